@@ -12,6 +12,7 @@ from app.api.v1.endpoints import (
     proyectos,
     empresa_proyecto,
     auth,
+    trabajos,
 )
 
 api_router = APIRouter()
@@ -84,6 +85,13 @@ api_router.include_router(
     dependencies=[require_auth],
 )
 
+api_router.include_router(
+    trabajos.router,
+    prefix="/trabajos",
+    tags=["Trabajos en segundo plano"],
+    dependencies=[require_auth],
+)
+
 api_router.include_router(
     documentos_onedrive.router,
     prefix="/documentos-onedrive",
@@ -1,19 +1,14 @@
 # app/api/v1/endpoints/documentos.py
 from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 
-import pytesseract
-from PIL import Image, ImageEnhance  # ← Importación correcta aquí
-import io
-
 from app.db.session import get_db
 from app.models.documento import DocumentoProcesado, GenerationRequest
-from app.core.config import TESSERACT_CMD
 from app.services.documento import ServicioDocumento
+from app.services.servicio_ocr import servicio_ocr
+from app.utils.documento_memoria import respuesta_descarga
 
 router = APIRouter()
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
 servicio_documento = ServicioDocumento()
 
 
@@ -27,37 +22,23 @@ async def ocr_extract(file: UploadFile = File(...)):
     try:
         # Leer la imagen
         contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        
-        # Preprocesar imagen para mejorar OCR
-        # 1. Convertir a escala de grises
-        image = image.convert('L')
-        
-        # 2. Aumentar contraste
-        enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(2.0)
-        
-        # 3. Aumentar nitidez
-        sharpener = ImageEnhance.Sharpness(image)
-        image = sharpener.enhance(2.0)
         
-        # Extraer texto con Tesseract
+        # Preprocesar (contraste 2.0 + binarización) y extraer texto con PSM 6
         # PSM 6 = Asume un bloque uniforme de texto (ideal para tablas)
-        custom_config = r'--oem 3 --psm 6'
-        extracted_text = pytesseract.image_to_string(image, lang='spa', config=custom_config)
+        resultado = await servicio_ocr.procesar(contents, perfil="v1")
         
         print("\n" + "="*70)
         print(" TEXTO RAW EXTRAÍDO POR TESSERACT:")
         print("="*70)
-        print(extracted_text)
+        print(resultado["texto"])
         print("="*70 + "\n")
         
-        # Parsear el texto con nuestro servicio
-        from app.services.ocr import parse_ocr_text
-        result = parse_ocr_text(extracted_text)
+        result = resultado["datos"]
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f" ERROR EN OCR: {str(e)}")
         import traceback
@@ -68,13 +49,9 @@ async def ocr_extract(file: UploadFile = File(...)):
 @router.post("/generate")
 def generate_new_document(request: GenerationRequest, db: Session = Depends(get_db)):
     try:
-        output_filename = servicio_documento.generar_documento(db, request)
+        documento = servicio_documento.generar_documento(db, request)
         
-        return FileResponse(
-            output_filename,
-            media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            filename=output_filename
-        )
+        return respuesta_descarga(documento)
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
@@ -4,26 +4,40 @@ Endpoint actualizado usando docxtpl para generación de documentos
 VERSIÓN MEJORADA - Con mejor preprocesamiento OCR
 """
 
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+import datetime
+import json
+import os
+from typing import List
 
-import pytesseract
-from PIL import Image, ImageEnhance, ImageFilter
-import io
+from fastapi import APIRouter, Depends, File, UploadFile, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
 
 from app.db.session import get_db
-from app.models.documento import DocumentoProcesado, GenerationRequest
-from app.core.config import TESSERACT_CMD
+from app.models.documento import DocumentoProcesado, GenerationRequest, GenerationBatchRequest
 from app.services.documento_v2 import ServicioDocumentoV2
+from app.services.ejecutor_ocr import ejecutor_ocr
+from app.services.cache_ocr import cache_ocr
+from app.services.cache_plantillas import cache_plantillas
+from app.services.cache_generacion import cache_generacion
+from app.core.config import OCR_PERFIL_POR_DEFECTO
+from app.services.servicio_ocr import servicio_ocr, validar_perfil, documento_procesado
+from app.services.lote_ocr import servicio_lote_ocr
+from app.services.lote_documentos import ColaboradorLote, servicio_lote_documentos, leer_csv_colaboradores
+from app.services.paginas_ocr import presupuesto_decodificacion
+from app.services.conversion_pdf import SALIDA_DOCX, SALIDA_PDF, pool_pdf, validar_salida
+from app.utils.documento_memoria import MEDIA_TYPE_PDF, MEDIA_TYPE_ZIP, comprimir_documentos, respuesta_descarga
 
 router = APIRouter()
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
 servicio_documento = ServicioDocumentoV2()
 
 
 @router.post("/ocr", response_model=DocumentoProcesado)
-async def ocr_extract(file: UploadFile = File(...)):
+async def ocr_extract(
+    file: UploadFile = File(...),
+    perfil: str = Form(OCR_PERFIL_POR_DEFECTO)
+):
     """
     Endpoint de OCR con preprocesamiento MEJORADO de imagen.
     Optimizado para detectar números en tablas (como edad).
@@ -31,72 +45,49 @@ async def ocr_extract(file: UploadFile = File(...)):
     MEJORAS:
     - Contraste más agresivo (2.5x)
     - Brillo ajustado (+20%)
-    - Nitidez aumentada (3.0x)
-    - Filtro SHARPEN adicional
+    - Binarización Otsu y enderezado automático
+    - Pasadas PSM en paralelo en el pool de OCR
+
+    PERFILES (campo `perfil`):
+    - fast: PSM 6 con tessdata_fast
+    - balanced: PSM 6 → 4 con el tessdata por defecto
+    - accurate: PSM 6 → 4 → 11 con tessdata_best
+    - layout: PSM 6 y luego solo las celdas de valor junto a cada etiqueta,
+      re-reconocidas con lista blanca (dígitos para CUI, edad y monto)
+    Si la primera pasada ya trae todos los campos con buena confianza,
+    las demás no se ejecutan.
+
+    Acepta también PDF y TIFF de varias páginas: las páginas se procesan en
+    paralelo y su texto se une antes del parser. Las páginas de PDF que ya
+    traen capa de texto se leen directamente, sin OCR.
     """
     print(f"📄 Procesando imagen: {file.filename}")
     
     try:
         # Leer la imagen
         contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        
-        # ===== PREPROCESAMIENTO MEJORADO =====
-        
-        # 1. Convertir a escala de grises
-        image = image.convert('L')
-        
-        # 2. Aumentar contraste (MÁS AGRESIVO)
-        enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(2.5)  # ⬆ Aumentado de 2.0 a 2.5
-        
-        # 3. Ajustar brillo ligeramente
-        brightness = ImageEnhance.Brightness(image)
-        image = brightness.enhance(1.2)  # ➕ NUEVO
         
-        # 4. Aumentar nitidez (MÁS AGRESIVO)
-        sharpener = ImageEnhance.Sharpness(image)
-        image = sharpener.enhance(3.0)  # ⬆ Aumentado de 2.0 a 3.0
-        
-        # 5. Aplicar filtro de nitidez adicional
-        image = image.filter(ImageFilter.SHARPEN)  # ➕ NUEVO
-        
-        # ===== EXTRACCIÓN DE TEXTO =====
-        
-        # INTENTAR MÚLTIPLES CONFIGURACIONES DE TESSERACT
-        
-        # Primer intento: PSM 6 (bloque uniforme de texto)
-        custom_config_1 = r'--oem 3 --psm 6'
-        extracted_text_1 = pytesseract.image_to_string(image, lang='spa', config=custom_config_1)
-        
-        # Segundo intento: PSM 4 (columna única de texto - mejor para tablas)
-        custom_config_2 = r'--oem 3 --psm 4'
-        extracted_text_2 = pytesseract.image_to_string(image, lang='spa', config=custom_config_2)
-        
-        # Tercer intento: PSM 11 (encontrar texto disperso - mejor para celdas)
-        custom_config_3 = r'--oem 3 --psm 11'
-        extracted_text_3 = pytesseract.image_to_string(image, lang='spa', config=custom_config_3)
-        
-        # Combinar resultados (el más largo suele ser el más completo)
-        textos = [extracted_text_1, extracted_text_2, extracted_text_3]
-        extracted_text = max(textos, key=len)
+        # ===== OCR: cache → preprocesamiento → pasadas PSM (con corte temprano) → parser =====
+        resultado = await servicio_ocr.procesar(contents, perfil=perfil)
         
         print("\n" + "="*70)
-        print("🔍 TEXTO RAW EXTRAÍDO POR TESSERACT:")
+        print(f"🔍 TEXTO RAW EXTRAÍDO POR TESSERACT (perfil {resultado['perfil']}):")
         print("="*70)
-        print(f"[PSM 6 - {len(extracted_text_1)} chars]")
-        print(f"[PSM 4 - {len(extracted_text_2)} chars]")
-        print(f"[PSM 11 - {len(extracted_text_3)} chars]")
-        print(f"\n📌 Usando el más completo:")
-        print(extracted_text)
+        for psm, pasada in resultado["pasadas"].items():
+            print(f"[PSM {psm} - {pasada['caracteres']} chars, "
+                  f"completitud {pasada['completitud']}, confianza {pasada['confianza_media']}]")
+        if resultado["desde_cache"]:
+            print("[Resultado desde cache]")
+        print(f"\n📌 Usando PSM {resultado['psm']}:")
+        print(resultado["texto"])
         print("="*70 + "\n")
         
-        # Parsear el texto con nuestro servicio MEJORADO
-        from app.services.ocr import parse_ocr_text
-        result = parse_ocr_text(extracted_text)
+        result = documento_procesado(resultado)
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ ERROR EN OCR: {str(e)}")
         import traceback
@@ -104,13 +95,82 @@ async def ocr_extract(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/ocr/lote")
+async def ocr_lote(
+    files: List[UploadFile] = File(...),
+    perfil: str = Form(OCR_PERFIL_POR_DEFECTO)
+):
+    """
+    OCR de varias imágenes (o de un ZIP con imágenes) en una sola solicitud.
+    
+    Responde en NDJSON (application/x-ndjson): una línea por imagen apenas
+    termina su OCR, en orden de llegada. Cada línea trae `indice` y `archivo`
+    para correlacionarla, y además:
+    - estado "ok": `documento` con el payload de DocumentoProcesado
+    - estado "error": `codigo` y `error` (el resto del lote sigue)
+    """
+    perfil = validar_perfil(perfil)
+    lote = await servicio_lote_ocr.preparar(files)
+    print(f"📦 Lote OCR recibido: {len(files)} archivo(s), perfil {perfil}")
+
+    async def generar_ndjson():
+        async for resultado in servicio_lote_ocr.procesar(lote, perfil=perfil):
+            yield json.dumps(resultado, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generar_ndjson(), media_type="application/x-ndjson")
+
+
+@router.get("/ocr/estado")
+def ocr_estado():
+    """
+    Estado del pool de OCR: workers, tareas en ejecución y profundidad de cola,
+    más el presupuesto de memoria para decodificar imágenes
+    """
+    return {**ejecutor_ocr.estado(), "memoria_decodificacion": presupuesto_decodificacion.estado()}
+
+
+@router.get("/ocr/cache")
+def ocr_cache():
+    """
+    Estadísticas de la cache de OCR: hits en memoria/disco, misses y tamaño en disco
+    """
+    return cache_ocr.estadisticas()
+
+
+@router.get("/plantillas/cache")
+def plantillas_cache():
+    """
+    Estadísticas de la cache de plantillas preparadas: hits, misses, recargas por cambio en disco
+    """
+    return cache_plantillas.estadisticas()
+
+
+@router.get("/generate/cache")
+def generacion_cache():
+    """
+    Estadísticas de la cache de documentos generados (y de solicitudes del flujo ya registradas)
+    """
+    return cache_generacion.estadisticas()
+
+
+@router.get("/pdf/estado")
+def pdf_estado():
+    """
+    Estado del pool de conversión a PDF: workers de LibreOffice activos, cola, timeouts
+    """
+    return pool_pdf.estado()
+
+
 @router.post("/generate")
-def generate_document(request: GenerationRequest, db: Session = Depends(get_db)):
+def generate_document(request: GenerationRequest, output: str = SALIDA_DOCX, db: Session = Depends(get_db)):
     """
     Genera un documento Word usando docxtpl
     
     CAMBIO PRINCIPAL: Ahora usa ServicioDocumentoV2 que implementa docxtpl
+    
+    ?output=docx (por defecto) | pdf (convertido con LibreOffice) | both (ZIP con los dos)
     """
+    output = validar_salida(output)
     try:
         print("\n" + "="*70)
         print("📝 SOLICITUD DE GENERACIÓN DE DOCUMENTO")
@@ -121,17 +181,24 @@ def generate_document(request: GenerationRequest, db: Session = Depends(get_db))
         print(f"Colaborador: {request.colaborador_data.datos_persona.nombre_completo}")
         print("="*70 + "\n")
         
+        # Antes de ir a la BD: la plantilla no debe quedar con datos del colaborador en blanco
+        servicio_documento.verificar_campos(request)
+        
         # Generar documento usando el nuevo servicio
-        output_filename = servicio_documento.generar_documento(db, request)
+        documento = servicio_documento.generar_documento(db, request)
         
-        print(f"\n✅ Documento generado exitosamente: {output_filename}\n")
+        print(f"\n✅ Documento generado exitosamente: {documento.nombre_archivo}\n")
         
-        # Retornar archivo para descarga
-        return FileResponse(
-            output_filename,
-            media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            filename=output_filename
-        )
+        if output == SALIDA_DOCX:
+            # Retornar el documento para descarga directo desde memoria
+            return respuesta_descarga(documento)
+        
+        pdf = pool_pdf.a_pdf(documento)
+        print(f"✅ PDF generado: {pdf.nombre_archivo} ({pdf.tamano} bytes)")
+        if output == SALIDA_PDF:
+            return respuesta_descarga(pdf, MEDIA_TYPE_PDF)
+        zip_nombre = os.path.splitext(documento.nombre_archivo)[0] + ".zip"
+        return respuesta_descarga(comprimir_documentos([documento, pdf], zip_nombre), MEDIA_TYPE_ZIP)
         
     except Exception as e:
         print(f"\n❌ ERROR AL GENERAR DOCUMENTO: {str(e)}\n")
@@ -148,6 +215,96 @@ def generate_document(request: GenerationRequest, db: Session = Depends(get_db))
         )
 
 
+@router.post("/generate/validar")
+def validar_generacion(request: GenerationRequest, db: Session = Depends(get_db)):
+    """
+    Revisa una solicitud contra el índice de campos de la plantilla, sin renderizar:
+    - faltantes: datos del colaborador que la plantilla usa y vienen vacíos (/generate responde 422)
+    - desconocidas: campos de la plantilla que el contexto no trae (quedarían en blanco)
+    """
+    empresa, representante = servicio_documento.obtener_empresa_representante(
+        db, request.empresa_id, request.representante_id
+    )
+    context = servicio_documento.preparar_contexto(empresa, representante, request)
+    validacion = servicio_documento.validar_solicitud(request, context)
+    validacion["valida"] = not validacion["faltantes"]
+    return validacion
+
+
+def _respuesta_zip(lote):
+    nombre = f"contratos_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return StreamingResponse(
+        servicio_lote_documentos.generar_zip(lote),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
+
+
+@router.post("/generate/lote")
+def generate_lote(request: GenerationBatchRequest, db: Session = Depends(get_db)):
+    """
+    Genera un contrato por colaborador con la misma plantilla, empresa y
+    representante, y los entrega en un ZIP que se va enviando mientras se
+    renderiza (ver servicio lote_documentos).
+    
+    Con `subirOnedrive` cada documento se sube a OneDrive; con `registrarBd`
+    además queda registrado en BD. El ZIP trae `resumen_lote.json` con el
+    estado de cada colaborador: un error individual no corta el lote.
+    
+    `output`: docx (por defecto), pdf o both. Con pdf el ZIP trae solo los
+    PDF; si se suben a OneDrive, el .docx se sube igual y el PDF queda al lado.
+    """
+    print(f"📦 Lote de generación: {len(request.colaboradores)} colaborador(es), plantilla {request.template_name}")
+    lote = servicio_lote_documentos.preparar(
+        db,
+        template_name=request.template_name,
+        fecha_contrato=request.fecha_contrato,
+        empresa_id=request.empresa_id,
+        representante_id=request.representante_id,
+        colaboradores=[ColaboradorLote(indice, colaborador=c) for indice, c in enumerate(request.colaboradores)],
+        subir_onedrive=request.subir_onedrive,
+        registrar_bd=request.registrar_bd,
+        salida=request.output
+    )
+    return _respuesta_zip(lote)
+
+
+@router.post("/generate/lote/csv")
+async def generate_lote_csv(
+    file: UploadFile = File(...),
+    template_name: str = Form(...),
+    fecha_contrato: str = Form(...),
+    empresa_id: int = Form(...),
+    representante_id: int = Form(...),
+    subir_onedrive: bool = Form(False),
+    registrar_bd: bool = Form(False),
+    output: str = Form(SALIDA_DOCX),
+    db: Session = Depends(get_db)
+):
+    """
+    Igual que /generate/lote, con los colaboradores en un CSV (una fila por
+    colaborador). Columnas: empresa_contratante, los campos de datos_persona
+    (cui, nombre_completo, direccion, edad, ...) y los de datos_contrato
+    (tipo_contrato, fecha_inicio, fecha_fin, monto, ...). Una fila inválida
+    aparece como error en el resumen del ZIP.
+    """
+    colaboradores = leer_csv_colaboradores(await file.read())
+    print(f"📦 Lote de generación (CSV {file.filename}): {len(colaboradores)} fila(s), plantilla {template_name}")
+    lote = await run_in_threadpool(
+        servicio_lote_documentos.preparar,
+        db,
+        template_name=template_name,
+        fecha_contrato=fecha_contrato,
+        empresa_id=empresa_id,
+        representante_id=representante_id,
+        colaboradores=colaboradores,
+        subir_onedrive=subir_onedrive,
+        registrar_bd=registrar_bd,
+        salida=output
+    )
+    return _respuesta_zip(lote)
+
+
 @router.get("/test")
 def test_endpoint():
     """
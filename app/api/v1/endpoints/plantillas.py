@@ -5,12 +5,13 @@ from typing import List
 import os
 import datetime
 import json
-import re
-import docx
+import zipfile
 
 from app.db.session import get_db
 from app.repository.plantilla import PlantillaRepository
 from app.models.plantilla import PlantillaSchema
+from app.services.cache_plantillas import cache_plantillas
+from app.services.indice_plantillas import extraer_indice, leer_indice
 
 router = APIRouter()
 repo = PlantillaRepository()
@@ -22,6 +23,21 @@ def get_all_plantillas(db: Session = Depends(get_db)):
     """
     return repo.get_all(db)
 
+@router.get("/{nombre_archivo}/campos")
+def get_campos_plantilla(nombre_archivo: str, db: Session = Depends(get_db)):
+    """
+    Índice de campos de la plantilla: el guardado al subirla o, para
+    plantillas subidas antes del índice, el de la plantilla preparada en cache.
+    """
+    plantilla = repo.get_by_nombre_archivo(db, nombre_archivo)
+    if plantilla is None:
+        raise HTTPException(status_code=404, detail=f"Plantilla no encontrada: {nombre_archivo}")
+    
+    indice = leer_indice(plantilla.get("campos_requeridos"))
+    if indice is None:
+        indice = cache_plantillas.obtener(nombre_archivo).indice
+    return {"nombre_archivo": nombre_archivo, **indice}
+
 @router.post("/upload")
 async def upload_plantilla(
     file: UploadFile = File(...),
@@ -43,17 +59,19 @@ async def upload_plantilla(
 
     contents = await file.read()
     
+    # El índice se arma antes de escribir nada: un .docx inválido no llega al disco ni a la BD
+    try:
+        indice = extraer_indice(contents)
+    except (zipfile.BadZipFile, KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"El archivo no es un .docx válido: {str(e)}")
+    
     try:
         # 1. Escribir el archivo en el disco
         with open(file_path, "wb") as f:
             f.write(contents)
         
-        # 2. Lógica para extraer placeholders...
-        doc = docx.Document(file_path)
-        placeholders = set()
-        # ... (código para extraer placeholders de párrafos y tablas) ...
-        # (Asegúrate de que esta lógica esté implementada)
-        campos_json = json.dumps(list(placeholders))
+        # 2. Índice de campos (cuerpo, tablas, encabezados y pies) como JSON
+        campos_json = json.dumps(indice, ensure_ascii=False)
         
         # 3. Guardar el registro en la base de datos
         repo.create(db, nombre, descripcion, nombre_archivo, categoria, campos_json)
@@ -61,7 +79,7 @@ async def upload_plantilla(
         # 4. CONFIRMAR LA TRANSACCIÓN
         db.commit()
         
-        return {"message": "Plantilla subida exitosamente", "nombre_archivo": nombre_archivo}
+        return {"message": "Plantilla subida exitosamente", "nombre_archivo": nombre_archivo, "campos": indice}
 
     except Exception as e:
         # 5. DESHACER LA TRANSACCIÓN DE BD
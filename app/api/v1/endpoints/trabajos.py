@@ -0,0 +1,212 @@
+# app/api/v1/endpoints/trabajos.py
+"""
+Trabajos en segundo plano: OCR, flujo completo y re-parseo sin retener la
+solicitud HTTP.
+
+1. POST /trabajos/ocr, /trabajos/flujo o /trabajos/reparseo → 202 con el id del trabajo
+2. GET /trabajos/{id}/eventos → progreso por etapa (Server-Sent Events)
+3. GET /trabajos/{id}/resultado → resultado final
+
+El procesamiento lo hace el worker (`python -m app.worker`), que corre
+como proceso aparte.
+"""
+
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.core.config import OCR_PERFIL_POR_DEFECTO
+from app.services.cola_trabajos import cola_trabajos, ESTADOS_FINALES
+from app.services.conversion_pdf import SALIDA_DOCX, validar_salida
+from app.services.servicio_ocr import validar_perfil
+
+router = APIRouter()
+
+INTERVALO_EVENTOS_SEGUNDOS = 0.5
+INTERVALO_LATIDO_SEGUNDOS = 15
+
+
+def _respuesta_encolado(trabajo_id: str):
+    return {
+        "id": trabajo_id,
+        "estado": "pendiente",
+        "estado_url": f"/api/v1/trabajos/{trabajo_id}",
+        "eventos_url": f"/api/v1/trabajos/{trabajo_id}/eventos",
+        "resultado_url": f"/api/v1/trabajos/{trabajo_id}/resultado",
+    }
+
+
+async def _obtener_trabajo(trabajo_id: str):
+    trabajo = await run_in_threadpool(cola_trabajos.obtener, trabajo_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return trabajo
+
+
+@router.post("/ocr", status_code=202)
+async def encolar_ocr(
+    file: UploadFile = File(...),
+    perfil: str = Form(OCR_PERFIL_POR_DEFECTO)
+):
+    """
+    Encola el OCR de una imagen. El resultado es el mismo payload de
+    /documentos-v2/ocr (DocumentoProcesado con metadatos_ocr).
+    """
+    perfil = validar_perfil(perfil)
+    contents = await file.read()
+    trabajo_id = await run_in_threadpool(
+        cola_trabajos.encolar, "ocr", {"perfil": perfil}, contents, file.filename
+    )
+    print(f"📥 Trabajo OCR encolado: {trabajo_id} ({file.filename})")
+    return _respuesta_encolado(trabajo_id)
+
+
+@router.post("/flujo", status_code=202)
+async def encolar_flujo(
+    # Imagen para OCR
+    imagen: UploadFile = File(...),
+
+    # Datos del contrato
+    template_name: str = Form(...),
+    fecha_contrato: str = Form(...),
+    empresa_id: int = Form(...),
+    representante_id: int = Form(...),
+
+    # Categorización
+    categoria: str = Form("contrato"),
+    notas: Optional[str] = Form(None),
+
+    # Perfil de OCR: fast / balanced / accurate
+    perfil_ocr: str = Form(OCR_PERFIL_POR_DEFECTO),
+
+    # docx / pdf / both
+    output: str = Form(SALIDA_DOCX)
+):
+    """
+    Encola el flujo completo de /flujo/procesar-y-generar
+    (OCR → OneDrive → documento Word → OneDrive → BD).
+    Etapas reportadas: ocr, imagen_onedrive, generacion, pdf (solo con
+    output=pdf o both), documento_onedrive, registro_bd
+    """
+    parametros = {
+        "template_name": template_name,
+        "fecha_contrato": fecha_contrato,
+        "empresa_id": empresa_id,
+        "representante_id": representante_id,
+        "categoria": categoria,
+        "notas": notas,
+        "perfil_ocr": validar_perfil(perfil_ocr),
+        "salida": validar_salida(output),
+    }
+    contents = await imagen.read()
+    trabajo_id = await run_in_threadpool(
+        cola_trabajos.encolar, "flujo", parametros, contents, imagen.filename
+    )
+    print(f"📥 Trabajo de flujo completo encolado: {trabajo_id} ({imagen.filename})")
+    return _respuesta_encolado(trabajo_id)
+
+
+@router.post("/reparseo", status_code=202)
+async def encolar_reparseo(
+    solo_desactualizados: bool = Form(True)
+):
+    """
+    Encola el re-parseo de los layouts de OCR guardados: vuelve a extraer los
+    campos con las reglas vigentes sin correr el OCR de nuevo. Por defecto solo
+    los documentos parseados con otra versión de parser o de reglas.
+    """
+    trabajo_id = await run_in_threadpool(
+        cola_trabajos.encolar, "reparseo", {"solo_desactualizados": solo_desactualizados}, b"", None
+    )
+    print(f"📥 Trabajo de re-parseo encolado: {trabajo_id}")
+    return _respuesta_encolado(trabajo_id)
+
+
+@router.get("/estadisticas")
+async def estadisticas_trabajos():
+    """Cantidad de trabajos por estado"""
+    return await run_in_threadpool(cola_trabajos.estadisticas)
+
+
+@router.get("/{trabajo_id}")
+async def estado_trabajo(trabajo_id: str):
+    """Estado, etapa actual e intentos de un trabajo"""
+    trabajo = await _obtener_trabajo(trabajo_id)
+    return {
+        "id": trabajo["id"],
+        "tipo": trabajo["tipo"],
+        "estado": trabajo["estado"],
+        "etapa": trabajo["etapa"],
+        "intentos": trabajo["intentos"],
+        "error": trabajo["error"],
+        "creado_en": trabajo["creado_en"],
+        "actualizado_en": trabajo["actualizado_en"],
+    }
+
+
+@router.get("/{trabajo_id}/resultado")
+async def resultado_trabajo(trabajo_id: str):
+    """
+    Resultado del trabajo. 409 si todavía no terminó; 422 si terminó con error.
+    """
+    trabajo = await _obtener_trabajo(trabajo_id)
+    if trabajo["estado"] == "error":
+        raise HTTPException(status_code=422, detail=trabajo["error"])
+    if trabajo["estado"] != "completado":
+        raise HTTPException(status_code=409, detail=f"El trabajo está {trabajo['estado']} (etapa: {trabajo['etapa']})")
+    return trabajo["resultado"]
+
+
+@router.get("/{trabajo_id}/eventos")
+async def eventos_trabajo(trabajo_id: str, last_event_id: Optional[str] = Header(None)):
+    """
+    Progreso del trabajo como Server-Sent Events: un evento por etapa.
+    El stream se cierra con el evento `completado` o `error`.
+    Soporta reconexión con el encabezado Last-Event-ID.
+    """
+    await _obtener_trabajo(trabajo_id)
+    ultimo_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+
+    async def generar_eventos():
+        nonlocal ultimo_id
+        sin_novedades = 0.0
+        terminado = False
+        while True:
+            eventos = await run_in_threadpool(cola_trabajos.eventos, trabajo_id, ultimo_id)
+            for evento in eventos:
+                ultimo_id = evento["id"]
+                datos = json.dumps(
+                    {"etapa": evento["etapa"], "mensaje": evento["mensaje"], "momento": evento["creado_en"]},
+                    ensure_ascii=False
+                )
+                yield f"id: {evento['id']}\nevent: {evento['etapa']}\ndata: {datos}\n\n"
+                if evento["etapa"] in ESTADOS_FINALES:
+                    return
+
+            if eventos:
+                sin_novedades = 0.0
+            else:
+                # Reconexión posterior al evento final: no hay nada más que esperar
+                if terminado:
+                    return
+                trabajo = await run_in_threadpool(cola_trabajos.obtener, trabajo_id)
+                if trabajo is None or trabajo["estado"] in ESTADOS_FINALES:
+                    # Una lectura más por si el evento final llegó entre ambas consultas
+                    terminado = True
+                    continue
+                sin_novedades += INTERVALO_EVENTOS_SEGUNDOS
+                if sin_novedades >= INTERVALO_LATIDO_SEGUNDOS:
+                    # Comentario SSE para que proxies y Azure no corten la conexión
+                    yield ": latido\n\n"
+                    sin_novedades = 0.0
+            await asyncio.sleep(INTERVALO_EVENTOS_SEGUNDOS)
+
+    return StreamingResponse(
+        generar_eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
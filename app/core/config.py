@@ -26,6 +26,62 @@ SQLALCHEMY_DATABASE_URL = f"mssql+pyodbc://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB
 # =============================================
 TESSERACT_CMD = os.getenv("TESSERACT_CMD", r'C:\Program Files\Tesseract-OCR\tesseract.exe')
 
+# Pool de procesos compartido para las pasadas de Tesseract
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+OCR_MAX_PENDIENTES = int(os.getenv("OCR_MAX_PENDIENTES", "24"))  # tareas en cola antes de responder 503
+OCR_TIMEOUT_SEGUNDOS = int(os.getenv("OCR_TIMEOUT_SEGUNDOS", "60"))  # límite por pasada de Tesseract
+
+# Motor de OCR: "tesserocr" (API en proceso, modelo cargado una vez) o "pytesseract" (un proceso por llamada)
+OCR_MOTOR = os.getenv("OCR_MOTOR", "tesserocr")
+OCR_DPI = os.getenv("OCR_DPI", "300")  # resolución declarada a Tesseract (vacío = autodetectar)
+OCR_TESSDATA_DIR = os.getenv("OCR_TESSDATA_DIR") or None
+
+# Recorte a la región del formulario y escalado antes del OCR
+OCR_DPI_MINIMO = float(os.getenv("OCR_DPI_MINIMO", "150"))  # fuera de [mínimo, máximo] se escala a OCR_DPI
+OCR_DPI_MAXIMO = float(os.getenv("OCR_DPI_MAXIMO", "350"))
+OCR_MAX_MEGAPIXELES = float(os.getenv("OCR_MAX_MEGAPIXELES", "10"))
+OCR_ANCHO_CONTENIDO_PULGADAS = float(os.getenv("OCR_ANCHO_CONTENIDO_PULGADAS", "7.5"))  # ancho útil de una hoja carta
+
+# Variantes de tessdata por perfil (fast = tessdata_fast, best = tessdata_best).
+# Si no se configuran, se usa OCR_TESSDATA_DIR.
+OCR_TESSDATA_VARIANTES = {
+    "fast": os.getenv("OCR_TESSDATA_FAST") or None,
+    "default": None,
+    "best": os.getenv("OCR_TESSDATA_BEST") or None,
+}
+OCR_PERFIL_POR_DEFECTO = os.getenv("OCR_PERFIL_POR_DEFECTO", "accurate")
+OCR_CONFIANZA_MINIMA = float(os.getenv("OCR_CONFIANZA_MINIMA", "80"))  # para cortar tras la primera pasada
+OCR_REGLAS_PATH = os.getenv("OCR_REGLAS_PATH") or None  # JSON con reglas del parser (se recarga al cambiar)
+
+# Memoria para decodificar imágenes (por proceso)
+OCR_MEMORIA_DECODIFICACION_MB = int(os.getenv("OCR_MEMORIA_DECODIFICACION_MB", "512"))  # más allá se encola
+OCR_MAX_MEGAPIXELES_ARCHIVO = float(os.getenv("OCR_MAX_MEGAPIXELES_ARCHIVO", "150"))  # más = bomba de descompresión
+
+# Documentos de varias páginas (PDF/TIFF)
+OCR_PDF_DPI = int(os.getenv("OCR_PDF_DPI", OCR_DPI or "300"))  # resolución al rasterizar páginas de PDF
+OCR_MAX_PAGINAS = int(os.getenv("OCR_MAX_PAGINAS", "50"))
+OCR_PAGINAS_CONCURRENCIA = int(os.getenv("OCR_PAGINAS_CONCURRENCIA", str(OCR_WORKERS)))  # páginas en vuelo por documento
+OCR_PDF_MIN_CARACTERES = int(os.getenv("OCR_PDF_MIN_CARACTERES", "20"))  # menos texto embebido = página escaneada
+
+# OCR por lotes (NDJSON): imágenes en vuelo a la vez y tamaño máximo por imagen
+OCR_LOTE_CONCURRENCIA = int(os.getenv("OCR_LOTE_CONCURRENCIA", str(OCR_WORKERS)))
+OCR_LOTE_MAX_MB_IMAGEN = int(os.getenv("OCR_LOTE_MAX_MB_IMAGEN", "25"))
+
+# Cache de resultados de OCR (memoria + disco)
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join(".cache", "ocr"))
+OCR_CACHE_MEMORIA_ENTRADAS = int(os.getenv("OCR_CACHE_MEMORIA_ENTRADAS", "256"))
+OCR_CACHE_DISCO_MB = int(os.getenv("OCR_CACHE_DISCO_MB", "256"))
+
+# =============================================
+# TRABAJOS EN SEGUNDO PLANO (cola durable + worker)
+# =============================================
+TRABAJOS_DB_PATH = os.getenv("TRABAJOS_DB_PATH", os.path.join(".cache", "trabajos", "trabajos.db"))
+TRABAJOS_DIR_ENTRADAS = os.getenv("TRABAJOS_DIR_ENTRADAS", os.path.join(".cache", "trabajos", "entradas"))
+TRABAJOS_CONCURRENCIA = int(os.getenv("TRABAJOS_CONCURRENCIA", "2"))  # trabajos simultáneos por worker
+TRABAJOS_LEASE_SEGUNDOS = int(os.getenv("TRABAJOS_LEASE_SEGUNDOS", "600"))  # sin noticias del worker → se re-encola
+TRABAJOS_MAX_INTENTOS = int(os.getenv("TRABAJOS_MAX_INTENTOS", "3"))
+TRABAJOS_RETENCION_HORAS = int(os.getenv("TRABAJOS_RETENCION_HORAS", "72"))
+
 # =============================================
 # CONFIGURACIÓN DE AZURE AD Y ONEDRIVE
 # =============================================
@@ -58,6 +114,52 @@ ONEDRIVE_PATHS = {
     "temp": os.getenv("ONEDRIVE_PATH_TEMP", "/Documentos_Legales/Temp")
 }
 
+# =============================================
+# PLANTILLAS DE DOCUMENTOS
+# =============================================
+PLANTILLAS_DIR = os.getenv("PLANTILLAS_DIR", "templates")
+PLANTILLAS_CACHE_MAX = int(os.getenv("PLANTILLAS_CACHE_MAX", "64"))  # plantillas preparadas en memoria
+
+# Generación por lote (ZIP): pool de procesos propio, separado del de OCR
+GENERACION_LOTE_WORKERS = int(os.getenv("GENERACION_LOTE_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+GENERACION_LOTE_CONCURRENCIA = int(os.getenv("GENERACION_LOTE_CONCURRENCIA", str(GENERACION_LOTE_WORKERS * 2)))  # documentos en vuelo por lote
+GENERACION_LOTE_MAX_DOCUMENTOS = int(os.getenv("GENERACION_LOTE_MAX_DOCUMENTOS", "500"))
+
+# Cache de documentos generados (memoria + disco): misma plantilla + mismos datos = mismo .docx
+GENERACION_CACHE_DIR = os.getenv("GENERACION_CACHE_DIR", os.path.join(".cache", "generacion"))
+GENERACION_CACHE_MEMORIA_ENTRADAS = int(os.getenv("GENERACION_CACHE_MEMORIA_ENTRADAS", "64"))
+GENERACION_CACHE_DISCO_MB = int(os.getenv("GENERACION_CACHE_DISCO_MB", "512"))
+# Flujo completo: solicitud idéntica → documento ya subido y registrado
+GENERACION_CACHE_FLUJO_ENTRADAS = int(os.getenv("GENERACION_CACHE_FLUJO_ENTRADAS", "1024"))
+GENERACION_CACHE_FLUJO_DISCO_MB = int(os.getenv("GENERACION_CACHE_FLUJO_DISCO_MB", "16"))
+
+# Conversión a PDF: procesos de LibreOffice headless que quedan vivos entre documentos
+CONVERSION_PDF_SOFFICE = os.getenv("CONVERSION_PDF_SOFFICE", "soffice")
+CONVERSION_PDF_PYTHON = os.getenv("CONVERSION_PDF_PYTHON", "/usr/bin/python3")  # intérprete con python3-uno
+CONVERSION_PDF_WORKERS = int(os.getenv("CONVERSION_PDF_WORKERS", "2"))
+CONVERSION_PDF_MAX_PENDIENTES = int(os.getenv("CONVERSION_PDF_MAX_PENDIENTES", "16"))  # en cola antes de responder 503
+CONVERSION_PDF_TIMEOUT_SEGUNDOS = int(os.getenv("CONVERSION_PDF_TIMEOUT_SEGUNDOS", "60"))  # por documento
+CONVERSION_PDF_ARRANQUE_SEGUNDOS = int(os.getenv("CONVERSION_PDF_ARRANQUE_SEGUNDOS", "60"))  # hasta que soffice acepta conexiones
+CONVERSION_PDF_MAX_TRABAJOS = int(os.getenv("CONVERSION_PDF_MAX_TRABAJOS", "200"))  # documentos antes de reciclar el proceso
+CONVERSION_PDF_PERFILES_DIR = os.getenv("CONVERSION_PDF_PERFILES_DIR", os.path.join(".cache", "libreoffice"))
+
+# =============================================
+# INGESTA DESDE CARPETA VIGILADA (python -m app.ingesta)
+# =============================================
+INGESTA_ORIGEN = os.getenv("INGESTA_ORIGEN", "local")  # local | onedrive
+INGESTA_DIR = os.getenv("INGESTA_DIR", "entrada_escaneos")
+# Subcarpeta propia: Imagenes_Originales también recibe las imágenes que sube el flujo
+INGESTA_ONEDRIVE_CARPETA = os.getenv("INGESTA_ONEDRIVE_CARPETA", ONEDRIVE_PATHS["imagenes"] + "/Entrada")
+INGESTA_INTERVALO_SEGUNDOS = float(os.getenv("INGESTA_INTERVALO_SEGUNDOS", "10"))
+INGESTA_ESPERA_SEGUNDOS = float(os.getenv("INGESTA_ESPERA_SEGUNDOS", "5"))  # sin cambios por este tiempo = copia terminada
+INGESTA_CONCURRENCIA = int(os.getenv("INGESTA_CONCURRENCIA", "2"))
+INGESTA_REGISTRO_PATH = os.getenv("INGESTA_REGISTRO_PATH", os.path.join(".cache", "ingesta", "ingesta.db"))
+# Datos del contrato que no vienen en el escaneo
+INGESTA_PLANTILLA = os.getenv("INGESTA_PLANTILLA")
+INGESTA_EMPRESA_ID = int(os.getenv("INGESTA_EMPRESA_ID", "0")) or None
+INGESTA_REPRESENTANTE_ID = int(os.getenv("INGESTA_REPRESENTANTE_ID", "0")) or None
+INGESTA_PERFIL_OCR = os.getenv("INGESTA_PERFIL_OCR", OCR_PERFIL_POR_DEFECTO)
+
 # =============================================
 # CONFIGURACIÓN GENERAL
 # =============================================
@@ -0,0 +1,205 @@
+# app/ingesta.py
+"""
+Ingesta automática de escaneos desde una carpeta vigilada.
+
+Corre como proceso independiente de la API, igual que el worker:
+
+    python -m app.ingesta
+
+Sondea la carpeta de entrada (local en INGESTA_DIR u OneDrive en
+INGESTA_ONEDRIVE_CARPETA, según INGESTA_ORIGEN), espera a que cada archivo
+termine de copiarse, descarta los duplicados por SHA-256 y pasa cada
+escaneo por el flujo completo (OCR → ServicioDocumentoV2 → OneDrive → BD),
+con como máximo INGESTA_CONCURRENCIA archivos en vuelo. Al terminar, cada
+archivo se mueve a procesados/, errores/ o duplicados/ (ver origenes_ingesta).
+
+Los datos del contrato que no salen del escaneo se configuran con
+INGESTA_PLANTILLA, INGESTA_EMPRESA_ID e INGESTA_REPRESENTANTE_ID; la fecha
+del contrato es la del día de la ingesta.
+"""
+
+import asyncio
+import datetime
+import signal
+import sys
+import time
+import traceback
+from typing import Dict
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import (
+    INGESTA_ORIGEN,
+    INGESTA_DIR,
+    INGESTA_ONEDRIVE_CARPETA,
+    INGESTA_INTERVALO_SEGUNDOS,
+    INGESTA_ESPERA_SEGUNDOS,
+    INGESTA_CONCURRENCIA,
+    INGESTA_PLANTILLA,
+    INGESTA_EMPRESA_ID,
+    INGESTA_REPRESENTANTE_ID,
+    INGESTA_PERFIL_OCR,
+)
+from app.db.session import SessionLocal
+from app.services.conversion_pdf import pool_pdf
+from app.services.ejecutor_ocr import ejecutor_ocr
+from app.services.flujo_documento import servicio_flujo_documento
+from app.services.origenes_ingesta import (
+    Antirrebote,
+    Candidato,
+    OrigenLocal,
+    OrigenOneDrive,
+    RegistroIngesta,
+    ESTADO_PROCESADO,
+    ESTADO_ERROR,
+    ESTADO_DUPLICADO,
+)
+from app.services.servicio_ocr import validar_perfil
+
+
+def crear_origen():
+    if INGESTA_ORIGEN == "onedrive":
+        return OrigenOneDrive(servicio_flujo_documento.onedrive_service, INGESTA_ONEDRIVE_CARPETA)
+    if INGESTA_ORIGEN == "local":
+        return OrigenLocal(INGESTA_DIR)
+    raise ValueError(f"INGESTA_ORIGEN inválido: {INGESTA_ORIGEN}. Use: local, onedrive")
+
+
+class Ingesta:
+
+    def __init__(self, origen, registro: RegistroIngesta, concurrencia: int = INGESTA_CONCURRENCIA):
+        self.origen = origen
+        self.registro = registro
+        self.concurrencia = max(1, concurrencia)
+        self.antirrebote = Antirrebote(INGESTA_ESPERA_SEGUNDOS)
+        # clave del origen → tarea, y hashes en vuelo (el mismo escaneo dos veces a la vez)
+        self._en_vuelo: Dict[str, asyncio.Future] = {}
+        self._hashes_en_vuelo = set()
+        self.contadores = {ESTADO_PROCESADO: 0, ESTADO_ERROR: 0, ESTADO_DUPLICADO: 0}
+
+    async def _flujo(self, candidato: Candidato, contenido: bytes) -> Dict:
+        db = SessionLocal()
+        try:
+            return await servicio_flujo_documento.ejecutar(
+                db,
+                contenido=contenido,
+                nombre_imagen=candidato.nombre,
+                template_name=INGESTA_PLANTILLA,
+                fecha_contrato=datetime.date.today().isoformat(),
+                empresa_id=INGESTA_EMPRESA_ID,
+                representante_id=INGESTA_REPRESENTANTE_ID,
+                notas=f"Ingesta automática desde {self.origen.descripcion()}",
+                perfil_ocr=INGESTA_PERFIL_OCR,
+                imagen_onedrive=self.origen.imagen_onedrive(candidato)
+            )
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _procesar(self, candidato: Candidato):
+        inicio = time.time()
+        hash_sha256 = None
+        try:
+            contenido = await run_in_threadpool(self.origen.leer, candidato)
+            hash_sha256 = servicio_flujo_documento.onedrive_service.calcular_hash(contenido)
+
+            anterior = await run_in_threadpool(self.registro.procesado, hash_sha256)
+            if anterior is not None or hash_sha256 in self._hashes_en_vuelo:
+                hash_sha256 = None  # el registro es del original, no se toca
+                await run_in_threadpool(self.origen.mover, candidato, ESTADO_DUPLICADO)
+                self.contadores[ESTADO_DUPLICADO] += 1
+                print(f"♻️ {candidato.nombre}: duplicado" + (f" del documento {anterior}" if anterior else ""))
+                return
+
+            self._hashes_en_vuelo.add(hash_sha256)
+            resultado = await self._flujo(candidato, contenido)
+            documento_id = resultado["documento"]["id"]
+            await run_in_threadpool(self.registro.registrar, hash_sha256, candidato.nombre, ESTADO_PROCESADO, documento_id)
+            await run_in_threadpool(self.origen.mover, candidato, ESTADO_PROCESADO)
+            self.contadores[ESTADO_PROCESADO] += 1
+            print(f"✅ {candidato.nombre}: documento {documento_id} en {time.time() - inicio:.1f}s")
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            print(f"❌ {candidato.nombre}: {error}")
+            if not isinstance(e, HTTPException):
+                traceback.print_exc()
+            if hash_sha256 is not None:
+                await run_in_threadpool(self.registro.registrar, hash_sha256, candidato.nombre, ESTADO_ERROR, None, str(error))
+            try:
+                await run_in_threadpool(self.origen.mover, candidato, ESTADO_ERROR, str(error))
+                self.contadores[ESTADO_ERROR] += 1
+            except Exception as e_mover:
+                # Queda en la carpeta de entrada y se reintenta en el próximo sondeo
+                print(f"⚠️ No se pudo mover {candidato.nombre} a {ESTADO_ERROR}: {e_mover}")
+        finally:
+            if hash_sha256 is not None:
+                self._hashes_en_vuelo.discard(hash_sha256)
+
+    async def sondear(self):
+        """Un sondeo: lanza los archivos listos mientras haya capacidad."""
+        candidatos = await run_in_threadpool(self.origen.listar)
+        for candidato in self.antirrebote.listos(candidatos):
+            if len(self._en_vuelo) >= self.concurrencia:
+                break
+            if candidato.clave in self._en_vuelo:
+                continue
+            tarea = asyncio.ensure_future(self._procesar(candidato))
+            self._en_vuelo[candidato.clave] = tarea
+            tarea.add_done_callback(lambda _, clave=candidato.clave: self._en_vuelo.pop(clave, None))
+
+    async def ejecutar(self, detener: asyncio.Event):
+        await run_in_threadpool(self.origen.preparar)
+        while not detener.is_set():
+            try:
+                await self.sondear()
+            except Exception as e:
+                # Un corte de red o de OneDrive no debe tumbar la ingesta
+                print(f"⚠️ Error al sondear {self.origen.descripcion()}: {e}")
+
+            # Hasta el próximo sondeo, o antes si se libera un lugar
+            espera = asyncio.ensure_future(detener.wait())
+            await asyncio.wait(
+                set(self._en_vuelo.values()) | {espera},
+                timeout=INGESTA_INTERVALO_SEGUNDOS, return_when=asyncio.FIRST_COMPLETED
+            )
+            espera.cancel()
+
+        print("⏹️ Deteniendo ingesta, esperando archivos en curso...")
+        if self._en_vuelo:
+            await asyncio.wait(set(self._en_vuelo.values()))
+
+
+async def ejecutar_ingesta():
+    if not (INGESTA_PLANTILLA and INGESTA_EMPRESA_ID and INGESTA_REPRESENTANTE_ID):
+        print("❌ Configure INGESTA_PLANTILLA, INGESTA_EMPRESA_ID e INGESTA_REPRESENTANTE_ID")
+        sys.exit(2)
+    validar_perfil(INGESTA_PERFIL_OCR)
+
+    origen = crear_origen()
+    ingesta = Ingesta(origen, RegistroIngesta())
+
+    detener = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(senal, detener.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    print("\n" + "="*70)
+    print(f"📥 INGESTA AUTOMÁTICA: {origen.descripcion()} (concurrencia {ingesta.concurrencia})")
+    print("="*70 + "\n")
+
+    try:
+        await ingesta.ejecutar(detener)
+    finally:
+        ejecutor_ocr.cerrar()
+        pool_pdf.cerrar()  # también borra los perfiles de LibreOffice de este proceso
+    print(f"📊 Ingesta detenida: {ingesta.contadores}")
+
+
+if __name__ == "__main__":
+    asyncio.run(ejecutar_ingesta())
@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.api import api_router # <- Importación absoluta
+from app.services.cache_plantillas import cache_plantillas
+from app.services.ejecutor_ocr import ejecutor_ocr
 
 app = FastAPI(title="API de Gestión Documental (Refactorizada)")
 
@@ -14,6 +16,39 @@ app.add_middleware(
 
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def precargar_plantillas():
+    """Prepara las plantillas activas para que la primera generación no pague el costo"""
+    from fastapi.concurrency import run_in_threadpool
+    from app.db.session import SessionLocal
+
+    def precargar():
+        db = SessionLocal()
+        try:
+            return cache_plantillas.precargar_activas(db)
+        finally:
+            db.close()
+
+    try:
+        resultado = await run_in_threadpool(precargar)
+        listas = sum(estado == "ok" for estado in resultado.values())
+        print(f"📄 Plantillas precargadas: {listas}/{len(resultado)}")
+        for nombre, estado in resultado.items():
+            if estado != "ok":
+                print(f"⚠️ Plantilla {nombre}: {estado}")
+    except Exception as e:
+        # Sin BD la API igual arranca; las plantillas se preparan en el primer uso
+        print(f"⚠️ No se pudieron precargar las plantillas: {e}")
+
+@app.on_event("shutdown")
+def cerrar_pool_ocr():
+    from app.services.conversion_pdf import pool_pdf
+    from app.services.lote_documentos import ejecutor_generacion
+
+    ejecutor_ocr.cerrar()
+    ejecutor_generacion.cerrar()
+    pool_pdf.cerrar()
+
 @app.get("/")
 def root():
     return {"message": "Bienvenido a la API de Gestión Documental"}
\ No newline at end of file
@@ -1,6 +1,6 @@
 # app/models/documento.py
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 class PersonaData(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
@@ -30,6 +30,8 @@ class DocumentoProcesado(BaseModel):
     empresa_contratante: Optional[str] = Field(None, serialization_alias='empresa_contratante')
     datos_persona: PersonaData = Field(..., serialization_alias='datos_persona')
     datos_contrato: ContratoData = Field(..., serialization_alias='datos_contrato')
+    # Perfil, PSM elegido y calidad de la pasada (solo en respuestas de OCR V2)
+    metadatos_ocr: Optional[Dict[str, Any]] = Field(None, serialization_alias='metadatos_ocr')
 
 class GenerationRequest(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
@@ -38,4 +40,19 @@ class GenerationRequest(BaseModel):
     fecha_contrato: str = Field(..., alias='fechaContrato')
     empresa_id: int = Field(..., alias='empresaId')
     representante_id: int = Field(..., alias='representanteId')
-    colaborador_data: DocumentoProcesado = Field(..., alias='colaboradorData')
\ No newline at end of file
+    colaborador_data: DocumentoProcesado = Field(..., alias='colaboradorData')
+
+class GenerationBatchRequest(BaseModel):
+    """Generación por lote: misma plantilla, empresa y representante para todos los colaboradores."""
+    model_config = ConfigDict(populate_by_name=True)
+    
+    template_name: str = Field(..., alias='templateName')
+    fecha_contrato: str = Field(..., alias='fechaContrato')
+    empresa_id: int = Field(..., alias='empresaId')
+    representante_id: int = Field(..., alias='representanteId')
+    colaboradores: List[DocumentoProcesado] = Field(..., alias='colaboradores')
+    # Subir cada documento a OneDrive y (opcionalmente) registrarlo en BD
+    subir_onedrive: bool = Field(False, alias='subirOnedrive')
+    registrar_bd: bool = Field(False, alias='registrarBd')
+    # docx, pdf o both (qué archivos van al ZIP; el .docx se sube siempre)
+    output: str = Field('docx', alias='output')
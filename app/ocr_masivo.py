@@ -0,0 +1,255 @@
+# app/ocr_masivo.py
+"""
+OCR masivo fuera de línea, para migraciones de archivo.
+
+Corre sin la API ni autenticación:
+
+    python -m app.ocr_masivo escaneos/ resultados.jsonl
+    python -m app.ocr_masivo escaneos/ resultados.jsonl --perfil fast --workers 8
+
+Recorre la carpeta (y subcarpetas) buscando imágenes y PDF, y procesa cada
+archivo con el mismo pipeline que /documentos-v2/ocr (servicio_ocr:
+preprocesamiento, pool de Tesseract con un proceso por núcleo y parse_ocr_text).
+
+La salida es JSONL, una línea por archivo en orden de terminación, escrita
+apenas termina cada uno. El mismo archivo de salida es el checkpoint: al
+volver a correr, se omiten los archivos que ya tienen una línea "ok" (y los
+que fallaron, salvo --reintentar-errores). Al final se imprime el resumen de
+rendimiento y de errores.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Set, Tuple
+
+# Un hilo de OpenMP por proceso de Tesseract: el paralelismo lo da el pool.
+# Se fija antes de crear el pool para que lo hereden los procesos hijos.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import OCR_PERFIL_POR_DEFECTO, OCR_LOTE_MAX_MB_IMAGEN
+from app.services.ejecutor_ocr import EjecutorOCR
+from app.services.lote_ocr import EXTENSIONES_IMAGEN
+from app.services.servicio_ocr import ServicioOCR, validar_perfil, documento_procesado
+
+INTERVALO_AVANCE_SEGUNDOS = 10
+
+
+class _SinCache:
+    """Cache nula: en una migración cada archivo se procesa una sola vez."""
+
+    def clave(self, contenido, descriptor):
+        return ""
+
+    def obtener(self, clave):
+        return None
+
+    def guardar(self, clave, valor):
+        pass
+
+
+def listar_archivos(carpeta: str) -> List[str]:
+    """Rutas relativas de las imágenes y PDF bajo la carpeta, ordenadas."""
+    archivos = []
+    for raiz, directorios, nombres in os.walk(carpeta):
+        directorios[:] = sorted(d for d in directorios if not d.startswith('.'))
+        for nombre in nombres:
+            if nombre.startswith('.') or not nombre.lower().endswith(EXTENSIONES_IMAGEN):
+                continue
+            archivos.append(os.path.relpath(os.path.join(raiz, nombre), carpeta))
+    return sorted(archivos)
+
+
+def leer_checkpoint(salida: str, reintentar_errores: bool) -> Set[str]:
+    """Archivos que ya figuran en la salida de una corrida anterior."""
+    hechos = set()
+    if not os.path.exists(salida):
+        return hechos
+    with open(salida, encoding='utf-8') as f:
+        for linea in f:
+            try:
+                registro = json.loads(linea)
+            except json.JSONDecodeError:
+                # Última línea truncada por una interrupción: ese archivo se reprocesa
+                continue
+            if registro.get("estado") == "ok" or not reintentar_errores:
+                hechos.add(registro["archivo"])
+    return hechos
+
+
+def recortar_linea_incompleta(salida: str):
+    """
+    Quita la última línea si quedó sin terminar (corrida interrumpida a mitad
+    de una escritura), para que el próximo registro no se pegue a ella.
+    """
+    if not os.path.exists(salida):
+        return
+    with open(salida, 'rb+') as f:
+        fin = f.seek(0, os.SEEK_END)
+        posicion = fin
+        while posicion > 0:
+            bloque = min(64 * 1024, posicion)
+            posicion -= bloque
+            f.seek(posicion)
+            ultimo_salto = f.read(bloque).rfind(b"\n")
+            if ultimo_salto != -1:
+                posicion += ultimo_salto + 1
+                break
+        if posicion < fin:
+            print(f"✂️ Se descarta la última línea incompleta de {salida} ({fin - posicion} bytes)")
+            f.truncate(posicion)
+
+
+def _leer_archivo(ruta: str) -> bytes:
+    if os.path.getsize(ruta) > OCR_LOTE_MAX_MB_IMAGEN * 1024 * 1024:
+        raise ValueError(f"El archivo supera el máximo de {OCR_LOTE_MAX_MB_IMAGEN} MB")
+    with open(ruta, 'rb') as f:
+        return f.read()
+
+
+async def procesar_archivo(servicio: ServicioOCR, carpeta: str, archivo: str,
+                           perfil: str, incluir_texto: bool) -> Dict[str, Any]:
+    inicio = time.perf_counter()
+    try:
+        contenido = await run_in_threadpool(_leer_archivo, os.path.join(carpeta, archivo))
+        resultado = await servicio.procesar(contenido, perfil=perfil)
+        registro = {
+            "archivo": archivo,
+            "estado": "ok",
+            "documento": documento_procesado(resultado).model_dump(by_alias=True),
+        }
+        if incluir_texto:
+            registro["texto"] = resultado["texto"]
+    except HTTPException as e:
+        registro = {"archivo": archivo, "estado": "error", "codigo": e.status_code, "error": e.detail}
+    except Exception as e:
+        registro = {"archivo": archivo, "estado": "error", "codigo": 500, "error": str(e)}
+    registro["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    return registro
+
+
+def _percentil(valores: List[float], percentil: float) -> float:
+    ordenados = sorted(valores)
+    posicion = min(len(ordenados) - 1, max(0, round(percentil / 100 * len(ordenados)) - 1))
+    return ordenados[posicion]
+
+
+def imprimir_resumen(registros: List[Dict[str, Any]], omitidos: int, duracion: float):
+    correctos = [r for r in registros if r["estado"] == "ok"]
+    errores = [r for r in registros if r["estado"] != "ok"]
+
+    print("\n" + "="*70)
+    print("RESUMEN DE OCR MASIVO")
+    print("="*70)
+    print(f"  Procesados:   {len(registros)} ({len(correctos)} ok, {len(errores)} con error)")
+    print(f"  Omitidos:     {omitidos} (ya estaban en la salida)")
+    print(f"  Duración:     {duracion:.1f}s")
+    if registros:
+        latencias = [r["duracion_ms"] for r in registros]
+        print(f"  Rendimiento:  {len(registros) / duracion:.2f} archivos/s")
+        print(f"  Latencia:     p50 {_percentil(latencias, 50):.0f} ms, "
+              f"p95 {_percentil(latencias, 95):.0f} ms, media {statistics.mean(latencias):.0f} ms")
+    if errores:
+        print("\n  Errores más frecuentes:")
+        for (codigo, error), cantidad in Counter((r["codigo"], str(r["error"])) for r in errores).most_common(5):
+            print(f"    {cantidad:>5} × [{codigo}] {error[:90]}")
+    print()
+
+
+async def ejecutar(argumentos) -> Tuple[List[Dict[str, Any]], int, float]:
+    perfil = validar_perfil(argumentos.perfil)
+    archivos = listar_archivos(argumentos.carpeta)
+    recortar_linea_incompleta(argumentos.salida)
+    hechos = leer_checkpoint(argumentos.salida, argumentos.reintentar_errores)
+    pendientes = [archivo for archivo in archivos if archivo not in hechos]
+    omitidos = len(archivos) - len(pendientes)
+    print(f"📂 {len(archivos)} archivos en {argumentos.carpeta}: {len(pendientes)} pendientes, {omitidos} ya procesados")
+
+    servicio = ServicioOCR()
+    # Sin límite de cola: la concurrencia la acota este mismo bucle
+    servicio.ejecutor = EjecutorOCR(max_workers=argumentos.workers, max_pendientes=10**6)
+    if not argumentos.usar_cache:
+        servicio.cache = _SinCache()
+    concurrencia = argumentos.concurrencia or argumentos.workers
+
+    registros = []
+    en_vuelo = set()
+    inicio = ultimo_avance = time.perf_counter()
+    with open(argumentos.salida, 'a', encoding='utf-8') as salida:
+        def escribir(tareas):
+            nonlocal ultimo_avance
+            for tarea in tareas:
+                registro = tarea.result()
+                registros.append(registro)
+                salida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                if registro["estado"] != "ok":
+                    print(f"❌ {registro['archivo']}: {registro['error']}")
+            salida.flush()
+            if time.perf_counter() - ultimo_avance >= INTERVALO_AVANCE_SEGUNDOS:
+                transcurrido = time.perf_counter() - inicio
+                print(f"  ⏱️ {len(registros)}/{len(pendientes)} ({len(registros) / transcurrido:.2f} archivos/s)")
+                ultimo_avance = time.perf_counter()
+
+        try:
+            for archivo in pendientes:
+                if len(en_vuelo) >= concurrencia:
+                    terminadas, en_vuelo = await asyncio.wait(en_vuelo, return_when=asyncio.FIRST_COMPLETED)
+                    escribir(terminadas)
+                en_vuelo.add(asyncio.ensure_future(
+                    procesar_archivo(servicio, argumentos.carpeta, archivo, perfil, argumentos.texto)
+                ))
+            while en_vuelo:
+                terminadas, en_vuelo = await asyncio.wait(en_vuelo, return_when=asyncio.FIRST_COMPLETED)
+                escribir(terminadas)
+        finally:
+            for tarea in en_vuelo:
+                tarea.cancel()
+            servicio.ejecutor.cerrar()
+    return registros, omitidos, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR masivo de una carpeta de escaneos a JSONL (reanudable)")
+    parser.add_argument("carpeta", help="Carpeta con imágenes/PDF (se recorre con subcarpetas)")
+    parser.add_argument("salida", help="Archivo JSONL de salida; si existe, se continúa donde quedó")
+    parser.add_argument("--perfil", default=OCR_PERFIL_POR_DEFECTO, help="Perfil de OCR (fast, balanced, accurate, layout)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos de Tesseract (por defecto, uno por núcleo)")
+    parser.add_argument("--concurrencia", type=int, default=0, help="Archivos en vuelo (por defecto, igual a --workers)")
+    parser.add_argument("--reintentar-errores", action="store_true", help="Vuelve a procesar los archivos que fallaron")
+    parser.add_argument("--texto", action="store_true", help="Incluye el texto reconocido en cada línea")
+    parser.add_argument("--usar-cache", action="store_true", help="Usa la cache de OCR (por defecto no)")
+    argumentos = parser.parse_args()
+
+    if not os.path.isdir(argumentos.carpeta):
+        print(f"❌ No existe la carpeta: {argumentos.carpeta}")
+        sys.exit(2)
+    try:
+        validar_perfil(argumentos.perfil)
+    except HTTPException as e:
+        print(f"❌ {e.detail}")
+        sys.exit(2)
+
+    print("\n" + "="*70)
+    print(f"🗂️ OCR MASIVO: perfil {argumentos.perfil}, {argumentos.workers} workers")
+    print("="*70)
+
+    try:
+        registros, omitidos, duracion = asyncio.run(ejecutar(argumentos))
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrumpido: lo ya escrito en la salida se omite al reanudar")
+        sys.exit(130)
+
+    imprimir_resumen(registros, omitidos, duracion)
+    sys.exit(1 if any(r["estado"] != "ok" for r in registros) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# app/repository/documento_layout_ocr.py
+"""
+Layout de OCR guardado por documento (ver services/reparseo_ocr.py).
+
+Tabla sin SP propio; se consulta directo como dbo.proyecto. Se crea con
+sql/001_documento_layout_ocr.sql. Si todavía no existe, el flujo registra
+el documento igual y solo se pierde la posibilidad de re-parsearlo.
+
+Su columna datos_ocr (JSON) es la base de comparación del re-parseo; lo que
+leen los endpoints sigue siendo dbo.documento.datos_ocr, que el re-parseo
+actualiza en la misma transacción (ver services/reparseo_ocr.py).
+"""
+
+from typing import Any, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+class DocumentoLayoutOCRRepository:
+
+    def guardar(self, db: Session, documento_id: int, layout: bytes, version_parser: str, datos_ocr: str):
+        """Guarda el layout del documento recién creado"""
+        db.execute(
+            text("""
+                INSERT INTO dbo.documento_layout_ocr (documento_id, layout, version_parser, datos_ocr)
+                VALUES (:documento_id, :layout, :version_parser, :datos_ocr)
+            """),
+            {
+                'documento_id': documento_id,
+                'layout': layout,
+                'version_parser': version_parser,
+                'datos_ocr': datos_ocr
+            }
+        )
+        # No db.commit()
+
+    def contar(self, db: Session, excluir_version: Optional[str] = None) -> int:
+        """Cantidad de layouts guardados (sin los que ya están en excluir_version)"""
+        return db.execute(
+            text("""
+                SELECT COUNT(*) FROM dbo.documento_layout_ocr
+                WHERE :version IS NULL OR version_parser <> :version
+            """),
+            {'version': excluir_version}
+        ).scalar()
+
+    def listar_lote(
+        self,
+        db: Session,
+        despues_de_id: int,
+        limite: int,
+        excluir_version: Optional[str] = None
+    ) -> List[Any]:
+        """
+        Siguiente lote por documento_id (paginación por clave, no OFFSET:
+        el costo no crece a medida que se avanza en la tabla). Incluye el
+        datos_ocr actual de dbo.documento como datos_documento.
+        """
+        return db.execute(
+            text("""
+                SELECT TOP (:limite) l.documento_id, l.layout, l.version_parser, l.datos_ocr,
+                       d.datos_ocr AS datos_documento
+                FROM dbo.documento_layout_ocr l
+                LEFT JOIN dbo.documento d ON d.id = l.documento_id
+                WHERE l.documento_id > :despues_de_id
+                  AND (:version IS NULL OR l.version_parser <> :version)
+                ORDER BY l.documento_id
+            """),
+            {'limite': limite, 'despues_de_id': despues_de_id, 'version': excluir_version}
+        ).mappings().all()
+
+    def actualizar_datos(self, db: Session, documento_id: int, version_parser: str, datos_ocr: str):
+        """Actualiza los campos estructurados tras un re-parseo"""
+        db.execute(
+            text("""
+                UPDATE dbo.documento_layout_ocr
+                SET datos_ocr = :datos_ocr, version_parser = :version_parser, fecha_reparseo = SYSUTCDATETIME()
+                WHERE documento_id = :documento_id
+            """),
+            {'documento_id': documento_id, 'version_parser': version_parser, 'datos_ocr': datos_ocr}
+        )
+        # No db.commit()
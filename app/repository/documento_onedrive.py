@@ -181,6 +181,17 @@ class DocumentoOneDriveRepository:
         )
         # No db.commit()
     
+    def actualizar_datos_ocr(self, db: Session, documento_id: int, datos_ocr: str):
+        """
+        Reemplaza los datos de OCR del documento (re-parseo). sp_CRUD_Documentos
+        no tiene acción para esta columna: se actualiza directo, como dbo.proyecto
+        """
+        db.execute(
+            text("UPDATE dbo.documento SET datos_ocr = :datos_ocr WHERE id = :id"),
+            {'id': documento_id, 'datos_ocr': datos_ocr}
+        )
+        # No db.commit()
+    
     def eliminar(self, db: Session, documento_id: int):
         """Elimina lógicamente un documento (estado=anulado)"""
         db.execute(
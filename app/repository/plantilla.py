@@ -7,6 +7,12 @@ class PlantillaRepository:
         result = db.execute(text("EXEC sp_Plantilla_ListarActivos"))
         return result.mappings().all()
 
+    def get_by_nombre_archivo(self, db: Session, nombre_archivo: str):
+        for plantilla in self.get_all(db):
+            if plantilla["nombre_archivo"] == nombre_archivo:
+                return plantilla
+        return None
+
     def create(self, db: Session, nombre: str, descripcion: str, nombre_archivo: str, categoria: str, campos_requeridos: str):
         params = {
             'nombre': nombre,
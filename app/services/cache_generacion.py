@@ -0,0 +1,135 @@
+# app/services/cache_generacion.py
+"""
+Cache de documentos generados: la misma plantilla con los mismos datos da
+siempre el mismo .docx, así que volver a "generar" sin cambios no vuelve a
+renderizar.
+
+Clave = SHA-256 del contenido de la plantilla (PlantillaPreparada.sha256) +
+los valores ya calculados de cada campo que usa la plantilla (rutas del
+índice de campos, ver indice_plantillas), en JSON con claves ordenadas. Los
+derivados que la plantilla no usa no cuentan ni se calculan.
+Valor = el .docx, tal cual.
+
+Para el flujo completo hay además un mapa clave de la solicitud → resultado
+(item de OneDrive y fila de `documento`): una solicitud idéntica devuelve el
+documento existente sin renderizar, subir ni insertar nada.
+
+Igual que cache_ocr: cada versión del código de render usa su propio
+subdirectorio y al arrancar se eliminan los de versiones anteriores.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, Optional
+
+import docxtpl
+
+from app.core.config import (
+    GENERACION_CACHE_DIR,
+    GENERACION_CACHE_DISCO_MB,
+    GENERACION_CACHE_FLUJO_DISCO_MB,
+    GENERACION_CACHE_FLUJO_ENTRADAS,
+    GENERACION_CACHE_MEMORIA_ENTRADAS,
+)
+from app.services import cache_plantillas as modulo_plantillas
+from app.services.cache_plantillas import PlantillaPreparada
+from app.services.indice_plantillas import rutas_indice
+from app.utils.cache_dos_niveles import CacheBinariaDosNiveles, CacheDosNiveles
+from app.utils.contexto_perezoso import materializar
+
+
+def _huella_version() -> str:
+    """Versión de docxtpl + hash del código que renderiza (cache_plantillas)."""
+    huella = hashlib.sha256()
+    huella.update(docxtpl.__version__.encode())
+    with open(modulo_plantillas.__file__, 'rb') as f:
+        huella.update(f.read())
+    return f"docxtpl{docxtpl.__version__}-{huella.hexdigest()[:12]}"
+
+
+def _purgar_versiones_anteriores(raiz: str, vigente: str):
+    if not os.path.isdir(raiz):
+        return
+    for entrada in os.scandir(raiz):
+        if entrada.is_dir() and entrada.name != vigente:
+            shutil.rmtree(entrada.path, ignore_errors=True)
+            print(f"🗑️ Cache de generación: eliminada versión obsoleta {entrada.name}")
+
+
+def valores_usados(context: Dict[str, Any], indice: Dict[str, Any]) -> Dict[str, Any]:
+    """{ruta: valor} de cada campo de la plantilla, con los derivados calculados."""
+    if indice.get("errores"):
+        # El índice no vio toda la plantilla: cuenta el contexto completo
+        return materializar(context)
+    usados = {}
+    for ruta in rutas_indice(indice):
+        valor = context
+        recorrido = []
+        for segmento in ruta.split('.'):
+            if not isinstance(valor, dict) or segmento not in valor:
+                break  # atributo de un valor final (p. ej. .upper()) o campo que no existe
+            valor = valor[segmento]
+            recorrido.append(segmento)
+        if recorrido:
+            usados['.'.join(recorrido)] = materializar(valor) if isinstance(valor, dict) else valor
+    return usados
+
+
+def _digest(*partes) -> str:
+    return hashlib.sha256(
+        json.dumps(partes, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    ).hexdigest()
+
+
+class CacheGeneracion:
+
+    def __init__(self, raiz: str = GENERACION_CACHE_DIR):
+        self.version = _huella_version()
+        _purgar_versiones_anteriores(raiz, self.version)
+        self._documentos = CacheBinariaDosNiveles(
+            directorio=os.path.join(raiz, self.version, "documentos"),
+            max_entradas_memoria=GENERACION_CACHE_MEMORIA_ENTRADAS,
+            max_bytes_disco=GENERACION_CACHE_DISCO_MB * 1024 * 1024,
+        )
+        self._flujo = CacheDosNiveles(
+            directorio=os.path.join(raiz, self.version, "flujo"),
+            max_entradas_memoria=GENERACION_CACHE_FLUJO_ENTRADAS,
+            max_bytes_disco=GENERACION_CACHE_FLUJO_DISCO_MB * 1024 * 1024,
+        )
+
+    @staticmethod
+    def clave(preparada: PlantillaPreparada, context: Dict[str, Any]) -> str:
+        return _digest(preparada.sha256, valores_usados(context, preparada.indice))
+
+    def obtener(self, clave: str) -> Optional[bytes]:
+        return self._documentos.obtener(clave)
+
+    def guardar(self, clave: str, contenido: bytes):
+        self._documentos.guardar(clave, bytes(contenido))
+
+    @staticmethod
+    def clave_flujo(clave_documento: str, **parametros) -> str:
+        """Clave del documento + lo que además queda en OneDrive/BD (imagen, categoría, salida...)."""
+        return _digest(clave_documento, parametros)
+
+    def obtener_flujo(self, clave: str) -> Optional[Dict[str, Any]]:
+        return self._flujo.obtener(clave)
+
+    def guardar_flujo(self, clave: str, resultado: Dict[str, Any]):
+        self._flujo.guardar(clave, resultado)
+
+    def descartar_flujo(self, clave: str):
+        self._flujo.descartar(clave)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "documentos": self._documentos.estadisticas(),
+            "flujo": self._flujo.estadisticas(),
+        }
+
+
+# Instancia compartida por la generación V2, el lote y el flujo completo
+cache_generacion = CacheGeneracion()
@@ -0,0 +1,81 @@
+# app/services/cache_ocr.py
+"""
+Cache de resultados de OCR direccionado por contenido.
+
+Clave = SHA-256 de los bytes de la imagen + perfil (preprocesamiento, PSM y
+tessdata) + huella de las reglas vigentes del parser.
+Valor = texto/TSV de la pasada elegida + salida de parse_ocr_text + calidad.
+
+La invalidación es automática: cada combinación de versión del parser y del
+preprocesamiento (más una huella del código fuente de ambos módulos) usa su
+propio subdirectorio, y al arrancar se eliminan los subdirectorios de
+versiones anteriores.
+"""
+
+import hashlib
+import os
+import shutil
+from typing import Any, Dict, Optional
+
+from app.core.config import OCR_CACHE_DIR, OCR_CACHE_MEMORIA_ENTRADAS, OCR_CACHE_DISCO_MB
+from app.services import calidad_ocr as modulo_calidad
+from app.services import layout_ocr as modulo_layout
+from app.services import ocr as modulo_ocr
+from app.services import paginas_ocr as modulo_paginas
+from app.services import preprocesamiento as modulo_preprocesamiento
+from app.utils.cache_dos_niveles import CacheDosNiveles
+
+
+def _huella_version() -> str:
+    """Versiones declaradas + hash del código del parser, preprocesamiento, evaluación, layout y páginas."""
+    huella = hashlib.sha256()
+    huella.update(modulo_ocr.PARSER_VERSION.encode())
+    huella.update(modulo_preprocesamiento.PREPROCESAMIENTO_VERSION.encode())
+    for modulo in (modulo_ocr, modulo_preprocesamiento, modulo_calidad, modulo_layout,
+                   modulo_paginas):
+        with open(modulo.__file__, 'rb') as f:
+            huella.update(f.read())
+    return (
+        f"p{modulo_ocr.PARSER_VERSION}"
+        f"-pp{modulo_preprocesamiento.PREPROCESAMIENTO_VERSION}"
+        f"-{huella.hexdigest()[:12]}"
+    )
+
+
+def _purgar_versiones_anteriores(raiz: str, vigente: str):
+    if not os.path.isdir(raiz):
+        return
+    for entrada in os.scandir(raiz):
+        if entrada.is_dir() and entrada.name != vigente:
+            shutil.rmtree(entrada.path, ignore_errors=True)
+            print(f"🗑️ Cache OCR: eliminada versión obsoleta {entrada.name}")
+
+
+class CacheOCR:
+
+    def __init__(self, raiz: str = OCR_CACHE_DIR):
+        self.version = _huella_version()
+        _purgar_versiones_anteriores(raiz, self.version)
+        self._cache = CacheDosNiveles(
+            directorio=os.path.join(raiz, self.version),
+            max_entradas_memoria=OCR_CACHE_MEMORIA_ENTRADAS,
+            max_bytes_disco=OCR_CACHE_DISCO_MB * 1024 * 1024,
+        )
+
+    @staticmethod
+    def clave(contenido: bytes, perfil: str) -> str:
+        digest_imagen = hashlib.sha256(contenido).hexdigest()
+        return hashlib.sha256(f"{digest_imagen}|{perfil}".encode()).hexdigest()
+
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        return self._cache.obtener(clave)
+
+    def guardar(self, clave: str, resultado: Dict[str, Any]):
+        self._cache.guardar(clave, resultado)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {"version": self.version, **self._cache.estadisticas()}
+
+
+# Instancia compartida por los endpoints de OCR
+cache_ocr = CacheOCR()
@@ -0,0 +1,249 @@
+# app/services/cache_plantillas.py
+"""
+Cache de plantillas docxtpl ya preparadas.
+
+Abrir una plantilla con DocxTemplate y renderizarla repite en cada
+solicitud el trabajo que solo depende del archivo: leer el zip, parsear el
+XML, limpiar las etiquetas Jinja partidas entre runs (patch_xml) y compilar
+el XML resultante a una plantilla Jinja. Aquí eso se hace una vez por
+plantilla:
+
+- Clave: nombre + mtime + tamaño del archivo; si el archivo cambia en
+  disco, la siguiente solicitud lo vuelve a preparar (y el SHA-256 del
+  contenido queda en las estadísticas)
+- Cada render recibe un clon propio (copia profunda del documento parseado
+  + las plantillas Jinja ya compiladas, que son inmutables), así que las
+  solicitudes concurrentes nunca comparten estado mutable
+- precargar_activas() prepara al arrancar las plantillas activas de BD
+- De paso se arma el índice de campos de la plantilla (indice_plantillas)
+- El entorno Jinja trae los filtros de formato legal (| letras, | letras_cui,
+  | fecha_larga...; ver formato_legal.FILTROS_JINJA)
+
+PlantillaCompilada reimplementa build_xml y build_headers_footers_xml de
+DocxTemplate para usar el XML precompilado (docxtpl==0.16.7).
+"""
+
+import copy
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Tuple
+
+from docx import Document
+from docxtpl import DocxTemplate
+from fastapi import HTTPException
+from jinja2 import Environment, Template
+
+from app.core.config import PLANTILLAS_DIR, PLANTILLAS_CACHE_MAX
+from app.services.indice_plantillas import PARTE_CUERPO, PARTE_ENCABEZADO, PARTE_PIE, indice_desde_xml
+from app.utils.formato_legal import FILTROS_JINJA
+
+# Las plantillas Jinja compiladas se pueden renderizar desde varios hilos a la vez
+_entorno_jinja = Environment()
+_entorno_jinja.filters.update(FILTROS_JINJA)
+
+
+@dataclass
+class PlantillaPreparada:
+    """Todo lo que depende solo del archivo de la plantilla (no se modifica)."""
+    nombre: str
+    firma: Tuple[int, int]  # (mtime_ns, tamaño)
+    sha256: str
+    documento: Any  # docx.Document original, se clona en cada render
+    cuerpo: Template
+    partes: Dict[str, Tuple[Template, str]] = field(default_factory=dict)  # relKey → (plantilla, encoding)
+    indice: Dict[str, Any] = field(default_factory=dict)  # ver indice_plantillas
+    tamano: int = 0
+    preparacion_ms: float = 0.0
+
+
+class PlantillaCompilada(DocxTemplate):
+    """DocxTemplate que renderiza un clon de una PlantillaPreparada."""
+
+    def __init__(self, preparada: PlantillaPreparada, ruta: str):
+        super().__init__(ruta)
+        self.preparada = preparada
+
+    def init_docx(self, reload: bool = True):
+        if not self.docx or (self.is_rendered and reload):
+            self.docx = copy.deepcopy(self.preparada.documento)
+            self.is_rendered = False
+
+    def _renderizar_parte(self, plantilla: Template, part, context) -> str:
+        # Igual que DocxTemplate.render_xml_part, sin patch_xml ni compilación
+        self.current_rendering_part = part
+        dst_xml = plantilla.render(context)
+        dst_xml = re.sub(r'\n<w:p([ >])', r'<w:p\1', dst_xml)
+        dst_xml = (dst_xml
+                   .replace('{_{', '{{')
+                   .replace('}_}', '}}')
+                   .replace('{_%', '{%')
+                   .replace('%_}', '%}'))
+        return self.resolve_listing(dst_xml)
+
+    def build_xml(self, context, jinja_env=None):
+        return self._renderizar_parte(self.preparada.cuerpo, self.docx._part, context)
+
+    def build_headers_footers_xml(self, context, uri, jinja_env=None):
+        for rel_key, part in self.get_headers_footers(uri):
+            plantilla, encoding = self.preparada.partes[rel_key]
+            yield rel_key, self._renderizar_parte(plantilla, part, context).encode(encoding)
+
+
+def _compilar(xml_parcheado: str) -> Template:
+    # Mismo salto de línea antes de cada párrafo que agrega render_xml_part
+    return _entorno_jinja.from_string(re.sub(r'<w:p([ >])', r'\n<w:p\1', xml_parcheado))
+
+
+def preparar_plantilla(nombre: str, ruta: str, firma: Tuple[int, int]) -> PlantillaPreparada:
+    inicio = time.perf_counter()
+    with open(ruta, 'rb') as f:
+        contenido = f.read()
+
+    # Se usa DocxTemplate solo para parsear y limpiar el XML, una vez
+    base = DocxTemplate(io.BytesIO(contenido))
+    base.init_docx()
+    xml_cuerpo = base.patch_xml(base.get_xml())
+    cuerpo = _compilar(xml_cuerpo)
+    partes = {}
+    xml_partes = {PARTE_CUERPO: [xml_cuerpo], PARTE_ENCABEZADO: [], PARTE_PIE: []}
+    for uri, nombre_parte in ((DocxTemplate.HEADER_URI, PARTE_ENCABEZADO), (DocxTemplate.FOOTER_URI, PARTE_PIE)):
+        for rel_key, part in base.get_headers_footers(uri):
+            xml = base.get_part_xml(part)
+            xml_parcheado = base.patch_xml(xml)
+            partes[rel_key] = (_compilar(xml_parcheado), base.get_headers_footers_encoding(xml))
+            xml_partes[nombre_parte].append(xml_parcheado)
+
+    return PlantillaPreparada(
+        nombre=nombre,
+        firma=firma,
+        sha256=hashlib.sha256(contenido).hexdigest(),
+        documento=Document(io.BytesIO(contenido)),
+        cuerpo=cuerpo,
+        partes=partes,
+        indice=indice_desde_xml(xml_partes),
+        tamano=len(contenido),
+        preparacion_ms=round((time.perf_counter() - inicio) * 1000, 1),
+    )
+
+
+class CachePlantillas:
+
+    def __init__(self, directorio: str = PLANTILLAS_DIR, max_entradas: int = PLANTILLAS_CACHE_MAX):
+        self.directorio = directorio
+        self.max_entradas = max(1, max_entradas)
+        self._entradas: "OrderedDict[str, PlantillaPreparada]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Un lock por plantilla: dos solicitudes de la misma plantilla fría la preparan una sola vez
+        self._locks_preparacion: Dict[str, threading.Lock] = {}
+        self._hits = 0
+        self._misses = 0
+        self._recargas = 0
+
+    def _ruta(self, nombre: str) -> str:
+        return os.path.join(self.directorio, nombre)
+
+    def obtener(self, nombre: str) -> PlantillaPreparada:
+        """Plantilla preparada vigente; 404 si el archivo no existe."""
+        ruta = self._ruta(nombre)
+        try:
+            info = os.stat(ruta)
+        except OSError:
+            raise HTTPException(status_code=404, detail=f"Plantilla no encontrada: {ruta}")
+        firma = (info.st_mtime_ns, info.st_size)
+
+        with self._lock:
+            entrada = self._entradas.get(nombre)
+            if entrada is not None and entrada.firma == firma:
+                self._entradas.move_to_end(nombre)
+                self._hits += 1
+                return entrada
+            lock_preparacion = self._locks_preparacion.setdefault(nombre, threading.Lock())
+
+        with lock_preparacion:
+            # Otro hilo pudo haberla preparado mientras se esperaba el lock
+            with self._lock:
+                entrada = self._entradas.get(nombre)
+                if entrada is not None and entrada.firma == firma:
+                    self._hits += 1
+                    return entrada
+                if entrada is not None:
+                    self._recargas += 1
+                self._misses += 1
+
+            preparada = preparar_plantilla(nombre, ruta, firma)
+            print(f"📄 Plantilla preparada: {nombre} ({preparada.preparacion_ms} ms)")
+
+            with self._lock:
+                self._entradas[nombre] = preparada
+                self._entradas.move_to_end(nombre)
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+            return preparada
+
+    def nueva_plantilla(self, nombre: str) -> PlantillaCompilada:
+        """Clon listo para render(); cada llamada devuelve uno independiente."""
+        return PlantillaCompilada(self.obtener(nombre), self._ruta(nombre))
+
+    def precargar(self, nombres: Iterable[str]) -> Dict[str, str]:
+        """Prepara las plantillas indicadas; retorna {nombre: "ok" | error}."""
+        resultado = {}
+        for nombre in nombres:
+            try:
+                self.obtener(nombre)
+                resultado[nombre] = "ok"
+            except HTTPException as e:
+                resultado[nombre] = e.detail
+            except Exception as e:
+                resultado[nombre] = str(e)
+        return resultado
+
+    def precargar_activas(self, db) -> Dict[str, str]:
+        """Prepara las plantillas activas registradas en BD (PlantillaRepository.get_all)."""
+        from app.repository.plantilla import PlantillaRepository
+
+        nombres = [fila["nombre_archivo"] for fila in PlantillaRepository().get_all(db) if fila.get("nombre_archivo")]
+        return self.precargar(nombres)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self._hits + self._misses
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "hits": self._hits,
+                "misses": self._misses,
+                "recargas": self._recargas,
+                "tasa_hits": round(self._hits / consultas, 3) if consultas else None,
+                "plantillas": [
+                    {
+                        "nombre": entrada.nombre,
+                        "sha256": entrada.sha256,
+                        "bytes": entrada.tamano,
+                        "preparacion_ms": entrada.preparacion_ms,
+                    }
+                    for entrada in self._entradas.values()
+                ],
+            }
+
+
+# Instancia compartida por los servicios de generación
+cache_plantillas = CachePlantillas()
+
+
+def renderizar_en_bytes(nombre: str, context: Dict[str, Any]) -> bytes:
+    """
+    Renderiza la plantilla y retorna el .docx. Pensada para correr en un pool
+    de procesos: cada proceso usa su propia cache_plantillas, y este módulo
+    no arrastra la BD ni OneDrive al importarse en el worker.
+    """
+    doc = cache_plantillas.nueva_plantilla(nombre)
+    doc.render(context)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
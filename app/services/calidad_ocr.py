@@ -0,0 +1,107 @@
+# app/services/calidad_ocr.py
+"""
+Evaluación de calidad de una pasada de OCR.
+
+Combina dos señales:
+- Confianza por palabra de Tesseract (TSV de image_to_data)
+- Completitud de los campos que espera parse_ocr_text: CUI con dígito
+  verificador válido, COLABORADOR, FECHA DE INICIO, HONORARIOS y EDAD
+
+Sirve para elegir la mejor pasada (en lugar del texto más largo) y para
+cortar temprano cuando la primera pasada ya es completa y confiable.
+"""
+
+import re
+from typing import Any, Dict, List
+
+# Cantidad de municipios por departamento (índice 0 = departamento 01)
+MUNICIPIOS_POR_DEPARTAMENTO = [17, 8, 16, 16, 14, 14, 19, 8, 24, 21, 9, 30, 33, 21, 8, 17, 14, 5, 11, 11, 7, 17]
+
+CAMPOS_REQUERIDOS = ("cui", "nombre_completo", "fecha_inicio", "monto", "edad")
+
+_NO_DIGITOS = re.compile(r'\D')
+
+
+def validar_cui(cui: str) -> bool:
+    """
+    Valida un CUI/DPI guatemalteco de 13 dígitos:
+    8 dígitos + verificador (módulo 11) + departamento (2) + municipio (2)
+    """
+    cui = _NO_DIGITOS.sub('', cui or '')
+    if len(cui) != 13:
+        return False
+
+    numero = cui[:8]
+    verificador = int(cui[8])
+    departamento = int(cui[9:11])
+    municipio = int(cui[11:13])
+
+    if not 1 <= departamento <= len(MUNICIPIOS_POR_DEPARTAMENTO):
+        return False
+    if not 1 <= municipio <= MUNICIPIOS_POR_DEPARTAMENTO[departamento - 1]:
+        return False
+
+    total = sum(int(digito) * (posicion + 2) for posicion, digito in enumerate(numero))
+    return total % 11 == verificador
+
+
+def palabras_tsv(tsv: str) -> List[Dict[str, Any]]:
+    """Convierte el TSV de Tesseract (sin encabezado) en una lista de palabras."""
+    palabras = []
+    for linea in tsv.splitlines():
+        columnas = linea.split('\t')
+        # level=5 → palabra
+        if len(columnas) < 12 or columnas[0] != '5' or not columnas[11].strip():
+            continue
+        palabras.append({
+            "bloque": int(columnas[2]),
+            "parrafo": int(columnas[3]),
+            "linea": int(columnas[4]),
+            "left": int(columnas[6]),
+            "top": int(columnas[7]),
+            "width": int(columnas[8]),
+            "height": int(columnas[9]),
+            "conf": float(columnas[10]),
+            "texto": columnas[11],
+        })
+    return palabras
+
+
+def campos_encontrados(datos: Dict[str, Any]) -> List[str]:
+    """Campos requeridos presentes (y válidos) en la salida de parse_ocr_text."""
+    persona = datos.get("datos_persona", {})
+    contrato = datos.get("datos_contrato", {})
+    encontrados = []
+    if validar_cui(persona.get("cui", "")):
+        encontrados.append("cui")
+    if persona.get("nombre_completo"):
+        encontrados.append("nombre_completo")
+    if contrato.get("fecha_inicio"):
+        encontrados.append("fecha_inicio")
+    if contrato.get("monto") and contrato.get("monto") != "Q.0.00":
+        encontrados.append("monto")
+    if persona.get("edad"):
+        encontrados.append("edad")
+    return encontrados
+
+
+def evaluar_pasada(datos: Dict[str, Any], tsv: str) -> Dict[str, Any]:
+    """Puntaje de una pasada: completitud de campos + confianza media por palabra."""
+    confianzas = [p["conf"] for p in palabras_tsv(tsv) if p["conf"] >= 0]
+    encontrados = campos_encontrados(datos)
+    return {
+        "campos_encontrados": encontrados,
+        "campos_faltantes": [c for c in CAMPOS_REQUERIDOS if c not in encontrados],
+        "completitud": round(len(encontrados) / len(CAMPOS_REQUERIDOS), 3),
+        "confianza_media": round(sum(confianzas) / len(confianzas), 2) if confianzas else 0.0,
+    }
+
+
+def es_suficiente(evaluacion: Dict[str, Any], confianza_minima: float) -> bool:
+    """Registro completo y con confianza suficiente: no hace falta otra pasada."""
+    return evaluacion["completitud"] == 1.0 and evaluacion["confianza_media"] >= confianza_minima
+
+
+def clave_orden(evaluacion: Dict[str, Any], texto: str):
+    """Orden para elegir la mejor pasada; el largo del texto solo desempata."""
+    return (evaluacion["completitud"], evaluacion["confianza_media"], len(texto))
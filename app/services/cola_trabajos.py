@@ -0,0 +1,300 @@
+# app/services/cola_trabajos.py
+"""
+Cola durable de trabajos en segundo plano (SQLite).
+
+La API encola y consulta; el worker (`python -m app.worker`) corre como
+proceso aparte, toma trabajos y publica su progreso por etapa. Como ambos
+procesos comparten solo el archivo SQLite, el estado sobrevive reinicios
+de cualquiera de los dos.
+
+Estados: pendiente → en_proceso → completado | error
+
+Un trabajo tomado tiene un lease (TRABAJOS_LEASE_SEGUNDOS) que el worker
+renueva mientras lo procesa. Si el worker muere, el lease vence y otro
+worker lo vuelve a tomar, hasta TRABAJOS_MAX_INTENTOS; solo los tipos
+reintentables: un flujo con el lease vencido pasa a error, porque pudo
+haber subido archivos o insertado el documento.
+
+Las escrituras del worker (etapas, resultado, error) solo aplican si el
+trabajo sigue siendo suyo: un worker que perdió el lease no pisa al nuevo.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from app.core.config import (
+    TRABAJOS_DB_PATH,
+    TRABAJOS_DIR_ENTRADAS,
+    TRABAJOS_LEASE_SEGUNDOS,
+    TRABAJOS_MAX_INTENTOS,
+    TRABAJOS_RETENCION_HORAS,
+)
+
+TIPOS_TRABAJO = ("ocr", "flujo", "reparseo")
+# Trabajos que se pueden repetir sin efectos duplicados
+TIPOS_REINTENTABLES = ("ocr", "reparseo")
+ESTADOS_FINALES = ("completado", "error")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    parametros TEXT NOT NULL,
+    nombre_archivo TEXT,
+    etapa TEXT,
+    resultado TEXT,
+    error TEXT,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_hasta REAL,
+    creado_en REAL NOT NULL,
+    actualizado_en REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_trabajos_estado ON trabajos (estado, creado_en);
+CREATE TABLE IF NOT EXISTS eventos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    trabajo_id TEXT NOT NULL,
+    etapa TEXT NOT NULL,
+    mensaje TEXT,
+    creado_en REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_eventos_trabajo ON eventos (trabajo_id, id);
+"""
+
+
+class ColaTrabajos:
+
+    def __init__(self, ruta_db: str = TRABAJOS_DB_PATH, dir_entradas: str = TRABAJOS_DIR_ENTRADAS):
+        self.ruta_db = ruta_db
+        self.dir_entradas = dir_entradas
+        self._local = threading.local()
+        self._inicializada = False
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Conexión (una por hilo; el esquema se crea en el primer uso)
+    # ------------------------------------------------------------------
+    def _conexion(self) -> sqlite3.Connection:
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.ruta_db)), exist_ok=True)
+            conexion = sqlite3.connect(self.ruta_db, timeout=30, isolation_level=None)
+            conexion.row_factory = sqlite3.Row
+            # WAL: lectores (API) no bloquean al escritor (worker)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        with self._lock:
+            if not self._inicializada:
+                conexion.executescript(_ESQUEMA)
+                os.makedirs(self.dir_entradas, exist_ok=True)
+                self._inicializada = True
+        return conexion
+
+    @contextmanager
+    def _transaccion(self):
+        """BEGIN IMMEDIATE: toma el lock de escritura al inicio (evita carreras entre workers)."""
+        conexion = self._conexion()
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            yield conexion
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+        conexion.execute("COMMIT")
+
+    def _ruta_entrada(self, trabajo_id: str) -> str:
+        return os.path.join(self.dir_entradas, f"{trabajo_id}.bin")
+
+    @staticmethod
+    def _a_dict(fila: sqlite3.Row) -> Dict[str, Any]:
+        trabajo = dict(fila)
+        trabajo["parametros"] = json.loads(trabajo["parametros"])
+        trabajo["resultado"] = json.loads(trabajo["resultado"]) if trabajo["resultado"] else None
+        return trabajo
+
+    # ------------------------------------------------------------------
+    # Lado API
+    # ------------------------------------------------------------------
+    def encolar(self, tipo: str, parametros: Dict[str, Any], contenido: bytes, nombre_archivo: Optional[str]) -> str:
+        """Guarda la entrada en disco y registra el trabajo como pendiente."""
+        if tipo not in TIPOS_TRABAJO:
+            raise ValueError(f"Tipo de trabajo inválido: {tipo}")
+        self._conexion()
+        trabajo_id = uuid.uuid4().hex
+        ruta = self._ruta_entrada(trabajo_id)
+        with open(ruta + ".tmp", 'wb') as f:
+            f.write(contenido)
+        os.replace(ruta + ".tmp", ruta)
+
+        ahora = time.time()
+        with self._transaccion() as conexion:
+            conexion.execute(
+                "INSERT INTO trabajos (id, tipo, estado, parametros, nombre_archivo, etapa, creado_en, actualizado_en) "
+                "VALUES (?, ?, 'pendiente', ?, ?, 'en_cola', ?, ?)",
+                (trabajo_id, tipo, json.dumps(parametros, ensure_ascii=False), nombre_archivo, ahora, ahora)
+            )
+            self._insertar_evento(conexion, trabajo_id, "en_cola", "Trabajo encolado")
+        return trabajo_id
+
+    def obtener(self, trabajo_id: str) -> Optional[Dict[str, Any]]:
+        fila = self._conexion().execute("SELECT * FROM trabajos WHERE id = ?", (trabajo_id,)).fetchone()
+        return self._a_dict(fila) if fila else None
+
+    def eventos(self, trabajo_id: str, despues_de: int = 0) -> List[Dict[str, Any]]:
+        filas = self._conexion().execute(
+            "SELECT id, etapa, mensaje, creado_en FROM eventos WHERE trabajo_id = ? AND id > ? ORDER BY id",
+            (trabajo_id, despues_de)
+        ).fetchall()
+        return [dict(fila) for fila in filas]
+
+    def estadisticas(self) -> Dict[str, int]:
+        filas = self._conexion().execute("SELECT estado, COUNT(*) AS total FROM trabajos GROUP BY estado").fetchall()
+        return {fila["estado"]: fila["total"] for fila in filas}
+
+    # ------------------------------------------------------------------
+    # Lado worker
+    # ------------------------------------------------------------------
+    def tomar(self, worker: str) -> Optional[Dict[str, Any]]:
+        """
+        Toma atómicamente el trabajo pendiente más antiguo (o uno reintentable
+        cuyo lease venció) y lo marca en_proceso para este worker.
+        """
+        ahora = time.time()
+        tipos = ", ".join("?" * len(TIPOS_REINTENTABLES))
+        with self._transaccion() as conexion:
+            # Trabajos abandonados que no se vuelven a tomar: sin intentos o no reintentables
+            abandonados = conexion.execute(
+                f"SELECT id, tipo FROM trabajos WHERE estado = 'en_proceso' AND lease_hasta < ? "
+                f"AND (intentos >= ? OR tipo NOT IN ({tipos}))",
+                (ahora, TRABAJOS_MAX_INTENTOS, *TIPOS_REINTENTABLES)
+            ).fetchall()
+            for abandonado in abandonados:
+                if abandonado["tipo"] in TIPOS_REINTENTABLES:
+                    error = "El worker dejó de responder y se agotaron los intentos"
+                else:
+                    error = "El worker dejó de responder; no se reintenta para no duplicar documentos"
+                conexion.execute(
+                    "UPDATE trabajos SET estado = 'error', etapa = 'error', error = ?, lease_hasta = NULL, "
+                    "actualizado_en = ? WHERE id = ?",
+                    (error, ahora, abandonado["id"])
+                )
+                self._insertar_evento(conexion, abandonado["id"], "error", error)
+            fila = conexion.execute(
+                f"SELECT id FROM trabajos "
+                f"WHERE estado = 'pendiente' OR (estado = 'en_proceso' AND lease_hasta < ? AND tipo IN ({tipos})) "
+                f"ORDER BY creado_en LIMIT 1",
+                (ahora, *TIPOS_REINTENTABLES)
+            ).fetchone()
+            if fila is not None:
+                conexion.execute(
+                    "UPDATE trabajos SET estado = 'en_proceso', worker = ?, intentos = intentos + 1, "
+                    "lease_hasta = ?, actualizado_en = ? WHERE id = ?",
+                    (worker, ahora + TRABAJOS_LEASE_SEGUNDOS, ahora, fila["id"])
+                )
+        for abandonado in abandonados:
+            self._eliminar_entrada(abandonado["id"])
+        return self.obtener(fila["id"]) if fila is not None else None
+
+    def leer_entrada(self, trabajo_id: str) -> bytes:
+        with open(self._ruta_entrada(trabajo_id), 'rb') as f:
+            return f.read()
+
+    def _insertar_evento(self, conexion: sqlite3.Connection, trabajo_id: str, etapa: str, mensaje: str):
+        conexion.execute(
+            "INSERT INTO eventos (trabajo_id, etapa, mensaje, creado_en) VALUES (?, ?, ?, ?)",
+            (trabajo_id, etapa, mensaje, time.time())
+        )
+
+    # Condición de las escrituras del worker: el trabajo sigue en proceso y es suyo
+    _PROPIO = "id = ? AND worker = ? AND estado = 'en_proceso'"
+
+    def renovar_lease(self, trabajo_id: str, worker: str) -> bool:
+        """Extiende el lease; False si el trabajo ya no es de este worker."""
+        ahora = time.time()
+        with self._transaccion() as conexion:
+            cursor = conexion.execute(
+                f"UPDATE trabajos SET lease_hasta = ?, actualizado_en = ? WHERE {self._PROPIO}",
+                (ahora + TRABAJOS_LEASE_SEGUNDOS, ahora, trabajo_id, worker)
+            )
+        return cursor.rowcount > 0
+
+    def registrar_etapa(self, trabajo_id: str, worker: str, etapa: str, mensaje: str) -> bool:
+        """Publica una etapa y renueva el lease; False si el trabajo ya no es de este worker."""
+        ahora = time.time()
+        with self._transaccion() as conexion:
+            cursor = conexion.execute(
+                f"UPDATE trabajos SET etapa = ?, lease_hasta = ?, actualizado_en = ? WHERE {self._PROPIO}",
+                (etapa, ahora + TRABAJOS_LEASE_SEGUNDOS, ahora, trabajo_id, worker)
+            )
+            if cursor.rowcount == 0:
+                return False
+            self._insertar_evento(conexion, trabajo_id, etapa, mensaje)
+        return True
+
+    def completar(self, trabajo_id: str, worker: str, resultado: Dict[str, Any]) -> bool:
+        with self._transaccion() as conexion:
+            cursor = conexion.execute(
+                f"UPDATE trabajos SET estado = 'completado', etapa = 'completado', resultado = ?, "
+                f"lease_hasta = NULL, actualizado_en = ? WHERE {self._PROPIO}",
+                (json.dumps(resultado, ensure_ascii=False, default=str), time.time(), trabajo_id, worker)
+            )
+            if cursor.rowcount == 0:
+                return False
+            self._insertar_evento(conexion, trabajo_id, "completado", "Trabajo completado")
+        self._eliminar_entrada(trabajo_id)
+        return True
+
+    def fallar(self, trabajo_id: str, worker: str, error: str, reintentable: bool = True) -> bool:
+        """
+        Registra el error. Si quedan intentos y el error es reintentable,
+        el trabajo vuelve a pendiente; si no, queda en estado error.
+        False si el trabajo ya no es de este worker (no se toca).
+        """
+        with self._transaccion() as conexion:
+            fila = conexion.execute(f"SELECT intentos FROM trabajos WHERE {self._PROPIO}", (trabajo_id, worker)).fetchone()
+            if fila is None:
+                return False
+            reintentar = reintentable and fila["intentos"] < TRABAJOS_MAX_INTENTOS
+            etapa = "reintento" if reintentar else "error"
+            conexion.execute(
+                "UPDATE trabajos SET estado = ?, etapa = ?, error = ?, lease_hasta = NULL, actualizado_en = ? "
+                "WHERE id = ?",
+                ("pendiente" if reintentar else "error", etapa, error, time.time(), trabajo_id)
+            )
+            self._insertar_evento(conexion, trabajo_id, etapa, error)
+        if not reintentar:
+            self._eliminar_entrada(trabajo_id)
+        return True
+
+    def _eliminar_entrada(self, trabajo_id: str):
+        try:
+            os.remove(self._ruta_entrada(trabajo_id))
+        except OSError:
+            pass
+
+    def purgar_antiguos(self, horas: int = TRABAJOS_RETENCION_HORAS) -> int:
+        """Elimina trabajos terminados (y sus eventos) más viejos que la retención."""
+        limite = time.time() - horas * 3600
+        with self._transaccion() as conexion:
+            conexion.execute(
+                "DELETE FROM eventos WHERE trabajo_id IN "
+                "(SELECT id FROM trabajos WHERE estado IN ('completado', 'error') AND actualizado_en < ?)",
+                (limite,)
+            )
+            cursor = conexion.execute(
+                "DELETE FROM trabajos WHERE estado IN ('completado', 'error') AND actualizado_en < ?",
+                (limite,)
+            )
+        return cursor.rowcount
+
+
+# Instancia compartida por la API y el worker
+cola_trabajos = ColaTrabajos()
@@ -0,0 +1,338 @@
+# app/services/conversion_pdf.py
+"""
+Conversión de los .docx generados a PDF con LibreOffice headless.
+
+Levantar soffice cuesta segundos, así que no se lanza uno por archivo: hay
+un pool de CONVERSION_PDF_WORKERS procesos que quedan vivos. Cada worker es
+un puente_uno (con el Python que trae python3-uno) con su propio soffice y
+su propio perfil, conectado por UNO; el .docx va y vuelve por stdin/stdout
+del puente, en memoria.
+
+- Arranque perezoso: el primer documento que llega a un worker lo levanta
+- Timeout por documento: si se pasa, se mata el grupo de procesos del
+  worker (puente + soffice) y el siguiente documento lo vuelve a levantar
+- Reciclaje: después de CONVERSION_PDF_MAX_TRABAJOS documentos el worker
+  se cierra limpio (LibreOffice acumula memoria con el uso)
+- Perfil de LibreOffice por worker y por proceso (host + pid): la API, el
+  worker de trabajos y la ingesta tienen cada uno su pool; se borra al
+  detener el worker, y los de procesos muertos al crear el pool
+- Cola acotada: más de workers + CONVERSION_PDF_MAX_PENDIENTES documentos
+  esperando = 503, como el pool de OCR
+
+convertir() es bloqueante: desde código async va por run_in_threadpool.
+"""
+
+import io
+import os
+import queue
+import shutil
+import signal
+import socket
+import struct
+import subprocess
+import threading
+from typing import Dict, List, Union
+
+from fastapi import HTTPException
+
+from app.core.config import (
+    CONVERSION_PDF_ARRANQUE_SEGUNDOS,
+    CONVERSION_PDF_MAX_PENDIENTES,
+    CONVERSION_PDF_MAX_TRABAJOS,
+    CONVERSION_PDF_PERFILES_DIR,
+    CONVERSION_PDF_PYTHON,
+    CONVERSION_PDF_SOFFICE,
+    CONVERSION_PDF_TIMEOUT_SEGUNDOS,
+    CONVERSION_PDF_WORKERS,
+)
+from app.utils.documento_memoria import DocumentoGenerado
+
+# Valores de output en los endpoints de generación y flujo
+SALIDA_DOCX = "docx"
+SALIDA_PDF = "pdf"
+SALIDA_AMBOS = "both"
+SALIDAS = (SALIDA_DOCX, SALIDA_PDF, SALIDA_AMBOS)
+
+_PUENTE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "puente_uno.py")
+
+
+def validar_salida(output: str) -> str:
+    output = (output or SALIDA_DOCX).lower()
+    if output not in SALIDAS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"output inválido: {output}. Valores permitidos: {', '.join(SALIDAS)}"
+        )
+    return output
+
+
+def incluye_pdf(salida: str) -> bool:
+    return salida in (SALIDA_PDF, SALIDA_AMBOS)
+
+
+def nombre_pdf(nombre_archivo: str) -> str:
+    return os.path.splitext(nombre_archivo)[0] + ".pdf"
+
+
+class ErrorConversion(Exception):
+    """LibreOffice respondió, pero no pudo convertir el documento."""
+
+
+class TiempoAgotado(Exception):
+    pass
+
+
+class LibreOfficeNoDisponible(Exception):
+    """No se pudo levantar el worker (sin soffice o sin python3-uno, o no arrancó a tiempo)."""
+
+
+class TrabajadorPDF:
+    """Un puente_uno + soffice persistente. Lo usa un solo hilo a la vez."""
+
+    def __init__(self, numero: int):
+        self.numero = numero
+        self.proceso = None
+        self.trabajos = 0
+        self.reinicios = 0
+        self._vencido = False
+        self._perfil = None
+
+    def _matar(self):
+        self._vencido = True
+        try:
+            os.killpg(self.proceso.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _con_limite(self, segundos: float, funcion, *args):
+        """Corre funcion(*args); si tarda más de `segundos`, mata el worker."""
+        self._vencido = False
+        vigilante = threading.Timer(segundos, self._matar)
+        vigilante.start()
+        try:
+            return funcion(*args)
+        except (OSError, ValueError, struct.error, ErrorConversion):
+            if self._vencido:
+                raise TiempoAgotado()
+            raise
+        finally:
+            vigilante.cancel()
+
+    def _leer(self, cantidad: int) -> bytes:
+        datos = self.proceso.stdout.read(cantidad)
+        if len(datos) < cantidad:
+            raise ErrorConversion("El proceso de LibreOffice terminó inesperadamente")
+        return datos
+
+    def _iniciar(self):
+        # Perfil por proceso: la API, el worker y la ingesta tienen cada uno su pool, y dos soffice
+        # con el mismo UserInstallation se comparten (el segundo le pasa el trabajo al primero y sale)
+        perfil = os.path.join(CONVERSION_PDF_PERFILES_DIR, f"{_prefijo_perfil()}{self.numero}")
+        os.makedirs(perfil, exist_ok=True)
+        self._perfil = perfil
+        tuberia = f"gestion_documental_pdf_{os.getpid()}_{self.numero}"
+        try:
+            self.proceso = subprocess.Popen(
+                [CONVERSION_PDF_PYTHON, _PUENTE, CONVERSION_PDF_SOFFICE, tuberia, perfil,
+                 str(CONVERSION_PDF_ARRANQUE_SEGUNDOS)],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                start_new_session=True  # grupo propio: matarlo se lleva también a soffice
+            )
+        except OSError as e:
+            self._borrar_perfil()
+            raise LibreOfficeNoDisponible(f"no se pudo ejecutar {CONVERSION_PDF_PYTHON}: {e}")
+        self.trabajos = 0
+        try:
+            self._con_limite(CONVERSION_PDF_ARRANQUE_SEGUNDOS + 5, self._esperar_listo)
+        except TiempoAgotado:
+            self.detener(forzar=True)
+            raise LibreOfficeNoDisponible(f"LibreOffice no arrancó en {CONVERSION_PDF_ARRANQUE_SEGUNDOS} segundos")
+        except Exception as e:
+            self.detener(forzar=True)
+            raise LibreOfficeNoDisponible(f"LibreOffice no arrancó ({e}); revisar soffice y python3-uno")
+        self.reinicios += 1
+        print(f"📄 LibreOffice listo (worker PDF {self.numero}, pid {self.proceso.pid})")
+
+    def _esperar_listo(self):
+        if self._leer(1) != b'L':
+            raise ErrorConversion("Respuesta inesperada al iniciar LibreOffice")
+
+    def _intercambiar(self, contenido: Union[bytes, memoryview]) -> bytes:
+        self.proceso.stdin.write(struct.pack('>I', len(contenido)))
+        self.proceso.stdin.write(contenido)
+        self.proceso.stdin.flush()
+        estado = self._leer(1)
+        tamano, = struct.unpack('>I', self._leer(4))
+        datos = self._leer(tamano)
+        if estado != b'0':
+            raise ErrorConversion(datos.decode('utf-8', 'replace'))
+        return datos
+
+    def convertir(self, contenido: Union[bytes, memoryview], timeout: float) -> bytes:
+        if self.proceso is None or self.proceso.poll() is not None:
+            self._iniciar()
+        try:
+            pdf = self._con_limite(timeout, self._intercambiar, contenido)
+        except Exception:
+            # Tras un error no se sabe en qué quedó soffice: el siguiente documento lo levanta de nuevo
+            self.detener(forzar=True)
+            raise
+        self.trabajos += 1
+        if self.trabajos >= CONVERSION_PDF_MAX_TRABAJOS:
+            print(f"♻️ Reciclando worker PDF {self.numero} tras {self.trabajos} documentos")
+            self.detener()
+        return pdf
+
+    def detener(self, forzar: bool = False):
+        if self.proceso is None:
+            return
+        proceso, self.proceso = self.proceso, None
+        try:
+            self._terminar(proceso, forzar)
+        finally:
+            self._borrar_perfil()
+
+    @staticmethod
+    def _terminar(proceso: subprocess.Popen, forzar: bool):
+        if not forzar:
+            try:
+                proceso.stdin.close()  # el puente cierra soffice y termina
+                proceso.wait(timeout=15)
+                proceso.stdout.close()
+                return
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        try:
+            os.killpg(proceso.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        proceso.wait()
+        for flujo in (proceso.stdin, proceso.stdout):
+            try:
+                flujo.close()
+            except OSError:
+                pass
+
+    def _borrar_perfil(self):
+        # El próximo arranque crea uno limpio (también evita arrastrar un perfil corrupto)
+        if self._perfil is not None:
+            shutil.rmtree(self._perfil, ignore_errors=True)
+            self._perfil = None
+
+
+def _prefijo_perfil() -> str:
+    # Con el host: en contenedores distintos la API y el worker pueden tener el mismo pid
+    return f"{socket.gethostname()}_{os.getpid()}_worker_"
+
+
+def _proceso_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _purgar_perfiles_huerfanos(raiz: str = CONVERSION_PDF_PERFILES_DIR):
+    """Perfiles de procesos de este host que ya no existen (terminaron sin cerrar el pool)."""
+    if not os.path.isdir(raiz):
+        return
+    host = socket.gethostname()
+    for entrada in os.scandir(raiz):
+        partes = entrada.name.rsplit('_worker_', 1)[0].rsplit('_', 1)
+        if not entrada.is_dir() or len(partes) != 2 or partes[0] != host or not partes[1].isdigit():
+            continue
+        if not _proceso_vivo(int(partes[1])):
+            shutil.rmtree(entrada.path, ignore_errors=True)
+
+
+class PoolPDF:
+
+    def __init__(self, workers: int = CONVERSION_PDF_WORKERS, max_pendientes: int = CONVERSION_PDF_MAX_PENDIENTES):
+        self.workers = max(1, workers)
+        self.max_pendientes = max_pendientes
+        _purgar_perfiles_huerfanos()
+        self._trabajadores: List[TrabajadorPDF] = [TrabajadorPDF(i) for i in range(self.workers)]
+        self._libres: "queue.Queue[TrabajadorPDF]" = queue.Queue()
+        for trabajador in self._trabajadores:
+            self._libres.put(trabajador)
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self._completadas = 0
+        self._errores = 0
+        self._timeouts = 0
+        self._rechazadas = 0
+
+    def _reservar(self):
+        with self._lock:
+            if self._pendientes >= self.workers + self.max_pendientes:
+                self._rechazadas += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="La conversión a PDF está saturada, intente de nuevo en unos segundos"
+                )
+            self._pendientes += 1
+
+    def _contar(self, contador: str):
+        with self._lock:
+            self._pendientes -= 1
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    def convertir(self, contenido: Union[bytes, memoryview], timeout: float = CONVERSION_PDF_TIMEOUT_SEGUNDOS) -> bytes:
+        """PDF del .docx recibido. Bloqueante (esperar worker + convertir)."""
+        self._reservar()
+        trabajador = self._libres.get()
+        try:
+            pdf = trabajador.convertir(contenido, timeout)
+        except TiempoAgotado:
+            self._contar("_timeouts")
+            raise HTTPException(status_code=504, detail=f"La conversión a PDF superó {timeout} segundos")
+        except ErrorConversion as e:
+            self._contar("_errores")
+            raise HTTPException(status_code=500, detail=f"LibreOffice no pudo convertir el documento: {e}")
+        except LibreOfficeNoDisponible as e:
+            self._contar("_errores")
+            raise HTTPException(status_code=503, detail=f"La conversión a PDF no está disponible: {e}")
+        except BaseException:
+            self._contar("_errores")
+            raise
+        finally:
+            self._libres.put(trabajador)
+        self._contar("_completadas")
+        return pdf
+
+    def a_pdf(self, documento: DocumentoGenerado) -> DocumentoGenerado:
+        """El documento convertido, con el mismo nombre y extensión .pdf."""
+        pdf = self.convertir(documento.contenido)
+        return DocumentoGenerado(nombre_archivo=nombre_pdf(documento.nombre_archivo), buffer=io.BytesIO(pdf))
+
+    def estado(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "activos": sum(1 for t in self._trabajadores if t.proceso is not None),
+                "en_cola": max(0, self._pendientes - self.workers),
+                "completadas": self._completadas,
+                "errores": self._errores,
+                "timeouts": self._timeouts,
+                "rechazadas": self._rechazadas,
+                "arranques": sum(t.reinicios for t in self._trabajadores),
+            }
+
+    def cerrar(self):
+        # Solo los libres: uno ocupado termina su documento y se cierra con el proceso
+        libres = []
+        while True:
+            try:
+                libres.append(self._libres.get_nowait())
+            except queue.Empty:
+                break
+        for trabajador in libres:
+            trabajador.detener()
+            self._libres.put(trabajador)
+
+
+# Instancia compartida por la generación (V2, lote) y el flujo completo
+pool_pdf = PoolPDF()
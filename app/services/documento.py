@@ -1,24 +1,21 @@
 import datetime
 import os
 import docx
-from num2words import num2words
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-import locale
-
-# Configurar el locale para que los nombres de los meses salgan en español
-try:
-    locale.setlocale(locale.LC_TIME, 'es_ES.UTF-8')
-except locale.Error:
-    try:
-        locale.setlocale(locale.LC_TIME, 'Spanish_Spain')
-    except locale.Error:
-        print("Advertencia: No se pudo configurar el locale en español.")
 
 from app.repository.empresa import EmpresaRepository
 from app.repository.representante import RepresentanteRepository
 from app.models.documento import GenerationRequest
 from app.utils.ayudante_docx import reemplazar_placeholders_docx
+from app.utils.documento_memoria import DocumentoGenerado, guardar_en_memoria
+from app.utils.formato_legal import (
+    digitos_en_letras,
+    fecha_larga,
+    mes_en_letras,
+    numero_a_letras,
+    parsear_fecha,
+)
 
 class ServicioDocumento:
     def __init__(self):
@@ -26,14 +23,9 @@ class ServicioDocumento:
         self.repo_representante = RepresentanteRepository()
 
     def formato_fecha_largo(self, objeto_fecha):
-        if not isinstance(objeto_fecha, (datetime.date, datetime.datetime)):
-            return ""
-        day_num = objeto_fecha.day
-        day_letras = num2words(day_num, lang='es')
-        month_name = objeto_fecha.strftime('%B')
-        return f"el {day_letras} ({day_num}) de {month_name} de {objeto_fecha.year}"
+        return fecha_larga(objeto_fecha)
 
-    def generar_documento(self, db: Session, solicitud: GenerationRequest):
+    def generar_documento(self, db: Session, solicitud: GenerationRequest) -> DocumentoGenerado:
         # --- SINTAXIS CORREGIDA A SNAKE_CASE ---
         resultado_empresa = self.repo_empresa.get_by_id(db, solicitud.empresa_id)
         if not resultado_empresa:
@@ -45,58 +37,46 @@ class ServicioDocumento:
 
         # --- PREPARACIÓN DE DATOS ---
         rep_edad_num = (datetime.date.today() - resultado_representante['fecha_nacimiento']).days // 365
-        rep_edad_letras = num2words(rep_edad_num, lang='es').upper()
-        rep_cui_letras = " ".join(num2words(c, lang='es') for c in resultado_representante['cui']).upper()
+        rep_edad_letras = numero_a_letras(rep_edad_num).upper()
+        rep_cui_letras = digitos_en_letras(resultado_representante['cui']).upper()
         
         genero_texto = "El Notario" # Valor por defecto
 
-        num_registro_letras = num2words(int(resultado_empresa['numero_registro']), lang='es').upper() if resultado_empresa.get('numero_registro') and resultado_empresa['numero_registro'].isdigit() else resultado_empresa.get('numero_registro', '')
-        num_libro_letras = num2words(int(resultado_empresa['numero_libro']), lang='es').upper() if resultado_empresa.get('numero_libro') and resultado_empresa['numero_libro'].isdigit() else resultado_empresa.get('numero_libro', '')
-        num_folio_letras = num2words(int(resultado_empresa['numero_folio']), lang='es').upper() if resultado_empresa.get('numero_folio') and resultado_empresa['numero_folio'].isdigit() else resultado_empresa.get('numero_folio', '')
+        num_registro_letras = numero_a_letras(int(resultado_empresa['numero_registro'])).upper() if resultado_empresa.get('numero_registro') and resultado_empresa['numero_registro'].isdigit() else resultado_empresa.get('numero_registro', '')
+        num_libro_letras = numero_a_letras(int(resultado_empresa['numero_libro'])).upper() if resultado_empresa.get('numero_libro') and resultado_empresa['numero_libro'].isdigit() else resultado_empresa.get('numero_libro', '')
+        num_folio_letras = numero_a_letras(int(resultado_empresa['numero_folio'])).upper() if resultado_empresa.get('numero_folio') and resultado_empresa['numero_folio'].isdigit() else resultado_empresa.get('numero_folio', '')
         
         colaborador = solicitud.colaborador_data.datos_persona
-        colab_cui_letras = " ".join(num2words(c, lang='es') for c in colaborador.cui).upper() if colaborador.cui and colaborador.cui.isdigit() else ""
-        colab_edad_letras = num2words(int(colaborador.edad), lang='es').upper() if colaborador.edad and colaborador.edad.isdigit() else ""
+        colab_cui_letras = digitos_en_letras(colaborador.cui).upper() if colaborador.cui and colaborador.cui.isdigit() else ""
+        colab_edad_letras = numero_a_letras(int(colaborador.edad)).upper() if colaborador.edad and colaborador.edad.isdigit() else ""
         colab_estado_civil = colaborador.estado_civil or "soltero"
         colab_nacionalidad = colaborador.nacionalidad or "guatemalteco"
         colab_profesion = colaborador.profesion or "N/A"
         colab_posicion = colaborador.posicion or solicitud.colaborador_data.datos_contrato.tipo_contrato
 
-        # Fecha de inicio - soporta dd/mm/yyyy y yyyy-mm-dd
-        try:
-            fecha_inicio_str = solicitud.colaborador_data.datos_contrato.fecha_inicio
-            if '/' in fecha_inicio_str:
-                fecha_inicio = datetime.datetime.strptime(fecha_inicio_str, "%d/%m/%Y")
-            else:
-                fecha_inicio = datetime.datetime.strptime(fecha_inicio_str, "%Y-%m-%d")
-            
+        # Fechas de inicio y fin - soportan dd/mm/yyyy y yyyy-mm-dd
+        fecha_inicio = parsear_fecha(solicitud.colaborador_data.datos_contrato.fecha_inicio)
+        if fecha_inicio is not None:
             dia_inicio = fecha_inicio.day
-            mes_inicio = fecha_inicio.strftime('%B')
+            mes_inicio = mes_en_letras(fecha_inicio)
             anio_inicio = fecha_inicio.year
-            dia_inicio_letras = num2words(dia_inicio, lang='es')
-            anio_inicio_letras = num2words(anio_inicio, lang='es')
-        except (ValueError, TypeError, AttributeError):
+            dia_inicio_letras = numero_a_letras(dia_inicio)
+            anio_inicio_letras = numero_a_letras(anio_inicio)
+        else:
             dia_inicio, mes_inicio, anio_inicio = "N/A", "N/A", "N/A"
             dia_inicio_letras, anio_inicio_letras = "N/A", "N/A"
 
-        # Fecha de fin - soporta dd/mm/yyyy y yyyy-mm-dd
-        try:
-            fecha_fin_str = solicitud.colaborador_data.datos_contrato.fecha_fin
-            if fecha_fin_str and "indefinido" not in fecha_fin_str.lower():
-                if '/' in fecha_fin_str:
-                    fecha_fin = datetime.datetime.strptime(fecha_fin_str, "%d/%m/%Y")
-                else:
-                    fecha_fin = datetime.datetime.strptime(fecha_fin_str, "%Y-%m-%d")
-                
-                dia_fin = fecha_fin.day
-                mes_fin = fecha_fin.strftime('%B')
-                anio_fin = fecha_fin.year
-                dia_fin_letras = num2words(dia_fin, lang='es')
-                anio_fin_letras = num2words(anio_fin, lang='es')
-            else:
-                dia_fin, mes_fin, anio_fin = "N/A", "N/A", "N/A"
-                dia_fin_letras, anio_fin_letras = "N/A", "N/A"
-        except (ValueError, TypeError, AttributeError):
+        fecha_fin_str = solicitud.colaborador_data.datos_contrato.fecha_fin
+        fecha_fin = None
+        if fecha_fin_str and "indefinido" not in fecha_fin_str.lower():
+            fecha_fin = parsear_fecha(fecha_fin_str)
+        if fecha_fin is not None:
+            dia_fin = fecha_fin.day
+            mes_fin = mes_en_letras(fecha_fin)
+            anio_fin = fecha_fin.year
+            dia_fin_letras = numero_a_letras(dia_fin)
+            anio_fin_letras = numero_a_letras(anio_fin)
+        else:
             dia_fin, mes_fin, anio_fin = "N/A", "N/A", "N/A"
             dia_fin_letras, anio_fin_letras = "N/A", "N/A"
 
@@ -161,6 +141,4 @@ class ServicioDocumento:
         reemplazar_placeholders_docx(doc, reemplazos)
         
         nombre_archivo_salida = f"contrato_generado_{colaborador.nombre_completo.replace(' ', '_') if colaborador.nombre_completo else 'sin_nombre'}.docx"
-        doc.save(nombre_archivo_salida)
-        
-        return nombre_archivo_salida
\ No newline at end of file
+        return guardar_en_memoria(doc, nombre_archivo_salida)
\ No newline at end of file
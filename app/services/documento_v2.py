@@ -9,25 +9,41 @@ VERSIÓN CORREGIDA:
 """
 
 import datetime
-import os
-from docxtpl import DocxTemplate
-from num2words import num2words
+import io
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-import locale
-
-# Configurar el locale para que los nombres de los meses salgan en español
-try:
-    locale.setlocale(locale.LC_TIME, 'es_ES.UTF-8')
-except locale.Error:
-    try:
-        locale.setlocale(locale.LC_TIME, 'Spanish_Spain')
-    except locale.Error:
-        print("Advertencia: No se pudo configurar el locale en español.")
 
 from app.repository.empresa import EmpresaRepository
 from app.repository.representante import RepresentanteRepository
 from app.models.documento import GenerationRequest
+from app.services.cache_generacion import cache_generacion
+from app.services.cache_plantillas import cache_plantillas
+from app.services.indice_plantillas import rutas_desconocidas, rutas_indice
+from app.utils.contexto_perezoso import DatosPerezosos
+from app.utils.documento_memoria import DocumentoGenerado, guardar_en_memoria
+from app.utils.formato_legal import (
+    FILTROS_JINJA,
+    fecha_contrato_en_letras,
+    mes_en_letras,
+    numero_a_letras,
+    parsear_fecha,
+)
+
+
+# Campos de la plantilla que salen de un dato del colaborador sin valor por defecto
+# (ruta en la plantilla → campo de DocumentoProcesado); una ruta cubre sus subcampos
+ORIGEN_CAMPOS_COLABORADOR = {
+    'colaborador.nombre_completo': 'datos_persona.nombre_completo',
+    'colaborador.nombre_completo_titulo': 'datos_persona.nombre_completo',
+    'colaborador.cui': 'datos_persona.cui',
+    'colaborador.cui_formateado': 'datos_persona.cui',
+    'colaborador.cui_letras': 'datos_persona.cui',
+    'colaborador.edad': 'datos_persona.edad',
+    'colaborador.edad_letras': 'datos_persona.edad',
+    'colaborador.direccion': 'datos_persona.direccion',
+    'colaborador.lugar_notificaciones': 'datos_persona.direccion',
+    'fecha_inicio': 'datos_contrato.fecha_inicio',
+}
 
 
 class ServicioDocumentoV2:
@@ -39,178 +55,213 @@ class ServicioDocumentoV2:
         self.repo_empresa = EmpresaRepository()
         self.repo_representante = RepresentanteRepository()
 
-    def generar_documento(self, db: Session, solicitud: GenerationRequest):
+    def generar_documento(self, db: Session, solicitud: GenerationRequest, context=None) -> DocumentoGenerado:
         """
-        Genera un documento Word a partir de una plantilla y datos del usuario
+        Genera un documento Word a partir de una plantilla y datos del usuario.
+        El documento queda en memoria (no se escribe en disco).
+        Si ya se generó uno con la misma plantilla y los mismos datos, se
+        devuelve ese sin renderizar (cache_generacion). `context` es el de
+        contexto_solicitud, si quien llama ya lo armó.
         """
         print("🚀 Iniciando generación de documento...")
         
-        # 1. Obtener datos de la base de datos
-        resultado_empresa = self.repo_empresa.get_by_id(db, solicitud.empresa_id)
-        if not resultado_empresa:
-            raise HTTPException(status_code=404, detail="Empresa no encontrada")
+        # 1-2. Datos de BD y contexto para la plantilla
+        if context is None:
+            context = self.contexto_solicitud(db, solicitud)
         
-        resultado_representante = self.repo_representante.get_by_id(db, solicitud.representante_id)
-        if not resultado_representante:
-            raise HTTPException(status_code=404, detail="Representante no encontrado")
+        desconocidas = self.validar_solicitud(solicitud, context)["desconocidas"]
+        if desconocidas:
+            print(f"⚠️ La plantilla usa campos que no existen (quedarán vacíos): {', '.join(desconocidas)}")
         
-        print(f"✅ Empresa: {resultado_empresa['razon_social']}")
-        print(f"✅ Representante: {resultado_representante['nombre_completo']}")
+        nombre_archivo_salida = self.nombre_archivo_salida(context)
+        clave = self.clave_documento(solicitud, context)
+        contenido = cache_generacion.obtener(clave)
+        if contenido is not None:
+            print(f"⚡ Documento desde cache ({clave[:12]}): {nombre_archivo_salida}")
+            return DocumentoGenerado(nombre_archivo=nombre_archivo_salida, buffer=io.BytesIO(contenido))
         
-        # 2. Preparar el contexto para la plantilla
-        context = self._preparar_contexto(
-            resultado_empresa, 
-            resultado_representante, 
-            solicitud
-        )
+        # 3. Clonar la plantilla ya preparada (cache por nombre + mtime) y renderizar
+        print(f"📄 Cargando plantilla: {solicitud.template_name}")
+        
+        doc = cache_plantillas.nueva_plantilla(solicitud.template_name)
+        doc.render(context)
+        
+        # 4. Guardar documento en memoria
+        documento = guardar_en_memoria(doc, nombre_archivo_salida)
+        cache_generacion.guardar(clave, documento.contenido)
         
+        print(f"✅ Documento generado: {nombre_archivo_salida} ({documento.tamano} bytes)")
+        
+        return documento
+
+    def contexto_solicitud(self, db: Session, solicitud: GenerationRequest):
+        """Contexto de la plantilla para una solicitud (consulta empresa y representante)."""
+        resultado_empresa, resultado_representante = self.obtener_empresa_representante(
+            db, solicitud.empresa_id, solicitud.representante_id
+        )
+        context = self.preparar_contexto(resultado_empresa, resultado_representante, solicitud)
         print(f"✅ Contexto preparado con {len(context)} secciones")
+        return context
+
+    def clave_documento(self, solicitud: GenerationRequest, context) -> str:
+        """Clave en cache_generacion: versión de la plantilla + valores de los campos que usa."""
+        return cache_generacion.clave(cache_plantillas.obtener(solicitud.template_name), context)
+
+    def validar_solicitud(self, solicitud: GenerationRequest, context=None):
+        """
+        Compara la solicitud con el índice de campos de la plantilla, antes de renderizar.
+        - faltantes: datos del colaborador que la plantilla usa y la solicitud no trae
+        - desconocidas: campos de la plantilla que el contexto no tiene (solo si se pasa context)
+        """
+        indice = cache_plantillas.obtener(solicitud.template_name).indice
+        rutas = rutas_indice(indice)
+        
+        faltantes = set()
+        for ruta in rutas:
+            for prefijo, origen in ORIGEN_CAMPOS_COLABORADOR.items():
+                if ruta != prefijo and not ruta.startswith(prefijo + '.'):
+                    continue
+                valor = solicitud.colaborador_data
+                for atributo in origen.split('.'):
+                    valor = getattr(valor, atributo)
+                if not valor:
+                    faltantes.add(origen)
         
-        # 3. Cargar y renderizar la plantilla
-        ruta_plantilla = os.path.join("templates", solicitud.template_name)
-        if not os.path.exists(ruta_plantilla):
+        return {
+            "campos": rutas,
+            "faltantes": sorted(faltantes),
+            "desconocidas": rutas_desconocidas(context, rutas) if context is not None else [],
+        }
+
+    def verificar_campos(self, solicitud: GenerationRequest):
+        """422 si la plantilla usa datos del colaborador que la solicitud no trae."""
+        faltantes = self.validar_solicitud(solicitud)["faltantes"]
+        if faltantes:
             raise HTTPException(
-                status_code=404, 
-                detail=f"Plantilla no encontrada: {ruta_plantilla}"
+                status_code=422,
+                detail=f"La plantilla {solicitud.template_name} usa datos que faltan en la solicitud: {', '.join(faltantes)}"
             )
+
+    def obtener_empresa_representante(self, db: Session, empresa_id: int, representante_id: int):
+        """
+        Datos de BD comunes a todos los documentos de una misma empresa y
+        representante (la generación por lote los consulta una sola vez)
+        """
+        resultado_empresa = self.repo_empresa.get_by_id(db, empresa_id)
+        if not resultado_empresa:
+            raise HTTPException(status_code=404, detail="Empresa no encontrada")
         
-        print(f"📄 Cargando plantilla: {ruta_plantilla}")
+        resultado_representante = self.repo_representante.get_by_id(db, representante_id)
+        if not resultado_representante:
+            raise HTTPException(status_code=404, detail="Representante no encontrado")
         
-        doc = DocxTemplate(ruta_plantilla)
-        doc.render(context)
+        print(f"✅ Empresa: {resultado_empresa['razon_social']}")
+        print(f"✅ Representante: {resultado_representante['nombre_completo']}")
         
-        # 4. Guardar documento
+        return resultado_empresa, resultado_representante
+
+    def nombre_archivo_salida(self, context) -> str:
         nombre_colaborador = context['colaborador']['nombre_completo'].replace(' ', '_')
-        nombre_archivo_salida = f"contrato_generado_{nombre_colaborador}.docx"
-        doc.save(nombre_archivo_salida)
-        
-        print(f"✅ Documento generado: {nombre_archivo_salida}")
-        
-        return nombre_archivo_salida
+        return f"contrato_generado_{nombre_colaborador}.docx"
 
-    def _preparar_contexto(self, empresa, representante, solicitud: GenerationRequest):
+    def preparar_contexto(self, empresa, representante, solicitud: GenerationRequest):
         """
-        Prepara el contexto (diccionario) con todos los datos para la plantilla
+        Prepara el contexto (diccionario) con todos los datos para la plantilla.
+        Los valores derivados (en letras, formateados, fechas largas) son
+        perezosos: se calculan solo si la plantilla los usa (ver contexto_perezoso),
+        con los mismos filtros memoizados que pueden usar las plantillas
         """
         colaborador = solicitud.colaborador_data.datos_persona
         contrato = solicitud.colaborador_data.datos_contrato
         
         rep_edad_num = (datetime.date.today() - representante['fecha_nacimiento']).days // 365
-        rep_edad_letras = num2words(rep_edad_num, lang='es')
-        rep_cui_letras = self._numero_a_letras_con_espacios(representante['cui'])
-        rep_cui_formateado = self._formatear_cui(representante['cui'])
-        
-        num_registro_letras = self._convertir_numero_letras(empresa.get('numero_registro'))
-        num_libro_letras = self._convertir_numero_letras(empresa.get('numero_libro'))
-        num_folio_letras = self._convertir_numero_letras(empresa.get('numero_folio'))
-        
-        colab_cui_letras = self._numero_a_letras_con_espacios(colaborador.cui) if colaborador.cui else ""
-        colab_cui_formateado = self._formatear_cui(colaborador.cui) if colaborador.cui else ""
-        colab_edad_letras = num2words(int(colaborador.edad), lang='es') if colaborador.edad and colaborador.edad.isdigit() else ""
-        
-        fecha_inicio_data = self._procesar_fecha(contrato.fecha_inicio)
-        fecha_fin_data = self._procesar_fecha(contrato.fecha_fin)
-        
-        fecha_contrato_formateada = self._formato_fecha_contrato(solicitud.fecha_contrato)
-        
-        colab_nombre_titulo = self._titulo_mayusculas(colaborador.nombre_completo)
+        puesto = colaborador.posicion or contrato.tipo_contrato or ''
 
         context = {
-            'colaborador': {
-                'nombre_completo': colaborador.nombre_completo or '',
-                'nombre_completo_titulo': colab_nombre_titulo,
-                'cui': colaborador.cui or '',
-                'cui_formateado': colab_cui_formateado,
-                'cui_letras': colab_cui_letras,
-                'edad': colaborador.edad or '',
-                'edad_letras': colab_edad_letras,
-                'direccion': colaborador.direccion or '',
-                'estado_civil': colaborador.estado_civil or 'Soltero',
-                'nacionalidad': colaborador.nacionalidad or 'Guatemalteco',
-                'profesion': colaborador.profesion or 'N/A',
-                'posicion': colaborador.posicion or contrato.tipo_contrato or '',
-                'lugar_notificaciones': colaborador.direccion or '',
-                'puesto': colaborador.posicion or contrato.tipo_contrato or '',
-            },
+            'colaborador': DatosPerezosos(
+                {
+                    'nombre_completo': colaborador.nombre_completo or '',
+                    'cui': colaborador.cui or '',
+                    'edad': colaborador.edad or '',
+                    'direccion': colaborador.direccion or '',
+                    'estado_civil': colaborador.estado_civil or 'Soltero',
+                    'nacionalidad': colaborador.nacionalidad or 'Guatemalteco',
+                    'profesion': colaborador.profesion or 'N/A',
+                    'posicion': puesto,
+                    'lugar_notificaciones': colaborador.direccion or '',
+                    'puesto': puesto,
+                },
+                nombre_completo_titulo=(FILTROS_JINJA['titulo'], colaborador.nombre_completo),
+                cui_formateado=(FILTROS_JINJA['cui_formateado'], colaborador.cui),
+                cui_letras=(FILTROS_JINJA['letras_cui'], colaborador.cui),
+                edad_letras=(self._edad_en_letras, colaborador.edad),
+            ),
             
-            'empresa': {
-                'razon_social': empresa['razon_social'],
-                'autorizada_en': empresa.get('autorizada_en', ''),
-                'fecha_autorizacion': self._formato_fecha_largo(empresa.get('fecha_autorizacion')),
-                'autorizada_por': empresa.get('autorizada_por', ''),
-                'inscrita_en': empresa.get('inscrita_en', ''),
-                'numero_registro': empresa.get('numero_registro', ''),
-                'numero_registro_letras': num_registro_letras,
-                'numero_folio': empresa.get('numero_folio', ''),
-                'numero_folio_letras': num_folio_letras,
-                'numero_libro': empresa.get('numero_libro', ''),
-                'numero_libro_letras': num_libro_letras,
-                'tipo_libro': empresa.get('tipo_libro', ''),
-                'lugar_notificaciones': empresa.get('lugar_notificaciones', ''),
-                'segundo_lugar_notificaciones': empresa.get('segundo_lugar_notificaciones', ''),
-            },
+            'empresa': DatosPerezosos(
+                {
+                    'razon_social': empresa['razon_social'],
+                    'autorizada_en': empresa.get('autorizada_en', ''),
+                    'autorizada_por': empresa.get('autorizada_por', ''),
+                    'inscrita_en': empresa.get('inscrita_en', ''),
+                    'numero_registro': empresa.get('numero_registro', ''),
+                    'numero_folio': empresa.get('numero_folio', ''),
+                    'numero_libro': empresa.get('numero_libro', ''),
+                    'tipo_libro': empresa.get('tipo_libro', ''),
+                    'lugar_notificaciones': empresa.get('lugar_notificaciones', ''),
+                    'segundo_lugar_notificaciones': empresa.get('segundo_lugar_notificaciones', ''),
+                },
+                fecha_autorizacion=(FILTROS_JINJA['fecha_larga'], empresa.get('fecha_autorizacion')),
+                numero_registro_letras=(FILTROS_JINJA['letras'], empresa.get('numero_registro')),
+                numero_folio_letras=(FILTROS_JINJA['letras'], empresa.get('numero_folio')),
+                numero_libro_letras=(FILTROS_JINJA['letras'], empresa.get('numero_libro')),
+            ),
             
-            'representante': {
-                'nombre_completo': representante['nombre_completo'],
-                'edad': str(rep_edad_num),
-                'edad_letras': rep_edad_letras,
-                'estado_civil': representante.get('estado_civil', ''),
-                'profesion': representante.get('profesion', ''),
-                'nacionalidad': representante.get('nacionalidad', ''),
-                'cui': representante['cui'],
-                'cui_formateado': rep_cui_formateado,
-                'cui_letras': rep_cui_letras,
-                'extendido_en': representante.get('extendido_en', ''),
-            },
+            'representante': DatosPerezosos(
+                {
+                    'nombre_completo': representante['nombre_completo'],
+                    'edad': str(rep_edad_num),
+                    'estado_civil': representante.get('estado_civil', ''),
+                    'profesion': representante.get('profesion', ''),
+                    'nacionalidad': representante.get('nacionalidad', ''),
+                    'cui': representante['cui'],
+                    'extendido_en': representante.get('extendido_en', ''),
+                },
+                edad_letras=(FILTROS_JINJA['letras'], rep_edad_num),
+                cui_formateado=(FILTROS_JINJA['cui_formateado'], representante['cui']),
+                cui_letras=(FILTROS_JINJA['letras_cui'], representante['cui']),
+            ),
             
-            'contrato': {
-                'fecha': fecha_contrato_formateada,
-                'monto': contrato.monto or 'Q.0.00',
-                'monto_letras': contrato.monto_en_letras or 'CERO QUETZALES EXACTOS',
-                'tipo': contrato.tipo_contrato or 'Servicios Profesionales',
-            },
+            'contrato': DatosPerezosos(
+                {
+                    'monto': contrato.monto or 'Q.0.00',
+                    'monto_letras': contrato.monto_en_letras or 'CERO QUETZALES EXACTOS',
+                    'tipo': contrato.tipo_contrato or 'Servicios Profesionales',
+                },
+                fecha=(self._formato_fecha_contrato, solicitud.fecha_contrato),
+            ),
             
-            'fecha_inicio': fecha_inicio_data,
-            'fecha_fin': fecha_fin_data,
+            'fecha_inicio': self._procesar_fecha(contrato.fecha_inicio),
+            'fecha_fin': self._procesar_fecha(contrato.fecha_fin),
             'genero': 'El Notario',
-            'puesto': colaborador.posicion or contrato.tipo_contrato or '',
+            'puesto': puesto,
         }
         
         return context
 
-    def _titulo_mayusculas(self, texto):
-        if not texto:
-            return ''
-        return texto.title()
+    def _edad_en_letras(self, edad):
+        return numero_a_letras(int(edad)) if edad and edad.isdigit() else ""
 
     def _formato_fecha_contrato(self, fecha_str):
-        meses_esp = {
-            1: 'enero', 2: 'febrero', 3: 'marzo', 4: 'abril',
-            5: 'mayo', 6: 'junio', 7: 'julio', 8: 'agosto',
-            9: 'septiembre', 10: 'octubre', 11: 'noviembre', 12: 'diciembre'
-        }
-        try:
-            fecha = datetime.datetime.strptime(fecha_str, "%Y-%m-%d")
-            dia_num = fecha.day
-            dia_letras = num2words(dia_num, lang='es')
-            mes_nombre = meses_esp[fecha.month]
-            anio_num = fecha.year
-            anio_letras = num2words(anio_num, lang='es')
-            return f"el {dia_letras} ({dia_num}) de {mes_nombre} del año {anio_letras} ({anio_num})"
-        except (ValueError, TypeError) as e:
-            print(f"⚠️ Error al formatear fecha del contrato: {e}")
+        fecha = parsear_fecha(fecha_str)
+        if fecha is None:
+            print(f"⚠️ Error al formatear fecha del contrato: {fecha_str!r}")
             return fecha_str
+        return fecha_contrato_en_letras(fecha)
 
     def _procesar_fecha(self, fecha_str):
         """
         Procesa fecha en formato dd/mm/yyyy o yyyy-mm-dd
         """
-        meses_esp = {
-            1: 'enero', 2: 'febrero', 3: 'marzo', 4: 'abril',
-            5: 'mayo', 6: 'junio', 7: 'julio', 8: 'agosto',
-            9: 'septiembre', 10: 'octubre', 11: 'noviembre', 12: 'diciembre'
-        }
-        
         if not fecha_str or "indefinido" in str(fecha_str).lower():
             return {
                 'dia': 'N/A', 
@@ -221,24 +272,8 @@ class ServicioDocumentoV2:
                 'completa': 'Por tiempo indefinido'
             }
         
-        try:
-            # Intentar formato dd/mm/yyyy primero (del OCR)
-            if '/' in fecha_str:
-                fecha = datetime.datetime.strptime(fecha_str, "%d/%m/%Y")
-            else:
-                # Formato yyyy-mm-dd
-                fecha = datetime.datetime.strptime(fecha_str, "%Y-%m-%d")
-            
-            mes_nombre = meses_esp[fecha.month]
-            return {
-                'dia': fecha.day, 
-                'dia_letras': num2words(fecha.day, lang='es'), 
-                'mes': mes_nombre, 
-                'anio': fecha.year, 
-                'anio_letras': num2words(fecha.year, lang='es'), 
-                'completa': f"{fecha.day} de {mes_nombre} de {fecha.year}"
-            }
-        except (ValueError, TypeError, AttributeError):
+        fecha = parsear_fecha(fecha_str)
+        if fecha is None:
             return {
                 'dia': 'N/A', 
                 'dia_letras': 'N/A', 
@@ -247,52 +282,15 @@ class ServicioDocumentoV2:
                 'anio_letras': 'N/A', 
                 'completa': 'Fecha no especificada'
             }
-
-    def _formato_fecha_largo(self, objeto_fecha):
-        meses_esp = {
-            1: 'enero', 2: 'febrero', 3: 'marzo', 4: 'abril',
-            5: 'mayo', 6: 'junio', 7: 'julio', 8: 'agosto',
-            9: 'septiembre', 10: 'octubre', 11: 'noviembre', 12: 'diciembre'
-        }
-        if not isinstance(objeto_fecha, (datetime.date, datetime.datetime)):
-            return ""
-        day_num = objeto_fecha.day
-        day_letras = num2words(day_num, lang='es')
-        month_name = meses_esp[objeto_fecha.month]
-        return f"el {day_letras} ({day_num}) de {month_name} de {objeto_fecha.year}"
-
-    def _numero_a_letras_con_espacios(self, numero_str):
-        if not numero_str or not str(numero_str).isdigit():
-            return ''
-        numero_str = numero_str.replace(' ', '').replace('-', '')
-        if len(numero_str) != 13:
-            return ' '.join(num2words(int(d), lang='es') for d in str(numero_str))
-        grupo1 = numero_str[0:4]
-        grupo2 = numero_str[4:9]
-        grupo3 = numero_str[9:13]
-        grupo1_letras = num2words(int(grupo1), lang='es')
-        grupo2_letras = num2words(int(grupo2), lang='es')
-        grupo3_letras = num2words(int(grupo3), lang='es')
-        return f"{grupo1_letras} espacio {grupo2_letras} espacio {grupo3_letras}"
-
-    def _formatear_cui(self, numero_str):
-        if not numero_str or not str(numero_str).isdigit():
-            return numero_str or ''
-        numero_str = numero_str.replace(' ', '').replace('-', '')
-        if len(numero_str) != 13:
-            return numero_str
-        grupo1 = numero_str[0:4]
-        grupo2 = numero_str[4:9]
-        grupo3 = numero_str[9:13]
-        return f"{grupo1} {grupo2} {grupo3}"
-
-    def _convertir_numero_letras(self, numero_str):
-        if not numero_str:
-            return ''
-        try:
-            if str(numero_str).isdigit():
-                return num2words(int(numero_str), lang='es')
-            else:
-                return str(numero_str)
-        except (ValueError, TypeError):
-            return str(numero_str)
\ No newline at end of file
+        
+        mes_nombre = mes_en_letras(fecha)
+        return DatosPerezosos(
+            {
+                'dia': fecha.day, 
+                'mes': mes_nombre, 
+                'anio': fecha.year, 
+                'completa': f"{fecha.day} de {mes_nombre} de {fecha.year}"
+            },
+            dia_letras=(numero_a_letras, fecha.day),
+            anio_letras=(numero_a_letras, fecha.year),
+        )
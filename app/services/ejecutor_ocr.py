@@ -0,0 +1,93 @@
+# app/services/ejecutor_ocr.py
+"""
+Pool de procesos compartido para ejecutar Tesseract sin bloquear el event loop.
+
+Las pasadas PSM de una misma imagen se envían en paralelo al pool y se
+esperan desde los endpoints async. El pool es acotado: si la cola supera
+OCR_MAX_PENDIENTES se responde 503 en lugar de acumular trabajo, y cada
+pasada tiene un timeout para que un escaneo lento no retenga un worker.
+"""
+
+import asyncio
+from typing import Dict, List, Optional, Sequence
+
+from app.core.config import (
+    OCR_WORKERS,
+    OCR_MAX_PENDIENTES,
+    OCR_TIMEOUT_SEGUNDOS,
+)
+from app.services.ejecutor_procesos import EjecutorProcesos
+from app.services.motor_ocr import obtener_motor
+
+# PSM 6 = bloque uniforme, PSM 4 = columna única (tablas), PSM 11 = texto disperso (celdas)
+PSM_POR_DEFECTO = (6, 4, 11)
+
+
+def _inicializar_worker():
+    """Crea el motor de OCR del proceso y deja cargado el modelo de español."""
+    obtener_motor().precargar('spa')
+
+
+def _ejecutar_pasada(imagen, psm: int, lang: str, timeout: int, tessdata_dir: Optional[str]) -> Dict[str, str]:
+    """Ejecuta una pasada de Tesseract (texto + TSV). Corre dentro de un proceso del pool."""
+    return obtener_motor().reconocer(imagen, psm, lang=lang, timeout=timeout, tessdata_dir=tessdata_dir)
+
+
+def _reconocer_celdas(celdas, lang: str, timeout: int, tessdata_dir: Optional[str]) -> List[str]:
+    """Reconoce varios recortes [(imagen, lista_blanca), ...] en una sola tarea del pool."""
+    motor = obtener_motor()
+    return [
+        motor.texto_celda(imagen, lista_blanca, lang=lang, timeout=timeout, tessdata_dir=tessdata_dir)
+        for imagen, lista_blanca in celdas
+    ]
+
+
+class EjecutorOCR(EjecutorProcesos):
+    """Pool de procesos con el motor de OCR precargado en cada worker."""
+
+    def __init__(self, max_workers: int = OCR_WORKERS, max_pendientes: int = OCR_MAX_PENDIENTES):
+        super().__init__("OCR", max_workers, max_pendientes, inicializador=_inicializar_worker)
+
+    async def reconocer(
+        self,
+        imagen,
+        psms: Sequence[int] = PSM_POR_DEFECTO,
+        lang: str = 'spa',
+        tessdata_dir: Optional[str] = None
+    ) -> Dict[int, Dict[str, str]]:
+        """
+        Ejecuta una pasada de Tesseract por cada PSM, todas en paralelo.
+        Retorna {psm: {"texto": ..., "tsv": ...}}.
+        """
+        self._reservar(len(psms))
+        try:
+            loop = asyncio.get_running_loop()
+            pool = self._obtener_pool()
+            tareas = [
+                loop.run_in_executor(
+                    pool, _ejecutar_pasada, imagen, psm, lang, OCR_TIMEOUT_SEGUNDOS, tessdata_dir
+                )
+                for psm in psms
+            ]
+            resultados = await asyncio.gather(*tareas)
+        finally:
+            self._liberar(len(psms))
+        return dict(zip(psms, resultados))
+
+    async def reconocer_celdas(
+        self,
+        celdas: Sequence,
+        lang: str = 'spa',
+        tessdata_dir: Optional[str] = None
+    ) -> List[str]:
+        """
+        Reconoce recortes chicos [(imagen, lista_blanca), ...] con PSM de una
+        línea. Van todos juntos a un mismo worker: cada uno tarda milisegundos.
+        """
+        if not celdas:
+            return []
+        return await self.ejecutar(_reconocer_celdas, list(celdas), lang, OCR_TIMEOUT_SEGUNDOS, tessdata_dir)
+
+
+# Instancia compartida por todos los endpoints de OCR
+ejecutor_ocr = EjecutorOCR()
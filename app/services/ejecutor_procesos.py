@@ -0,0 +1,90 @@
+# app/services/ejecutor_procesos.py
+"""
+Pool de procesos acotado para trabajo de CPU que no debe bloquear el event
+loop (base del pool de OCR y del de generación por lote).
+
+El pool se crea en el primer uso (con 'spawn', porque uvicorn ya tiene hilos
+corriendo al momento del fork). Si la cola supera max_pendientes se responde
+503 en lugar de acumular trabajo.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+
+class EjecutorProcesos:
+    """Envoltura de un ProcessPoolExecutor con control de profundidad de cola."""
+
+    def __init__(
+        self,
+        nombre: str,
+        max_workers: int,
+        max_pendientes: int,
+        inicializador: Optional[Callable[[], None]] = None
+    ):
+        self.nombre = nombre  # para el mensaje de 503: "El servicio de {nombre} está saturado"
+        self.max_workers = max_workers
+        self.inicializador = inicializador
+        self.max_pendientes = max_pendientes
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self._completadas = 0
+        self._rechazadas = 0
+
+    def _obtener_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self.inicializador,
+                )
+            return self._pool
+
+    def _reservar(self, cantidad: int):
+        with self._lock:
+            if self._pendientes + cantidad > self.max_workers + self.max_pendientes:
+                self._rechazadas += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"El servicio de {self.nombre} está saturado, intente de nuevo en unos segundos"
+                )
+            self._pendientes += cantidad
+
+    def _liberar(self, cantidad: int):
+        with self._lock:
+            self._pendientes -= cantidad
+            self._completadas += cantidad
+
+    async def ejecutar(self, funcion, *args):
+        """Ejecuta una función arbitraria (picklable) en el pool y espera su resultado."""
+        self._reservar(1)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._obtener_pool(), funcion, *args)
+        finally:
+            self._liberar(1)
+
+    def estado(self) -> Dict[str, int]:
+        """Profundidad de cola y contadores del pool."""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pendientes": self.max_pendientes,
+                "en_ejecucion": min(self._pendientes, self.max_workers),
+                "en_cola": max(0, self._pendientes - self.max_workers),
+                "completadas": self._completadas,
+                "rechazadas": self._rechazadas,
+            }
+
+    def cerrar(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
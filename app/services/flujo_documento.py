@@ -0,0 +1,342 @@
+# app/services/flujo_documento.py
+"""
+Flujo completo de un contrato a partir de una imagen:
+1. OCR de imagen
+2. Imagen original a OneDrive
+3. Generación de documento Word
+4. Subida del documento a OneDrive + link compartido (con salida pdf o
+   both, además el PDF convertido con LibreOffice, en la misma carpeta)
+5. Registro en BD (incluye el layout de OCR comprimido, para re-parsear
+   después sin volver a correr el OCR; ver reparseo_ocr). El layout es
+   opcional: si no se puede guardar, el documento se registra igual
+
+Una solicitud idéntica a una anterior (misma imagen, mismos datos y misma
+versión de la plantilla, ver cache_generacion) devuelve el documento ya
+subido y registrado, sin renderizar, subir ni insertar nada.
+
+Lo usan tanto el endpoint síncrono /flujo/procesar-y-generar como el worker
+de trabajos en segundo plano. Cada etapa se reporta por el callback
+`progreso(etapa, mensaje)` para poder publicarla como evento.
+"""
+
+import datetime
+import hashlib
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models.documento import GenerationRequest, DocumentoProcesado
+from app.repository.documento_layout_ocr import DocumentoLayoutOCRRepository
+from app.repository.documento_onedrive import DocumentoOneDriveRepository
+from app.services.cache_generacion import cache_generacion
+from app.services.conversion_pdf import SALIDA_DOCX, incluye_pdf, nombre_pdf, pool_pdf
+from app.services.documento_v2 import ServicioDocumentoV2
+from app.services.onedrive_service import OneDriveService
+from app.services.reparseo_ocr import comprimir_layout, serializar_datos, version_parser
+from app.services.servicio_ocr import servicio_ocr, documento_procesado
+
+USUARIO_ACTUAL_ID = 1
+
+# Etapas en el orden en que se reportan
+ETAPAS_FLUJO = ("ocr", "imagen_onedrive", "generacion", "pdf", "documento_onedrive", "registro_bd")
+
+Progreso = Callable[[str, str], None]
+
+
+def _sin_progreso(etapa: str, mensaje: str):
+    pass
+
+
+class ServicioFlujoDocumento:
+
+    def __init__(self):
+        self.onedrive_service = OneDriveService()
+        self.documento_service = ServicioDocumentoV2()
+        self.documento_repo = DocumentoOneDriveRepository()
+        self.layout_repo = DocumentoLayoutOCRRepository()
+
+    async def ejecutar(
+        self,
+        db: Session,
+        contenido: bytes,
+        nombre_imagen: str,
+        template_name: str,
+        fecha_contrato: str,
+        empresa_id: int,
+        representante_id: int,
+        categoria: str = "contrato",
+        notas: Optional[str] = None,
+        perfil_ocr: Optional[str] = None,
+        progreso: Optional[Progreso] = None,
+        imagen_onedrive: Optional[Dict[str, Any]] = None,
+        salida: str = SALIDA_DOCX
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta el flujo completo y hace commit del registro en BD.
+        Las llamadas bloqueantes (OneDrive, docx, BD) corren en el threadpool.
+        Si la imagen ya está en OneDrive (imagen_onedrive = item de Graph con
+        id y name, p. ej. en la ingesta desde OneDrive), no se vuelve a subir.
+        El .docx se sube y registra siempre; con salida pdf o both el PDF se
+        convierte (etapa "pdf") y se sube a su lado; el resultado trae su link.
+        """
+        progreso = progreso or _sin_progreso
+
+        # ===== PASO 1: OCR DE LA IMAGEN =====
+        print("\n PASO 1: Procesando imagen con OCR...")
+        progreso("ocr", "Procesando imagen con OCR")
+
+        # Cache → preprocesamiento → pasadas PSM con corte temprano → parser (igual que documentos_v2)
+        resultado_ocr = await servicio_ocr.procesar(contenido, perfil=perfil_ocr)
+        extracted_text = resultado_ocr["texto"]
+        # Incluye metadatos_ocr (pasada elegida, región recortada) para que queden en BD
+        datos_ocr = documento_procesado(resultado_ocr).model_dump()
+
+        if resultado_ocr["desde_cache"]:
+            print("[OCR desde cache]")
+        else:
+            print(f"[PSM {resultado_ocr['psm']} elegido de {list(resultado_ocr['pasadas'])}, "
+                  f"completitud {resultado_ocr['calidad']['completitud']}, "
+                  f"confianza {resultado_ocr['calidad']['confianza_media']}]")
+
+        print(f" Datos extraídos: {datos_ocr['datos_persona']['nombre_completo']}")
+
+        # Crear objeto GenerationRequest
+        colaborador_data = DocumentoProcesado(**datos_ocr)
+
+        request = GenerationRequest(
+            template_name=template_name,
+            fecha_contrato=fecha_contrato,
+            empresa_id=empresa_id,
+            representante_id=representante_id,
+            colaborador_data=colaborador_data
+        )
+
+        # ¿Ya se procesó esta misma solicitud? (antes de subir la imagen)
+        context = await run_in_threadpool(self.documento_service.contexto_solicitud, db, request)
+        clave_documento = await run_in_threadpool(self.documento_service.clave_documento, request, context)
+        clave = cache_generacion.clave_flujo(
+            clave_documento,
+            imagen=hashlib.sha256(contenido).hexdigest(),
+            perfil_ocr=perfil_ocr,
+            categoria=categoria,
+            notas=notas,
+            salida=salida
+        )
+        existente = await run_in_threadpool(self._existente, db, clave)
+        if existente is not None:
+            print(f"⚡ Solicitud idéntica a la del documento {existente['documento']['id']}: se reutiliza")
+            progreso("generacion", f"Documento ya generado con los mismos datos (ID {existente['documento']['id']})")
+            return existente
+
+        # ===== PASO 2: GUARDAR IMAGEN ORIGINAL EN ONEDRIVE =====
+        if imagen_onedrive is not None:
+            progreso("imagen_onedrive", "La imagen original ya está en OneDrive")
+            resultado_imagen = imagen_onedrive
+            imagen_filename = imagen_onedrive["name"]
+        else:
+            print("\n PASO 2: Guardando imagen original en OneDrive...")
+            progreso("imagen_onedrive", "Guardando imagen original en OneDrive")
+
+            imagen_filename = f"OCR_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{nombre_imagen}"
+            imagen_path = f"/Documentos_Legales/Imagenes_Originales/{imagen_filename}"
+
+            resultado_imagen = await run_in_threadpool(
+                self.onedrive_service.subir_archivo,
+                file_path=imagen_filename,
+                onedrive_path=imagen_path,
+                file_content=contenido
+            )
+
+        print(f"Imagen guardada: {resultado_imagen['id']}")
+
+        # ===== PASO 3: GENERAR DOCUMENTO WORD =====
+        print("\nPASO 3: Generando documento Word...")
+        progreso("generacion", "Generando documento Word")
+
+        # Generar documento (en memoria: el mismo buffer va a OneDrive y al hash)
+        documento_generado = await run_in_threadpool(self.documento_service.generar_documento, db, request, context)
+        doc_content = documento_generado.contenido
+
+        print(f" Documento generado: {documento_generado.nombre_archivo}")
+
+        # Se convierte antes de subir nada: si LibreOffice falla no queda un .docx suelto en OneDrive
+        pdf = None
+        if incluye_pdf(salida):
+            print("\nPASO 3b: Convirtiendo a PDF...")
+            progreso("pdf", "Convirtiendo el documento a PDF")
+            pdf = await run_in_threadpool(pool_pdf.convertir, doc_content)
+            print(f" PDF generado: {len(pdf)} bytes")
+
+        # ===== PASO 4: SUBIR DOCUMENTO A ONEDRIVE =====
+        print("\nPASO 4: Subiendo documento a OneDrive...")
+        progreso("documento_onedrive", "Subiendo documento a OneDrive")
+
+        # Nombre descriptivo
+        nombre_colaborador = datos_ocr['datos_persona']['nombre_completo'].replace(' ', '_')
+        doc_filename = f"Contrato_{nombre_colaborador}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{str(uuid.uuid4())[:8]}.docx"
+        doc_path = f"/Documentos_Legales/Contratos/{doc_filename}"
+
+        resultado_doc = await run_in_threadpool(
+            self.onedrive_service.subir_archivo,
+            file_path=doc_filename,
+            onedrive_path=doc_path,
+            file_content=doc_content
+        )
+
+        # Obtener link compartido
+        doc_id = resultado_doc["id"]
+        web_url = await run_in_threadpool(self.onedrive_service.obtener_link_compartido, doc_id, tipo="view")
+
+        print(f" Documento subido a OneDrive: {doc_id}")
+
+        pdf_onedrive = None
+        if pdf is not None:
+            pdf_filename = nombre_pdf(doc_filename)
+            resultado_pdf = await run_in_threadpool(
+                self.onedrive_service.subir_archivo,
+                file_path=pdf_filename,
+                onedrive_path=nombre_pdf(doc_path),
+                file_content=pdf
+            )
+            pdf_url = await run_in_threadpool(
+                self.onedrive_service.obtener_link_compartido, resultado_pdf["id"], tipo="view"
+            )
+            pdf_onedrive = {"onedrive_id": resultado_pdf["id"], "nombre_archivo": pdf_filename, "onedrive_url": pdf_url}
+
+            print(f" PDF subido a OneDrive: {resultado_pdf['id']}")
+
+        # ===== PASO 5: REGISTRAR EN BASE DE DATOS =====
+        print("\n PASO 5: Registrando en base de datos...")
+        progreso("registro_bd", "Registrando en base de datos")
+
+        documento = await run_in_threadpool(
+            self._registrar,
+            db,
+            doc_id=doc_id,
+            doc_path=doc_path,
+            web_url=web_url,
+            doc_filename=doc_filename,
+            doc_content=doc_content,
+            empresa_id=empresa_id,
+            representante_id=representante_id,
+            datos_ocr=datos_ocr,
+            extracted_text=extracted_text,
+            resultado_ocr=resultado_ocr,
+            categoria=categoria,
+            notas=notas
+        )
+
+        print(f" Registro creado en BD: ID {documento['id']}")
+
+        # ===== RETORNAR RESULTADO =====
+        resultado = {
+            "success": True,
+            "mensaje": "Documento procesado y guardado exitosamente",
+            "documento": {
+                "id": documento['id'],
+                "nombre_archivo": doc_filename,
+                "onedrive_url": web_url,
+                "estado": "borrador",
+                "tipo": "contrato"
+            },
+            "datos_extraidos": {
+                "colaborador": datos_ocr['datos_persona']['nombre_completo'],
+                "cui": datos_ocr['datos_persona']['cui'],
+                "empresa": datos_ocr['empresa_contratante']
+            },
+            "imagen_original": {
+                "onedrive_id": resultado_imagen['id'],
+                "nombre": imagen_filename
+            }
+        }
+        if pdf_onedrive is not None:
+            resultado["pdf"] = pdf_onedrive
+        cache_generacion.guardar_flujo(clave, resultado)
+        return {**resultado, "desde_cache": False}
+
+    def _existente(self, db: Session, clave: str) -> Optional[Dict[str, Any]]:
+        """Resultado de una solicitud idéntica anterior, si su registro sigue vigente en BD."""
+        resultado = cache_generacion.obtener_flujo(clave)
+        if resultado is None:
+            return None
+        registro = self.documento_repo.obtener_por_id(db, resultado["documento"]["id"])
+        if registro is None or registro.get("estado") == "anulado":
+            cache_generacion.descartar_flujo(clave)
+            return None
+        return {
+            **resultado,
+            "mensaje": "Documento ya generado con los mismos datos: se devuelve el existente",
+            "desde_cache": True,
+        }
+
+    def _registrar(
+        self,
+        db: Session,
+        doc_id: str,
+        doc_path: str,
+        web_url: str,
+        doc_filename: str,
+        doc_content: memoryview,
+        empresa_id: int,
+        representante_id: int,
+        datos_ocr: Dict[str, Any],
+        extracted_text: str,
+        resultado_ocr: Dict[str, Any],
+        categoria: str,
+        notas: Optional[str]
+    ) -> Dict[str, Any]:
+        # Calcular hash
+        doc_hash = self.onedrive_service.calcular_hash(doc_content)
+
+        # Crear registro en BD
+        documento = self.documento_repo.crear(
+            db=db,
+            onedrive_file_id=doc_id,
+            onedrive_path=doc_path,
+            onedrive_web_url=web_url,
+            nombre_archivo=doc_filename,
+            tipo_documento="contrato",
+            estado="borrador",
+            usuario_creador_id=USUARIO_ACTUAL_ID,
+            hash_sha256=doc_hash,
+            tamano_bytes=len(doc_content),
+            empresa_id=empresa_id,
+            representante_id=representante_id,
+            datos_ocr=str(datos_ocr),
+            contenido_indexado=extracted_text,
+            categoria=categoria,
+            notas=notas
+        )
+
+        # Layout de OCR para poder re-parsear sin volver a correr el OCR. A esta
+        # altura los archivos ya están en OneDrive: si falla (p. ej. la tabla no
+        # existe) se descarta solo el savepoint y el documento se registra igual
+        try:
+            with db.begin_nested():
+                self.layout_repo.guardar(
+                    db=db,
+                    documento_id=documento['id'],
+                    layout=comprimir_layout(resultado_ocr),
+                    version_parser=version_parser(),
+                    datos_ocr=serializar_datos(resultado_ocr["datos"])
+                )
+        except SQLAlchemyError as e:
+            print(f"⚠️ No se guardó el layout de OCR del documento {documento['id']}: {e}")
+
+        # Registrar historial
+        self.documento_repo.registrar_historial(
+            db=db,
+            documento_id=documento['id'],
+            accion="creado",
+            usuario_id=USUARIO_ACTUAL_ID,
+            notas=f"Documento generado automáticamente desde OCR y subido a OneDrive"
+        )
+
+        db.commit()
+        return documento
+
+
+servicio_flujo_documento = ServicioFlujoDocumento()
@@ -0,0 +1,189 @@
+# app/services/indice_plantillas.py
+"""
+Índice de campos de una plantilla .docx.
+
+Se arma una vez, al subir la plantilla (y al prepararla en
+cache_plantillas), a partir del XML del cuerpo (incluye tablas) y de los
+encabezados y pies de página ya limpiados con patch_xml de docxtpl, así que
+las etiquetas partidas entre runs cuentan igual:
+
+- `campos`: cada variable Jinja como ruta con puntos ("colaborador.cui",
+  "fecha_inicio.dia") con las partes donde aparece. Las variables locales
+  de la plantilla ({% for %}, {% set %}) no cuentan
+- `raices`: los nombres de primer nivel (lo que da
+  get_undeclared_template_variables de docxtpl)
+- `placeholders`: el texto de cada {{...}} tal como está en la plantilla
+  (las plantillas V1 usan claves como {{nombre_completo}})
+- `filtros`: filtros Jinja usados por cada campo
+
+Se guarda como JSON en campos_requeridos de la plantilla.
+"""
+
+import io
+import json
+import re
+from typing import Any, Dict, List, Optional, Set
+
+from docxtpl import DocxTemplate
+from jinja2 import Environment, meta, nodes
+from jinja2.exceptions import TemplateSyntaxError
+
+from app.utils.formato_legal import FILTROS_JINJA
+
+VERSION_INDICE = 1
+
+PARTE_CUERPO = "cuerpo"
+PARTE_ENCABEZADO = "encabezado"
+PARTE_PIE = "pie"
+
+_RE_PLACEHOLDER = re.compile(r'\{\{(.*?)\}\}', re.DOTALL)
+_RE_ETIQUETA_XML = re.compile(r'<[^>]+>')
+_RE_RUTA = re.compile(r'^\s*([^\W\d][\w]*(?:\.[^\W\d][\w]*)*)\s*$')
+
+# Con los mismos filtros que cache_plantillas: find_undeclared_variables falla con filtros desconocidos
+_entorno = Environment()
+_entorno.filters.update(FILTROS_JINJA)
+
+
+def _ruta(nodo) -> Optional[List[str]]:
+    """["colaborador", "cui"] para colaborador.cui o colaborador["cui"]; None si no es una ruta simple."""
+    if isinstance(nodo, nodes.Name):
+        return [nodo.name]
+    if isinstance(nodo, nodes.Getattr):
+        base = _ruta(nodo.node)
+        return base + [nodo.attr] if base is not None else None
+    if isinstance(nodo, nodes.Getitem) and isinstance(nodo.arg, nodes.Const) and isinstance(nodo.arg.value, str):
+        base = _ruta(nodo.node)
+        return base + [nodo.arg.value] if base is not None else None
+    return None
+
+
+def _recorrer(nodo, raices: Set[str], campos: Dict[str, Set[str]], filtros: Dict[str, Set[str]]):
+    if isinstance(nodo, nodes.Call) and isinstance(nodo.node, nodes.Getattr):
+        # colaborador.nombre_completo.upper(): el campo es colaborador.nombre_completo
+        ruta = _ruta(nodo.node.node)
+        if ruta is not None and ruta[0] in raices:
+            campos.setdefault('.'.join(ruta), set())
+            for hijo in nodo.iter_child_nodes(exclude=('node',)):
+                _recorrer(hijo, raices, campos, filtros)
+            return
+
+    if isinstance(nodo, nodes.Filter) and nodo.node is not None:
+        ruta = _ruta(nodo.node)
+        if ruta is not None and ruta[0] in raices:
+            filtros.setdefault('.'.join(ruta), set()).add(nodo.name)
+
+    if isinstance(nodo, (nodes.Name, nodes.Getattr, nodes.Getitem)):
+        ruta = _ruta(nodo)
+        if ruta is not None:
+            if ruta[0] in raices and getattr(nodo, 'ctx', 'load') == 'load':
+                campos.setdefault('.'.join(ruta), set())
+            return
+
+    for hijo in nodo.iter_child_nodes():
+        _recorrer(hijo, raices, campos, filtros)
+
+
+def _analizar_xml(xml: str) -> Dict[str, Any]:
+    """Campos, raíces y placeholders de una parte (XML ya pasado por patch_xml)."""
+    placeholders = [
+        '{{' + _RE_ETIQUETA_XML.sub('', expresion) + '}}'
+        for expresion in _RE_PLACEHOLDER.findall(xml)
+    ]
+    try:
+        arbol = _entorno.parse(xml)
+        raices = meta.find_undeclared_variables(arbol)
+    except TemplateSyntaxError as e:
+        # Sin Jinja válido (p. ej. una plantilla V1 con llaves sueltas): solo las claves simples
+        campos = {}
+        for placeholder in placeholders:
+            coincidencia = _RE_RUTA.match(placeholder[2:-2])
+            if coincidencia:
+                campos[coincidencia.group(1)] = set()
+        return {"campos": campos, "raices": {c.split('.')[0] for c in campos}, "filtros": {},
+                "placeholders": placeholders, "error": f"línea {e.lineno}: {e.message}"}
+
+    campos: Dict[str, Set[str]] = {}
+    filtros: Dict[str, Set[str]] = {}
+    _recorrer(arbol, raices, campos, filtros)
+    return {"campos": campos, "raices": raices, "filtros": filtros, "placeholders": placeholders, "error": None}
+
+
+def indice_desde_xml(partes: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Índice a partir del XML limpio de cada parte: {"cuerpo": [xml], "encabezado": [...], "pie": [...]}."""
+    campos: Dict[str, Set[str]] = {}
+    filtros: Dict[str, Set[str]] = {}
+    raices: Set[str] = set()
+    placeholders: List[str] = []
+    errores: List[str] = []
+
+    for parte, xmls in partes.items():
+        for xml in xmls:
+            analisis = _analizar_xml(xml)
+            for campo in analisis["campos"]:
+                campos.setdefault(campo, set()).add(parte)
+            for campo, nombres in analisis["filtros"].items():
+                filtros.setdefault(campo, set()).update(nombres)
+            raices.update(analisis["raices"])
+            for placeholder in analisis["placeholders"]:
+                if placeholder not in placeholders:
+                    placeholders.append(placeholder)
+            if analisis["error"]:
+                errores.append(f"{parte}, {analisis['error']}")
+
+    return {
+        "version": VERSION_INDICE,
+        "campos": [
+            {"campo": campo, "partes": sorted(campos[campo]), "filtros": sorted(filtros.get(campo, ()))}
+            for campo in sorted(campos)
+        ],
+        "raices": sorted(raices),
+        "placeholders": placeholders,
+        "errores": errores,
+    }
+
+
+def partes_xml(plantilla: DocxTemplate) -> Dict[str, List[str]]:
+    """XML de cuerpo, encabezados y pies de una DocxTemplate ya inicializada, pasado por patch_xml."""
+    partes = {PARTE_CUERPO: [plantilla.patch_xml(plantilla.get_xml())], PARTE_ENCABEZADO: [], PARTE_PIE: []}
+    for uri, parte in ((DocxTemplate.HEADER_URI, PARTE_ENCABEZADO), (DocxTemplate.FOOTER_URI, PARTE_PIE)):
+        for _, part in plantilla.get_headers_footers(uri):
+            partes[parte].append(plantilla.patch_xml(plantilla.get_part_xml(part)))
+    return partes
+
+
+def extraer_indice(contenido: bytes) -> Dict[str, Any]:
+    """Índice de campos de un .docx (contenido completo del archivo)."""
+    plantilla = DocxTemplate(io.BytesIO(contenido))
+    plantilla.init_docx()
+    return indice_desde_xml(partes_xml(plantilla))
+
+
+def rutas_indice(indice: Dict[str, Any]) -> List[str]:
+    return [campo["campo"] for campo in indice.get("campos", [])]
+
+
+def leer_indice(campos_requeridos: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Índice guardado en BD; None si la plantilla es anterior al índice (lista vacía o sin dato)."""
+    if not campos_requeridos:
+        return None
+    try:
+        indice = json.loads(campos_requeridos)
+    except ValueError:
+        return None
+    return indice if isinstance(indice, dict) and indice.get("version") else None
+
+
+def rutas_desconocidas(context: Dict[str, Any], rutas: List[str]) -> List[str]:
+    """Rutas de la plantilla que el contexto no trae (se renderizarían vacías)."""
+    desconocidas = []
+    for ruta in rutas:
+        valor = context
+        for segmento in ruta.split('.'):
+            if not isinstance(valor, dict):
+                break  # atributo de un valor final (p. ej. un método de str)
+            if segmento not in valor:
+                desconocidas.append(ruta)
+                break
+            valor = valor[segmento]
+    return desconocidas
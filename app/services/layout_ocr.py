@@ -0,0 +1,200 @@
+# app/services/layout_ocr.py
+"""
+Extracción de campos por geometría de las palabras del TSV de Tesseract.
+
+parse_ocr_text trabaja sobre texto plano: si Tesseract separa la etiqueta de
+su celda (tablas con PSM 6) o lee mal un número (EDAD S7), el campo se pierde
+o necesita una corrección ad hoc. Aquí se usa la posición de cada palabra:
+
+1. Se buscan las etiquetas (DPI/PASAPORTE, EDAD, HONORARIOS...) en cada
+   línea del TSV
+2. La celda del valor es lo que está a la derecha de la etiqueta, en la misma
+   franja vertical, hasta la siguiente etiqueta de esa franja
+3. Los campos con lista blanca (CUI, edad, monto, fechas) se vuelven a
+   reconocer solo en esa celda, restringidos a esos caracteres; los de texto
+   libre toman directamente las palabras del TSV
+
+Unas pocas celdas chicas reemplazan a las pasadas extra de página completa.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.calidad_ocr import palabras_tsv
+
+# Incrementar cuando cambien las etiquetas o la geometría (invalida caches de OCR)
+LAYOUT_VERSION = "2"
+
+# Etiqueta de cada campo y caracteres permitidos al re-reconocer su celda
+# (None = texto libre, se toma del TSV sin re-OCR)
+CAMPOS_LAYOUT: List[Dict[str, Any]] = [
+    {"campo": "empresa_contratante", "etiqueta": r"EMPRESA", "lista_blanca": None},
+    {"campo": "nombre_completo", "etiqueta": r"COLABORADOR", "lista_blanca": None},
+    {"campo": "cui", "etiqueta": r"DPI(?:\s*/?\s*PASAPORTE)?", "lista_blanca": "0123456789"},
+    {"campo": "direccion", "etiqueta": r"DIRECCI[OÓ]N", "lista_blanca": None},
+    {"campo": "fecha_inicio", "etiqueta": r"FECHA\s+DE\s+INICIO", "lista_blanca": "0123456789/"},
+    # Puede ser una fecha o "Indefinido": texto libre
+    {"campo": "fecha_fin", "etiqueta": r"FECHA\s+DE\s+FINALIZACI[OÓ]N", "lista_blanca": None},
+    {"campo": "monto", "etiqueta": r"HONORARIOS\s+POR\s+PA[GC]AR", "lista_blanca": "0123456789.,"},
+    {"campo": "posicion", "etiqueta": r"POSICI[OÓ]N", "lista_blanca": None},
+    {"campo": "profesion", "etiqueta": r"PROFESI[OÓ]N", "lista_blanca": None},
+    {"campo": "estado_civil", "etiqueta": r"ESTADO\s+CIVIL", "lista_blanca": None},
+    {"campo": "edad", "etiqueta": r"EDAD", "lista_blanca": "0123456789"},
+]
+
+# Cada etiqueta debe ser una palabra completa (EDAD no dentro de SOCIEDAD, EMPRESA no
+# dentro de EMPRESARIAL); al final sí puede seguir un dígito: valor pegado (EDAD57)
+_DESPACHADOR = re.compile(
+    "|".join(rf"(?<![^\W\d_])(?P<e{i}>{c['etiqueta']})(?![^\W\d_])" for i, c in enumerate(CAMPOS_LAYOUT)),
+    re.IGNORECASE,
+)
+_RE_SEPARADOR_INICIAL = re.compile(r'^[\s:;.\-]+')
+
+_SOLAPE_MINIMO = 0.5  # fracción de la altura de una palabra que debe caer en la franja de la etiqueta
+_MARGEN_CELDA = 6  # píxeles agregados alrededor del recorte
+_BORDE_BLANCO = 10  # borde blanco para que Tesseract no pegue el texto al límite de la imagen
+
+Caja = Tuple[int, int, int, int]  # (izquierda, arriba, derecha, abajo)
+
+
+def _caja(palabra: Dict[str, Any]) -> Caja:
+    return (
+        palabra["left"], palabra["top"],
+        palabra["left"] + palabra["width"], palabra["top"] + palabra["height"],
+    )
+
+
+def _union(cajas: List[Caja]) -> Caja:
+    return (
+        min(c[0] for c in cajas), min(c[1] for c in cajas),
+        max(c[2] for c in cajas), max(c[3] for c in cajas),
+    )
+
+
+def _en_franja(caja: Caja, arriba: int, abajo: int) -> bool:
+    alto = max(1, caja[3] - caja[1])
+    return min(caja[3], abajo) - max(caja[1], arriba) >= _SOLAPE_MINIMO * alto
+
+
+def _lineas(palabras: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Palabras agrupadas por línea de Tesseract, en orden de lectura."""
+    lineas: Dict[tuple, List[Dict[str, Any]]] = {}
+    for palabra in palabras:
+        lineas.setdefault((palabra["bloque"], palabra["parrafo"], palabra["linea"]), []).append(palabra)
+    return [sorted(linea, key=lambda p: p["left"]) for linea in lineas.values()]
+
+
+def buscar_etiquetas(palabras: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Etiquetas encontradas en el TSV: [{"campo", "caja", "resto"}, ...].
+    `caja` termina donde termina la etiqueta; si la última palabra trae el
+    valor pegado (EDAD:57), ese sobrante queda en `resto`.
+    """
+    etiquetas = []
+    for linea in _lineas(palabras):
+        inicios = []
+        posicion = 0
+        for palabra in linea:
+            inicios.append(posicion)
+            posicion += len(palabra["texto"]) + 1
+        texto = " ".join(p["texto"] for p in linea)
+
+        for coincidencia in _DESPACHADOR.finditer(texto):
+            inicio, fin = coincidencia.span()
+            cubiertas = [
+                (palabra, desde) for palabra, desde in zip(linea, inicios)
+                if desde < fin and desde + len(palabra["texto"]) > inicio
+            ]
+            izquierda, arriba, derecha, abajo = _union([_caja(p) for p, _ in cubiertas])
+
+            ultima, desde = cubiertas[-1]
+            resto = ultima["texto"][fin - desde:]
+            if resto:
+                # Valor pegado a la etiqueta: la celda empieza donde terminaría la etiqueta
+                derecha = ultima["left"] + ultima["width"] * (fin - desde) // len(ultima["texto"])
+
+            etiquetas.append({
+                "campo": CAMPOS_LAYOUT[int(coincidencia.lastgroup[1:])]["campo"],
+                "caja": (izquierda, arriba, derecha, abajo),
+                "resto": _RE_SEPARADOR_INICIAL.sub('', resto),
+            })
+    return etiquetas
+
+
+def _celda_valor(etiqueta: Dict[str, Any], palabras: List[Dict[str, Any]],
+                 etiquetas: List[Dict[str, Any]], ancho_imagen: int) -> Dict[str, Any]:
+    """Caja y texto (según el TSV) de la celda a la derecha de la etiqueta."""
+    izquierda, arriba, derecha, abajo = etiqueta["caja"]
+
+    # La celda termina donde empieza la siguiente etiqueta de la misma franja
+    limite = min(
+        (e["caja"][0] for e in etiquetas
+         if e is not etiqueta and e["caja"][0] >= derecha and _en_franja(e["caja"], arriba, abajo)),
+        default=ancho_imagen,
+    )
+    valor = sorted(
+        (p for p in palabras
+         if derecha <= p["left"] < limite and _en_franja(_caja(p), arriba, abajo)),
+        key=lambda p: p["left"],
+    )
+
+    textos = ([etiqueta["resto"]] if etiqueta["resto"] else []) + [p["texto"] for p in valor]
+    texto = _RE_SEPARADOR_INICIAL.sub('', " ".join(textos)).strip()
+
+    if valor:
+        caja = _union([_caja(p) for p in valor] + [(derecha, arriba, derecha, abajo)])
+    else:
+        # Celda vacía según el TSV (el valor no se reconoció): toda la franja hasta el límite
+        caja = (derecha, arriba, limite, abajo)
+    return {"caja": caja, "texto": texto}
+
+
+def ubicar_celdas(tsv: str, ancho_imagen: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Celda de valor de cada campo encontrado en el TSV (la primera etiqueta del
+    campo en orden de lectura): {campo: {"caja", "texto", "lista_blanca"}}.
+    """
+    palabras = palabras_tsv(tsv)
+    etiquetas = buscar_etiquetas(palabras)
+    listas_blancas = {c["campo"]: c["lista_blanca"] for c in CAMPOS_LAYOUT}
+
+    celdas = {}
+    for etiqueta in etiquetas:
+        campo = etiqueta["campo"]
+        if campo in celdas:
+            continue
+        celda = _celda_valor(etiqueta, palabras, etiquetas, ancho_imagen)
+        celdas[campo] = {**celda, "lista_blanca": listas_blancas[campo]}
+    return celdas
+
+
+def recortar_celda(imagen: np.ndarray, caja: Caja) -> Optional[np.ndarray]:
+    """Recorte de la celda con margen y borde blanco, o None si la caja está vacía."""
+    alto, ancho = imagen.shape[:2]
+    izquierda, arriba, derecha, abajo = caja
+    izquierda = max(0, izquierda - _MARGEN_CELDA)
+    arriba = max(0, arriba - _MARGEN_CELDA)
+    derecha = min(ancho, derecha + _MARGEN_CELDA)
+    abajo = min(alto, abajo + _MARGEN_CELDA)
+    if derecha - izquierda < 2 or abajo - arriba < 2:
+        return None
+    return np.pad(imagen[arriba:abajo, izquierda:derecha], _BORDE_BLANCO, constant_values=255)
+
+
+def valores_layout(celdas: Dict[str, Dict[str, Any]], textos_celdas: Dict[str, str]) -> Dict[str, str]:
+    """
+    Valores crudos por campo (misma forma que extraer_campos). Los campos con
+    lista blanca solo se toman del re-OCR de su celda; si quedó vacío, se
+    omiten y se conserva lo que haya encontrado el parser de texto.
+    """
+    valores = {}
+    for campo, celda in celdas.items():
+        if celda["lista_blanca"]:
+            texto = "".join(c for c in textos_celdas.get(campo, "") if c in celda["lista_blanca"])
+        else:
+            texto = celda["texto"]
+        if texto:
+            valores[campo] = texto
+    return valores
@@ -0,0 +1,411 @@
+# app/services/lote_documentos.py
+"""
+Generación de contratos por lote: una plantilla, una empresa y un
+representante para muchos colaboradores (p. ej. el arranque de un proyecto).
+
+- Empresa y representante se consultan una sola vez para todo el lote
+- Los documentos se renderizan en un pool de procesos propio (cada worker
+  mantiene su cache de plantillas preparadas) con como máximo
+  GENERACION_LOTE_CONCURRENCIA documentos en vuelo
+- Un colaborador con los mismos datos que un documento ya generado con la
+  misma plantilla no se renderiza: el .docx sale de cache_generacion
+- El ZIP se va entregando mientras se renderiza: cada documento se agrega
+  apenas termina, en orden de llegada, y al final va resumen_lote.json con
+  el estado de cada colaborador
+- Opcionalmente cada documento se sube a OneDrive y se registra en BD
+- Con salida pdf/both cada .docx se convierte en el pool de LibreOffice
+  (conversion_pdf); el PDF va al ZIP y, si se sube, a OneDrive junto al .docx
+- El error de un colaborador (datos inválidos, render, OneDrive, BD) queda
+  en el resumen y no corta el lote
+"""
+
+import asyncio
+import csv
+import datetime
+import io
+import json
+import time
+import uuid
+import zipfile
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+
+from app.core.config import (
+    GENERACION_LOTE_WORKERS,
+    GENERACION_LOTE_CONCURRENCIA,
+    GENERACION_LOTE_MAX_DOCUMENTOS,
+    ONEDRIVE_PATHS,
+)
+from app.db.session import SessionLocal
+from app.models.documento import (
+    ContratoData,
+    DocumentoProcesado,
+    GenerationRequest,
+    PersonaData,
+)
+from app.repository.documento_onedrive import DocumentoOneDriveRepository
+from app.services.cache_generacion import cache_generacion
+from app.services.cache_plantillas import cache_plantillas, renderizar_en_bytes
+from app.services.conversion_pdf import SALIDA_DOCX, SALIDA_PDF, incluye_pdf, nombre_pdf, pool_pdf, validar_salida
+from app.services.documento_v2 import ServicioDocumentoV2
+from app.services.ejecutor_procesos import EjecutorProcesos
+from app.services.indice_plantillas import rutas_indice
+from app.utils.contexto_perezoso import materializar
+
+NOMBRE_RESUMEN = "resumen_lote.json"
+USUARIO_ACTUAL_ID = 1
+
+# Columnas del CSV: campos de PersonaData y ContratoData, más empresa_contratante
+COLUMNAS_PERSONA = tuple(PersonaData.model_fields)
+COLUMNAS_CONTRATO = tuple(ContratoData.model_fields)
+
+# Pool propio: el de OCR precarga Tesseract y no debe competir con la generación
+ejecutor_generacion = EjecutorProcesos(
+    "generación de documentos",
+    max_workers=GENERACION_LOTE_WORKERS,
+    max_pendientes=10 ** 6,  # la concurrencia ya la acota cada lote
+)
+
+
+@dataclass
+class ColaboradorLote:
+    """Un colaborador del lote; si sus datos no son válidos trae el error."""
+    indice: int
+    colaborador: Optional[DocumentoProcesado] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class LoteDocumentos:
+    template_name: str
+    fecha_contrato: str
+    empresa_id: int
+    representante_id: int
+    empresa: Dict[str, Any]
+    representante: Dict[str, Any]
+    colaboradores: List[ColaboradorLote]
+    subir_onedrive: bool = False
+    registrar_bd: bool = False
+    salida: str = SALIDA_DOCX
+
+
+def leer_csv_colaboradores(contenido: bytes) -> List[ColaboradorLote]:
+    """
+    Una fila por colaborador. Las columnas desconocidas se ignoran y las
+    vacías quedan en None; una fila inválida se reporta como error del
+    colaborador, no de todo el lote.
+    """
+    try:
+        texto = contenido.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        texto = contenido.decode('latin-1')
+
+    lector = csv.DictReader(io.StringIO(texto))
+    if not lector.fieldnames:
+        raise HTTPException(status_code=400, detail="El CSV está vacío o no tiene encabezados")
+
+    colaboradores = []
+    for indice, fila in enumerate(lector):
+        fila = {(clave or '').strip(): (valor or '').strip() or None for clave, valor in fila.items()}
+        try:
+            colaborador = DocumentoProcesado(
+                empresa_contratante=fila.get('empresa_contratante'),
+                datos_persona=PersonaData(**{c: fila.get(c) for c in COLUMNAS_PERSONA}),
+                datos_contrato=ContratoData(**{c: fila.get(c) for c in COLUMNAS_CONTRATO}),
+            )
+            colaboradores.append(ColaboradorLote(indice, colaborador=colaborador))
+        except ValidationError as e:
+            colaboradores.append(ColaboradorLote(indice, error=f"Fila {indice + 2} inválida: {e}"))
+    return colaboradores
+
+
+class _SalidaZip:
+    """Destino no 'seekable' de ZipFile: acumula lo escrito hasta que se vacía."""
+
+    def __init__(self):
+        self._bloques = []
+
+    def write(self, datos) -> int:
+        self._bloques.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self) -> bytes:
+        datos = b''.join(self._bloques)
+        self._bloques = []
+        return datos
+
+
+def _info_zip(nombre: str) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(nombre, date_time=time.localtime()[:6])
+    # El .docx y el PDF ya vienen comprimidos: se guardan tal cual
+    info.compress_type = zipfile.ZIP_STORED
+    return info
+
+
+class ServicioLoteDocumentos:
+
+    def __init__(self, concurrencia: int = GENERACION_LOTE_CONCURRENCIA):
+        self.concurrencia = max(1, concurrencia)
+        self.documento_service = ServicioDocumentoV2()
+        self.documento_repo = DocumentoOneDriveRepository()
+        self._onedrive_service = None
+
+    @property
+    def onedrive_service(self):
+        # Perezoso: solo los lotes que suben a OneDrive necesitan MSAL
+        if self._onedrive_service is None:
+            from app.services.onedrive_service import OneDriveService
+            self._onedrive_service = OneDriveService()
+        return self._onedrive_service
+
+    def preparar(
+        self,
+        db,
+        template_name: str,
+        fecha_contrato: str,
+        empresa_id: int,
+        representante_id: int,
+        colaboradores: List[ColaboradorLote],
+        subir_onedrive: bool = False,
+        registrar_bd: bool = False,
+        salida: str = SALIDA_DOCX
+    ) -> LoteDocumentos:
+        """
+        Valida el lote y consulta empresa y representante una sola vez.
+        Se llama antes de responder: los errores de todo el lote (plantilla
+        o empresa inexistente, lote vacío) salen como HTTP y no dentro del ZIP.
+        """
+        if not colaboradores:
+            raise HTTPException(status_code=400, detail="Debe enviar al menos un colaborador")
+        if len(colaboradores) > GENERACION_LOTE_MAX_DOCUMENTOS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"El lote supera el máximo de {GENERACION_LOTE_MAX_DOCUMENTOS} documentos"
+            )
+        if registrar_bd and not subir_onedrive:
+            raise HTTPException(status_code=400, detail="Para registrar en BD los documentos deben subirse a OneDrive")
+        salida = validar_salida(salida)
+
+        # 404 temprano si la plantilla no existe (y queda preparada en este proceso)
+        cache_plantillas.obtener(template_name)
+        empresa, representante = self.documento_service.obtener_empresa_representante(
+            db, empresa_id, representante_id
+        )
+        return LoteDocumentos(
+            template_name=template_name,
+            fecha_contrato=fecha_contrato,
+            empresa_id=empresa_id,
+            representante_id=representante_id,
+            empresa=empresa,
+            representante=representante,
+            colaboradores=colaboradores,
+            subir_onedrive=subir_onedrive,
+            registrar_bd=registrar_bd,
+            salida=salida,
+        )
+
+    def _subir(self, contenido: bytes, colaborador: DocumentoProcesado) -> Dict[str, Any]:
+        nombre_colaborador = (colaborador.datos_persona.nombre_completo or 'sin_nombre').replace(' ', '_')
+        doc_filename = (f"Contrato_{nombre_colaborador}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                        f"_{str(uuid.uuid4())[:8]}.docx")
+        doc_path = f"{ONEDRIVE_PATHS['contratos']}/{doc_filename}"
+
+        resultado = self.onedrive_service.subir_archivo(
+            file_path=doc_filename,
+            onedrive_path=doc_path,
+            file_content=contenido
+        )
+        web_url = self.onedrive_service.obtener_link_compartido(resultado["id"], tipo="view")
+        return {"id": resultado["id"], "path": doc_path, "nombre_archivo": doc_filename, "url": web_url}
+
+    def _subir_pdf(self, pdf: bytes, onedrive: Dict[str, Any]) -> Dict[str, Any]:
+        """El PDF va en la misma carpeta que el .docx, con el mismo nombre."""
+        pdf_filename = nombre_pdf(onedrive["nombre_archivo"])
+        resultado = self.onedrive_service.subir_archivo(
+            file_path=pdf_filename,
+            onedrive_path=nombre_pdf(onedrive["path"]),
+            file_content=pdf
+        )
+        web_url = self.onedrive_service.obtener_link_compartido(resultado["id"], tipo="view")
+        return {"id": resultado["id"], "url": web_url}
+
+    def _preparar(self, lote: LoteDocumentos, solicitud: GenerationRequest):
+        """
+        Verificación, contexto y consulta a cache_generacion de un colaborador.
+        Lee la plantilla y la cache en disco: se ejecuta fuera del event loop.
+        Retorna (context, preparada, clave, contenido); contenido es None si no estaba en cache.
+        """
+        self.documento_service.verificar_campos(solicitud)
+        context = self.documento_service.preparar_contexto(lote.empresa, lote.representante, solicitud)
+        # Mismos datos que un documento ya generado: se reutiliza sin pasar por el pool
+        preparada = cache_plantillas.obtener(lote.template_name)
+        clave = cache_generacion.clave(preparada, context)
+        return context, preparada, clave, cache_generacion.obtener(clave)
+
+    def _registrar(self, db, lote: LoteDocumentos, onedrive: Dict[str, Any], contenido: bytes,
+                   colaborador: DocumentoProcesado) -> int:
+        try:
+            documento = self.documento_repo.crear(
+                db=db,
+                onedrive_file_id=onedrive["id"],
+                onedrive_path=onedrive["path"],
+                onedrive_web_url=onedrive["url"],
+                nombre_archivo=onedrive["nombre_archivo"],
+                tipo_documento="contrato",
+                estado="borrador",
+                usuario_creador_id=USUARIO_ACTUAL_ID,
+                hash_sha256=self.onedrive_service.calcular_hash(contenido),
+                tamano_bytes=len(contenido),
+                empresa_id=lote.empresa_id,
+                representante_id=lote.representante_id,
+                datos_ocr=str(colaborador.model_dump()),
+                categoria="contrato",
+            )
+            self.documento_repo.registrar_historial(
+                db=db,
+                documento_id=documento['id'],
+                accion="creado",
+                usuario_id=USUARIO_ACTUAL_ID,
+                notas=f"Documento generado por lote con la plantilla {lote.template_name}"
+            )
+            db.commit()
+            return documento['id']
+        except Exception:
+            db.rollback()
+            raise
+
+    async def _procesar_colaborador(
+        self,
+        lote: LoteDocumentos,
+        elemento: ColaboradorLote,
+        db,
+        lock_bd: asyncio.Lock
+    ) -> Tuple[Dict[str, Any], List[Tuple[str, bytes]]]:
+        resultado = {"indice": elemento.indice, "archivo": None, "estado": "error"}
+        archivos = []  # (nombre en el ZIP, contenido)
+        if elemento.error is not None:
+            resultado.update(codigo=422, error=elemento.error)
+            return resultado, archivos
+
+        colaborador = elemento.colaborador
+        resultado["colaborador"] = colaborador.datos_persona.nombre_completo
+        try:
+            solicitud = GenerationRequest(
+                template_name=lote.template_name,
+                fecha_contrato=lote.fecha_contrato,
+                empresa_id=lote.empresa_id,
+                representante_id=lote.representante_id,
+                colaborador_data=colaborador
+            )
+            context, preparada, clave, contenido = await run_in_threadpool(self._preparar, lote, solicitud)
+            # Prefijo con el índice: dos colaboradores con el mismo nombre no chocan en el ZIP
+            resultado["archivo"] = f"{elemento.indice + 1:04d}_{self.documento_service.nombre_archivo_salida(context)}"
+
+            resultado["desde_cache"] = contenido is not None
+            if contenido is None:
+                # Al worker va un dict común, con solo los valores derivados que usa la plantilla
+                contenido = await ejecutor_generacion.ejecutar(
+                    renderizar_en_bytes, lote.template_name, materializar(context, rutas_indice(preparada.indice))
+                )
+                await run_in_threadpool(cache_generacion.guardar, clave, contenido)
+            resultado["bytes"] = len(contenido)
+            if lote.salida != SALIDA_PDF:
+                archivos.append((resultado["archivo"], contenido))
+
+            pdf = None
+            if incluye_pdf(lote.salida):
+                pdf = await run_in_threadpool(pool_pdf.convertir, contenido)
+                resultado["archivo_pdf"] = nombre_pdf(resultado["archivo"])
+                resultado["bytes_pdf"] = len(pdf)
+                archivos.append((resultado["archivo_pdf"], pdf))
+
+            if lote.subir_onedrive:
+                onedrive = await run_in_threadpool(self._subir, contenido, colaborador)
+                resultado["onedrive"] = {"id": onedrive["id"], "url": onedrive["url"]}
+                if pdf is not None:
+                    resultado["onedrive_pdf"] = await run_in_threadpool(self._subir_pdf, pdf, onedrive)
+                if lote.registrar_bd:
+                    # Una sola sesión por lote: los registros van de a uno
+                    async with lock_bd:
+                        resultado["documento_id"] = await run_in_threadpool(
+                            self._registrar, db, lote, onedrive, contenido, colaborador
+                        )
+            resultado["estado"] = "ok"
+        except HTTPException as e:
+            resultado.update(codigo=e.status_code, error=e.detail)
+        except Exception as e:
+            print(f"❌ ERROR EN LOTE DE DOCUMENTOS ({resultado.get('colaborador')}): {str(e)}")
+            resultado.update(codigo=500, error=str(e))
+        return resultado, archivos
+
+    async def _procesar(self, lote: LoteDocumentos) -> AsyncIterator[Tuple[Dict[str, Any], List[Tuple[str, bytes]]]]:
+        """Un (resultado, archivos) por colaborador, en orden de llegada."""
+        db = SessionLocal() if lote.registrar_bd else None
+        lock_bd = asyncio.Lock()
+        en_vuelo = set()
+        try:
+            for elemento in lote.colaboradores:
+                if len(en_vuelo) >= self.concurrencia:
+                    terminadas, en_vuelo = await asyncio.wait(en_vuelo, return_when=asyncio.FIRST_COMPLETED)
+                    for tarea in terminadas:
+                        yield tarea.result()
+                en_vuelo.add(asyncio.ensure_future(self._procesar_colaborador(lote, elemento, db, lock_bd)))
+
+            while en_vuelo:
+                terminadas, en_vuelo = await asyncio.wait(en_vuelo, return_when=asyncio.FIRST_COMPLETED)
+                for tarea in terminadas:
+                    yield tarea.result()
+        finally:
+            for tarea in en_vuelo:
+                tarea.cancel()
+            if db is not None:
+                db.close()
+
+    async def generar_zip(self, lote: LoteDocumentos) -> AsyncIterator[bytes]:
+        """
+        Produce el ZIP en bloques a medida que se generan los documentos.
+        Si el cliente se desconecta, se cancelan los documentos en vuelo.
+        """
+        inicio = time.time()
+        salida = _SalidaZip()
+        resultados = []
+        with zipfile.ZipFile(salida, 'w') as comprimido:
+            async for resultado, archivos in self._procesar(lote):
+                for nombre, contenido in archivos:
+                    comprimido.writestr(_info_zip(nombre), contenido)
+                resultados.append(resultado)
+                bloque = salida.vaciar()
+                if bloque:
+                    yield bloque
+
+            resultados.sort(key=lambda r: r["indice"])
+            generados = sum(1 for r in resultados if r["estado"] == "ok")
+            resumen = {
+                "plantilla": lote.template_name,
+                "empresa_id": lote.empresa_id,
+                "representante_id": lote.representante_id,
+                "salida": lote.salida,
+                "total": len(resultados),
+                "generados": generados,
+                "errores": len(resultados) - generados,
+                "segundos": round(time.time() - inicio, 2),
+                "documentos": resultados,
+            }
+            comprimido.writestr(
+                _info_zip(NOMBRE_RESUMEN),
+                json.dumps(resumen, ensure_ascii=False, indent=2),
+                compress_type=zipfile.ZIP_DEFLATED
+            )
+
+        print(f"✅ Lote de documentos terminado: {generados}/{len(resultados)} en {resumen['segundos']}s")
+        yield salida.vaciar()
+
+
+servicio_lote_documentos = ServicioLoteDocumentos()
@@ -0,0 +1,170 @@
+# app/services/lote_ocr.py
+"""
+OCR por lotes: varias imágenes (o un ZIP) procesadas en el pool de OCR,
+entregando un resultado por imagen apenas termina.
+
+La memoria queda acotada sin importar el tamaño del lote:
+- Los archivos subidos se copian a un directorio temporal en bloques
+  (no se cargan completos en memoria)
+- Los miembros del ZIP se leen uno a uno recién cuando les toca
+- Como máximo OCR_LOTE_CONCURRENCIA imágenes están en vuelo a la vez
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import OCR_LOTE_CONCURRENCIA, OCR_LOTE_MAX_MB_IMAGEN
+from app.services.servicio_ocr import servicio_ocr, validar_perfil, documento_procesado
+
+EXTENSIONES_IMAGEN = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.webp', '.pdf')
+TAMANO_BLOQUE_COPIA = 1024 * 1024
+
+
+@dataclass
+class ElementoLote:
+    """Una imagen del lote: archivo suelto o miembro de un ZIP."""
+    indice: int
+    nombre: str
+    ruta: str
+    miembro_zip: Optional[str] = None
+    tamano: int = 0
+
+
+@dataclass
+class Lote:
+    """Subidas ya copiadas a disco: (nombre original, ruta temporal)."""
+    directorio: str
+    archivos: List[Tuple[str, str]]
+
+
+def _es_zip(nombre: str, ruta: str) -> bool:
+    return (nombre or '').lower().endswith('.zip') or zipfile.is_zipfile(ruta)
+
+
+def _copiar_subidas(archivos: List[UploadFile], directorio: str) -> List[Tuple[str, str]]:
+    """Copia las subidas a disco en bloques. Corre en el threadpool."""
+    copiados = []
+    for posicion, archivo in enumerate(archivos):
+        ruta = os.path.join(directorio, f"{posicion:05d}")
+        archivo.file.seek(0)
+        with open(ruta, 'wb') as destino:
+            shutil.copyfileobj(archivo.file, destino, TAMANO_BLOQUE_COPIA)
+        copiados.append((archivo.filename or f"archivo_{posicion}", ruta))
+    return copiados
+
+
+def _enumerar_elementos(lote: Lote) -> Iterator[ElementoLote]:
+    """Expande los ZIP en sus imágenes, sin leer su contenido todavía."""
+    indice = 0
+    for nombre_archivo, ruta in lote.archivos:
+        if not _es_zip(nombre_archivo, ruta):
+            yield ElementoLote(indice, nombre_archivo, ruta, tamano=os.path.getsize(ruta))
+            indice += 1
+            continue
+
+        with zipfile.ZipFile(ruta) as comprimido:
+            miembros = comprimido.infolist()
+        for miembro in miembros:
+            nombre = miembro.filename
+            if miembro.is_dir() or nombre.startswith('__MACOSX/') or os.path.basename(nombre).startswith('.'):
+                continue
+            if not nombre.lower().endswith(EXTENSIONES_IMAGEN):
+                continue
+            yield ElementoLote(indice, nombre, ruta, miembro_zip=nombre, tamano=miembro.file_size)
+            indice += 1
+
+
+def _leer_elemento(elemento: ElementoLote) -> bytes:
+    if elemento.tamano > OCR_LOTE_MAX_MB_IMAGEN * 1024 * 1024:
+        raise ValueError(f"La imagen supera el máximo de {OCR_LOTE_MAX_MB_IMAGEN} MB")
+    if elemento.miembro_zip is None:
+        with open(elemento.ruta, 'rb') as f:
+            return f.read()
+    with zipfile.ZipFile(elemento.ruta) as comprimido:
+        return comprimido.read(elemento.miembro_zip)
+
+
+class ServicioLoteOCR:
+
+    def __init__(self, concurrencia: int = OCR_LOTE_CONCURRENCIA):
+        self.concurrencia = max(1, concurrencia)
+
+    async def preparar(self, archivos: List[UploadFile]) -> Lote:
+        """
+        Copia las subidas a un directorio temporal propio del lote.
+        Se hace antes de responder porque el framework cierra los
+        UploadFile cuando termina el endpoint, antes de que el stream avance.
+        """
+        if not archivos:
+            raise HTTPException(status_code=400, detail="Debe enviar al menos una imagen o un ZIP")
+        directorio = tempfile.mkdtemp(prefix="lote_ocr_")
+        try:
+            copiados = await run_in_threadpool(_copiar_subidas, archivos, directorio)
+        except Exception:
+            shutil.rmtree(directorio, ignore_errors=True)
+            raise
+        return Lote(directorio=directorio, archivos=copiados)
+
+    async def _procesar_elemento(self, elemento: ElementoLote, perfil: str) -> Dict[str, Any]:
+        try:
+            contenido = await run_in_threadpool(_leer_elemento, elemento)
+            resultado = await servicio_ocr.procesar(contenido, perfil=perfil)
+            documento = documento_procesado(resultado)
+            return {
+                "indice": elemento.indice,
+                "archivo": elemento.nombre,
+                "estado": "ok",
+                "documento": documento.model_dump(by_alias=True),
+            }
+        except HTTPException as e:
+            return {"indice": elemento.indice, "archivo": elemento.nombre, "estado": "error",
+                    "codigo": e.status_code, "error": e.detail}
+        except Exception as e:
+            print(f"❌ ERROR EN OCR DEL LOTE ({elemento.nombre}): {str(e)}")
+            return {"indice": elemento.indice, "archivo": elemento.nombre, "estado": "error",
+                    "codigo": 500, "error": str(e)}
+
+    async def procesar(self, lote: Lote, perfil: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Procesa el lote y produce un resultado por imagen en orden de llegada
+        (no de envío). Borra el directorio temporal al terminar o si el
+        cliente se desconecta.
+        """
+        perfil = validar_perfil(perfil)
+        en_vuelo = set()
+        procesadas = 0
+        try:
+            try:
+                for elemento in _enumerar_elementos(lote):
+                    if len(en_vuelo) >= self.concurrencia:
+                        terminadas, en_vuelo = await asyncio.wait(en_vuelo, return_when=asyncio.FIRST_COMPLETED)
+                        for tarea in terminadas:
+                            procesadas += 1
+                            yield tarea.result()
+                    en_vuelo.add(asyncio.ensure_future(self._procesar_elemento(elemento, perfil)))
+            except zipfile.BadZipFile as e:
+                yield {"indice": None, "archivo": None, "estado": "error", "codigo": 400,
+                       "error": f"ZIP inválido: {str(e)}"}
+
+            while en_vuelo:
+                terminadas, en_vuelo = await asyncio.wait(en_vuelo, return_when=asyncio.FIRST_COMPLETED)
+                for tarea in terminadas:
+                    procesadas += 1
+                    yield tarea.result()
+
+            print(f"✅ Lote OCR terminado: {procesadas} imágenes")
+        finally:
+            for tarea in en_vuelo:
+                tarea.cancel()
+            shutil.rmtree(lote.directorio, ignore_errors=True)
+
+
+servicio_lote_ocr = ServicioLoteOCR()
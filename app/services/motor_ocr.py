@@ -0,0 +1,214 @@
+# app/services/motor_ocr.py
+"""
+Abstracción del motor de OCR con dos backends:
+
+- "tesserocr" (por defecto): mantiene handles de la API de Tesseract vivos en
+  cada proceso del pool, con el modelo de idioma ya cargado. Cambiar de PSM
+  entre pasadas no recarga el modelo.
+- "pytesseract": lanza un proceso `tesseract` por llamada (comportamiento
+  original). Se usa como respaldo si tesserocr no está instalado.
+
+Ambos backends reciben exactamente la misma imagen (escala de grises sin
+pérdida), el mismo OEM/PSM/DPI y el mismo tessdata, por lo que producen el
+mismo texto.
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from app.core.config import TESSERACT_CMD, OCR_MOTOR, OCR_DPI, OCR_TESSDATA_DIR
+
+OEM_POR_DEFECTO = 3  # LSTM + legacy, igual que '--oem 3'
+PSM_CELDA = 7  # una sola línea de texto
+
+
+def _a_pil(imagen) -> Image.Image:
+    if isinstance(imagen, np.ndarray):
+        return Image.fromarray(imagen)
+    return imagen
+
+
+def _normalizar_tsv(tsv: str) -> str:
+    """Quita la fila de encabezado que agrega el CLI; la API no la incluye."""
+    if tsv.startswith('level\t'):
+        tsv = tsv.split('\n', 1)[1] if '\n' in tsv else ''
+    return tsv
+
+
+class MotorOCR:
+    """Interfaz común de los backends."""
+
+    nombre = "base"
+
+    def texto(self, imagen, psm: int, lang: str = 'spa', timeout: int = 0,
+              tessdata_dir: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    def reconocer(self, imagen, psm: int, lang: str = 'spa', timeout: int = 0,
+                  tessdata_dir: Optional[str] = None) -> Dict[str, str]:
+        """
+        Una sola pasada de reconocimiento que devuelve el texto plano y el TSV
+        de palabras (equivalente a image_to_data) sin la fila de encabezado.
+        """
+        raise NotImplementedError
+
+    def texto_celda(self, imagen, lista_blanca: Optional[str], psm: int = PSM_CELDA, lang: str = 'spa',
+                    timeout: int = 0, tessdata_dir: Optional[str] = None) -> str:
+        """
+        Reconoce un recorte chico (una celda) limitando los caracteres posibles
+        a `lista_blanca` (None = sin restricción).
+        """
+        raise NotImplementedError
+
+    def precargar(self, lang: str = 'spa'):
+        """Carga anticipada del modelo (no-op si el backend no mantiene estado)."""
+
+
+class MotorPytesseract(MotorOCR):
+
+    nombre = "pytesseract"
+
+    def __init__(self, tesseract_cmd: str = TESSERACT_CMD):
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    @staticmethod
+    def _config(psm: int, tessdata_dir: Optional[str]) -> str:
+        config = f'--oem {OEM_POR_DEFECTO} --psm {psm}'
+        if OCR_DPI:
+            config += f' --dpi {OCR_DPI}'
+        tessdata_dir = tessdata_dir or OCR_TESSDATA_DIR
+        if tessdata_dir:
+            config += f' --tessdata-dir "{tessdata_dir}"'
+        return config
+
+    def texto(self, imagen, psm: int, lang: str = 'spa', timeout: int = 0,
+              tessdata_dir: Optional[str] = None) -> str:
+        resultado = pytesseract.image_to_string(
+            _a_pil(imagen), lang=lang, config=self._config(psm, tessdata_dir), timeout=timeout
+        )
+        # El CLI agrega un salto de página (\f) al final; la API no
+        return resultado.rstrip('\f')
+
+    def reconocer(self, imagen, psm: int, lang: str = 'spa', timeout: int = 0,
+                  tessdata_dir: Optional[str] = None) -> Dict[str, str]:
+        # Una sola ejecución del CLI genera ambos archivos (.txt y .tsv)
+        config = self._config(psm, tessdata_dir) + ' -c tessedit_create_tsv=1'
+        with pytesseract.pytesseract.save(_a_pil(imagen)) as (base_temporal, archivo_entrada):
+            pytesseract.pytesseract.run_tesseract(
+                archivo_entrada, base_temporal, 'txt tsv', lang, config, 0, timeout
+            )
+            with open(f"{base_temporal}{os.extsep}txt", 'rb') as f:
+                texto = f.read().decode('utf-8')
+            with open(f"{base_temporal}{os.extsep}tsv", 'rb') as f:
+                tsv = f.read().decode('utf-8')
+        return {"texto": texto.rstrip('\f'), "tsv": _normalizar_tsv(tsv)}
+
+    def texto_celda(self, imagen, lista_blanca: Optional[str], psm: int = PSM_CELDA, lang: str = 'spa',
+                    timeout: int = 0, tessdata_dir: Optional[str] = None) -> str:
+        config = self._config(psm, tessdata_dir)
+        if lista_blanca:
+            config += f' -c tessedit_char_whitelist={lista_blanca}'
+        resultado = pytesseract.image_to_string(_a_pil(imagen), lang=lang, config=config, timeout=timeout)
+        return resultado.rstrip('\f')
+
+
+class MotorTesserocr(MotorOCR):
+
+    nombre = "tesserocr"
+
+    def __init__(self):
+        import tesserocr  # dependencia opcional
+        self._tesserocr = tesserocr
+        self._handles: Dict[Tuple[str, Optional[str]], object] = {}
+        self._lock = threading.Lock()
+
+    def _handle(self, lang: str, tessdata_dir: Optional[str]):
+        tessdata_dir = tessdata_dir or OCR_TESSDATA_DIR
+        clave = (lang, tessdata_dir)
+        api = self._handles.get(clave)
+        if api is None:
+            argumentos = {"lang": lang, "oem": OEM_POR_DEFECTO}
+            if tessdata_dir:
+                argumentos["path"] = tessdata_dir
+            api = self._tesserocr.PyTessBaseAPI(**argumentos)
+            self._handles[clave] = api
+        return api
+
+    def precargar(self, lang: str = 'spa'):
+        with self._lock:
+            self._handle(lang, None)
+
+    def _reconocer(self, api, imagen, psm: int, timeout: int):
+        api.SetPageSegMode(psm)
+        api.SetImage(_a_pil(imagen))
+        if OCR_DPI:
+            api.SetSourceResolution(int(OCR_DPI))
+        if not api.Recognize(timeout * 1000 if timeout else 0):
+            api.Clear()
+            # Mismo error que pytesseract cuando vence el timeout
+            raise RuntimeError('Tesseract process timeout')
+
+    def texto(self, imagen, psm: int, lang: str = 'spa', timeout: int = 0,
+              tessdata_dir: Optional[str] = None) -> str:
+        with self._lock:
+            api = self._handle(lang, tessdata_dir)
+            self._reconocer(api, imagen, psm, timeout)
+            resultado = api.GetUTF8Text()
+            api.Clear()
+            return resultado
+
+    def reconocer(self, imagen, psm: int, lang: str = 'spa', timeout: int = 0,
+                  tessdata_dir: Optional[str] = None) -> Dict[str, str]:
+        with self._lock:
+            api = self._handle(lang, tessdata_dir)
+            self._reconocer(api, imagen, psm, timeout)
+            resultado = {"texto": api.GetUTF8Text(), "tsv": api.GetTSVText(0)}
+            api.Clear()
+            return resultado
+
+    def texto_celda(self, imagen, lista_blanca: Optional[str], psm: int = PSM_CELDA, lang: str = 'spa',
+                    timeout: int = 0, tessdata_dir: Optional[str] = None) -> str:
+        with self._lock:
+            api = self._handle(lang, tessdata_dir)
+            if lista_blanca:
+                api.SetVariable('tessedit_char_whitelist', lista_blanca)
+            try:
+                self._reconocer(api, imagen, psm, timeout)
+                resultado = api.GetUTF8Text()
+                api.Clear()
+                return resultado
+            finally:
+                # Las variables sobreviven a Clear(): se restaura para las pasadas de página completa
+                if lista_blanca:
+                    api.SetVariable('tessedit_char_whitelist', '')
+
+    def cerrar(self):
+        with self._lock:
+            for api in self._handles.values():
+                api.End()
+            self._handles.clear()
+
+
+_motor: Optional[MotorOCR] = None
+
+
+def crear_motor(nombre: str = OCR_MOTOR) -> MotorOCR:
+    if nombre == "tesserocr":
+        try:
+            return MotorTesserocr()
+        except ImportError:
+            print("⚠️ tesserocr no está instalado, usando pytesseract como respaldo")
+    return MotorPytesseract()
+
+
+def obtener_motor() -> MotorOCR:
+    """Motor del proceso actual (uno por worker del pool, creado una sola vez)."""
+    global _motor
+    if _motor is None:
+        _motor = crear_motor()
+    return _motor
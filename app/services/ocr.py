@@ -1,169 +1,304 @@
 # app/services/ocr.py
+"""
+Parser de campos del texto OCR (formato de tabla guatemalteco).
+
+Las reglas de extracción son datos (REGLAS_OCR) y se compilan una sola vez:
+- `correcciones`: sustituciones previas para caracteres que el OCR confunde
+- `campos`: por cada campo, patrones en orden de prioridad. `etiqueta` es el
+  prefijo del patrón que identifica la línea (EMPRESA, DPI, EDAD...)
+
+La extracción recorre el texto una sola vez con un despachador de etiquetas:
+un único regex encuentra todas las etiquetas y solo en esas posiciones se
+prueban los patrones de ese campo. El resultado es el mismo que buscar cada
+patrón por separado (gana el primer patrón de la lista que aparezca, en su
+primera aparición).
+
+Las reglas se pueden reemplazar sin reiniciar con un JSON de la misma forma
+en OCR_REGLAS_PATH; se recargan cuando cambia la fecha de modificación.
+"""
+
+import hashlib
+import json
+import logging
+import os
 import re
-from num2words import num2words
+import threading
+import time
+from typing import Any, Dict, List, Optional
 
-def limpiar_fecha_gt(fecha_raw):
-    """
-    Limpia fechas mal formateadas por OCR.
-    Formato guatemalteco: dd/mm/aaaa (día/mes/año)
-    """
-    if not fecha_raw:
-        return fecha_raw
-    
-    fecha = str(fecha_raw).strip()
-    
-    # PRIMERO: Corregir caracteres mal leídos por OCR
-    fecha = fecha.replace('h', '1').replace('H', '1')
-    fecha = fecha.replace('o', '0').replace('O', '0')
-    
-    # Si ya tiene formato correcto dd/mm/aaaa, retornar
-    if re.match(r'^\d{1,2}/\d{1,2}/\d{4}$', fecha):
-        return fecha
-    
-    # Si solo tiene números sin separadores (ej: 13102025)
-    if re.match(r'^\d{8}$', fecha):
-        dia = fecha[:2]
-        mes = fecha[2:4]
-        anio = fecha[4:]
-        return f"{dia}/{mes}/{anio}"
-    
-    # Si tiene formato parcial sin / entre día y mes (ej: 1310/2025 o 120/2026)
-    match = re.match(r'^(\d{3,4})/(\d{4})$', fecha)
-    if match:
-        sin_anio = match.group(1)
-        anio = match.group(2)
-        
-        if len(sin_anio) == 4:  # ej: 1310 -> 13/10
-            dia = sin_anio[:2]
-            mes = sin_anio[2:]
-        elif len(sin_anio) == 3:  # ej: 120 -> 12/10
-            dia = sin_anio[:2]
-            mes = sin_anio[2:]
-            # Si mes es 0, probablemente es 10
-            if mes == '0':
-                mes = '10'
-        else:
-            return fecha
-        
-        return f"{dia}/{mes}/{anio}"
-    
-    return fecha
+from app.core.config import OCR_REGLAS_PATH
+from app.utils.formato_legal import limpiar_fecha_ocr, monto_en_letras
 
+logger = logging.getLogger(__name__)
 
-def parse_ocr_text(text: str):
-    """
-    Parser OCR optimizado para formato de tabla guatemalteco.
-    Versión mejorada con correcciones de caracteres OCR comunes.
-    """
-    print("\n" + "="*70)
-    print(" TEXTO EXTRAÍDO POR OCR:")
-    print("="*70)
-    print(text)
-    print("="*70 + "\n")
-    
-    data = {}
-    
-    # PRE-PROCESAMIENTO: Limpiar caracteres confusos comunes de OCR
-    text_cleaned = text
-    
-    # Correcciones para EDAD
-    text_cleaned = re.sub(r'EDAD[\s:]*S7', 'EDAD 57', text_cleaned, flags=re.IGNORECASE)
-    text_cleaned = re.sub(r'EDAD[\s:]*s7', 'EDAD 57', text_cleaned, flags=re.IGNORECASE)
-    text_cleaned = re.sub(r'\bS7\b', '57', text_cleaned)
-    text_cleaned = re.sub(r'\bs7\b', '57', text_cleaned)
-    text_cleaned = re.sub(r'EDAD[\s:]*S(\d)', r'EDAD 5\1', text_cleaned, flags=re.IGNORECASE)
-    
-    # Patrones de búsqueda
-    patterns = [
+# Incrementar cuando cambien las reglas de extracción (invalida caches de OCR)
+PARSER_VERSION = "2"
+
+# Flags de los patrones de campos (las correcciones declaran los suyos)
+FLAGS_CAMPOS = re.IGNORECASE | re.DOTALL | re.MULTILINE
+
+REGLAS_OCR: Dict[str, List[Dict[str, Any]]] = {
+    # PRE-PROCESAMIENTO: Limpiar caracteres confusos comunes de OCR (en orden)
+    "correcciones": [
+        # Correcciones para EDAD
+        {"patron": r'EDAD[\s:]*S7', "reemplazo": 'EDAD 57', "ignorar_mayusculas": True},
+        {"patron": r'EDAD[\s:]*s7', "reemplazo": 'EDAD 57', "ignorar_mayusculas": True},
+        {"patron": r'\bS7\b', "reemplazo": '57'},
+        {"patron": r'\bs7\b', "reemplazo": '57'},
+        {"patron": r'EDAD[\s:]*S(\d)', "reemplazo": r'EDAD 5\1', "ignorar_mayusculas": True},
+    ],
+    # Patrones de búsqueda (el orden dentro de cada campo es la prioridad)
+    "campos": [
         # Empresa
-        ('empresa_contratante', r"EMPRESA[:\s]+([^\n]+)"),
-        
+        {"campo": "empresa_contratante", "etiqueta": r"EMPRESA", "patron": r"EMPRESA[:\s]+([^\n]+)"},
+
         # Colaborador
-        ('nombre_completo', r"COLABORADOR[:\s]+([^\n]+)"),
-        
+        {"campo": "nombre_completo", "etiqueta": r"COLABORADOR", "patron": r"COLABORADOR[:\s]+([^\n]+)"},
+
         # DPI/CUI - captura todo incluyendo espacios
-        ('cui', r"DPI\s*[/]?\s*PASAPORTE[:\s]*([\d\s]+)"),
-        ('cui', r"DPI[:\s]*([\d\s]+)"),
-        
+        {"campo": "cui", "etiqueta": r"DPI", "patron": r"DPI\s*[/]?\s*PASAPORTE[:\s]*([\d\s]+)"},
+        {"campo": "cui", "etiqueta": r"DPI", "patron": r"DPI[:\s]*([\d\s]+)"},
+
         # Dirección
-        ('direccion', r"DIRECCI[OÓ]N[:\s]+([^\n]+)"),
-        
+        {"campo": "direccion", "etiqueta": r"DIRECCI[OÓ]N", "patron": r"DIRECCI[OÓ]N[:\s]+([^\n]+)"},
+
         # Fecha de Inicio - captura formato dd/mm/aaaa o mal formateado
-        ('fecha_inicio', r"FECHA\s+DE\s+INICIO[:\s]*(\d{1,2}/\d{1,2}/\d{4})"),
-        ('fecha_inicio', r"FECHA\s+DE\s+INICIO[:\s]*([\d/hHoO]+)"),
-        
+        {"campo": "fecha_inicio", "etiqueta": r"FECHA\s+DE\s+INICIO",
+         "patron": r"FECHA\s+DE\s+INICIO[:\s]*(\d{1,2}/\d{1,2}/\d{4})"},
+        {"campo": "fecha_inicio", "etiqueta": r"FECHA\s+DE\s+INICIO",
+         "patron": r"FECHA\s+DE\s+INICIO[:\s]*([\d/hHoO]+)"},
+
         # Fecha de Finalización
-        ('fecha_fin', r"FECHA\s+DE\s+FINALIZACI[OÓ]N[:\s]*(\d{1,2}/\d{1,2}/\d{4})"),
-        ('fecha_fin', r"FECHA\s+DE\s+FINALIZACI[OÓ]N[:\s]*([\d/hHoO]+)"),
-        ('fecha_fin', r"FECHA\s+DE\s+FINALIZACI[OÓ]N[:\s]+([^\n]+)"),
-        
+        {"campo": "fecha_fin", "etiqueta": r"FECHA\s+DE\s+FINALIZACI[OÓ]N",
+         "patron": r"FECHA\s+DE\s+FINALIZACI[OÓ]N[:\s]*(\d{1,2}/\d{1,2}/\d{4})"},
+        {"campo": "fecha_fin", "etiqueta": r"FECHA\s+DE\s+FINALIZACI[OÓ]N",
+         "patron": r"FECHA\s+DE\s+FINALIZACI[OÓ]N[:\s]*([\d/hHoO]+)"},
+        {"campo": "fecha_fin", "etiqueta": r"FECHA\s+DE\s+FINALIZACI[OÓ]N",
+         "patron": r"FECHA\s+DE\s+FINALIZACI[OÓ]N[:\s]+([^\n]+)"},
+
         # Honorarios - captura Q al inicio
-        ('monto', r"HONORARIOS\s+POR\s+PA[GC]AR[:\s]*Q?([\d,\.]+)"),
-        
+        {"campo": "monto", "etiqueta": r"HONORARIOS\s+POR\s+PA[GC]AR",
+         "patron": r"HONORARIOS\s+POR\s+PA[GC]AR[:\s]*Q?([\d,\.]+)"},
+
         # Posición
-        ('posicion', r"POSICI[OÓ]N[:\s]+([^\n]+)"),
-        
+        {"campo": "posicion", "etiqueta": r"POSICI[OÓ]N", "patron": r"POSICI[OÓ]N[:\s]+([^\n]+)"},
+
         # Profesión
-        ('profesion', r"PROFESI[OÓ]N[:\s]+([^\n]+)"),
-        
+        {"campo": "profesion", "etiqueta": r"PROFESI[OÓ]N", "patron": r"PROFESI[OÓ]N[:\s]+([^\n]+)"},
+
         # Estado Civil
-        ('estado_civil', r"ESTADO\s+CIVIL[:\s]+([^\n]+)"),
-        
+        {"campo": "estado_civil", "etiqueta": r"ESTADO\s+CIVIL", "patron": r"ESTADO\s+CIVIL[:\s]+([^\n]+)"},
+
         # Edad
-        ('edad', r"EDAD[:\s]*(\d{1,3})\s*a[ñn]os"),
-        ('edad', r"EDAD[:\s]*(\d{1,3})"),
-        ('edad', r"(\d{1,3})\s*a[ñn]os"),
-    ]
-    
-    # Extraer datos usando los patrones
-    for key, pattern in patterns:
-        if key not in data:
-            match = re.search(pattern, text_cleaned, re.IGNORECASE | re.DOTALL | re.MULTILINE)
-            if match:
-                try:
-                    value = match.group(1).strip()
-                    if value:
-                        data[key] = value
-                        print(f"✓ {key}: {value}")
-                except (ValueError, IndexError) as e:
-                    print(f" Error procesando {key}: {e}")
-    
+        {"campo": "edad", "etiqueta": r"EDAD", "patron": r"EDAD[:\s]*(\d{1,3})\s*a[ñn]os"},
+        {"campo": "edad", "etiqueta": r"EDAD", "patron": r"EDAD[:\s]*(\d{1,3})"},
+        {"campo": "edad", "etiqueta": r"\d{1,3}\s*a[ñn]os", "patron": r"(\d{1,3})\s*a[ñn]os"},
+    ],
+}
+
+# Limpieza post-extracción (las fechas se limpian en formato_legal)
+_RE_NOMBRE_L_BARRA_INICIO = re.compile(r'^L/')
+_RE_NOMBRE_L_BARRA = re.compile(r'\bL/')
+_RE_NOMBRE_CERO = re.compile(r'\b0\b')
+
+
+def _caracter_inicial(etiqueta: str) -> Optional[str]:
+    """
+    Clase de caracteres con la que empieza una etiqueta (para el prefiltro),
+    o None si no se puede determinar de forma simple.
+    """
+    if etiqueta.startswith(r'\d'):
+        return r'\d'
+    if etiqueta[:1].isalnum():
+        return re.escape(etiqueta[0])
+    return None
+
+
+class ReglasCompiladas:
+    """
+    Reglas listas para usar: correcciones compiladas, patrones por campo y
+    un único regex despachador con un grupo con nombre por etiqueta.
+    """
+
+    def __init__(self, reglas: Dict[str, List[Dict[str, Any]]]):
+        self.huella = hashlib.sha256(
+            json.dumps(reglas, sort_keys=True, ensure_ascii=False).encode()
+        ).hexdigest()[:12]
+
+        self.correcciones = [
+            (
+                re.compile(c["patron"], re.IGNORECASE if c.get("ignorar_mayusculas") else 0),
+                c["reemplazo"],
+            )
+            for c in reglas["correcciones"]
+        ]
+
+        # Campos en orden de primera aparición; reglas de cada campo en orden de prioridad
+        self.campos: List[str] = []
+        etiquetas: List[str] = []
+        # reglas_por_etiqueta[i] = [(campo, prioridad, patrón compilado), ...]
+        self.reglas_por_etiqueta: List[list] = []
+        prioridades: Dict[str, int] = {}
+        for regla in reglas["campos"]:
+            campo = regla["campo"]
+            if campo not in prioridades:
+                self.campos.append(campo)
+                prioridades[campo] = 0
+            if regla["etiqueta"] not in etiquetas:
+                etiquetas.append(regla["etiqueta"])
+                self.reglas_por_etiqueta.append([])
+            self.reglas_por_etiqueta[etiquetas.index(regla["etiqueta"])].append(
+                (campo, prioridades[campo], re.compile(regla["patron"], FLAGS_CAMPOS))
+            )
+            prioridades[campo] += 1
+        self.cantidad_reglas = prioridades
+
+        # Las etiquetas no deben poder coincidir en la misma posición; los
+        # patrones que comparten prefijo usan la misma etiqueta (ej. DPI)
+        alternativas = "|".join(f"(?P<e{i}>{etiqueta})" for i, etiqueta in enumerate(etiquetas))
+        # Prefiltro por primer carácter: el motor descarta rápido las posiciones
+        # que no pueden iniciar ninguna etiqueta
+        iniciales = [_caracter_inicial(etiqueta) for etiqueta in etiquetas]
+        if all(iniciales):
+            alternativas = f"(?=[{''.join(sorted(set(iniciales)))}])(?:{alternativas})"
+        self.despachador = re.compile(alternativas, re.IGNORECASE)
+
+    def extraer(self, texto: str) -> Dict[str, str]:
+        """
+        Una sola pasada: en cada etiqueta encontrada se prueban, anclados en
+        esa posición, los patrones de esa etiqueta que aún no coincidieron.
+        Equivale a re.search por patrón: por campo gana el primer patrón (en
+        orden de prioridad) cuya primera coincidencia tiene un valor no vacío.
+        """
+        primeras: Dict[tuple, str] = {}  # (campo, prioridad) -> valor de su primera coincidencia
+        resueltos = set()  # campos cuya regla de mayor prioridad ya coincidió con valor
+        for etiqueta in self.despachador.finditer(texto):
+            posicion = etiqueta.start()
+            for campo, prioridad, patron in self.reglas_por_etiqueta[int(etiqueta.lastgroup[1:])]:
+                if campo in resueltos or (campo, prioridad) in primeras:
+                    continue
+                coincidencia = patron.match(texto, posicion)
+                if coincidencia is None:
+                    continue
+                valor = coincidencia.group(1).strip()
+                primeras[(campo, prioridad)] = valor
+                if prioridad == 0 and valor:
+                    resueltos.add(campo)
+            if len(resueltos) == len(self.campos):
+                break
+
+        data = {}
+        for campo in self.campos:
+            for prioridad in range(self.cantidad_reglas[campo]):
+                valor = primeras.get((campo, prioridad))
+                if valor:
+                    data[campo] = valor
+                    break
+        return data
+
+
+_reglas = ReglasCompiladas(REGLAS_OCR)
+_reglas_mtime: Optional[float] = None
+_ultima_revision = 0.0
+_lock_reglas = threading.Lock()
+INTERVALO_REVISION_REGLAS = 2.0  # segundos entre revisiones del archivo de reglas
+
+
+def obtener_reglas() -> ReglasCompiladas:
+    """
+    Reglas vigentes. Si OCR_REGLAS_PATH está configurado, recompila cuando el
+    archivo cambia (revisando su fecha como máximo cada pocos segundos).
+    Un JSON inválido se ignora y se mantienen las reglas anteriores.
+    """
+    global _reglas, _reglas_mtime, _ultima_revision
+    if not OCR_REGLAS_PATH:
+        return _reglas
+
+    ahora = time.monotonic()
+    if ahora - _ultima_revision < INTERVALO_REVISION_REGLAS:
+        return _reglas
+
+    with _lock_reglas:
+        _ultima_revision = ahora
+        try:
+            mtime = os.path.getmtime(OCR_REGLAS_PATH)
+        except OSError:
+            return _reglas
+        if mtime != _reglas_mtime:
+            try:
+                with open(OCR_REGLAS_PATH, 'r', encoding='utf-8') as f:
+                    _reglas = ReglasCompiladas(json.load(f))
+                logger.info("Reglas de OCR recargadas desde %s (%s)", OCR_REGLAS_PATH, _reglas.huella)
+            except (OSError, ValueError, KeyError, re.error) as e:
+                logger.error("Reglas de OCR inválidas en %s, se mantienen las anteriores: %s", OCR_REGLAS_PATH, e)
+            _reglas_mtime = mtime
+    return _reglas
+
+
+def huella_reglas() -> str:
+    """Identifica las reglas vigentes (forma parte de la clave de la cache de OCR)."""
+    return obtener_reglas().huella
+
+
+def extraer_campos(text: str) -> Dict[str, str]:
+    """Valores crudos por campo ({campo: texto}) encontrados en el texto OCR."""
+    reglas = obtener_reglas()
+
+    # PRE-PROCESAMIENTO: Limpiar caracteres confusos comunes de OCR
+    text_cleaned = text
+    for patron, reemplazo in reglas.correcciones:
+        text_cleaned = patron.sub(reemplazo, text_cleaned)
+
+    # Extraer datos en una sola pasada
+    return reglas.extraer(text_cleaned)
+
+
+def parse_ocr_text(text: str):
+    """
+    Parser OCR optimizado para formato de tabla guatemalteco.
+    Versión mejorada con correcciones de caracteres OCR comunes.
+    """
+    logger.debug("Texto extraído por OCR:\n%s", text)
+    return estructurar_campos(extraer_campos(text))
+
+
+def estructurar_campos(data: Dict[str, str]):
+    """
+    Limpieza post-extracción y respuesta estructurada a partir de los valores
+    crudos por campo (de extraer_campos o de la extracción por layout).
+    """
+    data = dict(data)
+
     # ===== LIMPIEZA DE DATOS POST-EXTRACCIÓN =====
-    
+
     # Limpiar CUI (quitar espacios)
     if data.get('cui'):
         data['cui'] = data['cui'].replace(' ', '').strip()
-        print(f"✓ cui (limpiado): {data['cui']}")
-    
+
     # Limpiar fechas con formato guatemalteco
     if data.get('fecha_inicio'):
-        data['fecha_inicio'] = limpiar_fecha_gt(data['fecha_inicio'])
-        print(f"✓ fecha_inicio (limpiada): {data['fecha_inicio']}")
-    
+        data['fecha_inicio'] = limpiar_fecha_ocr(data['fecha_inicio'])
+
     if data.get('fecha_fin'):
         fecha_fin = data['fecha_fin']
         # Verificar si es texto como "indefinido" o fecha
         if not any(palabra in fecha_fin.lower() for palabra in ['indefinido', 'tiempo']):
-            data['fecha_fin'] = limpiar_fecha_gt(fecha_fin)
-        print(f"✓ fecha_fin (limpiada): {data['fecha_fin']}")
-    
+            data['fecha_fin'] = limpiar_fecha_ocr(fecha_fin)
+
     # Limpiar nombre (correcciones OCR comunes)
     if data.get('nombre_completo'):
         nombre = data['nombre_completo']
-        nombre = re.sub(r'^L/', 'J', nombre)
-        nombre = re.sub(r'\bL/', 'J', nombre)
+        nombre = _RE_NOMBRE_L_BARRA_INICIO.sub('J', nombre)
+        nombre = _RE_NOMBRE_L_BARRA.sub('J', nombre)
         nombre = nombre.replace('0s', 'OS')
         nombre = nombre.replace('CRLOS', 'CARLOS')
-        nombre = re.sub(r'\b0\b', 'O', nombre)
+        nombre = _RE_NOMBRE_CERO.sub('O', nombre)
         data['nombre_completo'] = nombre.strip()
-        print(f"✓ nombre_completo (limpiado): {data['nombre_completo']}")
-    
+
     # Limpiar monto
     if data.get('monto'):
-        monto = data['monto'].replace(',', '')
-        data['monto'] = monto
-        print(f"✓ monto (limpiado): {monto}")
-    
+        data['monto'] = data['monto'].replace(',', '')
+
     # Limpiar el campo posición
     if data.get('posicion'):
         posicion = data['posicion']
@@ -172,37 +307,35 @@ def parse_ocr_text(text: str):
                 posicion = posicion.split(keyword)[0].strip()
                 break
         data['posicion'] = posicion
-        print(f"✓ posicion (limpiada): {posicion}")
-    
+
     # Validar edad
     if data.get('edad'):
         try:
             edad_num = int(data['edad'])
             if edad_num < 18 or edad_num > 99:
                 data['edad'] = ""
-        except:
+        except ValueError:
             data['edad'] = ""
-    
+
     # Procesar el monto
     monto_numero = 0.0
-    monto_en_letras = "CERO QUETZALES EXACTOS"
+    monto_letras = "CERO QUETZALES EXACTOS"
     monto_formateado = "Q.0.00"
-    
+
     if data.get("monto"):
         try:
             monto_numero = float(data["monto"])
             monto_formateado = f"Q.{monto_numero:,.2f}"
             parte_entera = int(monto_numero)
-            monto_en_letras = num2words(parte_entera, lang='es').upper() + " QUETZALES EXACTOS"
-            print(f"✓ monto procesado: {monto_formateado} ({monto_en_letras})")
+            monto_letras = monto_en_letras(parte_entera)
         except (ValueError, TypeError) as e:
-            print(f"⚠ Error al procesar monto: {e}")
-    
+            logger.warning("Error al procesar monto %r: %s", data["monto"], e)
+
     # Procesar fecha de fin
     fecha_fin_texto = data.get("fecha_fin")
     if not fecha_fin_texto or "indefinido" in str(fecha_fin_texto).lower():
         fecha_fin_texto = "Contrato Indefinido"
-    
+
     # Construir la respuesta estructurada
     structured_data = {
         "empresa_contratante": data.get("empresa_contratante", ""),
@@ -221,16 +354,11 @@ def parse_ocr_text(text: str):
             "fecha_inicio": data.get("fecha_inicio", ""),
             "fecha_fin": fecha_fin_texto,
             "monto": monto_formateado,
-            "monto_en_letras": monto_en_letras,
+            "monto_en_letras": monto_letras,
             "descripcion_adicional": f"Posición: {data.get('posicion', 'N/A')}"
         }
     }
-    
-    print("\n" + "="*70)
-    print(" RESULTADO PROCESADO:")
-    print("="*70)
-    import json
-    print(json.dumps(structured_data, indent=2, ensure_ascii=False))
-    print("="*70 + "\n")
-    
-    return structured_data
\ No newline at end of file
+
+    logger.debug("Campos extraídos: %s", data)
+
+    return structured_data
@@ -9,7 +9,7 @@ Requiere: pip install msal requests
 import os
 import hashlib
 import requests
-from typing import Optional, Dict
+from typing import Optional, Dict, Union
 from msal import ConfidentialClientApplication
 
 class OneDriveService:
@@ -88,7 +88,7 @@ class OneDriveService:
         self, 
         file_path: str, 
         onedrive_path: str,
-        file_content: Optional[bytes] = None
+        file_content: Optional[Union[bytes, memoryview]] = None
     ) -> Dict:
         """
         Sube un archivo a OneDrive del usuario especificado
@@ -96,7 +96,8 @@ class OneDriveService:
         Args:
             file_path: Ruta local del archivo O nombre del archivo
             onedrive_path: Ruta en OneDrive (ej: /Documentos_Legales/Contratos/contrato.docx)
-            file_content: Contenido del archivo en bytes (opcional si ya existe en file_path)
+            file_content: Contenido del archivo en bytes o memoryview, p. ej. la vista de un
+                documento generado en memoria (opcional si ya existe en file_path)
         
         Returns:
             Dict con información del archivo subido (id, webUrl, etc)
@@ -239,6 +240,70 @@ class OneDriveService:
         else:
             raise Exception(f"Error creando carpeta: {response.status_code} - {response.text}")
     
+    def asegurar_carpeta(self, parent_path: str, folder_name: str) -> Dict:
+        """
+        Devuelve la carpeta parent_path/folder_name, creándola si no existe
+        (crear_carpeta renombra en caso de conflicto, así que no sirve para esto)
+        """
+        import urllib.parse
+
+        encoded_path = urllib.parse.quote(f"{parent_path.rstrip('/')}/{folder_name}")
+        url = f"{self.graph_url}/users/{self.user_id}/drive/root:{encoded_path}"
+
+        response = requests.get(url, headers=self._headers())
+
+        if response.status_code == 200:
+            return response.json()
+        elif response.status_code == 404:
+            return self.crear_carpeta(parent_path, folder_name)
+        else:
+            raise Exception(f"Error obteniendo carpeta: {response.status_code} - {response.text}")
+
+    def listar_carpeta(self, onedrive_path: str) -> list:
+        """
+        Lista los archivos (no subcarpetas) de una carpeta, siguiendo la paginación de Graph
+
+        Args:
+            onedrive_path: Ruta en OneDrive (ej: /Documentos_Legales/Imagenes_Originales/Entrada)
+
+        Returns:
+            Lista de items con id, name, size, lastModifiedDateTime
+        """
+        import urllib.parse
+
+        encoded_path = urllib.parse.quote(onedrive_path)
+        url = (
+            f"{self.graph_url}/users/{self.user_id}/drive/root:{encoded_path}:/children"
+            "?$select=id,name,size,lastModifiedDateTime,file&$top=200"
+        )
+
+        archivos = []
+        while url:
+            response = requests.get(url, headers=self._headers())
+            if response.status_code != 200:
+                raise Exception(f"Error listando carpeta: {response.status_code} - {response.text}")
+            pagina = response.json()
+            archivos.extend(item for item in pagina.get("value", []) if "file" in item)
+            url = pagina.get("@odata.nextLink")
+
+        return archivos
+
+    def mover_archivo(self, file_id: str, carpeta_destino_id: str) -> Dict:
+        """Mueve un archivo a otra carpeta (renombra si ya existe uno con el mismo nombre)"""
+        url = (
+            f"{self.graph_url}/users/{self.user_id}/drive/items/{file_id}"
+            "?@microsoft.graph.conflictBehavior=rename"
+        )
+
+        body = {"parentReference": {"id": carpeta_destino_id}}
+
+        response = requests.patch(url, headers=self._headers(), json=body)
+
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise Exception(f"Error moviendo archivo: {response.status_code} - {response.text}")
+
     def obtener_link_compartido(self, file_id: str, tipo: str = "view") -> str:
         """
         Crea un link compartido para un archivo
@@ -0,0 +1,191 @@
+# app/services/origenes_ingesta.py
+"""
+Orígenes de la ingesta automática (ver app/ingesta.py) y registro de lo ya
+ingestado.
+
+Un origen lista los archivos candidatos de una carpeta, los lee y al
+terminar los mueve a una subcarpeta por estado:
+
+- procesados/  el flujo completo terminó y el documento quedó en BD
+- errores/     el flujo falló (en local se deja al lado un .error.txt)
+- duplicados/  el mismo contenido (SHA-256) ya se había procesado
+
+Orígenes: carpeta local u OneDrive (INGESTA_ONEDRIVE_CARPETA), ambos por
+sondeo. Un archivo se considera completo cuando su tamaño y su fecha de
+modificación no cambian durante INGESTA_ESPERA_SEGUNDOS (ver Antirrebote),
+para no tomar copias a medio escribir.
+"""
+
+import datetime
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import INGESTA_REGISTRO_PATH
+from app.services.lote_ocr import EXTENSIONES_IMAGEN
+
+ESTADO_PROCESADO = "procesados"
+ESTADO_ERROR = "errores"
+ESTADO_DUPLICADO = "duplicados"
+CARPETAS_ESTADO = (ESTADO_PROCESADO, ESTADO_ERROR, ESTADO_DUPLICADO)
+
+
+@dataclass
+class Candidato:
+    """Un archivo del origen: clave estable, nombre y firma (tamaño, modificación)."""
+    clave: str
+    nombre: str
+    tamano: int
+    modificado: str
+    item: Optional[Dict[str, Any]] = None  # item de Graph (solo OneDrive)
+
+
+def _es_escaneo(nombre: str) -> bool:
+    return not nombre.startswith('.') and nombre.lower().endswith(EXTENSIONES_IMAGEN)
+
+
+class OrigenLocal:
+
+    def __init__(self, carpeta: str):
+        self.carpeta = carpeta
+
+    def descripcion(self) -> str:
+        return f"carpeta local {os.path.abspath(self.carpeta)}"
+
+    def preparar(self):
+        for estado in CARPETAS_ESTADO:
+            os.makedirs(os.path.join(self.carpeta, estado), exist_ok=True)
+
+    def listar(self) -> List[Candidato]:
+        candidatos = []
+        with os.scandir(self.carpeta) as entradas:
+            for entrada in entradas:
+                if not entrada.is_file() or not _es_escaneo(entrada.name):
+                    continue
+                info = entrada.stat()
+                candidatos.append(Candidato(entrada.name, entrada.name, info.st_size, str(info.st_mtime_ns)))
+        return candidatos
+
+    def leer(self, candidato: Candidato) -> bytes:
+        with open(os.path.join(self.carpeta, candidato.nombre), 'rb') as f:
+            return f.read()
+
+    def imagen_onedrive(self, candidato: Candidato) -> Optional[Dict[str, Any]]:
+        """Las imágenes locales las sube el flujo."""
+        return None
+
+    def mover(self, candidato: Candidato, estado: str, detalle: Optional[str] = None):
+        destino_dir = os.path.join(self.carpeta, estado)
+        destino = os.path.join(destino_dir, candidato.nombre)
+        if os.path.exists(destino):
+            base, extension = os.path.splitext(candidato.nombre)
+            destino = os.path.join(destino_dir, f"{base}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}")
+        shutil.move(os.path.join(self.carpeta, candidato.nombre), destino)
+        if detalle:
+            with open(destino + ".error.txt", 'w', encoding='utf-8') as f:
+                f.write(detalle)
+
+
+class OrigenOneDrive:
+
+    def __init__(self, onedrive_service, carpeta: str):
+        self.onedrive_service = onedrive_service
+        self.carpeta = carpeta.rstrip('/')
+        self._carpetas_estado: Dict[str, str] = {}
+
+    def descripcion(self) -> str:
+        return f"OneDrive {self.carpeta}"
+
+    def preparar(self):
+        padre, nombre = self.carpeta.rsplit('/', 1)
+        self.onedrive_service.asegurar_carpeta(padre or "/", nombre)
+        for estado in CARPETAS_ESTADO:
+            self._carpetas_estado[estado] = self.onedrive_service.asegurar_carpeta(self.carpeta, estado)["id"]
+
+    def listar(self) -> List[Candidato]:
+        return [
+            Candidato(item["id"], item["name"], item.get("size", 0), item.get("lastModifiedDateTime", ""), item)
+            for item in self.onedrive_service.listar_carpeta(self.carpeta)
+            if _es_escaneo(item["name"])
+        ]
+
+    def leer(self, candidato: Candidato) -> bytes:
+        return self.onedrive_service.descargar_archivo(candidato.clave)
+
+    def imagen_onedrive(self, candidato: Candidato) -> Optional[Dict[str, Any]]:
+        """La imagen ya está en OneDrive: el flujo no la vuelve a subir (mover conserva el id)."""
+        return candidato.item
+
+    def mover(self, candidato: Candidato, estado: str, detalle: Optional[str] = None):
+        self.onedrive_service.mover_archivo(candidato.clave, self._carpetas_estado[estado])
+
+
+class Antirrebote:
+    """
+    Devuelve los candidatos cuya firma (tamaño, modificación) lleva al menos
+    `espera` segundos sin cambiar entre sondeos.
+    """
+
+    def __init__(self, espera: float):
+        self.espera = espera
+        self._vistos: Dict[str, Tuple[int, str, float]] = {}
+
+    def listos(self, candidatos: List[Candidato]) -> List[Candidato]:
+        ahora = time.monotonic()
+        vistos = {}
+        listos = []
+        for candidato in candidatos:
+            anterior = self._vistos.get(candidato.clave)
+            if anterior is not None and anterior[:2] == (candidato.tamano, candidato.modificado):
+                desde = anterior[2]
+            else:
+                desde = ahora
+            vistos[candidato.clave] = (candidato.tamano, candidato.modificado, desde)
+            if ahora - desde >= self.espera:
+                listos.append(candidato)
+        # Lo que ya no está en el origen (movido o borrado) se olvida
+        self._vistos = vistos
+        return listos
+
+
+class RegistroIngesta:
+    """
+    Hashes ya ingestados (SQLite), para no procesar dos veces el mismo
+    escaneo aunque llegue con otro nombre.
+    """
+
+    def __init__(self, ruta_db: str = INGESTA_REGISTRO_PATH):
+        self.ruta_db = ruta_db
+        self._local = threading.local()
+
+    def _conexion(self) -> sqlite3.Connection:
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.ruta_db)), exist_ok=True)
+            conexion = sqlite3.connect(self.ruta_db, timeout=30, isolation_level=None)
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS ingestados ("
+                "hash TEXT PRIMARY KEY, nombre TEXT NOT NULL, estado TEXT NOT NULL, "
+                "documento_id INTEGER, error TEXT, actualizado_en REAL NOT NULL)"
+            )
+            self._local.conexion = conexion
+        return conexion
+
+    def procesado(self, hash_sha256: str) -> Optional[int]:
+        """documento_id si el contenido ya se procesó con éxito (0 si sin id), None si no."""
+        fila = self._conexion().execute(
+            "SELECT documento_id FROM ingestados WHERE hash = ? AND estado = ?", (hash_sha256, ESTADO_PROCESADO)
+        ).fetchone()
+        return None if fila is None else (fila[0] or 0)
+
+    def registrar(self, hash_sha256: str, nombre: str, estado: str,
+                  documento_id: Optional[int] = None, error: Optional[str] = None):
+        self._conexion().execute(
+            "INSERT OR REPLACE INTO ingestados (hash, nombre, estado, documento_id, error, actualizado_en) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (hash_sha256, nombre, estado, documento_id, error, time.time())
+        )
@@ -0,0 +1,206 @@
+# app/services/paginas_ocr.py
+"""
+Documentos de varias páginas (PDF y TIFF) para el OCR.
+
+- El formato se detecta por la firma de los bytes, no por la extensión
+- Capa de texto: si una página de PDF ya trae texto embebido, se lee
+  directamente y no pasa por Tesseract
+- Rasterización perezosa: cada página se decodifica recién cuando le toca,
+  en escala de grises y a la resolución que necesita el OCR (escala DCT en
+  JPEG, escala de render en PDF), para no tener el documento completo en memoria
+- Presupuesto de memoria: antes de decodificar se estima el consumo de la
+  página a partir del encabezado y se reserva en presupuesto_decodificacion;
+  las imágenes que exceden OCR_MAX_MEGAPIXELES_ARCHIVO se rechazan con 413
+
+pypdfium2 es opcional: sin él, los PDF se rechazan con 415 y las imágenes y
+TIFF siguen funcionando.
+"""
+
+import io
+import math
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+from fastapi import HTTPException
+from PIL import Image
+
+from app.core.config import (
+    OCR_PDF_DPI,
+    OCR_MAX_PAGINAS,
+    OCR_PDF_MIN_CARACTERES,
+    OCR_MAX_MEGAPIXELES,
+    OCR_MAX_MEGAPIXELES_ARCHIVO,
+    OCR_MEMORIA_DECODIFICACION_MB,
+)
+from app.services.preprocesamiento import decodificar_gris, gris_reducido, factor_reduccion
+from app.utils.presupuesto_memoria import PresupuestoMemoria
+
+FORMATO_PDF = "pdf"
+FORMATO_TIFF = "tiff"
+FORMATO_IMAGEN = "imagen"
+
+_FIRMAS_TIFF = (b'II*\x00', b'MM\x00*')
+
+# Buffers del tamaño de la página en gris vivos a la vez durante el preprocesamiento
+_COPIAS_PREPROCESAMIENTO = 3
+
+# PDFium no es seguro entre hilos: todas las llamadas se serializan
+_lock_pdfium = threading.Lock()
+
+# Memoria de decodificación + preprocesamiento compartida por todas las solicitudes del proceso
+presupuesto_decodificacion = PresupuestoMemoria(OCR_MEMORIA_DECODIFICACION_MB * 1024 * 1024)
+
+
+def detectar_formato(contenido: bytes) -> str:
+    if contenido[:1024].lstrip().startswith(b'%PDF-'):
+        return FORMATO_PDF
+    if contenido[:4] in _FIRMAS_TIFF:
+        return FORMATO_TIFF
+    return FORMATO_IMAGEN
+
+
+def _pdfium():
+    try:
+        import pypdfium2  # dependencia opcional
+    except ImportError:
+        raise HTTPException(
+            status_code=415,
+            detail="El soporte de PDF no está disponible en el servidor (falta pypdfium2)"
+        )
+    return pypdfium2
+
+
+def _abrir_pdf(contenido: bytes):
+    pdfium = _pdfium()
+    try:
+        return pdfium.PdfDocument(contenido)
+    except pdfium.PdfiumError as e:
+        raise HTTPException(status_code=400, detail=f"PDF inválido o protegido: {e}")
+
+
+def contar_paginas(contenido: bytes, formato: str) -> int:
+    """Cantidad de páginas; rechaza con 413 los documentos de más de OCR_MAX_PAGINAS."""
+    if formato == FORMATO_PDF:
+        with _lock_pdfium:
+            documento = _abrir_pdf(contenido)
+            try:
+                paginas = len(documento)
+            finally:
+                documento.close()
+    elif formato == FORMATO_TIFF:
+        with Image.open(io.BytesIO(contenido)) as imagen:
+            paginas = getattr(imagen, "n_frames", 1)
+    else:
+        paginas = 1
+
+    if paginas > OCR_MAX_PAGINAS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El documento tiene {paginas} páginas; el máximo es {OCR_MAX_PAGINAS}"
+        )
+    return paginas
+
+
+def _verificar_pixeles(ancho: int, alto: int):
+    """Guarda contra bombas de descompresión: se decide solo con el encabezado."""
+    if ancho * alto > OCR_MAX_MEGAPIXELES_ARCHIVO * 1_000_000:
+        raise HTTPException(
+            status_code=413,
+            detail=f"La imagen de {ancho}x{alto} píxeles supera el máximo de "
+                   f"{OCR_MAX_MEGAPIXELES_ARCHIVO:g} megapíxeles"
+        )
+
+
+def _escala_pdf(ancho_pt: float, alto_pt: float) -> float:
+    """Escala de render: OCR_PDF_DPI, sin pasar de OCR_MAX_MEGAPIXELES (páginas enormes)."""
+    escala = OCR_PDF_DPI / 72
+    maximo = OCR_MAX_MEGAPIXELES * 1_000_000
+    if ancho_pt * alto_pt * escala * escala > maximo:
+        escala = math.sqrt(maximo / (ancho_pt * alto_pt))
+    return escala
+
+
+def estimar_bytes_pagina(contenido: bytes, formato: str, indice: int) -> int:
+    """
+    Memoria pico estimada para decodificar y preprocesar la página, a partir
+    del encabezado (sin decodificar). Rechaza con 413 las bombas de descompresión.
+    """
+    if formato == FORMATO_PDF:
+        with _lock_pdfium:
+            documento = _abrir_pdf(contenido)
+            try:
+                pagina = documento[indice]
+                ancho_pt, alto_pt = pagina.get_size()
+                pagina.close()
+            finally:
+                documento.close()
+        escala = _escala_pdf(ancho_pt, alto_pt)
+        # Render directo en escala de grises: 1 byte por píxel
+        return int(ancho_pt * escala * alto_pt * escala * (1 + _COPIAS_PREPROCESAMIENTO))
+
+    with Image.open(io.BytesIO(contenido)) as imagen:
+        if formato == FORMATO_TIFF:
+            imagen.seek(indice)
+        ancho, alto = imagen.size
+        _verificar_pixeles(ancho, alto)
+        factor = factor_reduccion(ancho, alto)
+        pixeles_gris = (ancho // factor) * (alto // factor)
+        if imagen.format == 'JPEG':
+            # Luminancia ya reducida por el decodificador
+            decodificados = pixeles_gris
+        else:
+            # Los demás formatos se decodifican completos (todas las bandas) antes de reducir
+            decodificados = ancho * alto * len(imagen.getbands())
+    return decodificados + pixeles_gris * _COPIAS_PREPROCESAMIENTO
+
+
+def texto_embebido(contenido: bytes, formato: str, indice: int) -> str:
+    """
+    Texto de la capa de texto de la página (solo PDF). Cadena vacía si no
+    tiene o si es muy poco para ser el contenido real (página escaneada con
+    apenas un encabezado o un sello de texto).
+    """
+    if formato != FORMATO_PDF:
+        return ""
+    with _lock_pdfium:
+        documento = _abrir_pdf(contenido)
+        try:
+            pagina = documento[indice]
+            pagina_texto = pagina.get_textpage()
+            texto = pagina_texto.get_text_bounded()
+            pagina_texto.close()
+            pagina.close()
+        finally:
+            documento.close()
+    texto = texto.replace('\r\n', '\n').replace('\r', '\n')
+    if sum(not c.isspace() for c in texto) < OCR_PDF_MIN_CARACTERES:
+        return ""
+    return texto
+
+
+def rasterizar_pagina(contenido: bytes, formato: str, indice: int, metadatos: Optional[Dict] = None) -> np.ndarray:
+    """
+    Página `indice` como array uint8 en escala de grises (PDF a OCR_PDF_DPI,
+    imágenes y TIFF reducidos según factor_reduccion).
+    """
+    if formato == FORMATO_PDF:
+        with _lock_pdfium:
+            documento = _abrir_pdf(contenido)
+            try:
+                pagina = documento[indice]
+                mapa = pagina.render(scale=_escala_pdf(*pagina.get_size()), grayscale=True)
+                imagen = mapa.to_pil()
+                gris = np.array(imagen if imagen.mode == 'L' else imagen.convert('L'), dtype=np.uint8)
+                mapa.close()
+                pagina.close()
+            finally:
+                documento.close()
+        return gris
+
+    if formato == FORMATO_TIFF:
+        with Image.open(io.BytesIO(contenido)) as imagen:
+            imagen.seek(indice)
+            return gris_reducido(imagen, metadatos)
+
+    return decodificar_gris(contenido, metadatos)
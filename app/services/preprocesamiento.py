@@ -0,0 +1,407 @@
+# app/services/preprocesamiento.py
+"""
+Preprocesamiento de imágenes para OCR, compartido por todos los endpoints.
+
+Reemplaza la cadena de PIL (convert L → Contrast → Brightness → Sharpness →
+SHARPEN) que estaba copiada en cada endpoint. Todo el pipeline trabaja sobre
+un único buffer uint8 en escala de grises:
+
+1. Decodificación + conversión a escala de grises (única imagen completa).
+   Los JPEG se decodifican directo a luminancia y, si sobra resolución, con
+   la escala DCT del decodificador (1/2, 1/4, 1/8)
+   Detección de la región del formulario (papel → contenido) por perfiles de
+   proyección sobre una muestra reducida, recorte y escalado a un rango de
+   DPI objetivo con tope de megapíxeles
+2. Contraste, brillo y umbral de binarización compuestos en una sola tabla
+   de 256 valores (LUT) que se aplica in-place, por franjas
+3. Binarización Otsu (global) o Sauvola (por bloques, para fotos con luz irregular)
+4. Enderezado (deskew) estimado por perfil de proyección sobre una muestra reducida
+
+El resultado es un np.ndarray que se pasa directamente a Tesseract.
+"""
+
+import io
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.core.config import (
+    OCR_DPI,
+    OCR_DPI_MINIMO,
+    OCR_DPI_MAXIMO,
+    OCR_MAX_MEGAPIXELES,
+    OCR_ANCHO_CONTENIDO_PULGADAS,
+    OCR_MAX_MEGAPIXELES_ARCHIVO,
+)
+
+# Respaldo contra bombas de descompresión (PIL avisa por encima y falla al doble);
+# paginas_ocr rechaza antes con 413 a partir del encabezado
+Image.MAX_IMAGE_PIXELS = int(OCR_MAX_MEGAPIXELES_ARCHIVO * 1_000_000)
+
+# Incrementar cuando cambie cualquier paso del pipeline (invalida caches de OCR)
+PREPROCESAMIENTO_VERSION = "3"
+
+# Parámetros por punto de entrada. "v1" y "v2" conservan los factores que
+# usaba cada endpoint con la cadena de PIL.
+PERFILES_PREPROCESAMIENTO: Dict[str, Dict] = {
+    "v1": {"contraste": 2.0, "brillo": 1.0, "binarizacion": "otsu", "enderezar": False, "recortar": False},
+    "v2": {"contraste": 2.5, "brillo": 1.2, "binarizacion": "otsu", "enderezar": True, "recortar": True},
+    "foto": {"contraste": 2.0, "brillo": 1.1, "binarizacion": "sauvola", "enderezar": True, "recortar": True},
+}
+
+# Parámetros de Sauvola
+_SAUVOLA_BLOQUE = 32
+_SAUVOLA_K = 0.2
+_SAUVOLA_R = 128.0
+
+# Búsqueda de ángulo para el enderezado (grados)
+_ANGULO_MAXIMO = 5.0
+_ANGULO_PASO = 0.25
+_MUESTRA_ENDEREZADO = 1000  # lado mayor de la muestra reducida
+
+# Detección de la región del formulario
+_MUESTRA_REGION = 800  # lado mayor de la muestra reducida
+_FRACCION_PAPEL = 0.5  # una fila/columna es papel si al menos esta fracción es clara
+_CUANTIL_TINTA = 0.002  # tinta descartada en cada borde (polvo, sombras, manchas sueltas)
+_MARGEN_REGION = 0.02  # margen agregado alrededor del contenido (fracción del lado)
+_AREA_MINIMA_REGION = 0.10  # regiones más chicas se descartan como falsos positivos
+
+# Reducciones que el decodificador JPEG aplica sin costo (escala DCT), de mayor a menor
+_REDUCCIONES = (8, 4, 2)
+
+
+def factor_reduccion(ancho: int, alto: int) -> int:
+    """
+    Mayor reducción (8, 4 o 2) con la que la imagen sigue teniendo al menos
+    OCR_MAX_MEGAPIXELES y al menos OCR_DPI aunque todo el ancho fuera
+    contenido: por debajo de eso el pipeline no la reduciría. 1 = sin reducir.
+    """
+    minimo = OCR_MAX_MEGAPIXELES * 1_000_000
+    dpi_objetivo = int(OCR_DPI) if OCR_DPI else OCR_DPI_MAXIMO
+    for factor in _REDUCCIONES:
+        ancho_reducido, alto_reducido = ancho // factor, alto // factor
+        if (ancho_reducido * alto_reducido >= minimo
+                and ancho_reducido / OCR_ANCHO_CONTENIDO_PULGADAS >= dpi_objetivo):
+            return factor
+    return 1
+
+
+def gris_reducido(imagen: Image.Image, metadatos: Optional[Dict] = None) -> np.ndarray:
+    """
+    Imagen PIL abierta (sin decodificar todavía) → array uint8 en escala de
+    grises, reducida por factor_reduccion. La reducción aplicada queda en
+    metadatos["reduccion_decodificacion"].
+    """
+    ancho_original = imagen.width
+    factor = factor_reduccion(*imagen.size)
+    if imagen.format == 'JPEG':
+        # El decodificador JPEG entrega la luminancia directamente, sin buffer RGB
+        # intermedio, y ya escalada: nunca materializa la resolución completa
+        imagen.draft('L', (imagen.width // factor, imagen.height // factor))
+    elif factor > 1:
+        imagen = imagen.reduce(factor)
+    if imagen.mode != 'L':
+        imagen = imagen.convert('L')
+    if metadatos is not None:
+        metadatos["reduccion_decodificacion"] = round(ancho_original / imagen.width, 3)
+    # np.array copia una sola vez y el buffer resultante es escribible
+    return np.array(imagen, dtype=np.uint8)
+
+
+def decodificar_gris(contenido: bytes, metadatos: Optional[Dict] = None) -> np.ndarray:
+    """Decodifica los bytes de la imagen a un array uint8 en escala de grises."""
+    return gris_reducido(Image.open(io.BytesIO(contenido)), metadatos)
+
+
+def _franjas(gris: np.ndarray):
+    """
+    Recorre la imagen en franjas de ~1 MP. np.bincount y np.take convierten su
+    entrada a índices de 64 bits, así que sobre la imagen completa costarían 8x su tamaño.
+    """
+    paso = max(1, (1 << 20) // max(1, gris.shape[1]))
+    for inicio in range(0, gris.shape[0], paso):
+        yield gris[inicio:inicio + paso]
+
+
+def _histograma(gris: np.ndarray) -> np.ndarray:
+    """Histograma de 256 niveles."""
+    histograma = np.zeros(256, dtype=np.int64)
+    for franja in _franjas(gris):
+        histograma += np.bincount(franja.ravel(), minlength=256)
+    return histograma
+
+
+def _aplicar_tabla(gris: np.ndarray, tabla: np.ndarray):
+    """Aplica una LUT de 256 valores in-place."""
+    for franja in _franjas(gris):
+        np.take(tabla, franja, out=franja)
+
+
+def _tabla_contraste_brillo(histograma: np.ndarray, contraste: float, brillo: float) -> np.ndarray:
+    """
+    LUT equivalente a ImageEnhance.Contrast seguido de ImageEnhance.Brightness.
+    PIL usa la media de la imagen como punto fijo del contraste y recorta a 0-255
+    después de cada paso.
+    """
+    total = histograma.sum()
+    media = int((histograma * np.arange(256)).sum() / total + 0.5) if total else 0
+    valores = np.arange(256, dtype=np.float32)
+    valores = media + contraste * (valores - media)
+    np.clip(valores, 0, 255, out=valores)
+    valores *= brillo
+    np.clip(valores, 0, 255, out=valores)
+    return np.rint(valores).astype(np.uint8)
+
+
+def _umbral_otsu(histograma: np.ndarray) -> int:
+    """Umbral de Otsu a partir de un histograma de 256 niveles."""
+    total = histograma.sum()
+    if total == 0:
+        return 127
+    niveles = np.arange(256, dtype=np.float64)
+    peso_fondo = np.cumsum(histograma)
+    peso_frente = total - peso_fondo
+    suma_acumulada = np.cumsum(histograma * niveles)
+    media_fondo = suma_acumulada / np.maximum(peso_fondo, 1)
+    media_frente = (suma_acumulada[-1] - suma_acumulada) / np.maximum(peso_frente, 1)
+    varianza_entre = peso_fondo * peso_frente * (media_fondo - media_frente) ** 2
+    return int(np.argmax(varianza_entre))
+
+
+def _binarizar_sauvola(gris: np.ndarray):
+    """
+    Sauvola calculado por bloques: media y desviación por bloque de
+    _SAUVOLA_BLOQUE px, suavizadas con los bloques vecinos. La comparación se
+    hace por franjas para no materializar un mapa de umbrales de tamaño completo.
+    """
+    alto, ancho = gris.shape
+    b = _SAUVOLA_BLOQUE
+    filas, columnas = -(-alto // b), -(-ancho // b)
+
+    medias = np.empty((filas, columnas), dtype=np.float32)
+    desviaciones = np.empty((filas, columnas), dtype=np.float32)
+    for i in range(filas):
+        franja = gris[i * b:(i + 1) * b]
+        # Copia float32 solo de la franja, rellenada hasta un múltiplo de b
+        franja = np.pad(franja, ((0, 0), (0, columnas * b - ancho)), mode='edge').astype(np.float32)
+        bloques = franja.reshape(franja.shape[0], columnas, b)
+        media = bloques.mean(axis=(0, 2))
+        medias[i] = media
+        desviaciones[i] = np.sqrt(np.maximum(np.square(bloques).mean(axis=(0, 2)) - media ** 2, 0))
+
+    # Suavizado 3x3 sobre la rejilla de bloques (equivale a una ventana de 3b px)
+    def _suavizar(rejilla):
+        relleno = np.pad(rejilla, 1, mode='edge')
+        return sum(
+            relleno[di:di + filas, dj:dj + columnas]
+            for di in range(3) for dj in range(3)
+        ) / 9.0
+
+    medias = _suavizar(medias)
+    desviaciones = _suavizar(desviaciones)
+    umbrales = medias * (1.0 + _SAUVOLA_K * (desviaciones / _SAUVOLA_R - 1.0))
+
+    for i in range(filas):
+        franja = gris[i * b:(i + 1) * b]
+        umbral_franja = np.repeat(umbrales[i], b)[:ancho]
+        mascara = franja > umbral_franja
+        franja[...] = 0
+        franja[mascara] = 255
+
+
+def _tramo_mas_largo(mascara: np.ndarray) -> Optional[Tuple[int, int]]:
+    """(inicio, fin) del tramo contiguo de True más largo, o None."""
+    if not mascara.any():
+        return None
+    bordes = np.diff(np.concatenate(([0], mascara.astype(np.int8), [0])))
+    inicios = np.flatnonzero(bordes == 1)
+    fines = np.flatnonzero(bordes == -1)
+    mayor = int(np.argmax(fines - inicios))
+    return int(inicios[mayor]), int(fines[mayor])
+
+
+def _rango_tinta(perfil: np.ndarray) -> Optional[Tuple[int, int]]:
+    """Rango que contiene la tinta del perfil, sin los extremos (_CUANTIL_TINTA)."""
+    acumulado = np.cumsum(perfil, dtype=np.float64)
+    total = acumulado[-1] if acumulado.size else 0
+    if total <= 0:
+        return None
+    inicio = int(np.searchsorted(acumulado, total * _CUANTIL_TINTA, side='right'))
+    fin = int(np.searchsorted(acumulado, total * (1 - _CUANTIL_TINTA), side='left')) + 1
+    return inicio, max(fin, inicio + 1)
+
+
+def detectar_region(gris: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Caja (izquierda, arriba, derecha, abajo) del área del formulario, en
+    píxeles de la imagen completa. None si no hay una región clara (en ese
+    caso se usa la imagen completa).
+
+    1. Papel: el tramo más largo de filas y columnas mayormente claras
+       (descarta la mesa o el fondo de las fotos de celular)
+    2. Contenido: rango de la tinta dentro del papel por perfiles de
+       proyección (descarta los márgenes en blanco)
+    """
+    alto, ancho = gris.shape
+    paso = max(1, max(alto, ancho) // _MUESTRA_REGION)
+    muestra = gris[::paso, ::paso]
+    claro = muestra > _umbral_otsu(np.bincount(muestra.ravel(), minlength=256))
+
+    filas = _tramo_mas_largo(claro.mean(axis=1) >= _FRACCION_PAPEL)
+    if filas is None:
+        return None
+    columnas = _tramo_mas_largo(claro[filas[0]:filas[1]].mean(axis=0) >= _FRACCION_PAPEL)
+    if columnas is None:
+        return None
+    # Con las columnas del papel ya acotadas, las filas se recalculan sin el fondo lateral
+    filas = _tramo_mas_largo(claro[:, columnas[0]:columnas[1]].mean(axis=1) >= _FRACCION_PAPEL) or filas
+
+    tinta = ~claro[filas[0]:filas[1], columnas[0]:columnas[1]]
+    rango_filas = _rango_tinta(tinta.sum(axis=1))
+    rango_columnas = _rango_tinta(tinta.sum(axis=0))
+    if rango_filas is None or rango_columnas is None:
+        return None
+
+    margen_y = int(tinta.shape[0] * _MARGEN_REGION)
+    margen_x = int(tinta.shape[1] * _MARGEN_REGION)
+    arriba = max(0, (filas[0] + rango_filas[0] - margen_y) * paso)
+    abajo = min(alto, (filas[0] + rango_filas[1] + margen_y) * paso)
+    izquierda = max(0, (columnas[0] + rango_columnas[0] - margen_x) * paso)
+    derecha = min(ancho, (columnas[0] + rango_columnas[1] + margen_x) * paso)
+
+    if (abajo - arriba) * (derecha - izquierda) < _AREA_MINIMA_REGION * alto * ancho:
+        return None
+    return izquierda, arriba, derecha, abajo
+
+
+def calcular_escala(ancho: int, alto: int) -> Tuple[float, float]:
+    """
+    Factor de escala para que el contenido quede dentro de
+    [OCR_DPI_MINIMO, OCR_DPI_MAXIMO] (si está fuera, se lleva a OCR_DPI) y sin
+    pasar de OCR_MAX_MEGAPIXELES. El DPI se estima suponiendo que el ancho del
+    contenido mide OCR_ANCHO_CONTENIDO_PULGADAS.
+    Retorna (escala, dpi_estimado).
+    """
+    dpi_estimado = ancho / OCR_ANCHO_CONTENIDO_PULGADAS
+    escala = 1.0
+    if OCR_DPI and not OCR_DPI_MINIMO <= dpi_estimado <= OCR_DPI_MAXIMO:
+        escala = int(OCR_DPI) / dpi_estimado
+    maximo = OCR_MAX_MEGAPIXELES * 1_000_000
+    if ancho * alto * escala * escala > maximo:
+        escala = math.sqrt(maximo / (ancho * alto))
+    return escala, dpi_estimado
+
+
+def recortar_y_escalar(gris: np.ndarray, metadatos: Optional[Dict] = None) -> np.ndarray:
+    """
+    Recorta a la región del formulario y la escala al rango de DPI objetivo.
+    La caja elegida queda en metadatos["region"] (coordenadas de la imagen
+    original, antes de la reducción al decodificar) para auditoría.
+    """
+    alto, ancho = gris.shape
+    region = detectar_region(gris)
+    izquierda, arriba, derecha, abajo = region or (0, 0, ancho, alto)
+    escala, dpi_estimado = calcular_escala(derecha - izquierda, abajo - arriba)
+
+    recorte = gris[arriba:abajo, izquierda:derecha]
+    if abs(escala - 1.0) > 0.02:
+        tamano = (max(1, round(recorte.shape[1] * escala)), max(1, round(recorte.shape[0] * escala)))
+        # BOX al reducir (promedia sin aliasing y es el más rápido); BICUBIC al ampliar
+        filtro = Image.BOX if escala < 1 else Image.BICUBIC
+        recorte = np.array(Image.fromarray(recorte).resize(tamano, filtro), dtype=np.uint8)
+    else:
+        escala = 1.0
+        if region is not None:
+            # Copia propia del recorte: libera la imagen completa
+            recorte = np.ascontiguousarray(recorte)
+
+    if metadatos is not None:
+        reduccion = metadatos.get("reduccion_decodificacion", 1)
+        metadatos["dimensiones_originales"] = [round(ancho * reduccion), round(alto * reduccion)]
+        metadatos["region"] = {
+            "x": round(izquierda * reduccion), "y": round(arriba * reduccion),
+            "ancho": round((derecha - izquierda) * reduccion), "alto": round((abajo - arriba) * reduccion),
+            "detectada": region is not None,
+        }
+        metadatos["dpi_estimado"] = round(dpi_estimado, 1)
+        metadatos["escala"] = round(escala, 4)
+        metadatos["dimensiones_ocr"] = [recorte.shape[1], recorte.shape[0]]
+    return recorte
+
+
+def estimar_inclinacion(binaria: np.ndarray) -> float:
+    """
+    Estima el ángulo de inclinación (grados) maximizando la varianza del
+    perfil de proyección horizontal de los píxeles de texto.
+    """
+    paso = max(1, max(binaria.shape) // _MUESTRA_ENDEREZADO)
+    muestra = binaria[::paso, ::paso]
+    ys, xs = np.nonzero(muestra == 0)
+    if ys.size < 100:
+        return 0.0
+    ys = ys.astype(np.float32)
+    xs = xs.astype(np.float32)
+
+    mejor_angulo, mejor_puntaje = 0.0, -1.0
+    for angulo in np.arange(-_ANGULO_MAXIMO, _ANGULO_MAXIMO + 1e-6, _ANGULO_PASO):
+        filas = np.rint(ys - xs * math.tan(math.radians(angulo))).astype(np.int64)
+        filas -= filas.min()
+        perfil = np.bincount(filas).astype(np.float64)
+        puntaje = float(np.square(np.diff(perfil)).sum())
+        if puntaje > mejor_puntaje:
+            mejor_angulo, mejor_puntaje = float(angulo), puntaje
+    return mejor_angulo
+
+
+def enderezar(binaria: np.ndarray, angulo: float) -> np.ndarray:
+    """Rota la imagen para compensar la inclinación detectada."""
+    if abs(angulo) < _ANGULO_PASO:
+        return binaria
+    rotada = Image.fromarray(binaria).rotate(
+        angulo, resample=Image.NEAREST, expand=False, fillcolor=255
+    )
+    return np.asarray(rotada)
+
+
+def preprocesar_gris(gris: np.ndarray, perfil: str = "v2", metadatos: Optional[Dict] = None) -> np.ndarray:
+    """
+    Aplica el pipeline a un array en escala de grises. Modifica `gris` in-place
+    siempre que no haga falta rotar.
+    """
+    parametros = PERFILES_PREPROCESAMIENTO[perfil]
+
+    if parametros["recortar"]:
+        gris = recortar_y_escalar(gris, metadatos)
+
+    histograma = _histograma(gris)
+    tabla = _tabla_contraste_brillo(histograma, parametros["contraste"], parametros["brillo"])
+
+    if parametros["binarizacion"] == "otsu":
+        # Histograma de la imagen ya ajustada, sin recorrerla otra vez
+        histograma_ajustado = np.bincount(tabla, weights=histograma, minlength=256)
+        umbral = _umbral_otsu(histograma_ajustado)
+        tabla = np.where(tabla > umbral, 255, 0).astype(np.uint8)
+        _aplicar_tabla(gris, tabla)
+    else:
+        _aplicar_tabla(gris, tabla)
+        _binarizar_sauvola(gris)
+
+    angulo = 0.0
+    if parametros["enderezar"]:
+        angulo = estimar_inclinacion(gris)
+        gris = enderezar(gris, angulo)
+
+    if metadatos is not None:
+        metadatos["perfil_preprocesamiento"] = perfil
+        metadatos["angulo_enderezado"] = angulo
+
+    return np.ascontiguousarray(gris)
+
+
+def preprocesar_imagen(contenido: bytes, perfil: str = "v2", metadatos: Optional[Dict] = None) -> np.ndarray:
+    """
+    Punto de entrada único: bytes de la imagen → buffer binarizado listo para Tesseract.
+    """
+    return preprocesar_gris(decodificar_gris(contenido, metadatos), perfil, metadatos)
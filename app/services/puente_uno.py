@@ -0,0 +1,159 @@
+# app/services/puente_uno.py
+"""
+Puente entre la API y un LibreOffice headless (lo usa conversion_pdf).
+
+Corre con el intérprete que trae python3-uno (CONVERSION_PDF_PYTHON), que
+no tiene por qué ser el de la API, así que no importa nada de app. Arranca
+su propio soffice escuchando en un pipe con nombre, se conecta por UNO y
+atiende documentos por stdin/stdout hasta que se cierra stdin:
+
+    →  4 bytes (big endian) con el tamaño + el .docx
+    ←  1 byte de estado (b'0' ok, b'1' error) + 4 bytes de tamaño + PDF o mensaje
+
+Al quedar conectado escribe b'L'. Los documentos entran y salen por
+streams UNO en memoria (private:stream), sin archivos temporales.
+
+    python3 puente_uno.py <soffice> <nombre_pipe> <directorio_perfil> <segundos_arranque>
+"""
+
+import os
+import struct
+import subprocess
+import sys
+import time
+
+import uno
+import unohelper
+from com.sun.star.beans import PropertyValue
+from com.sun.star.connection import NoConnectException
+from com.sun.star.io import XOutputStream
+
+LISTO = b'L'
+OK = b'0'
+ERROR = b'1'
+
+
+def _propiedades(**valores):
+    propiedades = []
+    for nombre, valor in valores.items():
+        propiedad = PropertyValue()
+        propiedad.Name = nombre
+        propiedad.Value = valor
+        propiedades.append(propiedad)
+    return tuple(propiedades)
+
+
+class _SalidaMemoria(unohelper.Base, XOutputStream):
+    def __init__(self):
+        self.partes = []
+
+    def writeBytes(self, datos):
+        self.partes.append(datos.value)
+
+    def flush(self):
+        pass
+
+    def closeOutput(self):
+        pass
+
+
+def _iniciar_soffice(soffice: str, tuberia: str, perfil: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            soffice, "--headless", "--invisible", "--nologo", "--nodefault", "--norestore",
+            "--nolockcheck", "--nofirststartwizard",
+            f"-env:UserInstallation={uno.systemPathToFileUrl(os.path.abspath(perfil))}",
+            f"--accept=pipe,name={tuberia};urp;StarOffice.ComponentContext",
+        ],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def _conectar(tuberia: str, limite: float):
+    local = uno.getComponentContext()
+    resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+    while True:
+        try:
+            contexto = resolver.resolve(f"uno:pipe,name={tuberia};urp;StarOffice.ComponentContext")
+            break
+        except NoConnectException:
+            if time.monotonic() > limite:
+                raise
+            time.sleep(0.25)
+    escritorio = contexto.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", contexto)
+    return contexto, escritorio
+
+
+def _convertir(contexto, escritorio, docx: bytes) -> bytes:
+    entrada = contexto.ServiceManager.createInstanceWithArgumentsAndContext(
+        "com.sun.star.io.SequenceInputStream", (uno.ByteSequence(docx),), contexto
+    )
+    documento = escritorio.loadComponentFromURL(
+        "private:stream", "_blank", 0,
+        _propiedades(InputStream=entrada, FilterName="MS Word 2007 XML", Hidden=True, ReadOnly=True)
+    )
+    if documento is None:
+        raise RuntimeError("LibreOffice no pudo abrir el documento")
+    try:
+        salida = _SalidaMemoria()
+        documento.storeToURL("private:stream", _propiedades(OutputStream=salida, FilterName="writer_pdf_Export"))
+        return b''.join(salida.partes)
+    finally:
+        documento.close(True)
+
+
+def _leer(flujo, cantidad: int) -> bytes:
+    datos = flujo.read(cantidad)
+    if len(datos) < cantidad:
+        raise EOFError
+    return datos
+
+
+def _responder(flujo, estado: bytes, datos: bytes):
+    flujo.write(estado + struct.pack('>I', len(datos)) + datos)
+    flujo.flush()
+
+
+def main():
+    soffice, tuberia, perfil, arranque = sys.argv[1:5]
+
+    # El protocolo usa una copia del stdout original; cualquier print de UNO va a stderr
+    salida = os.fdopen(os.dup(1), 'wb')
+    os.dup2(2, 1)
+    entrada = sys.stdin.buffer
+
+    proceso = _iniciar_soffice(soffice, tuberia, perfil)
+    try:
+        contexto, escritorio = _conectar(tuberia, time.monotonic() + float(arranque))
+    except Exception:
+        proceso.kill()
+        raise
+
+    try:
+        salida.write(LISTO)
+        salida.flush()
+
+        while True:
+            try:
+                tamano, = struct.unpack('>I', _leer(entrada, 4))
+                docx = _leer(entrada, tamano)
+            except EOFError:
+                break
+            try:
+                _responder(salida, OK, _convertir(contexto, escritorio, docx))
+            except Exception as e:
+                _responder(salida, ERROR, f"{type(e).__name__}: {e}".encode('utf-8', 'replace'))
+
+        try:
+            escritorio.terminate()
+        except Exception:
+            pass
+    finally:
+        try:
+            proceso.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# app/services/reparseo_ocr.py
+"""
+Layout de OCR persistido y re-parseo sin volver a correr Tesseract.
+
+Al registrar un documento se guarda, comprimido, todo lo que el parser
+necesita: el texto reconocido, el TSV de image_to_data (palabras, cajas y
+confianzas) y los valores leídos por celda en el perfil layout.
+
+Cuando cambian las reglas (OCR_REGLAS_PATH) o el parser, el trabajo
+"reparseo" recorre los layouts guardados por lotes, vuelve a correr solo
+extraer_campos + estructurar_campos en el pool de procesos y actualiza los
+campos estructurados de cada documento. Re-parsear un documento toma
+milisegundos; volver a correr el OCR, segundos.
+
+Cada documento con cambios se actualiza, en una misma transacción, en:
+- dbo.documento.datos_ocr: lo que devuelven los endpoints de documentos, en
+  el mismo formato con que lo registra el flujo y conservando sus metadatos_ocr
+- dbo.documento_layout_ocr.datos_ocr (JSON) y version_parser: base de
+  comparación de la próxima pasada
+- el historial del documento (valor anterior y nuevo)
+"""
+
+import ast
+import asyncio
+import json
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.repository.documento_layout_ocr import DocumentoLayoutOCRRepository
+from app.models.documento import DocumentoProcesado
+from app.repository.documento_onedrive import DocumentoOneDriveRepository
+from app.services.ejecutor_ocr import ejecutor_ocr
+from app.services.ocr import PARSER_VERSION, huella_reglas, extraer_campos, estructurar_campos
+
+FORMATO_LAYOUT = 1
+NIVEL_COMPRESION = 6
+
+# Filas leídas de la BD por vuelta y layouts por tarea del pool
+TAMANO_LOTE_BD = 200
+TAMANO_TAREA_POOL = 25
+
+USUARIO_SISTEMA_ID = 1
+
+Progreso = Callable[[str, str], None]
+
+
+def _sin_progreso(etapa: str, mensaje: str):
+    pass
+
+
+def version_parser() -> str:
+    """Identifica el parser vigente: cambia con PARSER_VERSION o con las reglas."""
+    return f"{PARSER_VERSION}-{huella_reglas()}"
+
+
+def serializar_datos(datos: Dict[str, Any]) -> str:
+    """JSON estable de los campos estructurados (para guardar y comparar)."""
+    return json.dumps(datos, ensure_ascii=False, sort_keys=True)
+
+
+def comprimir_layout(resultado_ocr: Dict[str, Any]) -> bytes:
+    """Layout de un resultado de servicio_ocr.procesar, listo para la BD."""
+    contenido = {
+        "formato": FORMATO_LAYOUT,
+        "texto": resultado_ocr["texto"],
+        "tsv": resultado_ocr["tsv"],
+        # Resultados en cache anteriores al campo no lo traen
+        "valores_layout": resultado_ocr.get("valores_layout") or {},
+    }
+    serializado = json.dumps(contenido, ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(serializado.encode("utf-8"), NIVEL_COMPRESION)
+
+
+def datos_documento(datos: str, anterior: Optional[str]) -> str:
+    """
+    Valor de dbo.documento.datos_ocr para los campos re-parseados (JSON de
+    serializar_datos), en el formato del flujo: str de DocumentoProcesado.
+    Conserva los metadatos_ocr del registro anterior (pasada, calidad...).
+    """
+    metadatos = None
+    if anterior:
+        try:
+            metadatos = ast.literal_eval(anterior).get("metadatos_ocr")
+        except (ValueError, SyntaxError, AttributeError):
+            pass
+    return str(DocumentoProcesado(**json.loads(datos), metadatos_ocr=metadatos).model_dump())
+
+
+def descomprimir_layout(layout: bytes) -> Dict[str, Any]:
+    contenido = json.loads(zlib.decompress(layout).decode("utf-8"))
+    if contenido.get("formato") != FORMATO_LAYOUT:
+        raise ValueError(f"Formato de layout no soportado: {contenido.get('formato')}")
+    return contenido
+
+
+def reparsear_layout(layout: bytes) -> Dict[str, Any]:
+    """Campos estructurados a partir del layout guardado (igual que servicio_ocr.procesar)."""
+    contenido = descomprimir_layout(layout)
+    return estructurar_campos({**extraer_campos(contenido["texto"]), **contenido["valores_layout"]})
+
+
+def _reparsear_lote(layouts: List[Tuple[int, bytes]]) -> Tuple[str, List[Tuple[int, Optional[str], Optional[str]]]]:
+    """
+    Re-parsea varios layouts en una sola tarea del pool. Retorna la versión
+    de parser con que se hizo y [(documento_id, datos JSON, error), ...].
+    """
+    resultados = []
+    for documento_id, layout in layouts:
+        try:
+            resultados.append((documento_id, serializar_datos(reparsear_layout(layout)), None))
+        except Exception as e:
+            resultados.append((documento_id, None, str(e)))
+    return version_parser(), resultados
+
+
+class ServicioReparseoOCR:
+
+    def __init__(self):
+        self.layout_repo = DocumentoLayoutOCRRepository()
+        self.documento_repo = DocumentoOneDriveRepository()
+        self.ejecutor = ejecutor_ocr
+
+    def _guardar_lote(self, db: Session, anteriores: Dict[int, Optional[str]],
+                      documentos_anteriores: Dict[int, Optional[str]],
+                      resultados: List[Tuple[str, List[Tuple[int, Optional[str], Optional[str]]]]]) -> Dict[str, int]:
+        """Actualiza el lote en una transacción. Corre en el threadpool."""
+        conteo = {"actualizados": 0, "sin_cambios": 0, "errores": 0}
+        try:
+            for version, documentos in resultados:
+                for documento_id, datos, error in documentos:
+                    if error is not None:
+                        print(f"⚠️ Re-parseo del documento {documento_id}: {error}")
+                        conteo["errores"] += 1
+                        continue
+                    self.layout_repo.actualizar_datos(db, documento_id, version, datos)
+                    if datos == anteriores[documento_id]:
+                        conteo["sin_cambios"] += 1
+                        continue
+                    self.documento_repo.actualizar_datos_ocr(
+                        db, documento_id, datos_documento(datos, documentos_anteriores[documento_id])
+                    )
+                    self.documento_repo.registrar_historial(
+                        db=db,
+                        documento_id=documento_id,
+                        accion="reparseo_ocr",
+                        usuario_id=USUARIO_SISTEMA_ID,
+                        campo_modificado="datos_ocr",
+                        valor_anterior=anteriores[documento_id],
+                        valor_nuevo=datos,
+                        notas=f"Campos re-extraídos del layout guardado (parser {version})"
+                    )
+                    conteo["actualizados"] += 1
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return conteo
+
+    async def reparsear(
+        self,
+        db: Session,
+        solo_desactualizados: bool = True,
+        progreso: Optional[Progreso] = None
+    ) -> Dict[str, Any]:
+        """
+        Re-parsea los layouts guardados (solo los de otra versión de parser,
+        salvo solo_desactualizados=False). Cada lote de la BD se reparte en
+        tareas del pool que corren en paralelo y se confirma por separado,
+        así que un corte a mitad de camino no pierde lo ya hecho.
+        """
+        progreso = progreso or _sin_progreso
+        version = version_parser()
+        excluir = version if solo_desactualizados else None
+
+        total = await run_in_threadpool(self.layout_repo.contar, db, excluir)
+        progreso("reparseo", f"{total} documentos por re-parsear (parser {version})")
+
+        resumen = {"total": total, "procesados": 0, "actualizados": 0, "sin_cambios": 0, "errores": 0}
+        ultimo_id = 0
+        while True:
+            lote = await run_in_threadpool(self.layout_repo.listar_lote, db, ultimo_id, TAMANO_LOTE_BD, excluir)
+            if not lote:
+                break
+            ultimo_id = lote[-1]["documento_id"]
+
+            layouts = [(fila["documento_id"], bytes(fila["layout"])) for fila in lote]
+            resultados = await asyncio.gather(*(
+                self.ejecutor.ejecutar(_reparsear_lote, layouts[inicio:inicio + TAMANO_TAREA_POOL])
+                for inicio in range(0, len(layouts), TAMANO_TAREA_POOL)
+            ))
+            anteriores = {fila["documento_id"]: fila["datos_ocr"] for fila in lote}
+            documentos_anteriores = {fila["documento_id"]: fila["datos_documento"] for fila in lote}
+            conteo = await run_in_threadpool(self._guardar_lote, db, anteriores, documentos_anteriores, resultados)
+
+            resumen["procesados"] += len(lote)
+            for clave, cantidad in conteo.items():
+                resumen[clave] += cantidad
+            progreso("reparseo", f"{resumen['procesados']}/{total} documentos re-parseados")
+
+        print(f"✅ Re-parseo terminado: {resumen}")
+        return {**resumen, "version_parser": version}
+
+
+servicio_reparseo_ocr = ServicioReparseoOCR()
@@ -0,0 +1,284 @@
+# app/services/servicio_ocr.py
+"""
+Orquestación del OCR compartida por los endpoints:
+cache → páginas (PDF/TIFF) → preprocesamiento → pasadas de Tesseract en el pool → parse_ocr_text
+
+Cada pasada se evalúa por confianza de palabras y completitud de campos
+(ver calidad_ocr). Si la primera pasada ya es completa y confiable, las demás
+no se ejecutan; si no, el resto de PSM del perfil corre en paralelo y se
+elige la mejor.
+
+Los PDF y TIFF de varias páginas se procesan página por página en paralelo
+(ver paginas_ocr); las páginas de PDF con capa de texto no pasan por OCR.
+
+Los perfiles con `layout` completan la pasada elegida leyendo las celdas de
+valor junto a cada etiqueta (ver layout_ocr) en lugar de más pasadas de
+página completa.
+"""
+
+import asyncio
+from typing import Any, Dict, List
+
+import numpy as np
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import (
+    OCR_TESSDATA_VARIANTES,
+    OCR_PERFIL_POR_DEFECTO,
+    OCR_CONFIANZA_MINIMA,
+    OCR_PAGINAS_CONCURRENCIA,
+)
+from app.models.documento import DocumentoProcesado
+from app.services.cache_ocr import cache_ocr
+from app.services.calidad_ocr import evaluar_pasada, es_suficiente, clave_orden
+from app.services.ejecutor_ocr import ejecutor_ocr
+from app.services.layout_ocr import LAYOUT_VERSION, ubicar_celdas, recortar_celda, valores_layout
+from app.services.ocr import parse_ocr_text, extraer_campos, estructurar_campos, huella_reglas
+from app.services.paginas_ocr import (
+    FORMATO_PDF,
+    detectar_formato,
+    contar_paginas,
+    texto_embebido,
+    rasterizar_pagina,
+    estimar_bytes_pagina,
+    presupuesto_decodificacion,
+)
+from app.services.preprocesamiento import preprocesar_gris
+
+def _preparar_pagina(contenido: bytes, formato: str, indice: int, perfil_preprocesamiento: str,
+                     metadatos: Dict) -> np.ndarray:
+    """Rasteriza/decodifica la página y la preprocesa (en el threadpool, un solo salto)."""
+    return preprocesar_gris(
+        rasterizar_pagina(contenido, formato, indice, metadatos), perfil_preprocesamiento, metadatos
+    )
+
+
+# Perfil de OCR = perfil de preprocesamiento + conjunto de PSM (en orden) + variante de tessdata
+PERFILES_OCR: Dict[str, Dict[str, Any]] = {
+    "fast": {"preprocesamiento": "v2", "psms": (6,), "tessdata": "fast"},
+    "balanced": {"preprocesamiento": "v2", "psms": (6, 4), "tessdata": "default"},
+    "accurate": {"preprocesamiento": "v2", "psms": (6, 4, 11), "tessdata": "best"},
+    # PSM 6 + re-OCR de las celdas de valor con lista blanca por campo
+    "layout": {"preprocesamiento": "v2", "psms": (6,), "tessdata": "default", "layout": True},
+    # Perfil del endpoint V1 (una sola pasada, contraste 2.0)
+    "v1": {"preprocesamiento": "v1", "psms": (6,), "tessdata": "default"},
+}
+
+
+def validar_perfil(perfil: str) -> str:
+    perfil = perfil or OCR_PERFIL_POR_DEFECTO
+    if perfil not in PERFILES_OCR:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Perfil de OCR inválido: {perfil}. Use: {list(PERFILES_OCR)}"
+        )
+    return perfil
+
+
+def documento_procesado(resultado: Dict[str, Any]) -> DocumentoProcesado:
+    """Datos extraídos + metadatos de la pasada elegida, como DocumentoProcesado."""
+    return DocumentoProcesado(
+        **resultado["datos"],
+        metadatos_ocr={
+            "perfil": resultado["perfil"],
+            "psm": resultado["psm"],
+            "desde_cache": resultado["desde_cache"],
+            **resultado["calidad"],
+            # Región recortada y escala aplicada antes del OCR (auditoría)
+            "preprocesamiento": resultado.get("preprocesamiento"),
+            # Celdas de valor leídas junto a cada etiqueta (perfil layout)
+            "layout": resultado.get("layout"),
+            # Origen (OCR o capa de texto del PDF) de cada página
+            "paginas": resultado.get("paginas"),
+        },
+    )
+
+
+class ServicioOCR:
+
+    def __init__(self):
+        self.cache = cache_ocr
+        self.ejecutor = ejecutor_ocr
+
+    @staticmethod
+    def _descriptor_perfil(perfil: str) -> str:
+        config = PERFILES_OCR[perfil]
+        psms = ",".join(str(psm) for psm in config["psms"])
+        return (
+            f"{perfil}|{config['preprocesamiento']}|psm={psms}|tessdata={config['tessdata']}"
+            f"|reglas={huella_reglas()}"
+            + (f"|layout={LAYOUT_VERSION}" if config.get("layout") else "")
+        )
+
+    @staticmethod
+    def _evaluar(resultado_pasada: Dict[str, str]) -> Dict[str, Any]:
+        datos = parse_ocr_text(resultado_pasada["texto"])
+        return {**resultado_pasada, "datos": datos, "calidad": evaluar_pasada(datos, resultado_pasada["tsv"])}
+
+    async def _completar_con_layout(self, imagen, evaluada: Dict[str, Any], tessdata_dir) -> Dict[str, Any]:
+        """
+        Ubica la celda de valor de cada etiqueta en el TSV de la pasada,
+        re-reconoce las celdas con lista blanca y combina esos valores con los
+        del parser de texto. Se queda con la combinación solo si no empeora.
+        """
+        celdas = ubicar_celdas(evaluada["tsv"], imagen.shape[1])
+        recortes: List[tuple] = []
+        campos_reocr: List[str] = []
+        for campo, celda in celdas.items():
+            recorte = recortar_celda(imagen, celda["caja"]) if celda["lista_blanca"] else None
+            if recorte is not None:
+                recortes.append((recorte, celda["lista_blanca"]))
+                campos_reocr.append(campo)
+
+        textos = await self.ejecutor.reconocer_celdas(recortes, tessdata_dir=tessdata_dir)
+        textos_celdas = {campo: texto.strip() for campo, texto in zip(campos_reocr, textos)}
+
+        datos = estructurar_campos({
+            **extraer_campos(evaluada["texto"]),
+            **valores_layout(celdas, textos_celdas),
+        })
+        calidad = evaluar_pasada(datos, evaluada["tsv"])
+        metadatos_layout = {
+            campo: {
+                "caja": list(celda["caja"]),
+                "texto_tsv": celda["texto"],
+                "texto_celda": textos_celdas.get(campo),
+            }
+            for campo, celda in celdas.items()
+        }
+        if calidad["completitud"] < evaluada["calidad"]["completitud"]:
+            return {**evaluada, "layout": metadatos_layout}
+        return {
+            **evaluada, "datos": datos, "calidad": calidad, "layout": metadatos_layout,
+            "valores_layout": valores_layout(celdas, textos_celdas),
+        }
+
+    async def _ocr_pagina(self, contenido: bytes, formato: str, indice: int,
+                          config: Dict[str, Any], tessdata_dir) -> Dict[str, Any]:
+        """Preprocesamiento → pasadas PSM con corte temprano → layout, para una página."""
+        metadatos_preprocesamiento = {}
+        # La reserva cubre el pico de decodificación + preprocesamiento; la
+        # imagen binarizada que queda para Tesseract ya está acotada
+        bytes_estimados = await run_in_threadpool(estimar_bytes_pagina, contenido, formato, indice)
+        async with presupuesto_decodificacion.reservar(bytes_estimados):
+            imagen = await run_in_threadpool(
+                _preparar_pagina, contenido, formato, indice, config["preprocesamiento"], metadatos_preprocesamiento
+            )
+
+        # Primera pasada sola: si ya es suficiente, no se gastan las demás
+        primer_psm, *resto_psms = config["psms"]
+        pasadas = await self.ejecutor.reconocer(imagen, psms=(primer_psm,), tessdata_dir=tessdata_dir)
+        evaluadas = {primer_psm: self._evaluar(pasadas[primer_psm])}
+
+        if resto_psms and not es_suficiente(evaluadas[primer_psm]["calidad"], OCR_CONFIANZA_MINIMA):
+            pasadas = await self.ejecutor.reconocer(imagen, psms=tuple(resto_psms), tessdata_dir=tessdata_dir)
+            for psm, pasada in pasadas.items():
+                evaluadas[psm] = self._evaluar(pasada)
+
+        psm_elegido = max(
+            evaluadas,
+            key=lambda psm: clave_orden(evaluadas[psm]["calidad"], evaluadas[psm]["texto"])
+        )
+        elegida = evaluadas[psm_elegido]
+        if config.get("layout") and not es_suficiente(elegida["calidad"], OCR_CONFIANZA_MINIMA):
+            elegida = await self._completar_con_layout(imagen, elegida, tessdata_dir)
+        return {
+            "origen": "ocr",
+            "texto": elegida["texto"],
+            "tsv": elegida["tsv"],
+            "valores_layout": elegida.get("valores_layout", {}),
+            "psm": psm_elegido,
+            "pasadas": {
+                str(psm): {"caracteres": len(e["texto"]), **e["calidad"]}
+                for psm, e in evaluadas.items()
+            },
+            "preprocesamiento": metadatos_preprocesamiento,
+            # Celdas leídas por layout (None si el perfil no lo usa o no hizo falta)
+            "layout": elegida.get("layout"),
+        }
+
+    async def _procesar_pagina(self, contenido: bytes, formato: str, indice: int,
+                               config: Dict[str, Any], tessdata_dir, limite: asyncio.Semaphore) -> Dict[str, Any]:
+        """Una página: capa de texto del PDF si la tiene; si no, OCR."""
+        # El semáforo acota cuántas páginas están rasterizadas a la vez
+        async with limite:
+            if formato == FORMATO_PDF:
+                texto = await run_in_threadpool(texto_embebido, contenido, formato, indice)
+                if texto:
+                    return {
+                        "origen": "texto_embebido", "texto": texto, "tsv": "", "valores_layout": {},
+                        "psm": None, "pasadas": {}, "preprocesamiento": None, "layout": None,
+                    }
+            return await self._ocr_pagina(contenido, formato, indice, config, tessdata_dir)
+
+    async def procesar(self, contenido: bytes, perfil: str = None) -> Dict[str, Any]:
+        """
+        Extrae texto y datos estructurados de una imagen o de un PDF/TIFF de
+        varias páginas. Las páginas se procesan en paralelo y su texto se une
+        (en orden) antes de parse_ocr_text.
+        Retorna {"texto", "tsv", "datos", "calidad", "psm", "pasadas",
+        "preprocesamiento", "layout", "valores_layout", "paginas", "desde_cache"};
+        psm, pasadas, preprocesamiento y layout son los de la primera página.
+        texto + tsv + valores_layout alcanzan para volver a parsear sin OCR
+        (ver reparseo_ocr).
+        """
+        perfil = validar_perfil(perfil)
+        config = PERFILES_OCR[perfil]
+        tessdata_dir = OCR_TESSDATA_VARIANTES.get(config["tessdata"])
+        # Hash del archivo completo y lectura de la cache en disco: fuera del event loop
+        clave = await run_in_threadpool(self.cache.clave, contenido, self._descriptor_perfil(perfil))
+
+        en_cache = await run_in_threadpool(self.cache.obtener, clave)
+        if en_cache is not None:
+            print(f"⚡ OCR desde cache ({clave[:12]})")
+            return {**en_cache, "desde_cache": True}
+
+        formato = detectar_formato(contenido)
+        cantidad = await run_in_threadpool(contar_paginas, contenido, formato)
+        limite = asyncio.Semaphore(OCR_PAGINAS_CONCURRENCIA)
+        paginas = await asyncio.gather(*(
+            self._procesar_pagina(contenido, formato, indice, config, tessdata_dir, limite)
+            for indice in range(cantidad)
+        ))
+
+        texto = "\n\n".join(pagina["texto"] for pagina in paginas)
+        tsv = "\n".join(pagina["tsv"] for pagina in paginas if pagina["tsv"])
+        # Por campo gana el valor por layout de la primera página que lo tenga
+        valores = {}
+        for pagina in reversed(paginas):
+            valores.update(pagina["valores_layout"])
+        datos = estructurar_campos({**extraer_campos(texto), **valores})
+        calidad = evaluar_pasada(datos, tsv)
+        if not tsv:
+            # Solo texto embebido: no hay incertidumbre de reconocimiento
+            calidad["confianza_media"] = 100.0
+
+        primera = paginas[0]
+        resultado = {
+            "texto": texto,
+            "tsv": tsv,
+            "datos": datos,
+            "calidad": calidad,
+            "perfil": perfil,
+            "psm": primera["psm"],
+            "pasadas": primera["pasadas"],
+            "preprocesamiento": primera["preprocesamiento"],
+            "layout": primera["layout"],
+            "valores_layout": valores,
+            "paginas": [
+                {
+                    "pagina": indice + 1,
+                    "origen": pagina["origen"],
+                    "caracteres": len(pagina["texto"]),
+                    "psm": pagina["psm"],
+                }
+                for indice, pagina in enumerate(paginas)
+            ],
+        }
+
+        await run_in_threadpool(self.cache.guardar, clave, resultado)
+        return {**resultado, "desde_cache": False}
+
+
+servicio_ocr = ServicioOCR()
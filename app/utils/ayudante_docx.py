@@ -1,76 +1,127 @@
-from docx.table import _Cell
+# app/utils/ayudante_docx.py
+"""
+Reemplazo de placeholders {{...}} en documentos Word (generación V1).
 
-def reemplazar_placeholders_docx(doc_obj, reemplazos: dict):
+Trabaja directo sobre el XML (lxml) del cuerpo y de las partes de
+encabezado y pie de página, sin pasar por los objetos de python-docx:
+- Todas las claves se buscan con un único regex de alternativas (compilado
+  una vez por conjunto de claves), en una sola pasada por párrafo
+- El texto de un párrafo se arma con los <w:t> de sus runs; solo cuando una
+  coincidencia abarca varios runs se juntan esos runs: el valor queda en el
+  primero (con su formato) y el resto del placeholder se quita de los demás.
+  Los runs que no tienen placeholders no se tocan
+- Se recorren los mismos párrafos que antes: los del cuerpo, los de las
+  tablas (y tablas anidadas) y los de todos los encabezados y pies de página
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterator, List, Tuple
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+
+_W_P = qn('w:p')
+_W_R = qn('w:r')
+_W_T = qn('w:t')
+_W_TBL = qn('w:tbl')
+_W_TR = qn('w:tr')
+_W_TC = qn('w:tc')
+_W_RPR = qn('w:rPr')
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+# Contenido de run que no es texto (tab, salto, dibujo...): corta cualquier coincidencia
+_SEPARADOR = '\x00'
+
+
+@lru_cache(maxsize=32)
+def _patron_claves(claves: Tuple[str, ...]) -> re.Pattern:
+    # Las más largas primero: una clave nunca le gana a otra que la contiene
+    return re.compile('|'.join(re.escape(clave) for clave in sorted(claves, key=len, reverse=True)))
+
+
+def _parrafos(contenedor) -> Iterator:
+    """Párrafos del contenedor (body, hdr, ftr o celda), entrando en tablas anidadas."""
+    for hijo in contenedor.iterchildren(_W_P, _W_TBL):
+        if hijo.tag == _W_P:
+            yield hijo
+            continue
+        for fila in hijo.iterchildren(_W_TR):
+            for celda in fila.iterchildren(_W_TC):
+                yield from _parrafos(celda)
+
+
+def _segmentos(parrafo) -> Tuple[str, List[Tuple[object, int]]]:
     """
-    Reemplaza todos los placeholders en un documento Word.
-    Esta lógica está basada en la versión original y funcional del main.py.
-    Maneja correctamente runs fragmentados y preserva el formato.
+    Texto del párrafo y, por cada <w:t>, (elemento, posición de inicio).
+    Solo runs directos del párrafo, como Paragraph.runs de python-docx.
     """
+    partes = []
+    nodos = []
+    posicion = 0
+    for run in parrafo.iterchildren(_W_R):
+        for hijo in run.iterchildren():
+            if hijo.tag == _W_T:
+                texto = hijo.text or ''
+                nodos.append((hijo, posicion))
+                partes.append(texto)
+                posicion += len(texto)
+            elif hijo.tag != _W_RPR:
+                partes.append(_SEPARADOR)
+                posicion += 1
+    return ''.join(partes), nodos
 
-    def reemplazar_en_parrafo(parrafo):
-        texto_completo = ''.join(run.text for run in parrafo.runs)
-        
-        # Si no hay nada que reemplazar, salimos para no alterar el formato
-        if not any(key in texto_completo for key in reemplazos.keys()):
-            return
-
-        # Realizamos todos los reemplazos en la cadena de texto
-        for key, value in reemplazos.items():
-            texto_completo = texto_completo.replace(key, str(value or ''))
-
-        # Preservamos el formato del primer 'run' del párrafo
-        if len(parrafo.runs) > 0:
-            primer_run = parrafo.runs[0]
-            fuente_nombre = primer_run.font.name
-            fuente_tamanio = primer_run.font.size
-            es_negrita = primer_run.bold
-            es_cursiva = primer_run.italic
-            es_subrayado = primer_run.underline
-
-            # Limpiamos todos los runs del párrafo
-            for run in parrafo.runs:
-                run.text = ''
-            
-            # Añadimos un nuevo run con el texto completo y aplicamos el formato guardado
-            nuevo_run = parrafo.add_run(texto_completo)
-            if fuente_nombre:
-                nuevo_run.font.name = fuente_nombre
-            if fuente_tamanio:
-                nuevo_run.font.size = fuente_tamanio
-            if es_negrita is not None:
-                nuevo_run.bold = es_negrita
-            if es_cursiva is not None:
-                nuevo_run.italic = es_cursiva
-            if es_subrayado is not None:
-                nuevo_run.underline = es_subrayado
-
-    def reemplazar_en_tabla(tabla):
-        for fila in tabla.rows:
-            for celda in fila.cells:
-                for parrafo in celda.paragraphs:
-                    reemplazar_en_parrafo(parrafo)
-                # Manejo de tablas anidadas
-                for tabla_anidada in celda.tables:
-                    reemplazar_en_tabla(tabla_anidada)
-
-    # --- INICIO DEL PROCESO ---
-
-    # Reemplazar en párrafos del cuerpo
-    for parrafo in doc_obj.paragraphs:
-        reemplazar_en_parrafo(parrafo)
-
-    # Reemplazar en tablas del cuerpo
-    for tabla in doc_obj.tables:
-        reemplazar_en_tabla(tabla)
-
-    # Reemplazar en encabezados y pies de página
-    for seccion in doc_obj.sections:
-        for parrafo in seccion.header.paragraphs:
-            reemplazar_en_parrafo(parrafo)
-        for tabla in seccion.header.tables:
-            reemplazar_en_tabla(tabla)
-        for parrafo in seccion.footer.paragraphs:
-            reemplazar_en_parrafo(parrafo)
-        for tabla in seccion.footer.tables:
-            reemplazar_en_tabla(tabla)
 
+def _asignar_texto(nodo, texto: str):
+    nodo.text = texto
+    if texto != texto.strip():
+        nodo.set(_XML_SPACE, 'preserve')
+
+
+def _reemplazar_en_parrafo(parrafo, patron: re.Pattern, valores: dict) -> int:
+    texto, nodos = _segmentos(parrafo)
+    if '{{' not in texto:
+        return 0
+    coincidencias = list(patron.finditer(texto))
+    if not coincidencias:
+        return 0
+
+    # De atrás hacia adelante: las posiciones de las coincidencias previas no cambian
+    for coincidencia in reversed(coincidencias):
+        inicio, fin = coincidencia.span()
+        primero = True
+        for nodo, inicio_nodo in nodos:
+            texto_nodo = nodo.text or ''
+            fin_nodo = inicio_nodo + len(texto_nodo)
+            if fin_nodo <= inicio or inicio_nodo >= fin:
+                continue
+            desde = max(inicio, inicio_nodo) - inicio_nodo
+            hasta = min(fin, fin_nodo) - inicio_nodo
+            valor = valores[coincidencia.group()] if primero else ''
+            _asignar_texto(nodo, texto_nodo[:desde] + valor + texto_nodo[hasta:])
+            primero = False
+    return len(coincidencias)
+
+
+def _partes_encabezado_pie(doc_obj) -> Iterator:
+    for relacion in doc_obj.part.rels.values():
+        if relacion.is_external or relacion.reltype not in (RT.HEADER, RT.FOOTER):
+            continue
+        yield relacion.target_part.element
+
+
+def reemplazar_placeholders_docx(doc_obj, reemplazos: dict) -> int:
+    """
+    Reemplaza todos los placeholders en un documento Word (python-docx).
+    Retorna la cantidad de placeholders reemplazados.
+    """
+    if not reemplazos:
+        return 0
+    patron = _patron_claves(tuple(reemplazos))
+    valores = {clave: str(valor or '') for clave, valor in reemplazos.items()}
+
+    total = 0
+    for contenedor in (doc_obj.element.body, *_partes_encabezado_pie(doc_obj)):
+        for parrafo in _parrafos(contenedor):
+            total += _reemplazar_en_parrafo(parrafo, patron, valores)
+    return total
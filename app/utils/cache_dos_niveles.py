@@ -0,0 +1,175 @@
+# app/utils/cache_dos_niveles.py
+"""
+Cache de dos niveles para resultados serializables a JSON:
+- Nivel 1: LRU en memoria (por proceso)
+- Nivel 2: directorio en disco acotado por tamaño, compartido entre procesos
+  y persistente entre reinicios
+
+Las escrituras en disco son atómicas (archivo temporal + os.replace), así que
+varios workers de uvicorn pueden compartir el mismo directorio.
+
+CacheBinariaDosNiveles es la misma cache para valores bytes (p. ej. un .docx
+generado), guardados tal cual en disco.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class CacheDosNiveles:
+    EXTENSION = '.json'
+
+    def __init__(self, directorio: str, max_entradas_memoria: int, max_bytes_disco: int):
+        self.directorio = directorio
+        self.max_entradas_memoria = max_entradas_memoria
+        self.max_bytes_disco = max_bytes_disco
+
+        self._memoria: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._contadores = {
+            "hits_memoria": 0,
+            "hits_disco": 0,
+            "misses": 0,
+            "escrituras": 0,
+            "desalojos_disco": 0,
+        }
+
+        os.makedirs(self.directorio, exist_ok=True)
+        self._bytes_disco = self._medir_disco()
+
+    # ---------- helpers de disco ----------
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, clave[:2], f"{clave}{self.EXTENSION}")
+
+    def _entradas_disco(self):
+        for subdirectorio in os.scandir(self.directorio):
+            if subdirectorio.is_dir():
+                for entrada in os.scandir(subdirectorio.path):
+                    if entrada.name.endswith(self.EXTENSION):
+                        yield entrada
+
+    def _medir_disco(self) -> int:
+        return sum(entrada.stat().st_size for entrada in self._entradas_disco())
+
+    def _desalojar_disco(self):
+        """Elimina las entradas menos usadas (mtime más antiguo) hasta quedar en el 90% del límite."""
+        entradas = sorted(self._entradas_disco(), key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in entradas)
+        objetivo = int(self.max_bytes_disco * 0.9)
+        for entrada in entradas:
+            if total <= objetivo:
+                break
+            try:
+                tamano = entrada.stat().st_size
+                os.remove(entrada.path)
+                total -= tamano
+                self._contadores["desalojos_disco"] += 1
+            except OSError:
+                pass
+        self._bytes_disco = total
+
+    # ---------- API pública ----------
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        with self._lock:
+            if clave in self._memoria:
+                self._memoria.move_to_end(clave)
+                self._contadores["hits_memoria"] += 1
+                return self._memoria[clave]
+
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'rb') as f:
+                valor = self._deserializar(f.read())
+            os.utime(ruta)  # marca de uso reciente para el desalojo
+        except (OSError, ValueError):
+            with self._lock:
+                self._contadores["misses"] += 1
+            return None
+
+        with self._lock:
+            self._contadores["hits_disco"] += 1
+            self._guardar_memoria(clave, valor)
+        return valor
+
+    def guardar(self, clave: str, valor: Any):
+        with self._lock:
+            self._guardar_memoria(clave, valor)
+            self._contadores["escrituras"] += 1
+
+        ruta = self._ruta(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        datos = self._serializar(valor)
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                f.write(datos)
+            os.replace(temporal, ruta)
+        except OSError:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return
+
+        with self._lock:
+            self._bytes_disco += len(datos)
+            if self._bytes_disco > self.max_bytes_disco:
+                self._desalojar_disco()
+
+    def descartar(self, clave: str):
+        with self._lock:
+            self._memoria.pop(clave, None)
+        ruta = self._ruta(clave)
+        try:
+            tamano = os.path.getsize(ruta)
+            os.remove(ruta)
+        except OSError:
+            return
+        with self._lock:
+            self._bytes_disco -= tamano
+
+    def _serializar(self, valor: Any) -> bytes:
+        return json.dumps(valor, ensure_ascii=False).encode('utf-8')
+
+    def _deserializar(self, datos: bytes) -> Any:
+        return json.loads(datos)
+
+    def _guardar_memoria(self, clave: str, valor: Any):
+        self._memoria[clave] = valor
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas_memoria:
+            self._memoria.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._memoria.clear()
+            shutil.rmtree(self.directorio, ignore_errors=True)
+            os.makedirs(self.directorio, exist_ok=True)
+            self._bytes_disco = 0
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self._contadores["hits_memoria"] + self._contadores["hits_disco"] + self._contadores["misses"]
+            aciertos = self._contadores["hits_memoria"] + self._contadores["hits_disco"]
+            return {
+                **self._contadores,
+                "tasa_aciertos": round(aciertos / consultas, 4) if consultas else 0.0,
+                "entradas_memoria": len(self._memoria),
+                "bytes_disco": self._bytes_disco,
+                "max_bytes_disco": self.max_bytes_disco,
+            }
+
+
+class CacheBinariaDosNiveles(CacheDosNiveles):
+    EXTENSION = '.bin'
+
+    def _serializar(self, valor: bytes) -> bytes:
+        return bytes(valor)
+
+    def _deserializar(self, datos: bytes) -> bytes:
+        return datos
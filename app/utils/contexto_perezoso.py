@@ -0,0 +1,105 @@
+# app/utils/contexto_perezoso.py
+"""
+Contexto de plantilla con valores derivados perezosos.
+
+DatosPerezosos es un dict: los valores que vienen tal cual de la solicitud
+o de la BD se guardan de entrada, y los derivados (CUI en letras, edades,
+fechas largas, nombre en título...) se registran como (función, *argumentos)
+y se calculan la primera vez que la plantilla los pide. El resultado queda
+guardado, así que cada valor se calcula a lo sumo una vez por contexto y
+los que la plantilla no usa no se calculan.
+
+Jinja resuelve colaborador.cui_letras con getattr y después con
+colaborador['cui_letras'], que cae en __missing__. El primer nivel del
+contexto tiene que ser un dict común (Template.render lo copia con dict()),
+por eso las perezosas son las secciones (colaborador, empresa...).
+
+Para hashear el contexto o mandarlo a otro proceso está materializar(): con
+las rutas del índice de la plantilla calcula solo lo que esta usa.
+"""
+
+from typing import Iterable, Optional, Tuple
+
+
+class DatosPerezosos(dict):
+    def __init__(self, valores: Optional[dict] = None, **proveedores: Tuple):
+        super().__init__(valores or {})
+        self._proveedores = proveedores
+
+    def __missing__(self, clave):
+        try:
+            funcion, *argumentos = self._proveedores.pop(clave)
+        except KeyError:
+            raise KeyError(clave) from None
+        valor = self[clave] = funcion(*argumentos)
+        return valor
+
+    def __contains__(self, clave):
+        return dict.__contains__(self, clave) or clave in self._proveedores
+
+    def get(self, clave, defecto=None):
+        return self[clave] if clave in self else defecto
+
+    def pendientes(self):
+        """Claves derivadas que todavía no se calcularon."""
+        return list(self._proveedores)
+
+    def resolver(self) -> 'DatosPerezosos':
+        """Calcula todos los valores pendientes."""
+        for clave in self.pendientes():
+            self[clave]
+        return self
+
+    # Comparar, copiar o serializar ve el dict completo, como si no fuera perezoso
+    def __eq__(self, otro):
+        if not isinstance(otro, dict):
+            return NotImplemented
+        if isinstance(otro, DatosPerezosos):
+            otro.resolver()
+        return dict.__eq__(self.resolver(), otro)
+
+    def __ne__(self, otro):
+        igual = self.__eq__(otro)
+        return igual if igual is NotImplemented else not igual
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return dict, (materializar(self),)
+
+
+def _resolver_todo(valor):
+    if isinstance(valor, DatosPerezosos):
+        valor.resolver()
+    if isinstance(valor, dict):
+        for hijo in dict.values(valor):
+            _resolver_todo(hijo)
+
+
+def _copiar(valor):
+    if isinstance(valor, dict):
+        return {clave: _copiar(hijo) for clave, hijo in dict.items(valor)}
+    return valor
+
+
+def materializar(context: dict, rutas: Optional[Iterable[str]] = None) -> dict:
+    """
+    Copia del contexto hecha solo de dicts comunes.
+    - Sin rutas: se calculan todos los valores
+    - Con rutas ("colaborador.cui_letras", ...): solo los que alcanzan esas
+      rutas (una ruta que termina en una sección la calcula entera); los
+      demás derivados pendientes quedan fuera de la copia
+    """
+    if rutas is None:
+        _resolver_todo(context)
+        return _copiar(context)
+
+    for ruta in rutas:
+        valor = context
+        for segmento in ruta.split('.'):
+            if not isinstance(valor, dict) or segmento not in valor:
+                break
+            valor = valor[segmento]
+        else:
+            _resolver_todo(valor)
+    return _copiar(context)
@@ -0,0 +1,75 @@
+# app/utils/documento_memoria.py
+"""
+Documentos generados en memoria.
+
+La generación guarda el .docx en un BytesIO en lugar del directorio de
+trabajo: dos solicitudes para el mismo colaborador ya no se pisan el archivo
+y no hay ida y vuelta a disco. El mismo buffer se usa para el hash, la
+subida a OneDrive y la respuesta HTTP, a través de vistas (memoryview) sin
+copiarlo.
+"""
+
+import io
+import zipfile
+from dataclasses import dataclass
+from typing import Iterator, Sequence
+from urllib.parse import quote
+
+from fastapi.responses import StreamingResponse
+
+MEDIA_TYPE_DOCX = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+MEDIA_TYPE_PDF = 'application/pdf'
+MEDIA_TYPE_ZIP = 'application/zip'
+
+# Starlette exige bytes por bloque: se copia de a un bloque, nunca el documento entero
+TAMANO_BLOQUE_RESPUESTA = 64 * 1024
+
+
+@dataclass
+class DocumentoGenerado:
+    nombre_archivo: str
+    buffer: io.BytesIO
+
+    @property
+    def contenido(self) -> memoryview:
+        """Vista de solo lectura del documento (sin copia)."""
+        return self.buffer.getbuffer().toreadonly()
+
+    @property
+    def tamano(self) -> int:
+        return self.buffer.getbuffer().nbytes
+
+
+def guardar_en_memoria(doc, nombre_archivo: str) -> DocumentoGenerado:
+    """Guarda un documento (python-docx o docxtpl) en un buffer nuevo."""
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return DocumentoGenerado(nombre_archivo=nombre_archivo, buffer=buffer)
+
+
+def comprimir_documentos(documentos: Sequence[DocumentoGenerado], nombre_archivo: str) -> DocumentoGenerado:
+    """ZIP en memoria con varios documentos (p. ej. el .docx y su PDF)."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as comprimido:
+        for documento in documentos:
+            comprimido.writestr(documento.nombre_archivo, documento.contenido)
+    return DocumentoGenerado(nombre_archivo=nombre_archivo, buffer=buffer)
+
+
+def _bloques(contenido: memoryview) -> Iterator[bytes]:
+    for inicio in range(0, len(contenido), TAMANO_BLOQUE_RESPUESTA):
+        yield bytes(contenido[inicio:inicio + TAMANO_BLOQUE_RESPUESTA])
+
+
+def respuesta_descarga(documento: DocumentoGenerado, media_type: str = MEDIA_TYPE_DOCX) -> StreamingResponse:
+    """Respuesta de descarga del documento, servida directo desde el buffer."""
+    nombre = quote(documento.nombre_archivo)
+    if nombre != documento.nombre_archivo:
+        disposicion = f"attachment; filename*=utf-8''{nombre}"
+    else:
+        disposicion = f'attachment; filename="{documento.nombre_archivo}"'
+    return StreamingResponse(
+        _bloques(documento.contenido),
+        media_type=media_type,
+        headers={"Content-Disposition": disposicion, "Content-Length": str(documento.tamano)}
+    )
@@ -0,0 +1,234 @@
+# app/utils/formato_legal.py
+"""
+Formato de números y fechas en el español de los contratos.
+
+Lo comparten la generación V1 y V2 y el parser de OCR. No depende de
+locale.setlocale (global al proceso y no seguro entre hilos): los meses
+salen de una tabla fija.
+
+Los números en letras dan exactamente lo mismo que num2words(n, lang='es'),
+pero sin pasar por num2words en cada llamada:
+- 0..999 y los prefijos de miles (1000, 2000, ... 999000) se calculan una
+  sola vez, la primera vez que se usan
+- Cualquier número menor a un millón (días, años, edades, grupos de 4 y 5
+  dígitos del CUI, registro/folio/libro, montos) se arma con dos consultas
+- Los mayores a un millón van a num2words, memoizados
+"""
+
+import datetime
+import re
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
+from num2words import num2words
+
+MESES = (
+    'enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio',
+    'julio', 'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre'
+)
+
+_RE_FECHA_DMA = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})$')
+_RE_FECHA_ISO = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})$')
+
+# Limpieza de fechas leídas por OCR
+_RE_FECHA_COMPLETA = re.compile(r'^\d{1,2}/\d{1,2}/\d{4}$')
+_RE_FECHA_SIN_SEPARADORES = re.compile(r'^\d{8}$')
+_RE_FECHA_PARCIAL = re.compile(r'^(\d{3,4})/(\d{4})$')
+_TRADUCCION_FECHA = str.maketrans({'h': '1', 'H': '1', 'o': '0', 'O': '0'})
+
+
+# =============================================
+# NÚMEROS EN LETRAS
+# =============================================
+
+@lru_cache(maxsize=1)
+def _tablas() -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """(0..999 en letras, prefijo de cada múltiplo de mil); se arma una sola vez."""
+    unidades = tuple(num2words(n, lang='es') for n in range(1000))
+    miles = ('',) + tuple(num2words(n * 1000, lang='es') for n in range(1, 1000))
+    return unidades, miles
+
+
+@lru_cache(maxsize=1024)
+def _numero_grande(n: int) -> str:
+    return num2words(n, lang='es')
+
+
+def numero_a_letras(n: int) -> str:
+    """Igual que num2words(n, lang='es') para enteros."""
+    if 0 <= n < 1_000_000:
+        unidades, miles = _tablas()
+        if n < 1000:
+            return unidades[n]
+        millar, resto = divmod(n, 1000)
+        return f"{miles[millar]} {unidades[resto]}" if resto else miles[millar]
+    return _numero_grande(n)
+
+
+def digitos_en_letras(digitos: str) -> str:
+    """Cada dígito en letras, separados por espacio ("12" → "uno dos"); ignora lo demás."""
+    unidades = _tablas()[0]
+    return ' '.join(unidades[ord(c) - 48] for c in digitos if c in '0123456789')
+
+
+def texto_a_letras(valor) -> str:
+    """Número en letras si el texto es solo dígitos; si no, el texto tal cual."""
+    if not valor:
+        return ''
+    texto = str(valor)
+    return numero_a_letras(int(texto)) if texto.isdigit() else texto
+
+
+def cui_en_letras(cui: str) -> str:
+    """
+    CUI de 13 dígitos en letras por grupos (4-5-4) separados por "espacio";
+    con otra longitud, dígito por dígito.
+    """
+    cui = cui.replace(' ', '').replace('-', '')
+    if len(cui) != 13:
+        return digitos_en_letras(cui)
+    return (f"{numero_a_letras(int(cui[0:4]))} espacio {numero_a_letras(int(cui[4:9]))} "
+            f"espacio {numero_a_letras(int(cui[9:13]))}")
+
+
+def cui_formateado(cui: str) -> str:
+    """CUI de 13 dígitos como "1234 56789 0123"; con otra longitud, sin cambios."""
+    cui = cui.replace(' ', '').replace('-', '')
+    if len(cui) != 13:
+        return cui
+    return f"{cui[0:4]} {cui[4:9]} {cui[9:13]}"
+
+
+def monto_en_letras(monto: Union[int, float]) -> str:
+    """
+    Monto en quetzales en mayúsculas: "MIL QUINIENTOS QUETZALES EXACTOS" o,
+    con centavos, "MIL QUINIENTOS QUETZALES CON 50/100".
+    """
+    centavos_totales = round(monto * 100)
+    entero, centavos = divmod(centavos_totales, 100)
+    letras = numero_a_letras(entero).upper()
+    if centavos:
+        return f"{letras} QUETZALES CON {centavos:02d}/100"
+    return f"{letras} QUETZALES EXACTOS"
+
+
+# =============================================
+# FECHAS
+# =============================================
+
+def parsear_fecha(texto) -> Optional[datetime.date]:
+    """
+    Fecha en dd/mm/aaaa (la del OCR) o aaaa-mm-dd (la de los formularios).
+    Retorna None si no es una fecha válida. Reemplaza los intentos
+    encadenados de strptime con "%d/%m/%Y" y "%Y-%m-%d".
+    """
+    if isinstance(texto, datetime.datetime):
+        return texto.date()
+    if isinstance(texto, datetime.date):
+        return texto
+    if not texto:
+        return None
+
+    texto = str(texto).strip()
+    try:
+        match = _RE_FECHA_DMA.match(texto)
+        if match:
+            return datetime.date(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+        match = _RE_FECHA_ISO.match(texto)
+        if match:
+            return datetime.date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    except ValueError:
+        pass
+    return None
+
+
+def limpiar_fecha_ocr(fecha_raw):
+    """
+    Limpia fechas mal formateadas por OCR.
+    Formato guatemalteco: dd/mm/aaaa (día/mes/año)
+    """
+    if not fecha_raw:
+        return fecha_raw
+
+    fecha = str(fecha_raw).strip()
+
+    # PRIMERO: Corregir caracteres mal leídos por OCR
+    fecha = fecha.translate(_TRADUCCION_FECHA)
+
+    # Si ya tiene formato correcto dd/mm/aaaa, retornar
+    if _RE_FECHA_COMPLETA.match(fecha):
+        return fecha
+
+    # Si solo tiene números sin separadores (ej: 13102025)
+    if _RE_FECHA_SIN_SEPARADORES.match(fecha):
+        return f"{fecha[:2]}/{fecha[2:4]}/{fecha[4:]}"
+
+    # Si tiene formato parcial sin / entre día y mes (ej: 1310/2025 o 120/2026)
+    match = _RE_FECHA_PARCIAL.match(fecha)
+    if match:
+        sin_anio = match.group(1)
+        anio = match.group(2)
+        dia = sin_anio[:2]
+        mes = sin_anio[2:]
+        # 3 dígitos (ej: 120 -> 12/10): si el mes es 0, probablemente es 10
+        if mes == '0':
+            mes = '10'
+        return f"{dia}/{mes}/{anio}"
+
+    return fecha
+
+
+def mes_en_letras(fecha: datetime.date) -> str:
+    return MESES[fecha.month - 1]
+
+
+def fecha_larga(fecha) -> str:
+    """"el quince (15) de marzo de 2020"; vacío si no es una fecha."""
+    if not isinstance(fecha, datetime.date):
+        return ""
+    return f"el {numero_a_letras(fecha.day)} ({fecha.day}) de {MESES[fecha.month - 1]} de {fecha.year}"
+
+
+def fecha_contrato_en_letras(fecha: datetime.date) -> str:
+    """"el veintinueve (29) de enero del año dos mil veinticinco (2025)"."""
+    return (f"el {numero_a_letras(fecha.day)} ({fecha.day}) de {MESES[fecha.month - 1]} "
+            f"del año {numero_a_letras(fecha.year)} ({fecha.year})")
+
+
+# =====================================================================
+# FILTROS JINJA (plantillas V2)
+# =====================================================================
+# {{ representante.cui | letras_cui }}, {{ colaborador.edad | letras }}...
+# Memoizados: el mismo valor usado en varias partes se formatea una vez.
+
+@lru_cache(maxsize=256)
+def _filtro_letras_cui(valor) -> str:
+    texto = str(valor or '')
+    return cui_en_letras(texto) if texto.isdigit() else ''
+
+
+@lru_cache(maxsize=256)
+def _filtro_cui_formateado(valor) -> str:
+    texto = str(valor or '')
+    return cui_formateado(texto) if texto.isdigit() else texto
+
+
+@lru_cache(maxsize=256)
+def _filtro_fecha_larga(valor) -> str:
+    return fecha_larga(parsear_fecha(valor))
+
+
+@lru_cache(maxsize=256)
+def _filtro_fecha_letras(valor) -> str:
+    fecha = parsear_fecha(valor)
+    return fecha_contrato_en_letras(fecha) if fecha is not None else str(valor or '')
+
+
+FILTROS_JINJA = {
+    'letras': lru_cache(maxsize=256)(texto_a_letras),
+    'letras_cui': _filtro_letras_cui,
+    'cui_formateado': _filtro_cui_formateado,
+    'fecha_larga': _filtro_fecha_larga,
+    'fecha_letras': _filtro_fecha_letras,
+    'titulo': lambda valor: str(valor).title() if valor else '',
+}
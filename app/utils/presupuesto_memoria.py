@@ -0,0 +1,66 @@
+# app/utils/presupuesto_memoria.py
+"""
+Semáforo ponderado en bytes para acotar la memoria de trabajo simultánea.
+
+Cada tarea reserva su consumo estimado antes de empezar y lo libera al
+terminar. Si no alcanza el presupuesto, la tarea espera (en el event loop,
+sin ocupar un hilo del threadpool) hasta que otras liberen. Una tarea más
+grande que todo el presupuesto corre sola en lugar de esperar para siempre.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+
+class PresupuestoMemoria:
+
+    def __init__(self, limite_bytes: int):
+        self.limite_bytes = max(1, limite_bytes)
+        self._en_uso = 0
+        self._condicion: Optional[asyncio.Condition] = None
+        self._contadores = {
+            "reservas": 0,
+            "esperas": 0,
+            "en_espera": 0,
+            "maximo_en_uso": 0,
+        }
+
+    def _obtener_condicion(self) -> asyncio.Condition:
+        # Creación perezosa: se asocia al event loop que la usa por primera vez
+        if self._condicion is None:
+            self._condicion = asyncio.Condition()
+        return self._condicion
+
+    @asynccontextmanager
+    async def reservar(self, cantidad: int):
+        cantidad = min(max(0, int(cantidad)), self.limite_bytes)
+        condicion = self._obtener_condicion()
+        async with condicion:
+            self._contadores["reservas"] += 1
+            if self._en_uso + cantidad > self.limite_bytes:
+                self._contadores["esperas"] += 1
+                self._contadores["en_espera"] += 1
+                try:
+                    await condicion.wait_for(lambda: self._en_uso + cantidad <= self.limite_bytes)
+                finally:
+                    self._contadores["en_espera"] -= 1
+            self._en_uso += cantidad
+            self._contadores["maximo_en_uso"] = max(self._contadores["maximo_en_uso"], self._en_uso)
+        try:
+            yield
+        finally:
+            async with condicion:
+                self._en_uso -= cantidad
+                condicion.notify_all()
+
+    def estado(self) -> Dict[str, int]:
+        """Bytes reservados, límite y contadores de espera."""
+        return {
+            "limite_mb": round(self.limite_bytes / (1024 * 1024), 1),
+            "en_uso_mb": round(self._en_uso / (1024 * 1024), 1),
+            "maximo_en_uso_mb": round(self._contadores["maximo_en_uso"] / (1024 * 1024), 1),
+            "reservas": self._contadores["reservas"],
+            "esperas": self._contadores["esperas"],
+            "en_espera": self._contadores["en_espera"],
+        }
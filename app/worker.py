@@ -0,0 +1,206 @@
+# app/worker.py
+"""
+Worker de trabajos en segundo plano.
+
+Corre como proceso independiente de la API:
+
+    python -m app.worker
+
+Toma trabajos de la cola durable (cola_trabajos), ejecuta el OCR, el flujo
+completo o el re-parseo de layouts guardados y publica cada etapa como evento. Tiene su propio pool de OCR, así
+que se puede escalar (más procesos, más OCR_WORKERS) sin afectar a la API.
+"""
+
+import asyncio
+import os
+import signal
+import socket
+import time
+import traceback
+from typing import Any, Dict
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import TRABAJOS_CONCURRENCIA, TRABAJOS_LEASE_SEGUNDOS
+from app.db.session import SessionLocal
+from app.services.cola_trabajos import TIPOS_REINTENTABLES, cola_trabajos
+from app.services.conversion_pdf import pool_pdf
+from app.services.ejecutor_ocr import ejecutor_ocr
+from app.services.flujo_documento import servicio_flujo_documento
+from app.services.reparseo_ocr import servicio_reparseo_ocr
+from app.services.servicio_ocr import servicio_ocr, documento_procesado
+
+INTERVALO_SONDEO_SEGUNDOS = 1.0
+INTERVALO_PURGA_SEGUNDOS = 3600
+# Renovar bastante antes de que venza: una etapa larga (OCR de un PDF de muchas páginas) no publica eventos
+INTERVALO_RENOVACION_SEGUNDOS = TRABAJOS_LEASE_SEGUNDOS / 3
+
+
+class SeguimientoTrabajo:
+    """
+    Publica las etapas de un trabajo en orden y renueva su lease mientras
+    corre. Las escrituras en SQLite (BEGIN IMMEDIATE, hasta 30 s esperando
+    el lock) van por el threadpool, no en el event loop.
+    """
+
+    def __init__(self, trabajo: Dict[str, Any]):
+        self.trabajo_id = trabajo["id"]
+        self.worker = trabajo["worker"]
+        self.perdido = False
+        self._etapas: "asyncio.Queue" = asyncio.Queue()
+        self._tareas = [asyncio.ensure_future(self._publicar()), asyncio.ensure_future(self._renovar())]
+
+    def progreso(self, etapa: str, mensaje: str):
+        self._etapas.put_nowait((etapa, mensaje))
+
+    def _lease_perdido(self):
+        if not self.perdido:
+            self.perdido = True
+            print(f"⚠️ Trabajo {self.trabajo_id}: el lease pasó a otro worker, sus eventos ya no se publican")
+
+    async def _publicar(self):
+        while True:
+            etapa, mensaje = await self._etapas.get()
+            try:
+                if not await run_in_threadpool(cola_trabajos.registrar_etapa, self.trabajo_id, self.worker, etapa, mensaje):
+                    self._lease_perdido()
+            except Exception as e:
+                print(f"⚠️ Trabajo {self.trabajo_id}: no se pudo publicar la etapa {etapa}: {e}")
+            finally:
+                self._etapas.task_done()
+
+    async def _renovar(self):
+        while True:
+            await asyncio.sleep(INTERVALO_RENOVACION_SEGUNDOS)
+            try:
+                if not await run_in_threadpool(cola_trabajos.renovar_lease, self.trabajo_id, self.worker):
+                    self._lease_perdido()
+                    return
+            except Exception as e:
+                print(f"⚠️ Trabajo {self.trabajo_id}: no se pudo renovar el lease: {e}")
+
+    async def cerrar(self):
+        """Espera a que se publiquen las etapas pendientes y deja de renovar."""
+        if not self._tareas:
+            return
+        await self._etapas.join()
+        for tarea in self._tareas:
+            tarea.cancel()
+        self._tareas = []
+
+
+async def _ejecutar_ocr(trabajo: Dict[str, Any], contenido: bytes, progreso) -> Dict[str, Any]:
+    progreso("ocr", "Procesando imagen con OCR")
+    resultado = await servicio_ocr.procesar(contenido, perfil=trabajo["parametros"].get("perfil"))
+    return {"documento": documento_procesado(resultado).model_dump(by_alias=True)}
+
+
+async def _ejecutar_flujo(trabajo: Dict[str, Any], contenido: bytes, progreso) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        return await servicio_flujo_documento.ejecutar(
+            db,
+            contenido=contenido,
+            nombre_imagen=trabajo["nombre_archivo"],
+            progreso=progreso,
+            **trabajo["parametros"]
+        )
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def _ejecutar_reparseo(trabajo: Dict[str, Any], contenido: bytes, progreso) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        return await servicio_reparseo_ocr.reparsear(db, progreso=progreso, **trabajo["parametros"])
+    finally:
+        db.close()
+
+
+MANEJADORES = {
+    "ocr": _ejecutar_ocr,
+    "flujo": _ejecutar_flujo,
+    "reparseo": _ejecutar_reparseo,
+}
+
+async def procesar_trabajo(trabajo: Dict[str, Any]):
+    trabajo_id = trabajo["id"]
+    print(f"▶️ Trabajo {trabajo_id} ({trabajo['tipo']}), intento {trabajo['intentos']}")
+    inicio = time.time()
+    worker = trabajo["worker"]
+    seguimiento = SeguimientoTrabajo(trabajo)
+    try:
+        contenido = await run_in_threadpool(cola_trabajos.leer_entrada, trabajo_id)
+        resultado = await MANEJADORES[trabajo["tipo"]](trabajo, contenido, seguimiento.progreso)
+        await seguimiento.cerrar()
+        if await run_in_threadpool(cola_trabajos.completar, trabajo_id, worker, resultado):
+            print(f"✅ Trabajo {trabajo_id} completado en {time.time() - inicio:.1f}s")
+        else:
+            print(f"⚠️ Trabajo {trabajo_id} terminado, pero ya no era de este worker: resultado descartado")
+    except HTTPException as e:
+        # 503 = pool saturado, vale la pena reintentar; el resto son errores del documento
+        await seguimiento.cerrar()
+        await run_in_threadpool(cola_trabajos.fallar, trabajo_id, worker, str(e.detail), e.status_code == 503)
+        print(f"❌ Trabajo {trabajo_id}: {e.detail}")
+    except Exception as e:
+        # El flujo sube archivos a OneDrive: reintentarlo podría duplicarlos
+        await seguimiento.cerrar()
+        await run_in_threadpool(
+            cola_trabajos.fallar, trabajo_id, worker, str(e), trabajo["tipo"] in TIPOS_REINTENTABLES
+        )
+        print(f"❌ Trabajo {trabajo_id}: {str(e)}")
+        traceback.print_exc()
+    finally:
+        await seguimiento.cerrar()
+
+
+async def ejecutar_worker(concurrencia: int = TRABAJOS_CONCURRENCIA):
+    nombre = f"{socket.gethostname()}-{os.getpid()}"
+    detener = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(senal, detener.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    print("\n" + "="*70)
+    print(f"👷 WORKER DE TRABAJOS: {nombre} (concurrencia {concurrencia})")
+    print("="*70 + "\n")
+
+    en_curso = set()
+    ultima_purga = 0.0
+    while not detener.is_set():
+        if time.time() - ultima_purga > INTERVALO_PURGA_SEGUNDOS:
+            eliminados = await run_in_threadpool(cola_trabajos.purgar_antiguos)
+            if eliminados:
+                print(f"🗑️ {eliminados} trabajos antiguos eliminados")
+            ultima_purga = time.time()
+
+        if len(en_curso) < concurrencia:
+            trabajo = await run_in_threadpool(cola_trabajos.tomar, nombre)
+            if trabajo is not None:
+                en_curso.add(asyncio.ensure_future(procesar_trabajo(trabajo)))
+                continue
+
+        # Sin trabajo nuevo (o sin capacidad): esperar a que algo termine o al próximo sondeo
+        espera = asyncio.ensure_future(detener.wait())
+        terminadas, _ = await asyncio.wait(
+            en_curso | {espera}, timeout=INTERVALO_SONDEO_SEGUNDOS, return_when=asyncio.FIRST_COMPLETED
+        )
+        espera.cancel()
+        en_curso -= terminadas
+
+    print("⏹️ Deteniendo worker, esperando trabajos en curso...")
+    if en_curso:
+        await asyncio.wait(en_curso)
+    ejecutor_ocr.cerrar()
+    pool_pdf.cerrar()  # también borra los perfiles de LibreOffice de este proceso
+
+
+if __name__ == "__main__":
+    asyncio.run(ejecutar_worker())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# benchmarks/bench_cache_generacion.py
+"""
+Mide la cache de documentos generados (app/services/cache_generacion.py)
+con ServicioDocumentoV2.generar_documento:
+- Verifica que un acierto devuelva el mismo .docx que el render, que
+  cambiar un campo que la plantilla usa cambie la clave y que cambiar uno
+  que no usa no la cambie
+- Compara el tiempo de generar con render (miss), desde memoria y desde
+  disco (otra instancia, como otro worker de uvicorn o tras un reinicio),
+  y el costo de calcular la clave
+
+Ejecutar:
+    python benchmarks/bench_cache_generacion.py                  # plantilla de templates/
+    python benchmarks/bench_cache_generacion.py plantilla.docx   # plantilla real
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_contexto_perezoso import datos_solicitud
+
+REPETICIONES = 20
+REPETICIONES_CLAVE = 200
+PLANTILLA_POR_DEFECTO = os.path.join(os.path.dirname(__file__), '..', 'templates', 'plantilla_20251018_233037.docx')
+
+
+def _medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+
+def _con_cambio(solicitud, campo, valor):
+    otra = solicitud.model_copy(deep=True)
+    setattr(otra.colaborador_data.datos_persona, campo, valor)
+    return otra
+
+
+def main():
+    import app.services.documento_v2 as modulo_documento
+    from app.services.cache_generacion import CacheGeneracion
+    from app.services.cache_plantillas import CachePlantillas
+
+    ruta = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else PLANTILLA_POR_DEFECTO)
+
+    print("\n" + "="*70)
+    print("BENCHMARK: CACHE DE DOCUMENTOS GENERADOS (render vs memoria vs disco)")
+    print("="*70)
+    print(f"  Plantilla: {os.path.basename(ruta)}")
+
+    empresa, representante, solicitud = datos_solicitud()
+    solicitud = solicitud.model_copy(update={"template_name": os.path.basename(ruta)})
+    servicio = modulo_documento.ServicioDocumentoV2()
+    servicio.obtener_empresa_representante = lambda db, empresa_id, representante_id: (empresa, representante)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        modulo_documento.cache_plantillas = CachePlantillas(directorio=os.path.dirname(ruta))
+        raiz = os.path.join(directorio, "generacion")
+
+        def generar(cache):
+            modulo_documento.cache_generacion = cache
+            return bytes(servicio.generar_documento(None, solicitud).contenido)
+
+        cache = CacheGeneracion(raiz)
+        renderizado = generar(cache)
+        desde_memoria = generar(cache)
+        desde_disco = generar(CacheGeneracion(raiz))
+
+        context = servicio.contexto_solicitud(None, solicitud)
+        clave = servicio.clave_documento(solicitud, context)
+        indice = modulo_documento.cache_plantillas.obtener(solicitud.template_name).indice
+        usados = {campo["campo"].split('.')[-1] for campo in indice["campos"] if campo["campo"].startswith('colaborador.')}
+        # edad entra a la clave en todas las plantillas que la usan; direccion solo si la plantilla la pide
+        cambios = [("edad", "35"), ("direccion", "otra dirección")]
+        comprobaciones = [
+            ("acierto en memoria = render", desde_memoria == renderizado),
+            ("acierto en disco = render", desde_disco == renderizado),
+        ]
+        for campo, valor in cambios:
+            otra = _con_cambio(solicitud, campo, valor)
+            cambia = servicio.clave_documento(otra, servicio.contexto_solicitud(None, otra)) != clave
+            usa = campo in usados or f"{campo}_letras" in usados
+            comprobaciones.append((f"{campo} {'usado' if usa else 'no usado'} → clave {'cambia' if cambia else 'igual'}",
+                                   cambia == usa))
+
+        def miss():
+            cache._documentos.limpiar()
+            generar(cache)
+
+        def disco():
+            cache._documentos._memoria.clear()  # como un proceso que no lo generó
+            generar(cache)
+
+        t_miss = _medir(miss, REPETICIONES)
+        t_memoria = _medir(lambda: generar(cache), REPETICIONES)
+        t_disco = _medir(disco, REPETICIONES)
+        t_clave = _medir(lambda: servicio.clave_documento(solicitud, servicio.contexto_solicitud(None, solicitud)),
+                         REPETICIONES_CLAVE)
+
+    print(f"\n  {'render (miss)':<22} {t_miss * 1000:8.2f} ms")
+    print(f"  {'desde memoria':<22} {t_memoria * 1000:8.2f} ms   {t_miss / t_memoria:6.1f}x")
+    print(f"  {'desde disco':<22} {t_disco * 1000:8.2f} ms   {t_miss / t_disco:6.1f}x")
+    print(f"  {'contexto + clave':<22} {t_clave * 1e6:8.1f} µs")
+
+    print()
+    for descripcion, correcto in comprobaciones:
+        print(f"  {'✅' if correcto else '❌'} {descripcion}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# benchmarks/bench_contexto_perezoso.py
+"""
+Compara el contexto perezoso de ServicioDocumentoV2.preparar_contexto
+(valores derivados calculados solo si la plantilla los pide) contra la
+versión original que calculaba todo en cada solicitud (copiada abajo):
+- Verifica que el .docx renderizado sea idéntico con ambos contextos, y
+  que los filtros Jinja (| letras_cui, | letras...) den lo mismo que los
+  campos *_letras
+- Mide el tiempo de armar el contexto y resolver los campos que usa cada
+  plantilla (pequeña, mediana, completa), y el render completo
+
+Ejecutar:
+    python benchmarks/bench_contexto_perezoso.py
+"""
+
+import datetime
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import docx
+
+REPETICIONES = 2000
+REPETICIONES_RENDER = 30
+
+CAMPOS_PEQUENA = ['colaborador.nombre_completo', 'colaborador.cui', 'colaborador.puesto', 'empresa.razon_social']
+CAMPOS_MEDIANA = CAMPOS_PEQUENA + [
+    'colaborador.direccion', 'colaborador.edad', 'representante.nombre_completo', 'representante.cui_letras',
+    'contrato.fecha', 'contrato.monto', 'fecha_inicio.completa', 'colaborador.cui_letras',
+]
+CAMPOS_COMPLETA = [
+    f'colaborador.{c}' for c in ('nombre_completo', 'nombre_completo_titulo', 'cui', 'cui_formateado', 'cui_letras',
+                                  'edad', 'edad_letras', 'direccion', 'estado_civil', 'nacionalidad', 'profesion',
+                                  'posicion', 'lugar_notificaciones', 'puesto')
+] + [
+    f'empresa.{c}' for c in ('razon_social', 'autorizada_en', 'fecha_autorizacion', 'autorizada_por', 'inscrita_en',
+                              'numero_registro', 'numero_registro_letras', 'numero_folio', 'numero_folio_letras',
+                              'numero_libro', 'numero_libro_letras', 'tipo_libro', 'lugar_notificaciones',
+                              'segundo_lugar_notificaciones')
+] + [
+    f'representante.{c}' for c in ('nombre_completo', 'edad', 'edad_letras', 'estado_civil', 'profesion',
+                                    'nacionalidad', 'cui', 'cui_formateado', 'cui_letras', 'extendido_en')
+] + [
+    'contrato.fecha', 'contrato.monto', 'contrato.monto_letras', 'contrato.tipo',
+    'fecha_inicio.dia', 'fecha_inicio.dia_letras', 'fecha_inicio.mes', 'fecha_inicio.anio',
+    'fecha_inicio.anio_letras', 'fecha_inicio.completa', 'fecha_fin.completa', 'genero', 'puesto',
+]
+# Mismos valores que los campos *_letras, con filtros
+FILTROS = {
+    '{{ representante.cui | letras_cui }}': 'representante.cui_letras',
+    '{{ colaborador.cui | cui_formateado }}': 'colaborador.cui_formateado',
+    '{{ colaborador.edad | letras }}': 'colaborador.edad_letras',
+    '{{ empresa.numero_registro | letras }}': 'empresa.numero_registro_letras',
+    '{{ colaborador.nombre_completo | titulo }}': 'colaborador.nombre_completo_titulo',
+}
+
+
+# =====================================================================
+# IMPLEMENTACIÓN ORIGINAL (todo se calcula en cada solicitud)
+# =====================================================================
+
+def _cui_letras_original(numero_str):
+    from app.utils.formato_legal import cui_en_letras
+    if not numero_str or not str(numero_str).isdigit():
+        return ''
+    return cui_en_letras(numero_str)
+
+
+def _cui_formateado_original(numero_str):
+    from app.utils.formato_legal import cui_formateado
+    if not numero_str or not str(numero_str).isdigit():
+        return numero_str or ''
+    return cui_formateado(numero_str)
+
+
+def _titulo_original(texto):
+    return texto.title() if texto else ''
+
+
+def _fecha_contrato_original(fecha_str):
+    from app.utils.formato_legal import fecha_contrato_en_letras, parsear_fecha
+    fecha = parsear_fecha(fecha_str)
+    return fecha_contrato_en_letras(fecha) if fecha is not None else fecha_str
+
+
+def _procesar_fecha_original(fecha_str):
+    from app.utils.formato_legal import mes_en_letras, numero_a_letras, parsear_fecha
+    if not fecha_str or "indefinido" in str(fecha_str).lower():
+        return {'dia': 'N/A', 'dia_letras': 'N/A', 'mes': 'N/A', 'anio': 'N/A', 'anio_letras': 'N/A',
+                'completa': 'Por tiempo indefinido'}
+    fecha = parsear_fecha(fecha_str)
+    if fecha is None:
+        return {'dia': 'N/A', 'dia_letras': 'N/A', 'mes': 'N/A', 'anio': 'N/A', 'anio_letras': 'N/A',
+                'completa': 'Fecha no especificada'}
+    mes_nombre = mes_en_letras(fecha)
+    return {'dia': fecha.day, 'dia_letras': numero_a_letras(fecha.day), 'mes': mes_nombre, 'anio': fecha.year,
+            'anio_letras': numero_a_letras(fecha.year), 'completa': f"{fecha.day} de {mes_nombre} de {fecha.year}"}
+
+
+def preparar_contexto_original(servicio, empresa, representante, solicitud):
+    from app.utils.formato_legal import fecha_larga, numero_a_letras, texto_a_letras
+    colaborador = solicitud.colaborador_data.datos_persona
+    contrato = solicitud.colaborador_data.datos_contrato
+
+    rep_edad_num = (datetime.date.today() - representante['fecha_nacimiento']).days // 365
+    rep_edad_letras = numero_a_letras(rep_edad_num)
+    rep_cui_letras = _cui_letras_original(representante['cui'])
+    rep_cui_formateado = _cui_formateado_original(representante['cui'])
+
+    num_registro_letras = texto_a_letras(empresa.get('numero_registro'))
+    num_libro_letras = texto_a_letras(empresa.get('numero_libro'))
+    num_folio_letras = texto_a_letras(empresa.get('numero_folio'))
+
+    colab_cui_letras = _cui_letras_original(colaborador.cui) if colaborador.cui else ""
+    colab_cui_formateado = _cui_formateado_original(colaborador.cui) if colaborador.cui else ""
+    colab_edad_letras = numero_a_letras(int(colaborador.edad)) if colaborador.edad and colaborador.edad.isdigit() else ""
+
+    fecha_inicio_data = _procesar_fecha_original(contrato.fecha_inicio)
+    fecha_fin_data = _procesar_fecha_original(contrato.fecha_fin)
+    fecha_contrato_formateada = _fecha_contrato_original(solicitud.fecha_contrato)
+    colab_nombre_titulo = _titulo_original(colaborador.nombre_completo)
+
+    return {
+        'colaborador': {
+            'nombre_completo': colaborador.nombre_completo or '',
+            'nombre_completo_titulo': colab_nombre_titulo,
+            'cui': colaborador.cui or '',
+            'cui_formateado': colab_cui_formateado,
+            'cui_letras': colab_cui_letras,
+            'edad': colaborador.edad or '',
+            'edad_letras': colab_edad_letras,
+            'direccion': colaborador.direccion or '',
+            'estado_civil': colaborador.estado_civil or 'Soltero',
+            'nacionalidad': colaborador.nacionalidad or 'Guatemalteco',
+            'profesion': colaborador.profesion or 'N/A',
+            'posicion': colaborador.posicion or contrato.tipo_contrato or '',
+            'lugar_notificaciones': colaborador.direccion or '',
+            'puesto': colaborador.posicion or contrato.tipo_contrato or '',
+        },
+        'empresa': {
+            'razon_social': empresa['razon_social'],
+            'autorizada_en': empresa.get('autorizada_en', ''),
+            'fecha_autorizacion': fecha_larga(empresa.get('fecha_autorizacion')),
+            'autorizada_por': empresa.get('autorizada_por', ''),
+            'inscrita_en': empresa.get('inscrita_en', ''),
+            'numero_registro': empresa.get('numero_registro', ''),
+            'numero_registro_letras': num_registro_letras,
+            'numero_folio': empresa.get('numero_folio', ''),
+            'numero_folio_letras': num_folio_letras,
+            'numero_libro': empresa.get('numero_libro', ''),
+            'numero_libro_letras': num_libro_letras,
+            'tipo_libro': empresa.get('tipo_libro', ''),
+            'lugar_notificaciones': empresa.get('lugar_notificaciones', ''),
+            'segundo_lugar_notificaciones': empresa.get('segundo_lugar_notificaciones', ''),
+        },
+        'representante': {
+            'nombre_completo': representante['nombre_completo'],
+            'edad': str(rep_edad_num),
+            'edad_letras': rep_edad_letras,
+            'estado_civil': representante.get('estado_civil', ''),
+            'profesion': representante.get('profesion', ''),
+            'nacionalidad': representante.get('nacionalidad', ''),
+            'cui': representante['cui'],
+            'cui_formateado': rep_cui_formateado,
+            'cui_letras': rep_cui_letras,
+            'extendido_en': representante.get('extendido_en', ''),
+        },
+        'contrato': {
+            'fecha': fecha_contrato_formateada,
+            'monto': contrato.monto or 'Q.0.00',
+            'monto_letras': contrato.monto_en_letras or 'CERO QUETZALES EXACTOS',
+            'tipo': contrato.tipo_contrato or 'Servicios Profesionales',
+        },
+        'fecha_inicio': fecha_inicio_data,
+        'fecha_fin': fecha_fin_data,
+        'genero': 'El Notario',
+        'puesto': colaborador.posicion or contrato.tipo_contrato or '',
+    }
+
+
+# =====================================================================
+# DATOS Y PLANTILLAS SINTÉTICAS
+# =====================================================================
+
+def datos_solicitud():
+    from app.models.documento import ContratoData, DocumentoProcesado, GenerationRequest, PersonaData
+    empresa = {
+        'razon_social': 'Servicios Integrados, S.A.', 'autorizada_en': 'Guatemala',
+        'fecha_autorizacion': datetime.date(2015, 3, 15), 'autorizada_por': 'Notario Juan López',
+        'inscrita_en': 'Registro Mercantil', 'numero_registro': '84512', 'numero_folio': '123',
+        'numero_libro': '45', 'tipo_libro': 'Sociedades', 'lugar_notificaciones': '6a avenida 10-20 zona 1',
+        'segundo_lugar_notificaciones': '',
+    }
+    representante = {
+        'nombre_completo': 'María Fernanda Ruiz', 'fecha_nacimiento': datetime.date(1978, 6, 2),
+        'estado_civil': 'casada', 'profesion': 'Abogada', 'nacionalidad': 'guatemalteca',
+        'cui': '2587456320101', 'extendido_en': 'Guatemala',
+    }
+    colaborador = DocumentoProcesado(
+        datos_persona=PersonaData(nombre_completo='JOSÉ ANTONIO PÉREZ GÓMEZ', cui='1234567890123', edad='34',
+                                  direccion='3a calle 4-56 zona 2', posicion='Analista'),
+        datos_contrato=ContratoData(fecha_inicio='01/02/2025', fecha_fin='Indefinido', monto='Q.5,000.00'),
+    )
+    solicitud = GenerationRequest(templateName='x.docx', fechaContrato='2025-01-29', empresaId=1,
+                                  representanteId=1, colaboradorData=colaborador)
+    return empresa, representante, solicitud
+
+
+def generar_plantilla(lineas) -> bytes:
+    documento = docx.Document()
+    for linea in lineas:
+        documento.add_paragraph(linea)
+    buffer = io.BytesIO()
+    documento.save(buffer)
+    return buffer.getvalue()
+
+
+def _placeholders(campos):
+    return [f"{campo}: {{{{ {campo} }}}}" for campo in campos]
+
+
+# =====================================================================
+# COMPARACIÓN
+# =====================================================================
+
+def _resolver_campos(context, campos):
+    """Lo que hace Jinja con cada {{ campo }}: bajar por la ruta."""
+    for campo in campos:
+        valor = context
+        for segmento in campo.split('.'):
+            valor = valor[segmento]
+
+
+def _medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(5):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        tiempos.append((time.perf_counter() - inicio) / repeticiones)
+    return statistics.median(tiempos)
+
+
+def _render(cache, nombre, context) -> bytes:
+    doc = cache.nueva_plantilla(nombre)
+    doc.render(context)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    with zipfile.ZipFile(io.BytesIO(buffer.getvalue())) as archivo:
+        return archivo.read('word/document.xml')
+
+
+def main():
+    from app.services.cache_plantillas import CachePlantillas
+    from app.services.documento_v2 import ServicioDocumentoV2
+
+    print("\n" + "="*70)
+    print("BENCHMARK: CONTEXTO PEREZOSO (derivados a pedido vs todo por solicitud)")
+    print("="*70)
+
+    servicio = ServicioDocumentoV2()
+    empresa, representante, solicitud = datos_solicitud()
+
+    def original():
+        return preparar_contexto_original(servicio, empresa, representante, solicitud)
+
+    def perezoso():
+        return servicio.preparar_contexto(empresa, representante, solicitud)
+
+    plantillas = [("pequeña", CAMPOS_PEQUENA), ("mediana", CAMPOS_MEDIANA), ("completa", CAMPOS_COMPLETA)]
+    diferencias = 0
+
+    with tempfile.TemporaryDirectory() as directorio:
+        cache = CachePlantillas(directorio=directorio)
+        for nombre, campos in plantillas:
+            with open(os.path.join(directorio, f"{nombre}.docx"), 'wb') as f:
+                f.write(generar_plantilla(_placeholders(campos)))
+        with open(os.path.join(directorio, "filtros.docx"), 'wb') as f:
+            f.write(generar_plantilla(list(FILTROS)))
+        with open(os.path.join(directorio, "filtros_campos.docx"), 'wb') as f:
+            f.write(generar_plantilla([f"{{{{ {campo} }}}}" for campo in FILTROS.values()]))
+
+        print(f"\n  {'plantilla':<10} {'campos':>6}   {'original':>12}   {'perezoso':>12}   {'contexto':>8}   "
+              f"{'render':>8}")
+        for nombre, campos in plantillas:
+            iguales = _render(cache, f"{nombre}.docx", original()) == _render(cache, f"{nombre}.docx", perezoso())
+            diferencias += 0 if iguales else 1
+
+            t_original = _medir(lambda: _resolver_campos(original(), campos), REPETICIONES)
+            t_perezoso = _medir(lambda: _resolver_campos(perezoso(), campos), REPETICIONES)
+            r_original = _medir(lambda: _render(cache, f"{nombre}.docx", original()), REPETICIONES_RENDER)
+            r_perezoso = _medir(lambda: _render(cache, f"{nombre}.docx", perezoso()), REPETICIONES_RENDER)
+            print(f"  {nombre:<10} {len(campos):6d}   {t_original * 1e6:9.1f} µs   {t_perezoso * 1e6:9.1f} µs   "
+                  f"{t_original / t_perezoso:7.2f}x   {r_original / r_perezoso:7.2f}x   {'✅' if iguales else '❌'}")
+
+        filtros_iguales = _render(cache, "filtros.docx", perezoso()) == _render(cache, "filtros_campos.docx", original())
+        diferencias += 0 if filtros_iguales else 1
+        print(f"\n  {'✅' if filtros_iguales else '❌'} Filtros Jinja (| letras_cui, | letras...) = campos *_letras")
+
+    print(f"  {'✅' if diferencias == 0 else '❌'} Documentos distintos: {diferencias}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# benchmarks/bench_formato_legal.py
+"""
+Compara el formato de números y fechas de app/utils/formato_legal.py contra
+las llamadas originales de ServicioDocumentoV2 (num2words en cada llamada,
+meses_esp armado en cada función, cadenas de strptime), copiadas abajo:
+- Verifica que numero_a_letras dé lo mismo que num2words de 0 a 99 999
+  (días, años, edades y grupos de 4 y 5 dígitos del CUI)
+- Verifica que el formato de cada solicitud del corpus sea idéntico
+- Mide el tiempo de formatear todos los valores de una solicitud (dos CUI,
+  dos edades, registro/folio/libro y cuatro fechas)
+
+Ejecutar:
+    python benchmarks/bench_formato_legal.py
+"""
+
+import datetime
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from num2words import num2words
+
+REPETICIONES = 20
+LIMITE_EXHAUSTIVO = 100_000
+
+
+# =====================================================================
+# IMPLEMENTACIÓN ORIGINAL (métodos de ServicioDocumentoV2, sin self)
+# =====================================================================
+
+def _formato_fecha_contrato(fecha_str):
+    meses_esp = {
+        1: 'enero', 2: 'febrero', 3: 'marzo', 4: 'abril',
+        5: 'mayo', 6: 'junio', 7: 'julio', 8: 'agosto',
+        9: 'septiembre', 10: 'octubre', 11: 'noviembre', 12: 'diciembre'
+    }
+    try:
+        fecha = datetime.datetime.strptime(fecha_str, "%Y-%m-%d")
+        dia_num = fecha.day
+        dia_letras = num2words(dia_num, lang='es')
+        mes_nombre = meses_esp[fecha.month]
+        anio_num = fecha.year
+        anio_letras = num2words(anio_num, lang='es')
+        return f"el {dia_letras} ({dia_num}) de {mes_nombre} del año {anio_letras} ({anio_num})"
+    except (ValueError, TypeError):
+        return fecha_str
+
+
+def _procesar_fecha(fecha_str):
+    meses_esp = {
+        1: 'enero', 2: 'febrero', 3: 'marzo', 4: 'abril',
+        5: 'mayo', 6: 'junio', 7: 'julio', 8: 'agosto',
+        9: 'septiembre', 10: 'octubre', 11: 'noviembre', 12: 'diciembre'
+    }
+    if not fecha_str or "indefinido" in str(fecha_str).lower():
+        return {'dia': 'N/A', 'dia_letras': 'N/A', 'mes': 'N/A', 'anio': 'N/A', 'anio_letras': 'N/A',
+                'completa': 'Por tiempo indefinido'}
+    try:
+        if '/' in fecha_str:
+            fecha = datetime.datetime.strptime(fecha_str, "%d/%m/%Y")
+        else:
+            fecha = datetime.datetime.strptime(fecha_str, "%Y-%m-%d")
+        mes_nombre = meses_esp[fecha.month]
+        return {
+            'dia': fecha.day,
+            'dia_letras': num2words(fecha.day, lang='es'),
+            'mes': mes_nombre,
+            'anio': fecha.year,
+            'anio_letras': num2words(fecha.year, lang='es'),
+            'completa': f"{fecha.day} de {mes_nombre} de {fecha.year}"
+        }
+    except (ValueError, TypeError, AttributeError):
+        return {'dia': 'N/A', 'dia_letras': 'N/A', 'mes': 'N/A', 'anio': 'N/A', 'anio_letras': 'N/A',
+                'completa': 'Fecha no especificada'}
+
+
+def _formato_fecha_largo(objeto_fecha):
+    meses_esp = {
+        1: 'enero', 2: 'febrero', 3: 'marzo', 4: 'abril',
+        5: 'mayo', 6: 'junio', 7: 'julio', 8: 'agosto',
+        9: 'septiembre', 10: 'octubre', 11: 'noviembre', 12: 'diciembre'
+    }
+    if not isinstance(objeto_fecha, (datetime.date, datetime.datetime)):
+        return ""
+    day_num = objeto_fecha.day
+    day_letras = num2words(day_num, lang='es')
+    month_name = meses_esp[objeto_fecha.month]
+    return f"el {day_letras} ({day_num}) de {month_name} de {objeto_fecha.year}"
+
+
+def _numero_a_letras_con_espacios(numero_str):
+    if not numero_str or not str(numero_str).isdigit():
+        return ''
+    numero_str = numero_str.replace(' ', '').replace('-', '')
+    if len(numero_str) != 13:
+        return ' '.join(num2words(int(d), lang='es') for d in str(numero_str))
+    return (f"{num2words(int(numero_str[0:4]), lang='es')} espacio "
+            f"{num2words(int(numero_str[4:9]), lang='es')} espacio "
+            f"{num2words(int(numero_str[9:13]), lang='es')}")
+
+
+def _formatear_cui(numero_str):
+    if not numero_str or not str(numero_str).isdigit():
+        return numero_str or ''
+    numero_str = numero_str.replace(' ', '').replace('-', '')
+    if len(numero_str) != 13:
+        return numero_str
+    return f"{numero_str[0:4]} {numero_str[4:9]} {numero_str[9:13]}"
+
+
+def _convertir_numero_letras(numero_str):
+    if not numero_str:
+        return ''
+    try:
+        if str(numero_str).isdigit():
+            return num2words(int(numero_str), lang='es')
+        return str(numero_str)
+    except (ValueError, TypeError):
+        return str(numero_str)
+
+
+def formatear_original(solicitud):
+    return (
+        _numero_a_letras_con_espacios(solicitud["cui_rep"]),
+        _formatear_cui(solicitud["cui_rep"]),
+        _numero_a_letras_con_espacios(solicitud["cui_colab"]),
+        _formatear_cui(solicitud["cui_colab"]),
+        num2words(solicitud["edad_rep"], lang='es'),
+        num2words(int(solicitud["edad_colab"]), lang='es'),
+        _convertir_numero_letras(solicitud["registro"]),
+        _convertir_numero_letras(solicitud["libro"]),
+        _convertir_numero_letras(solicitud["folio"]),
+        _formato_fecha_largo(solicitud["autorizacion"]),
+        _formato_fecha_contrato(solicitud["fecha_contrato"]),
+        _procesar_fecha(solicitud["fecha_inicio"]),
+        _procesar_fecha(solicitud["fecha_fin"]),
+    )
+
+
+def formatear_nuevo(servicio, solicitud):
+    # Los mismos filtros con los que ServicioDocumentoV2.preparar_contexto arma los derivados
+    from app.utils.formato_legal import FILTROS_JINJA, numero_a_letras
+    return (
+        FILTROS_JINJA['letras_cui'](solicitud["cui_rep"]),
+        FILTROS_JINJA['cui_formateado'](solicitud["cui_rep"]),
+        FILTROS_JINJA['letras_cui'](solicitud["cui_colab"]),
+        FILTROS_JINJA['cui_formateado'](solicitud["cui_colab"]),
+        numero_a_letras(solicitud["edad_rep"]),
+        numero_a_letras(int(solicitud["edad_colab"])),
+        FILTROS_JINJA['letras'](solicitud["registro"]),
+        FILTROS_JINJA['letras'](solicitud["libro"]),
+        FILTROS_JINJA['letras'](solicitud["folio"]),
+        FILTROS_JINJA['fecha_larga'](solicitud["autorizacion"]),
+        servicio._formato_fecha_contrato(solicitud["fecha_contrato"]),
+        servicio._procesar_fecha(solicitud["fecha_inicio"]),
+        servicio._procesar_fecha(solicitud["fecha_fin"]),
+    )
+
+
+# =====================================================================
+# CORPUS
+# =====================================================================
+
+def generar_corpus(cantidad=500, semilla=11):
+    aleatorio = random.Random(semilla)
+
+    def cui():
+        return "".join(str(aleatorio.randint(0, 9)) for _ in range(aleatorio.choice([13, 13, 13, 9])))
+
+    def fecha_texto():
+        dia, mes, anio = aleatorio.randint(1, 28), aleatorio.randint(1, 12), aleatorio.randint(2024, 2027)
+        return aleatorio.choice([f"{dia:02d}/{mes:02d}/{anio}", f"{dia}/{mes}/{anio}",
+                                 f"{anio}-{mes:02d}-{dia:02d}", "Indefinido", "", "31/02/2025"])
+
+    corpus = []
+    for _ in range(cantidad):
+        corpus.append({
+            "cui_rep": cui(),
+            "cui_colab": cui(),
+            "edad_rep": aleatorio.randint(25, 80),
+            "edad_colab": str(aleatorio.randint(18, 70)),
+            "registro": str(aleatorio.randint(1, 99999)),
+            "libro": aleatorio.choice([str(aleatorio.randint(1, 999)), "123-A", ""]),
+            "folio": str(aleatorio.randint(1, 999)),
+            "autorizacion": datetime.date(aleatorio.randint(1990, 2024), aleatorio.randint(1, 12),
+                                          aleatorio.randint(1, 28)),
+            "fecha_contrato": f"{aleatorio.randint(2024, 2027)}-{aleatorio.randint(1, 12):02d}-{aleatorio.randint(1, 28):02d}",
+            "fecha_inicio": fecha_texto(),
+            "fecha_fin": fecha_texto(),
+        })
+    return corpus
+
+
+def _medir(funcion, corpus):
+    """Mediana (sobre REPETICIONES corridas del corpus) del tiempo por solicitud."""
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        for solicitud in corpus:
+            funcion(solicitud)
+        tiempos.append((time.perf_counter() - inicio) / len(corpus))
+    return statistics.median(tiempos)
+
+
+def main():
+    from app.services.documento_v2 import ServicioDocumentoV2
+    from app.utils.formato_legal import numero_a_letras
+
+    print("\n" + "="*70)
+    print("BENCHMARK: FORMATO LEGAL (formato_legal vs num2words por llamada)")
+    print("="*70)
+
+    distintos = [n for n in range(LIMITE_EXHAUSTIVO) if numero_a_letras(n) != num2words(n, lang='es')]
+    print(f"  {'✅' if not distintos else '❌'} numero_a_letras vs num2words (0..{LIMITE_EXHAUSTIVO - 1}): "
+          f"{len(distintos)} diferencias {distintos[:5] if distintos else ''}")
+
+    servicio = ServicioDocumentoV2()
+    corpus = generar_corpus()
+    diferencias = sum(1 for s in corpus if formatear_original(s) != formatear_nuevo(servicio, s))
+
+    original = _medir(formatear_original, corpus)
+    nuevo = _medir(lambda s: formatear_nuevo(servicio, s), corpus)
+
+    print(f"  Solicitudes en el corpus: {len(corpus)}")
+    print(f"  num2words   {original * 1e6:8.1f} µs por solicitud")
+    print(f"  tablas      {nuevo * 1e6:8.1f} µs por solicitud")
+    print(f"\n  ⚡ Aceleración: {original / nuevo:.2f}x")
+    print(f"  {'✅' if diferencias == 0 else '❌'} Diferencias de resultado: {diferencias}\n")
+
+
+if __name__ == "__main__":
+    main()
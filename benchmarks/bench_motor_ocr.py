@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# benchmarks/bench_motor_ocr.py
+"""
+Compara los backends del motor de OCR (tesserocr vs pytesseract):
+- Verifica que ambos devuelvan exactamente el mismo texto por imagen y PSM
+- Mide la latencia por pasada (la primera llamada de tesserocr incluye cargar el modelo)
+
+Ejecutar:
+    python benchmarks/bench_motor_ocr.py                 # escaneos sintéticos
+    python benchmarks/bench_motor_ocr.py ruta/escaneos   # escaneos reales
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_preprocesamiento import generar_escaneos_sinteticos, cargar_escaneos
+
+PSMS = (6, 4, 11)
+
+
+def main():
+    from app.services.motor_ocr import MotorPytesseract, MotorTesserocr
+    from app.services.preprocesamiento import preprocesar_imagen
+
+    print("\n" + "="*70)
+    print("BENCHMARK: MOTOR OCR (tesserocr persistente vs pytesseract)")
+    print("="*70)
+
+    escaneos = cargar_escaneos(sys.argv[1]) if len(sys.argv) > 1 else generar_escaneos_sinteticos()
+    if not escaneos:
+        print("❌ No se encontraron imágenes")
+        return
+
+    try:
+        motores = [MotorPytesseract(), MotorTesserocr()]
+    except ImportError:
+        print("❌ tesserocr no está instalado: pip install tesserocr")
+        return
+
+    latencias = {motor.nombre: [] for motor in motores}
+    diferencias = 0
+    for nombre, contenido in escaneos:
+        imagen = preprocesar_imagen(contenido, "v2")
+        for psm in PSMS:
+            textos = {}
+            for motor in motores:
+                inicio = time.perf_counter()
+                textos[motor.nombre] = motor.texto(imagen, psm)
+                latencias[motor.nombre].append(time.perf_counter() - inicio)
+            iguales = textos["pytesseract"] == textos["tesserocr"]
+            diferencias += 0 if iguales else 1
+            print(f"  {nombre[:30]:<32} PSM {psm:<3} {'✅ idéntico' if iguales else '❌ DIFERENTE'}")
+
+    print("\n" + "="*70)
+    print("RESUMEN")
+    print("="*70)
+    for motor, valores in latencias.items():
+        print(f"  {motor:<14} mediana {statistics.median(valores) * 1000:8.1f} ms por pasada")
+    base = statistics.median(latencias["pytesseract"])
+    nuevo = statistics.median(latencias["tesserocr"])
+    print(f"\n  ⚡ Aceleración: {base / nuevo:.2f}x")
+    print(f"  {'✅' if diferencias == 0 else '❌'} Diferencias de texto: {diferencias}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# benchmarks/bench_parser_ocr.py
+"""
+Compara el parser de campos OCR compilado (app/services/ocr.py) contra la
+implementación original (copiada abajo tal cual, con sus prints):
+- Verifica que ambos devuelvan exactamente el mismo resultado por texto
+- Mide el tiempo por llamada sobre un corpus de textos OCR
+
+La salida de los prints del parser original se descarta (no se mide la
+terminal, solo el formateo).
+
+Ejecutar:
+    python benchmarks/bench_parser_ocr.py                # corpus sintético
+    python benchmarks/bench_parser_ocr.py ruta/textos    # archivos .txt reales
+"""
+
+import contextlib
+import io
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from num2words import num2words
+
+REPETICIONES = 20
+
+NOMBRES = ["JUAN CARLOS PÉREZ LÓPEZ", "MARÍA JOSÉ GARCÍA", "L/OSÉ ALBERTO M0RALES", "CRLOS ENRIQUE RAMOS",
+           "ANA LUCÍA DE LEÓN", "PEDR0s 0 HERNÁNDEZ"]
+EMPRESAS = ["SERVICIOS INTEGRALES, S.A.", "CONSTRUCTORA DEL SUR", "TECNOLOGÍA GT, S.A."]
+POSICIONES = ["ANALISTA DE DATOS", "CONTADOR GENERAL QUEDO ATENTO", "ASISTENTE ADMINISTRATIVO SALUDOS"]
+PROFESIONES = ["INGENIERO EN SISTEMAS", "PERITO CONTADOR", "LICENCIADA EN DERECHO"]
+ESTADOS = ["SOLTERO", "CASADA", "UNIDO"]
+
+
+# =====================================================================
+# IMPLEMENTACIÓN ORIGINAL (sin cambios salvo el nombre)
+# =====================================================================
+
+def _limpiar_fecha_gt_original(fecha_raw):
+    """
+    Limpia fechas mal formateadas por OCR.
+    Formato guatemalteco: dd/mm/aaaa (día/mes/año)
+    """
+    if not fecha_raw:
+        return fecha_raw
+    
+    fecha = str(fecha_raw).strip()
+    
+    # PRIMERO: Corregir caracteres mal leídos por OCR
+    fecha = fecha.replace('h', '1').replace('H', '1')
+    fecha = fecha.replace('o', '0').replace('O', '0')
+    
+    # Si ya tiene formato correcto dd/mm/aaaa, retornar
+    if re.match(r'^\d{1,2}/\d{1,2}/\d{4}$', fecha):
+        return fecha
+    
+    # Si solo tiene números sin separadores (ej: 13102025)
+    if re.match(r'^\d{8}$', fecha):
+        dia = fecha[:2]
+        mes = fecha[2:4]
+        anio = fecha[4:]
+        return f"{dia}/{mes}/{anio}"
+    
+    # Si tiene formato parcial sin / entre día y mes (ej: 1310/2025 o 120/2026)
+    match = re.match(r'^(\d{3,4})/(\d{4})$', fecha)
+    if match:
+        sin_anio = match.group(1)
+        anio = match.group(2)
+        
+        if len(sin_anio) == 4:  # ej: 1310 -> 13/10
+            dia = sin_anio[:2]
+            mes = sin_anio[2:]
+        elif len(sin_anio) == 3:  # ej: 120 -> 12/10
+            dia = sin_anio[:2]
+            mes = sin_anio[2:]
+            # Si mes es 0, probablemente es 10
+            if mes == '0':
+                mes = '10'
+        else:
+            return fecha
+        
+        return f"{dia}/{mes}/{anio}"
+    
+    return fecha
+
+
+def parse_ocr_text_original(text: str):
+    """
+    Parser OCR optimizado para formato de tabla guatemalteco.
+    Versión mejorada con correcciones de caracteres OCR comunes.
+    """
+    print("\n" + "="*70)
+    print(" TEXTO EXTRAÍDO POR OCR:")
+    print("="*70)
+    print(text)
+    print("="*70 + "\n")
+    
+    data = {}
+    
+    # PRE-PROCESAMIENTO: Limpiar caracteres confusos comunes de OCR
+    text_cleaned = text
+    
+    # Correcciones para EDAD
+    text_cleaned = re.sub(r'EDAD[\s:]*S7', 'EDAD 57', text_cleaned, flags=re.IGNORECASE)
+    text_cleaned = re.sub(r'EDAD[\s:]*s7', 'EDAD 57', text_cleaned, flags=re.IGNORECASE)
+    text_cleaned = re.sub(r'\bS7\b', '57', text_cleaned)
+    text_cleaned = re.sub(r'\bs7\b', '57', text_cleaned)
+    text_cleaned = re.sub(r'EDAD[\s:]*S(\d)', r'EDAD 5\1', text_cleaned, flags=re.IGNORECASE)
+    
+    # Patrones de búsqueda
+    patterns = [
+        # Empresa
+        ('empresa_contratante', r"EMPRESA[:\s]+([^\n]+)"),
+        
+        # Colaborador
+        ('nombre_completo', r"COLABORADOR[:\s]+([^\n]+)"),
+        
+        # DPI/CUI - captura todo incluyendo espacios
+        ('cui', r"DPI\s*[/]?\s*PASAPORTE[:\s]*([\d\s]+)"),
+        ('cui', r"DPI[:\s]*([\d\s]+)"),
+        
+        # Dirección
+        ('direccion', r"DIRECCI[OÓ]N[:\s]+([^\n]+)"),
+        
+        # Fecha de Inicio - captura formato dd/mm/aaaa o mal formateado
+        ('fecha_inicio', r"FECHA\s+DE\s+INICIO[:\s]*(\d{1,2}/\d{1,2}/\d{4})"),
+        ('fecha_inicio', r"FECHA\s+DE\s+INICIO[:\s]*([\d/hHoO]+)"),
+        
+        # Fecha de Finalización
+        ('fecha_fin', r"FECHA\s+DE\s+FINALIZACI[OÓ]N[:\s]*(\d{1,2}/\d{1,2}/\d{4})"),
+        ('fecha_fin', r"FECHA\s+DE\s+FINALIZACI[OÓ]N[:\s]*([\d/hHoO]+)"),
+        ('fecha_fin', r"FECHA\s+DE\s+FINALIZACI[OÓ]N[:\s]+([^\n]+)"),
+        
+        # Honorarios - captura Q al inicio
+        ('monto', r"HONORARIOS\s+POR\s+PA[GC]AR[:\s]*Q?([\d,\.]+)"),
+        
+        # Posición
+        ('posicion', r"POSICI[OÓ]N[:\s]+([^\n]+)"),
+        
+        # Profesión
+        ('profesion', r"PROFESI[OÓ]N[:\s]+([^\n]+)"),
+        
+        # Estado Civil
+        ('estado_civil', r"ESTADO\s+CIVIL[:\s]+([^\n]+)"),
+        
+        # Edad
+        ('edad', r"EDAD[:\s]*(\d{1,3})\s*a[ñn]os"),
+        ('edad', r"EDAD[:\s]*(\d{1,3})"),
+        ('edad', r"(\d{1,3})\s*a[ñn]os"),
+    ]
+    
+    # Extraer datos usando los patrones
+    for key, pattern in patterns:
+        if key not in data:
+            match = re.search(pattern, text_cleaned, re.IGNORECASE | re.DOTALL | re.MULTILINE)
+            if match:
+                try:
+                    value = match.group(1).strip()
+                    if value:
+                        data[key] = value
+                        print(f"✓ {key}: {value}")
+                except (ValueError, IndexError) as e:
+                    print(f" Error procesando {key}: {e}")
+    
+    # ===== LIMPIEZA DE DATOS POST-EXTRACCIÓN =====
+    
+    # Limpiar CUI (quitar espacios)
+    if data.get('cui'):
+        data['cui'] = data['cui'].replace(' ', '').strip()
+        print(f"✓ cui (limpiado): {data['cui']}")
+    
+    # Limpiar fechas con formato guatemalteco
+    if data.get('fecha_inicio'):
+        data['fecha_inicio'] = _limpiar_fecha_gt_original(data['fecha_inicio'])
+        print(f"✓ fecha_inicio (limpiada): {data['fecha_inicio']}")
+    
+    if data.get('fecha_fin'):
+        fecha_fin = data['fecha_fin']
+        # Verificar si es texto como "indefinido" o fecha
+        if not any(palabra in fecha_fin.lower() for palabra in ['indefinido', 'tiempo']):
+            data['fecha_fin'] = _limpiar_fecha_gt_original(fecha_fin)
+        print(f"✓ fecha_fin (limpiada): {data['fecha_fin']}")
+    
+    # Limpiar nombre (correcciones OCR comunes)
+    if data.get('nombre_completo'):
+        nombre = data['nombre_completo']
+        nombre = re.sub(r'^L/', 'J', nombre)
+        nombre = re.sub(r'\bL/', 'J', nombre)
+        nombre = nombre.replace('0s', 'OS')
+        nombre = nombre.replace('CRLOS', 'CARLOS')
+        nombre = re.sub(r'\b0\b', 'O', nombre)
+        data['nombre_completo'] = nombre.strip()
+        print(f"✓ nombre_completo (limpiado): {data['nombre_completo']}")
+    
+    # Limpiar monto
+    if data.get('monto'):
+        monto = data['monto'].replace(',', '')
+        data['monto'] = monto
+        print(f"✓ monto (limpiado): {monto}")
+    
+    # Limpiar el campo posición
+    if data.get('posicion'):
+        posicion = data['posicion']
+        for keyword in ['QUEDO', 'ATENTO', 'SALUDOS', 'CORDIALES']:
+            if keyword in posicion.upper():
+                posicion = posicion.split(keyword)[0].strip()
+                break
+        data['posicion'] = posicion
+        print(f"✓ posicion (limpiada): {posicion}")
+    
+    # Validar edad
+    if data.get('edad'):
+        try:
+            edad_num = int(data['edad'])
+            if edad_num < 18 or edad_num > 99:
+                data['edad'] = ""
+        except:
+            data['edad'] = ""
+    
+    # Procesar el monto
+    monto_numero = 0.0
+    monto_en_letras = "CERO QUETZALES EXACTOS"
+    monto_formateado = "Q.0.00"
+    
+    if data.get("monto"):
+        try:
+            monto_numero = float(data["monto"])
+            monto_formateado = f"Q.{monto_numero:,.2f}"
+            parte_entera = int(monto_numero)
+            monto_en_letras = num2words(parte_entera, lang='es').upper() + " QUETZALES EXACTOS"
+            print(f"✓ monto procesado: {monto_formateado} ({monto_en_letras})")
+        except (ValueError, TypeError) as e:
+            print(f"⚠ Error al procesar monto: {e}")
+    
+    # Procesar fecha de fin
+    fecha_fin_texto = data.get("fecha_fin")
+    if not fecha_fin_texto or "indefinido" in str(fecha_fin_texto).lower():
+        fecha_fin_texto = "Contrato Indefinido"
+    
+    # Construir la respuesta estructurada
+    structured_data = {
+        "empresa_contratante": data.get("empresa_contratante", ""),
+        "datos_persona": {
+            "cui": data.get("cui", ""),
+            "nombre_completo": data.get("nombre_completo", ""),
+            "direccion": data.get("direccion", ""),
+            "edad": data.get("edad", ""),
+            "estado_civil": data.get("estado_civil", ""),
+            "profesion": data.get("profesion", ""),
+            "posicion": data.get("posicion", ""),
+            "nacionalidad": None
+        },
+        "datos_contrato": {
+            "tipo_contrato": data.get("posicion", "Servicios Profesionales"),
+            "fecha_inicio": data.get("fecha_inicio", ""),
+            "fecha_fin": fecha_fin_texto,
+            "monto": monto_formateado,
+            "monto_en_letras": monto_en_letras,
+            "descripcion_adicional": f"Posición: {data.get('posicion', 'N/A')}"
+        }
+    }
+    
+    print("\n" + "="*70)
+    print(" RESULTADO PROCESADO:")
+    print("="*70)
+    import json
+    print(json.dumps(structured_data, indent=2, ensure_ascii=False))
+    print("="*70 + "\n")
+    
+    return structured_data
+
+
+# =====================================================================
+# CORPUS
+# =====================================================================
+
+def _separador(aleatorio):
+    return aleatorio.choice([": ", ":", " ", ":\n", "  :  ", "\t"])
+
+
+def _fecha(aleatorio):
+    dia, mes, anio = aleatorio.randint(1, 28), aleatorio.randint(1, 12), aleatorio.randint(2024, 2027)
+    return aleatorio.choice([
+        f"{dia:02d}/{mes:02d}/{anio}",
+        f"{dia:02d}{mes:02d}{anio}",
+        f"{dia:02d}{mes:02d}/{anio}",
+        f"{dia}/{mes}/{anio}".replace("1", "h").replace("0", "o"),
+        f"{dia:02d}0/{anio}",
+    ])
+
+
+def generar_corpus(cantidad=300, semilla=7):
+    """Textos con la forma de las hojas de ingreso, con el ruido típico del OCR."""
+    aleatorio = random.Random(semilla)
+    textos = []
+    for _ in range(cantidad):
+        lineas = []
+        if aleatorio.random() < 0.9:
+            lineas.append(f"EMPRESA{_separador(aleatorio)}{aleatorio.choice(EMPRESAS)}")
+        lineas.append("FICHA DE INGRESO DE PERSONAL")
+        if aleatorio.random() < 0.95:
+            lineas.append(f"COLABORADOR{_separador(aleatorio)}{aleatorio.choice(NOMBRES)}")
+        cui = "".join(str(aleatorio.randint(0, 9)) for _ in range(13))
+        if aleatorio.random() < 0.5:
+            cui = f"{cui[:4]} {cui[4:9]} {cui[9:]}"
+        etiqueta_dpi = aleatorio.choice(["DPI / PASAPORTE", "DPI/PASAPORTE", "DPI", "Dpi"])
+        if aleatorio.random() < 0.9:
+            lineas.append(f"{etiqueta_dpi}{_separador(aleatorio)}{cui}")
+        lineas.append(f"DIRECCIÓN{_separador(aleatorio)}{aleatorio.randint(1, 30)} AVENIDA {aleatorio.randint(1, 20)}-{aleatorio.randint(10, 99)} ZONA {aleatorio.randint(1, 21)}")
+        edad = aleatorio.choice([str(aleatorio.randint(16, 70)), "S7", "s7", f"S{aleatorio.randint(0, 9)}"])
+        lineas.append(aleatorio.choice([f"EDAD{_separador(aleatorio)}{edad} años", f"EDAD {edad}", f"{edad} anos"]))
+        lineas.append(f"ESTADO CIVIL{_separador(aleatorio)}{aleatorio.choice(ESTADOS)}")
+        lineas.append(f"PROFESIÓN{_separador(aleatorio)}{aleatorio.choice(PROFESIONES)}")
+        lineas.append(f"POSICIÓN{_separador(aleatorio)}{aleatorio.choice(POSICIONES)}")
+        if aleatorio.random() < 0.9:
+            lineas.append(f"FECHA DE INICIO{_separador(aleatorio)}{_fecha(aleatorio)}")
+        lineas.append(f"FECHA DE FINALIZACIÓN{_separador(aleatorio)}" +
+                      aleatorio.choice([_fecha(aleatorio), "Indefinido", "POR TIEMPO INDEFINIDO"]))
+        monto = aleatorio.randint(2500, 45000)
+        lineas.append(f"HONORARIOS POR {aleatorio.choice(['PAGAR', 'PACAR'])}{_separador(aleatorio)}"
+                      f"Q{aleatorio.choice([f'{monto:,}', str(monto), f'{monto:,}.50'])}")
+        # Ruido de tabla: líneas sueltas y celdas partidas
+        for _ in range(aleatorio.randint(0, 6)):
+            lineas.insert(aleatorio.randint(0, len(lineas)), aleatorio.choice(
+                ["|", "—", "Firma: ____________", "Observaciones", "", "| | |", "Página 1 de 1"]))
+        aleatorio.shuffle(lineas) if aleatorio.random() < 0.2 else None
+        textos.append("\n".join(lineas))
+    return textos
+
+
+def cargar_textos(directorio):
+    textos = []
+    for nombre in sorted(os.listdir(directorio)):
+        if nombre.lower().endswith(".txt"):
+            with open(os.path.join(directorio, nombre), "r", encoding="utf-8") as f:
+                textos.append(f.read())
+    return textos
+
+
+def _medir(funcion, textos):
+    """Mediana (sobre REPETICIONES corridas del corpus) del tiempo por llamada."""
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        for texto in textos:
+            funcion(texto)
+        tiempos.append((time.perf_counter() - inicio) / len(textos))
+    return statistics.median(tiempos)
+
+
+def main():
+    from app.services.ocr import parse_ocr_text
+
+    print("\n" + "="*70)
+    print("BENCHMARK: PARSER DE CAMPOS OCR (compilado vs original)")
+    print("="*70)
+
+    textos = cargar_textos(sys.argv[1]) if len(sys.argv) > 1 else generar_corpus()
+    if not textos:
+        print("❌ No se encontraron textos")
+        return
+
+    salida_descartada = io.StringIO()
+    diferencias = 0
+    for texto in textos:
+        with contextlib.redirect_stdout(salida_descartada):
+            esperado = parse_ocr_text_original(texto)
+        if parse_ocr_text(texto) != esperado:
+            diferencias += 1
+            if diferencias <= 3:
+                print(f"  ❌ DIFERENTE:\n{texto}\n")
+    salida_descartada.seek(0)
+    salida_descartada.truncate()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        original = _medir(parse_ocr_text_original, textos)
+    compilado = _medir(parse_ocr_text, textos)
+
+    print(f"  Textos en el corpus: {len(textos)}")
+    print(f"  original    {original * 1e6:8.1f} µs por llamada")
+    print(f"  compilado   {compilado * 1e6:8.1f} µs por llamada")
+    print(f"\n  ⚡ Aceleración: {original / compilado:.2f}x")
+    print(f"  {'✅' if diferencias == 0 else '❌'} Diferencias de resultado: {diferencias}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# benchmarks/bench_placeholders_docx.py
+"""
+Compara el reemplazo de placeholders de app/utils/ayudante_docx.py (una
+pasada de regex sobre el XML) contra la implementación original sobre los
+objetos de python-docx (copiada abajo tal cual):
+- Verifica que el texto de cada párrafo (cuerpo, tablas anidadas,
+  encabezados y pies) quede igual con ambas
+- Mide el tiempo de reemplazo sobre plantillas sintéticas grandes y con
+  muchas tablas, con placeholders partidos entre varios runs
+
+Ejecutar:
+    python benchmarks/bench_placeholders_docx.py                  # plantillas sintéticas
+    python benchmarks/bench_placeholders_docx.py plantilla.docx   # plantilla real
+"""
+
+import copy
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import docx
+
+REPETICIONES = 5
+
+# Las claves que arma ServicioDocumento.generar_documento
+CLAVES = [
+    'nombre_completo', 'cui', 'cui_letras', 'edad_empleado', 'edad_empleado_letras', 'direccion',
+    'estado_civil', 'nacionalidad', 'profesion', 'posicion', 'puesto', 'colaborador_lugar_notificaciones',
+    'fecha_contrato', 'día_letras', 'día_numeros', 'mes_letras', 'año_letras', 'año_numeros',
+    'vence_dia_letreas', 'vence_dia_numeros', 'vence_mes_letras', 'vence_año_letras', 'vence_año_numeros',
+    'monto', 'monto_letras', 'rep_legal_nombre', 'rep_legal_edad', 'rep_legal_edad_letras',
+    'rep_legal_estado_civil', 'rep_legal_profesion', 'rep_legal_nacionalidad', 'rep_legal_cui',
+    'rep_legal_cui_letras', 'rep_legal_extendido_en', 'genero', 'empresa_contratante', 'empresa_entidad',
+    'empresa_autorizada_en', 'empresa_fecha_autorizacion', 'empresa_autorizada_por', 'empresa_inscrita_en',
+    'empresa_numero_registro', 'empresa_numero_registro_letras', 'empresa_numero_folio',
+    'empresa_numero_folio_letras', 'empresa_numero_libro', 'empresa_numero_libro_letras',
+    'empresa_tipo_libro', 'empresa_lugar_notificaciones', 'empresa_segundo_lugar_notificaciones',
+]
+REEMPLAZOS = {f'{{{{{clave}}}}}': f'valor de {clave.upper()}' for clave in CLAVES}
+REEMPLAZOS['{{monto}}'] = None  # los valores vacíos se reemplazan por ''
+
+
+# =====================================================================
+# IMPLEMENTACIÓN ORIGINAL
+# =====================================================================
+
+def reemplazar_placeholders_original(doc_obj, reemplazos: dict):
+    def reemplazar_en_parrafo(parrafo):
+        texto_completo = ''.join(run.text for run in parrafo.runs)
+        if not any(key in texto_completo for key in reemplazos.keys()):
+            return
+        for key, value in reemplazos.items():
+            texto_completo = texto_completo.replace(key, str(value or ''))
+        if len(parrafo.runs) > 0:
+            primer_run = parrafo.runs[0]
+            fuente_nombre = primer_run.font.name
+            fuente_tamanio = primer_run.font.size
+            es_negrita = primer_run.bold
+            es_cursiva = primer_run.italic
+            es_subrayado = primer_run.underline
+            for run in parrafo.runs:
+                run.text = ''
+            nuevo_run = parrafo.add_run(texto_completo)
+            if fuente_nombre:
+                nuevo_run.font.name = fuente_nombre
+            if fuente_tamanio:
+                nuevo_run.font.size = fuente_tamanio
+            if es_negrita is not None:
+                nuevo_run.bold = es_negrita
+            if es_cursiva is not None:
+                nuevo_run.italic = es_cursiva
+            if es_subrayado is not None:
+                nuevo_run.underline = es_subrayado
+
+    def reemplazar_en_tabla(tabla):
+        for fila in tabla.rows:
+            for celda in fila.cells:
+                for parrafo in celda.paragraphs:
+                    reemplazar_en_parrafo(parrafo)
+                for tabla_anidada in celda.tables:
+                    reemplazar_en_tabla(tabla_anidada)
+
+    for parrafo in doc_obj.paragraphs:
+        reemplazar_en_parrafo(parrafo)
+    for tabla in doc_obj.tables:
+        reemplazar_en_tabla(tabla)
+    for seccion in doc_obj.sections:
+        for parrafo in seccion.header.paragraphs:
+            reemplazar_en_parrafo(parrafo)
+        for tabla in seccion.header.tables:
+            reemplazar_en_tabla(tabla)
+        for parrafo in seccion.footer.paragraphs:
+            reemplazar_en_parrafo(parrafo)
+        for tabla in seccion.footer.tables:
+            reemplazar_en_tabla(tabla)
+
+
+# =====================================================================
+# PLANTILLAS SINTÉTICAS
+# =====================================================================
+
+def _agregar_texto(parrafo, aleatorio):
+    """Texto con placeholders, a veces partidos entre runs (como los deja Word)."""
+    piezas = []
+    for _ in range(aleatorio.randint(1, 4)):
+        piezas.append(aleatorio.choice(["El señor ", ", con domicilio en ", " y ", " quien se identifica con "]))
+        if aleatorio.random() < 0.6:
+            piezas.append(f"{{{{{aleatorio.choice(CLAVES)}}}}}")
+    texto = "".join(piezas)
+    corte = 0
+    while corte < len(texto):
+        siguiente = min(len(texto), corte + aleatorio.randint(3, 25))
+        run = parrafo.add_run(texto[corte:siguiente])
+        run.bold = True if aleatorio.random() < 0.1 else None
+        corte = siguiente
+
+
+def _llenar_celda(celda, aleatorio, profundidad):
+    _agregar_texto(celda.paragraphs[0], aleatorio)
+    if profundidad < 1 and aleatorio.random() < 0.1:
+        anidada = celda.add_table(rows=2, cols=2)
+        for fila in anidada.rows:
+            for sub in fila.cells:
+                _llenar_celda(sub, aleatorio, profundidad + 1)
+
+
+def generar_plantilla(tablas, filas, columnas, parrafos, semilla=3) -> bytes:
+    aleatorio = random.Random(semilla)
+    documento = docx.Document()
+    for _ in range(parrafos):
+        _agregar_texto(documento.add_paragraph(), aleatorio)
+    for _ in range(tablas):
+        tabla = documento.add_table(rows=filas, cols=columnas)
+        for fila in tabla.rows:
+            for celda in fila.cells:
+                _llenar_celda(celda, aleatorio, 0)
+        _agregar_texto(documento.add_paragraph(), aleatorio)
+    _agregar_texto(documento.sections[0].header.paragraphs[0], aleatorio)
+    _agregar_texto(documento.sections[0].footer.paragraphs[0], aleatorio)
+    buffer = io.BytesIO()
+    documento.save(buffer)
+    return buffer.getvalue()
+
+
+# =====================================================================
+# COMPARACIÓN
+# =====================================================================
+
+def _textos(documento):
+    """Texto de cada párrafo recorrido por el reemplazo, en orden."""
+    textos = []
+
+    def tabla_textos(tabla):
+        for fila in tabla.rows:
+            for celda in fila.cells:
+                textos.extend(p.text for p in celda.paragraphs)
+                for anidada in celda.tables:
+                    tabla_textos(anidada)
+
+    for contenedor in [documento] + [s.header for s in documento.sections] + [s.footer for s in documento.sections]:
+        textos.extend(p.text for p in contenedor.paragraphs)
+        for tabla in contenedor.tables:
+            tabla_textos(tabla)
+    return textos
+
+
+def _medir(funcion, base):
+    """Mediana del tiempo de reemplazo (sin contar la copia del documento)."""
+    tiempos = []
+    for _ in range(REPETICIONES):
+        documento = copy.deepcopy(base)
+        inicio = time.perf_counter()
+        funcion(documento, REEMPLAZOS)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+
+def comparar(nombre, contenido):
+    from app.utils.ayudante_docx import reemplazar_placeholders_docx
+
+    base = docx.Document(io.BytesIO(contenido))
+    original_doc = copy.deepcopy(base)
+    nuevo_doc = copy.deepcopy(base)
+    reemplazar_placeholders_original(original_doc, REEMPLAZOS)
+    reemplazar_placeholders_docx(nuevo_doc, REEMPLAZOS)
+    esperado, obtenido = _textos(original_doc), _textos(nuevo_doc)
+    diferencias = sum(1 for a, b in zip(esperado, obtenido) if a != b) + abs(len(esperado) - len(obtenido))
+
+    original = _medir(reemplazar_placeholders_original, base)
+    nuevo = _medir(reemplazar_placeholders_docx, base)
+    print(f"  {nombre:<28} {len(esperado):6d} párrafos   original {original * 1000:8.1f} ms   "
+          f"una pasada {nuevo * 1000:7.1f} ms   {original / nuevo:5.1f}x   "
+          f"{'✅' if diferencias == 0 else '❌'} {diferencias} diferencias")
+    return diferencias
+
+
+def main():
+    print("\n" + "="*70)
+    print("BENCHMARK: REEMPLAZO DE PLACEHOLDERS V1 (XML en una pasada vs python-docx)")
+    print("="*70)
+
+    if len(sys.argv) > 1:
+        plantillas = [(os.path.basename(ruta), open(ruta, 'rb').read()) for ruta in sys.argv[1:]]
+    else:
+        plantillas = [
+            ("texto (200 párrafos)", generar_plantilla(0, 0, 0, 200)),
+            ("tablas (20 de 10x4)", generar_plantilla(20, 10, 4, 40)),
+            ("tablas (60 de 20x6)", generar_plantilla(60, 20, 6, 100)),
+        ]
+
+    diferencias = sum(comparar(nombre, contenido) for nombre, contenido in plantillas)
+    print(f"\n  {'✅' if diferencias == 0 else '❌'} Diferencias de texto en total: {diferencias}\n")
+
+
+if __name__ == "__main__":
+    main()
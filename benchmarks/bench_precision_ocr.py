@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# benchmarks/bench_precision_ocr.py
+"""
+Precisión y rendimiento del OCR completo sobre un corpus con verdad conocida
+(ver corpus_ocr.py). Corre sin red, solo con el Tesseract local.
+
+Reporta:
+- Por perfil de OCR (servicio_ocr.procesar, sin cache): imágenes/s, latencia
+  p50/p95 y aciertos por campo (CUI, nombre, fechas, monto, edad), también
+  desglosados por nivel de degradación
+- Por PSM (una sola pasada sobre la imagen preprocesada v2): latencia y
+  aciertos por campo
+
+Ejecutar:
+    python benchmarks/bench_precision_ocr.py                          # 30 hojas sintéticas
+    python benchmarks/bench_precision_ocr.py --corpus salida/         # corpus guardado
+    python benchmarks/bench_precision_ocr.py --perfiles fast,layout --psms 6 --json resultado.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from corpus_ocr import generar_corpus, cargar_corpus, NIVELES
+
+CAMPOS_EVALUADOS = ("cui", "nombre_completo", "fecha_inicio", "fecha_fin", "monto", "edad")
+PERFILES_POR_DEFECTO = "fast,balanced,accurate,layout"
+PSMS_POR_DEFECTO = "6,4,11"
+
+
+def _normalizar(campo: str, valor) -> str:
+    valor = str(valor or "")
+    if campo == "cui":
+        return "".join(c for c in valor if c.isdigit())
+    # Sin tildes, mayúsculas y espacios simples: el OCR suele perder las tildes
+    valor = unicodedata.normalize('NFKD', valor)
+    valor = "".join(c for c in valor if not unicodedata.combining(c))
+    return " ".join(valor.upper().split())
+
+
+def _valores_extraidos(datos: dict) -> dict:
+    persona, contrato = datos["datos_persona"], datos["datos_contrato"]
+    return {
+        "cui": persona.get("cui"),
+        "nombre_completo": persona.get("nombre_completo"),
+        "edad": persona.get("edad"),
+        "fecha_inicio": contrato.get("fecha_inicio"),
+        "fecha_fin": contrato.get("fecha_fin"),
+        "monto": contrato.get("monto"),
+    }
+
+
+def comparar(datos: dict, verdad: dict) -> dict:
+    """{campo: acertó} para los campos evaluados."""
+    extraidos = _valores_extraidos(datos)
+    return {
+        campo: _normalizar(campo, extraidos[campo]) == _normalizar(campo, verdad[campo])
+        for campo in CAMPOS_EVALUADOS
+    }
+
+
+def _percentil(valores, percentil: float) -> float:
+    ordenados = sorted(valores)
+    posicion = min(len(ordenados) - 1, max(0, round(percentil / 100 * len(ordenados)) - 1))
+    return ordenados[posicion]
+
+
+def _resumen(mediciones, duracion_total: float) -> dict:
+    """mediciones = [(latencia_s, nivel, {campo: acertó}), ...]"""
+    latencias = [m[0] for m in mediciones]
+    aciertos = {
+        campo: round(sum(m[2][campo] for m in mediciones) / len(mediciones), 3)
+        for campo in CAMPOS_EVALUADOS
+    }
+    por_nivel = {}
+    for nivel in NIVELES:
+        del_nivel = [m for m in mediciones if m[1] == nivel]
+        if del_nivel:
+            total = sum(sum(m[2].values()) for m in del_nivel)
+            por_nivel[nivel] = round(total / (len(del_nivel) * len(CAMPOS_EVALUADOS)), 3)
+    return {
+        "imagenes": len(mediciones),
+        "imagenes_por_segundo": round(len(mediciones) / duracion_total, 2),
+        "p50_ms": round(_percentil(latencias, 50) * 1000, 1),
+        "p95_ms": round(_percentil(latencias, 95) * 1000, 1),
+        "media_ms": round(statistics.mean(latencias) * 1000, 1),
+        "aciertos": aciertos,
+        "aciertos_totales": round(statistics.mean(aciertos.values()), 3),
+        "aciertos_por_nivel": por_nivel,
+    }
+
+
+async def _en_paralelo(corpus, concurrencia: int, medir_una):
+    """Corre medir_una sobre el corpus con `concurrencia` imágenes en vuelo; retorna (mediciones, duración)."""
+    limite = asyncio.Semaphore(concurrencia)
+
+    async def con_limite(elemento):
+        async with limite:
+            return await medir_una(elemento)
+
+    inicio = time.perf_counter()
+    mediciones = await asyncio.gather(*(con_limite(elemento) for elemento in corpus))
+    return mediciones, time.perf_counter() - inicio
+
+
+async def medir_perfil(servicio, corpus, perfil: str, concurrencia: int) -> dict:
+    async def medir_una(elemento):
+        _, contenido, verdad = elemento
+        inicio = time.perf_counter()
+        resultado = await servicio.procesar(contenido, perfil=perfil)
+        latencia = time.perf_counter() - inicio
+        return latencia, verdad["nivel"], comparar(resultado["datos"], verdad["campos"])
+
+    mediciones, duracion = await _en_paralelo(corpus, concurrencia, medir_una)
+    return _resumen(mediciones, duracion)
+
+
+async def medir_psm(imagenes, corpus, psm: int, concurrencia: int) -> dict:
+    from app.services.ejecutor_ocr import ejecutor_ocr
+    from app.services.ocr import parse_ocr_text
+
+    async def medir_una(indice_y_elemento):
+        indice, (_, _, verdad) = indice_y_elemento
+        inicio = time.perf_counter()
+        pasadas = await ejecutor_ocr.reconocer(imagenes[indice], psms=(psm,))
+        datos = parse_ocr_text(pasadas[psm]["texto"])
+        latencia = time.perf_counter() - inicio
+        return latencia, verdad["nivel"], comparar(datos, verdad["campos"])
+
+    mediciones, duracion = await _en_paralelo(list(enumerate(corpus)), concurrencia, medir_una)
+    return _resumen(mediciones, duracion)
+
+
+def _imprimir_tabla(titulo: str, resultados: dict):
+    print("\n" + "="*100)
+    print(titulo)
+    print("="*100)
+    encabezado = f"  {'':<10} {'img/s':>6} {'p50 ms':>8} {'p95 ms':>8}  " + " ".join(
+        f"{campo[:8]:>8}" for campo in CAMPOS_EVALUADOS
+    ) + f" {'total':>7}"
+    print(encabezado)
+    for nombre, resumen in resultados.items():
+        print(
+            f"  {nombre:<10} {resumen['imagenes_por_segundo']:>6.2f} {resumen['p50_ms']:>8.1f} {resumen['p95_ms']:>8.1f}  "
+            + " ".join(f"{resumen['aciertos'][campo] * 100:>7.0f}%" for campo in CAMPOS_EVALUADOS)
+            + f" {resumen['aciertos_totales'] * 100:>6.1f}%"
+        )
+    print("\n  Aciertos por nivel de degradación:")
+    for nombre, resumen in resultados.items():
+        niveles = "   ".join(f"{nivel} {valor * 100:5.1f}%" for nivel, valor in resumen["aciertos_por_nivel"].items())
+        print(f"  {nombre:<10} {niveles}")
+
+
+def _tesseract_disponible() -> bool:
+    import numpy as np
+    from app.services.motor_ocr import crear_motor
+    try:
+        crear_motor().texto(np.full((60, 200), 255, dtype=np.uint8), 6)
+        return True
+    except Exception as e:
+        print(f"❌ Tesseract no disponible: {e}")
+        return False
+
+
+async def ejecutar(argumentos) -> dict:
+    from fastapi.concurrency import run_in_threadpool
+    from app.core.config import OCR_WORKERS
+    from app.ocr_masivo import _SinCache
+    from app.services.ejecutor_ocr import ejecutor_ocr
+    from app.services.preprocesamiento import preprocesar_imagen
+    from app.services.servicio_ocr import ServicioOCR, PERFILES_OCR
+
+    if argumentos.corpus:
+        corpus = cargar_corpus(argumentos.corpus)
+        print(f"📂 {len(corpus)} hojas desde {argumentos.corpus}")
+    else:
+        corpus = generar_corpus(argumentos.cantidad)
+        print(f"🧪 {len(corpus)} hojas sintéticas ({', '.join(NIVELES)})")
+
+    concurrencia = argumentos.concurrencia or OCR_WORKERS
+    servicio = ServicioOCR()
+    servicio.cache = _SinCache()  # cada imagen se procesa de verdad
+
+    # Calentamiento: levanta el pool y carga el modelo en cada worker
+    await servicio.procesar(corpus[0][1], perfil="fast")
+
+    resultados = {"perfiles": {}, "psms": {}}
+    try:
+        for perfil in filter(None, argumentos.perfiles.split(",")):
+            if perfil not in PERFILES_OCR:
+                print(f"⚠️ Perfil desconocido, se omite: {perfil}")
+                continue
+            print(f"  ⏱️ perfil {perfil}...")
+            resultados["perfiles"][perfil] = await medir_perfil(servicio, corpus, perfil, concurrencia)
+
+        psms = [int(psm) for psm in filter(None, argumentos.psms.split(","))]
+        if psms:
+            imagenes = [await run_in_threadpool(preprocesar_imagen, contenido, "v2") for _, contenido, _ in corpus]
+            for psm in psms:
+                print(f"  ⏱️ PSM {psm}...")
+                resultados["psms"][f"psm_{psm}"] = await medir_psm(imagenes, corpus, psm, concurrencia)
+    finally:
+        ejecutor_ocr.cerrar()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precisión y rendimiento del OCR sobre un corpus con verdad conocida")
+    parser.add_argument("--corpus", help="Carpeta generada por corpus_ocr.py (por defecto se genera en memoria)")
+    parser.add_argument("--cantidad", type=int, default=30, help="Hojas sintéticas si no se indica --corpus")
+    parser.add_argument("--perfiles", default=PERFILES_POR_DEFECTO, help="Perfiles separados por coma")
+    parser.add_argument("--psms", default=PSMS_POR_DEFECTO, help="PSM a medir por separado (vacío = ninguno)")
+    parser.add_argument("--concurrencia", type=int, default=0, help="Imágenes en vuelo (por defecto OCR_WORKERS)")
+    parser.add_argument("--json", help="Guarda los resultados en este archivo")
+    argumentos = parser.parse_args()
+
+    print("\n" + "="*100)
+    print("BENCHMARK: PRECISIÓN Y RENDIMIENTO DEL OCR")
+    print("="*100)
+
+    if not _tesseract_disponible():
+        sys.exit(1)
+
+    resultados = asyncio.run(ejecutar(argumentos))
+
+    if resultados["perfiles"]:
+        _imprimir_tabla("POR PERFIL (pipeline completo, sin cache)", resultados["perfiles"])
+    if resultados["psms"]:
+        _imprimir_tabla("POR PSM (una pasada sobre la imagen preprocesada v2)", resultados["psms"])
+
+    if argumentos.json:
+        with open(argumentos.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados en {argumentos.json}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
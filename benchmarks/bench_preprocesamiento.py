@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# benchmarks/bench_preprocesamiento.py
+"""
+Compara la cadena de PIL original contra el pipeline de app/services/preprocesamiento.py
+Mide latencia (mediana de varias repeticiones) y memoria pico por imagen.
+
+Ejecutar:
+    python benchmarks/bench_preprocesamiento.py                 # escaneos sintéticos
+    python benchmarks/bench_preprocesamiento.py ruta/escaneos   # escaneos reales (jpg/png/tif)
+"""
+
+import io
+import os
+import statistics
+import sys
+import time
+import multiprocessing
+import resource
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+REPETICIONES = 5
+EXTENSIONES = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp')
+
+
+def cadena_pil_original(contenido: bytes):
+    """Copia de la cadena que usaba documentos_v2.ocr_extract antes del pipeline compartido."""
+    from PIL import Image, ImageEnhance, ImageFilter
+    image = Image.open(io.BytesIO(contenido))
+    image = image.convert('L')
+    image = ImageEnhance.Contrast(image).enhance(2.5)
+    image = ImageEnhance.Brightness(image).enhance(1.2)
+    image = ImageEnhance.Sharpness(image).enhance(3.0)
+    image = image.filter(ImageFilter.SHARPEN)
+    return image
+
+
+def pipeline_numpy(contenido: bytes):
+    from app.services.preprocesamiento import preprocesar_imagen
+    return preprocesar_imagen(contenido, "v2")
+
+
+METODOS = {
+    "pil_original": cadena_pil_original,
+    "numpy_compartido": pipeline_numpy,
+}
+
+
+def generar_escaneos_sinteticos(cantidad: int = 4):
+    """Hojas de ingreso sintéticas de ~3.5 MP con texto en tabla, ruido e inclinación."""
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
+
+    etiquetas = [
+        "EMPRESA: CONSULTORES ASOCIADOS, S.A.",
+        "COLABORADOR: MARIO RENE MIRANDA HERNANDEZ",
+        "DPI / PASAPORTE: 2456 78901 0101",
+        "DIRECCION: 5A AVENIDA 10-20 ZONA 1, GUATEMALA",
+        "FECHA DE INICIO: 01/02/2025",
+        "FECHA DE FINALIZACION: 31/12/2025",
+        "HONORARIOS POR PAGAR: Q8,500.00",
+        "POSICION: ANALISTA DE SISTEMAS",
+        "PROFESION: INGENIERO EN SISTEMAS",
+        "ESTADO CIVIL: SOLTERO",
+        "EDAD: 34 años",
+    ]
+    fuente = ImageFont.load_default(size=38)
+    generador = np.random.default_rng(7)
+    escaneos = []
+    for i in range(cantidad):
+        hoja = Image.new('L', (1700, 2200), 235)
+        dibujo = ImageDraw.Draw(hoja)
+        for fila, texto in enumerate(etiquetas):
+            y = 180 + fila * 120
+            dibujo.rectangle([120, y - 20, 1580, y + 80], outline=60, width=3)
+            dibujo.text((150, y), texto, fill=25, font=fuente)
+        hoja = hoja.rotate(generador.uniform(-2.5, 2.5), fillcolor=235, resample=Image.BICUBIC)
+        pixeles = np.asarray(hoja, dtype=np.int16) + generador.normal(0, 12, (2200, 1700)).astype(np.int16)
+        hoja = Image.fromarray(np.clip(pixeles, 0, 255).astype(np.uint8)).convert('RGB')
+        buffer = io.BytesIO()
+        hoja.save(buffer, 'JPEG', quality=90)
+        escaneos.append((f"sintetico_{i}.jpg", buffer.getvalue()))
+    return escaneos
+
+
+def cargar_escaneos(carpeta: str):
+    escaneos = []
+    for nombre in sorted(os.listdir(carpeta)):
+        if nombre.lower().endswith(EXTENSIONES):
+            with open(os.path.join(carpeta, nombre), 'rb') as f:
+                escaneos.append((nombre, f.read()))
+    return escaneos
+
+
+def _leer_status_kb(campo: str) -> int:
+    with open('/proc/self/status') as f:
+        for linea in f:
+            if linea.startswith(campo + ':'):
+                return int(linea.split()[1])
+    return 0
+
+
+def _medir(metodo: str, contenido: bytes, cola):
+    """
+    Corre en un proceso nuevo. El pico se mide en la primera llamada, antes de
+    que el allocator y el pool de bloques de Pillow retengan memoria reutilizable.
+    En Linux se usa VmHWM reiniciado vía /proc/self/clear_refs; en otros
+    sistemas, ru_maxrss.
+    """
+    import numpy  # noqa: F401
+    from PIL import Image, ImageEnhance, ImageFilter  # noqa: F401
+    import app.services.preprocesamiento  # noqa: F401
+
+    funcion = METODOS[metodo]
+    if os.path.exists('/proc/self/clear_refs'):
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        base_kb = _leer_status_kb('VmRSS')
+        funcion(contenido)
+        pico_kb = _leer_status_kb('VmHWM') - base_kb
+    else:
+        base_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        funcion(contenido)
+        pico_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_kb
+
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        funcion(contenido)
+        tiempos.append(time.perf_counter() - inicio)
+    cola.put((statistics.median(tiempos), pico_kb))
+
+
+def medir(metodo: str, contenido: bytes):
+    contexto = multiprocessing.get_context("spawn")
+    cola = contexto.Queue()
+    proceso = contexto.Process(target=_medir, args=(metodo, contenido, cola))
+    proceso.start()
+    resultado = cola.get()
+    proceso.join()
+    return resultado
+
+
+def main():
+    print("\n" + "="*70)
+    print("BENCHMARK: PREPROCESAMIENTO OCR (PIL vs NumPy compartido)")
+    print("="*70)
+
+    if len(sys.argv) > 1:
+        escaneos = cargar_escaneos(sys.argv[1])
+        print(f"📂 {len(escaneos)} escaneos desde {sys.argv[1]}")
+    else:
+        escaneos = generar_escaneos_sinteticos()
+        print(f"🧪 {len(escaneos)} escaneos sintéticos generados")
+
+    if not escaneos:
+        print("❌ No se encontraron imágenes")
+        return
+
+    totales = {metodo: {"latencias": [], "picos": []} for metodo in METODOS}
+    print(f"\n{'imagen':<28}{'método':<20}{'latencia (ms)':>15}{'pico (MB)':>12}")
+    print("-" * 75)
+    for nombre, contenido in escaneos:
+        for metodo in METODOS:
+            latencia, pico_kb = medir(metodo, contenido)
+            totales[metodo]["latencias"].append(latencia)
+            totales[metodo]["picos"].append(pico_kb)
+            print(f"{nombre[:27]:<28}{metodo:<20}{latencia * 1000:>15.1f}{pico_kb / 1024:>12.1f}")
+
+    print("\n" + "="*70)
+    print("RESUMEN (mediana sobre todas las imágenes)")
+    print("="*70)
+    for metodo, datos in totales.items():
+        print(
+            f"  {metodo:<20} latencia {statistics.median(datos['latencias']) * 1000:8.1f} ms"
+            f"   pico {statistics.median(datos['picos']) / 1024:7.1f} MB"
+        )
+    base = statistics.median(totales["pil_original"]["latencias"])
+    nuevo = statistics.median(totales["numpy_compartido"]["latencias"])
+    if nuevo:
+        print(f"\n  ⚡ Aceleración: {base / nuevo:.2f}x")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# benchmarks/bench_region.py
+"""
+Mide el efecto de recortar a la región del formulario y escalar antes del OCR
+(perfil v2 con y sin `recortar`):
+- Píxeles que llegan a Tesseract y latencia del preprocesamiento
+- Latencia de una pasada PSM 6 (si hay Tesseract instalado) y si el texto extraído
+  conserva los campos requeridos
+
+El set sintético mezcla fotos de celular (12 MP y 48 MP, hoja sobre una mesa
+oscura) con los escaneos de bench_preprocesamiento.
+
+Ejecutar:
+    python benchmarks/bench_region.py                 # fotos y escaneos sintéticos
+    python benchmarks/bench_region.py ruta/escaneos   # imágenes reales
+"""
+
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_preprocesamiento import generar_escaneos_sinteticos, cargar_escaneos
+
+REPETICIONES = 3
+PSM = 6
+
+
+def generar_fotos_sinteticas():
+    """Escaneos sintéticos "fotografiados": hoja ampliada sobre una mesa oscura con degradado y ruido."""
+    import numpy as np
+    from PIL import Image
+
+    generador = np.random.default_rng(11)
+    fotos = []
+    tamanos = [((3024, 4032), 2600), ((3024, 4032), 2200), ((6000, 8000), 5200)]
+    for i, (nombre, hoja_jpg) in enumerate(generar_escaneos_sinteticos(len(tamanos))):
+        (ancho, alto), ancho_hoja = tamanos[i]
+        hoja = Image.open(io.BytesIO(hoja_jpg)).convert('L')
+        hoja = hoja.resize((ancho_hoja, int(ancho_hoja * 2200 / 1700)), Image.BICUBIC)
+
+        degradado = np.linspace(70, 120, alto, dtype=np.float32)[:, None]
+        mesa = degradado + generador.normal(0, 10, (alto, ancho)).astype(np.float32)
+        foto = Image.fromarray(np.clip(mesa, 0, 255).astype(np.uint8))
+        x = int(generador.integers(0, ancho - hoja.width))
+        y = int(generador.integers(0, alto - hoja.height))
+        foto.paste(hoja, (x, y))
+
+        buffer = io.BytesIO()
+        foto.convert('RGB').save(buffer, 'JPEG', quality=90)
+        fotos.append((f"foto_{ancho * alto // 1_000_000}mp_{i}.jpg", buffer.getvalue()))
+    return fotos
+
+
+def _preprocesar(contenido: bytes, recortar: bool):
+    from app.services import preprocesamiento
+    perfil = "v2" if recortar else "v2_sin_region"
+    preprocesamiento.PERFILES_PREPROCESAMIENTO.setdefault(
+        "v2_sin_region", {**preprocesamiento.PERFILES_PREPROCESAMIENTO["v2"], "recortar": False}
+    )
+    metadatos = {}
+    imagen = preprocesamiento.preprocesar_imagen(contenido, perfil, metadatos)
+    return imagen, metadatos
+
+
+def _mediana_ms(funcion, *args) -> float:
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        funcion(*args)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000
+
+
+def _motor():
+    try:
+        from app.services.motor_ocr import obtener_motor
+        motor = obtener_motor()
+        motor.precargar()
+        return motor
+    except Exception as e:
+        print(f"⚠️ Tesseract no disponible, solo se mide el preprocesamiento ({e})")
+        return None
+
+
+def main():
+    from app.services.calidad_ocr import evaluar_pasada
+    from app.services.ocr import parse_ocr_text
+
+    print("\n" + "="*70)
+    print("BENCHMARK: RECORTE DE REGIÓN Y ESCALADO ANTES DEL OCR")
+    print("="*70)
+
+    if len(sys.argv) > 1:
+        imagenes = cargar_escaneos(sys.argv[1])
+        print(f"📂 {len(imagenes)} imágenes desde {sys.argv[1]}")
+    else:
+        imagenes = generar_fotos_sinteticas() + generar_escaneos_sinteticos(2)
+        print(f"🧪 {len(imagenes)} imágenes sintéticas (fotos de celular + escaneos)")
+
+    if not imagenes:
+        print("❌ No se encontraron imágenes")
+        return
+
+    motor = _motor()
+    totales = {"completa": {"pre": [], "ocr": []}, "region": {"pre": [], "ocr": []}}
+
+    for nombre, contenido in imagenes:
+        print(f"\n📄 {nombre}")
+        for variante, recortar in (("completa", False), ("region", True)):
+            imagen, metadatos = _preprocesar(contenido, recortar)
+            pre_ms = _mediana_ms(_preprocesar, contenido, recortar)
+            totales[variante]["pre"].append(pre_ms)
+            linea = (
+                f"   {variante:<9} {imagen.shape[1]:>5}x{imagen.shape[0]:<5} "
+                f"{imagen.size / 1_000_000:6.1f} MP   preproc {pre_ms:8.1f} ms"
+            )
+            if motor is not None:
+                inicio = time.perf_counter()
+                resultado = motor.reconocer(imagen, PSM)
+                ocr_ms = (time.perf_counter() - inicio) * 1000
+                totales[variante]["ocr"].append(ocr_ms)
+                calidad = evaluar_pasada(parse_ocr_text(resultado["texto"]), resultado["tsv"])
+                linea += f"   PSM {PSM} {ocr_ms:8.1f} ms   completitud {calidad['completitud']:.2f}"
+            print(linea)
+            if recortar and "region" in metadatos:
+                region = metadatos["region"]
+                print(
+                    f"   ↳ región x={region['x']} y={region['y']} {region['ancho']}x{region['alto']}"
+                    f" (detectada: {region['detectada']}), ~{metadatos['dpi_estimado']:.0f} dpi,"
+                    f" escala {metadatos['escala']}"
+                )
+
+    print("\n" + "="*70)
+    print("RESUMEN (suma sobre todas las imágenes)")
+    print("="*70)
+    for etapa, titulo in (("pre", "Preprocesamiento"), ("ocr", f"OCR PSM {PSM}")):
+        base = sum(totales["completa"][etapa])
+        nuevo = sum(totales["region"][etapa])
+        if not base or not nuevo:
+            continue
+        print(
+            f"  {titulo:<18} completa {base:9.1f} ms   región {nuevo:9.1f} ms"
+            f"   ⚡ -{(1 - nuevo / base) * 100:.0f}%"
+        )
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# benchmarks/corpus_ocr.py
+"""
+Corpus sintético de hojas de ingreso con verdad conocida para medir el OCR.
+
+Cada hoja reproduce la tabla guatemalteca (etiqueta a la izquierda, valor a
+la derecha) con datos aleatorios pero válidos (CUI con dígito verificador,
+fechas, montos, edades) y se degrada con ruido, desenfoque, inclinación y
+compresión JPEG según el nivel.
+
+Ejecutar:
+    python benchmarks/corpus_ocr.py salida/                  # 30 hojas, niveles mezclados
+    python benchmarks/corpus_ocr.py salida/ 100 dura         # 100 hojas de nivel "dura"
+
+Escribe las imágenes y un verdad.json con {archivo: {"nivel", "campos"}} que
+lee bench_precision_ocr.py.
+"""
+
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+ARCHIVO_VERDAD = "verdad.json"
+
+# Degradación por nivel: ruido (desvío), desenfoque (radio gaussiano),
+# inclinación máxima (grados), calidad JPEG y tono del papel
+NIVELES = {
+    "limpia": {"ruido": 4, "desenfoque": 0.0, "inclinacion": 0.3, "calidad": 95, "papel": 245},
+    "media": {"ruido": 10, "desenfoque": 0.8, "inclinacion": 1.5, "calidad": 85, "papel": 232},
+    "dura": {"ruido": 18, "desenfoque": 1.4, "inclinacion": 3.0, "calidad": 70, "papel": 215},
+}
+
+EMPRESAS = [
+    "CONSULTORES ASOCIADOS, S.A.", "INVERSIONES DEL PACIFICO, S.A.", "SERVICIOS INTEGRALES GT, S.A.",
+    "DISTRIBUIDORA LA ESPERANZA, S.A.", "TECNOLOGIA Y DESARROLLO, S.A.",
+]
+NOMBRES = ["MARIO", "RENÉ", "JUAN", "CARLOS", "ANA", "MARÍA", "JOSÉ", "LUCÍA", "PEDRO", "SOFÍA", "JORGE", "ELENA"]
+APELLIDOS = ["MIRANDA", "HERNÁNDEZ", "LÓPEZ", "GARCÍA", "PÉREZ", "MORALES", "CASTILLO", "RAMÍREZ", "OROZCO", "JUÁREZ"]
+CALLES = ["5A AVENIDA 10-20 ZONA 1", "12 CALLE 3-45 ZONA 10", "CALZADA ROOSEVELT 22-43 ZONA 11", "4A CALLE 7-15 ZONA 9"]
+MUNICIPIOS = ["GUATEMALA", "MIXCO", "VILLA NUEVA", "ANTIGUA GUATEMALA", "QUETZALTENANGO"]
+POSICIONES = ["ANALISTA DE SISTEMAS", "ASESOR DE VENTAS", "CONTADOR GENERAL", "ASISTENTE ADMINISTRATIVO"]
+PROFESIONES = ["INGENIERO EN SISTEMAS", "PERITO CONTADOR", "LICENCIADO EN ADMINISTRACION", "BACHILLER"]
+ESTADOS_CIVILES = ["SOLTERO", "CASADO", "SOLTERA", "CASADA"]
+
+# Orden y texto de las filas de la tabla
+FILAS = [
+    ("EMPRESA", "empresa_contratante"),
+    ("COLABORADOR", "nombre_completo"),
+    ("DPI / PASAPORTE", "cui"),
+    ("DIRECCIÓN", "direccion"),
+    ("FECHA DE INICIO", "fecha_inicio"),
+    ("FECHA DE FINALIZACIÓN", "fecha_fin"),
+    ("HONORARIOS POR PAGAR", "monto"),
+    ("POSICIÓN", "posicion"),
+    ("PROFESIÓN", "profesion"),
+    ("ESTADO CIVIL", "estado_civil"),
+    ("EDAD", "edad"),
+]
+
+ANCHO_HOJA, ALTO_HOJA = 1700, 2200  # carta a 200 dpi
+
+
+def generar_cui(generador) -> str:
+    """CUI de 13 dígitos válido (dígito verificador módulo 11, departamento y municipio existentes)."""
+    from app.services.calidad_ocr import MUNICIPIOS_POR_DEPARTAMENTO
+
+    while True:
+        numero = [int(d) for d in generador.integers(0, 10, 8)]
+        verificador = sum(d * (posicion + 2) for posicion, d in enumerate(numero)) % 11
+        if verificador < 10:
+            break
+    departamento = int(generador.integers(1, len(MUNICIPIOS_POR_DEPARTAMENTO) + 1))
+    municipio = int(generador.integers(1, MUNICIPIOS_POR_DEPARTAMENTO[departamento - 1] + 1))
+    return "".join(map(str, numero)) + str(verificador) + f"{departamento:02d}{municipio:02d}"
+
+
+def generar_verdad(generador) -> dict:
+    """Valores de una hoja, en la forma en que los devuelve parse_ocr_text."""
+    def elegir(opciones):
+        return opciones[int(generador.integers(0, len(opciones)))]
+
+    dia, mes, anio = int(generador.integers(1, 29)), int(generador.integers(1, 13)), int(generador.integers(2024, 2027))
+    indefinido = generador.random() < 0.3
+    monto = int(generador.integers(30, 400)) * 50
+    return {
+        "empresa_contratante": elegir(EMPRESAS),
+        "nombre_completo": f"{elegir(NOMBRES)} {elegir(NOMBRES)} {elegir(APELLIDOS)} {elegir(APELLIDOS)}",
+        "cui": generar_cui(generador),
+        "direccion": f"{elegir(CALLES)}, {elegir(MUNICIPIOS)}",
+        "fecha_inicio": f"{dia:02d}/{mes:02d}/{anio}",
+        "fecha_fin": "Contrato Indefinido" if indefinido else f"{dia:02d}/{mes:02d}/{anio + 1}",
+        "monto": f"Q.{monto:,.2f}",
+        "posicion": elegir(POSICIONES),
+        "profesion": elegir(PROFESIONES),
+        "estado_civil": elegir(ESTADOS_CIVILES),
+        "edad": str(int(generador.integers(18, 70))),
+    }
+
+
+def _texto_celda(campo: str, verdad: dict) -> str:
+    """Cómo se escribe el valor en la hoja (no siempre igual a la verdad normalizada)."""
+    valor = verdad[campo]
+    if campo == "cui":
+        return f"{valor[:4]} {valor[4:9]} {valor[9:]}"
+    if campo == "monto":
+        return "Q" + valor[2:]
+    if campo == "fecha_fin" and valor == "Contrato Indefinido":
+        return "INDEFINIDO"
+    if campo == "edad":
+        return f"{valor} años"
+    return valor
+
+
+def _fuente(tamano: int):
+    from PIL import ImageFont
+    for nombre in ("DejaVuSans.ttf", "Arial.ttf", "LiberationSans-Regular.ttf"):
+        try:
+            return ImageFont.truetype(nombre, tamano)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=tamano)
+
+
+def renderizar_hoja(verdad: dict, nivel: str, generador) -> bytes:
+    """Hoja en formato de tabla, degradada según el nivel, como JPEG."""
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFilter
+
+    parametros = NIVELES[nivel]
+    fuente = _fuente(34)
+    titulo = _fuente(44)
+
+    hoja = Image.new('L', (ANCHO_HOJA, ALTO_HOJA), parametros["papel"])
+    dibujo = ImageDraw.Draw(hoja)
+    dibujo.text((150, 110), "FICHA DE INGRESO DE COLABORADOR", fill=20, font=titulo)
+
+    x_izquierda, x_division, x_derecha = 120, 640, 1580
+    alto_fila = 120
+    y = 240
+    for etiqueta, campo in FILAS:
+        dibujo.rectangle([x_izquierda, y, x_derecha, y + alto_fila], outline=50, width=3)
+        dibujo.line([x_division, y, x_division, y + alto_fila], fill=50, width=3)
+        dibujo.text((x_izquierda + 25, y + 40), etiqueta, fill=25, font=fuente)
+        dibujo.text((x_division + 25, y + 40), _texto_celda(campo, verdad), fill=25, font=fuente)
+        y += alto_fila
+
+    angulo = generador.uniform(-parametros["inclinacion"], parametros["inclinacion"])
+    hoja = hoja.rotate(angulo, fillcolor=parametros["papel"], resample=Image.BICUBIC)
+    if parametros["desenfoque"]:
+        hoja = hoja.filter(ImageFilter.GaussianBlur(parametros["desenfoque"]))
+    ruido = generador.normal(0, parametros["ruido"], (ALTO_HOJA, ANCHO_HOJA))
+    pixeles = np.clip(np.asarray(hoja, dtype=np.float32) + ruido, 0, 255).astype(np.uint8)
+
+    buffer = io.BytesIO()
+    Image.fromarray(pixeles).convert('RGB').save(buffer, 'JPEG', quality=parametros["calidad"])
+    return buffer.getvalue()
+
+
+def generar_corpus(cantidad: int = 30, nivel: str = None, semilla: int = 2025):
+    """
+    Lista de (nombre, bytes JPEG, {"nivel", "campos"}). Sin nivel, se
+    reparten en partes iguales entre todos los niveles.
+    """
+    import numpy as np
+
+    generador = np.random.default_rng(semilla)
+    niveles = [nivel] if nivel else list(NIVELES)
+    corpus = []
+    for i in range(cantidad):
+        nivel_hoja = niveles[i % len(niveles)]
+        verdad = generar_verdad(generador)
+        contenido = renderizar_hoja(verdad, nivel_hoja, generador)
+        corpus.append((f"hoja_{i:04d}_{nivel_hoja}.jpg", contenido, {"nivel": nivel_hoja, "campos": verdad}))
+    return corpus
+
+
+def guardar_corpus(corpus, carpeta: str):
+    os.makedirs(carpeta, exist_ok=True)
+    verdad = {}
+    for nombre, contenido, datos in corpus:
+        with open(os.path.join(carpeta, nombre), 'wb') as f:
+            f.write(contenido)
+        verdad[nombre] = datos
+    with open(os.path.join(carpeta, ARCHIVO_VERDAD), 'w', encoding='utf-8') as f:
+        json.dump(verdad, f, ensure_ascii=False, indent=2)
+
+
+def cargar_corpus(carpeta: str):
+    """Corpus guardado por guardar_corpus (solo las imágenes listadas en verdad.json)."""
+    with open(os.path.join(carpeta, ARCHIVO_VERDAD), encoding='utf-8') as f:
+        verdad = json.load(f)
+    corpus = []
+    for nombre in sorted(verdad):
+        with open(os.path.join(carpeta, nombre), 'rb') as f:
+            corpus.append((nombre, f.read(), verdad[nombre]))
+    return corpus
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    carpeta = sys.argv[1]
+    cantidad = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    nivel = sys.argv[3] if len(sys.argv) > 3 else None
+    if nivel and nivel not in NIVELES:
+        print(f"❌ Nivel inválido: {nivel}. Use: {list(NIVELES)}")
+        return
+
+    corpus = generar_corpus(cantidad, nivel)
+    guardar_corpus(corpus, carpeta)
+    print(f"✅ {len(corpus)} hojas en {carpeta} (verdad en {ARCHIVO_VERDAD})")
+
+
+if __name__ == "__main__":
+    main()
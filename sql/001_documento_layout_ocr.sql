@@ -0,0 +1,27 @@
+-- sql/001_documento_layout_ocr.sql
+-- Layout de OCR guardado por documento, para re-parsear sin volver a correr
+-- el OCR (app/repository/documento_layout_ocr.py, app/services/reparseo_ocr.py).
+-- Idempotente: se puede ejecutar de nuevo sobre una base que ya la tiene.
+
+IF OBJECT_ID(N'dbo.documento_layout_ocr', N'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.documento_layout_ocr (
+        documento_id    INT            NOT NULL PRIMARY KEY,  -- id de sp_CRUD_Documentos
+        layout          VARBINARY(MAX) NOT NULL,              -- JSON comprimido con zlib
+        version_parser  VARCHAR(40)    NOT NULL,              -- PARSER_VERSION-huella de reglas
+        datos_ocr       NVARCHAR(MAX)  NULL,                  -- campos estructurados vigentes (JSON)
+        fecha_creacion  DATETIME2      NOT NULL DEFAULT SYSUTCDATETIME(),
+        fecha_reparseo  DATETIME2      NULL
+    );
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = N'ix_documento_layout_ocr_version'
+      AND object_id = OBJECT_ID(N'dbo.documento_layout_ocr')
+)
+BEGIN
+    CREATE INDEX ix_documento_layout_ocr_version ON dbo.documento_layout_ocr (version_parser, documento_id);
+END
+GO
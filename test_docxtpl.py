@@ -157,7 +157,7 @@ def test_simple_context():
             )
         })()
         
-        context = servicio._preparar_contexto(empresa_mock, representante_mock, solicitud_mock)
+        context = servicio.preparar_contexto(empresa_mock, representante_mock, solicitud_mock)
         
         print("✅ Contexto preparado correctamente")
         print(f"   Secciones: {list(context.keys())}")
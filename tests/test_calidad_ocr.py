@@ -0,0 +1,34 @@
+# tests/test_calidad_ocr.py
+"""Validación de CUI: rango de municipios por departamento."""
+
+import pytest
+
+from app.services.calidad_ocr import validar_cui
+
+
+@pytest.mark.parametrize("cui", [
+    "1234567891421",  # Quiché, municipio 21
+    "4567812341418",  # Quiché, municipio 18
+    "2345678131617",  # Alta Verapaz, municipio 17
+    "5678123401612",  # Alta Verapaz, municipio 12
+    "3456781250808",  # Totonicapán, municipio 8
+    "1234567890514",  # Escuintla, municipio 14 (Sipacate, 2015)
+    "2345678131333",  # Huehuetenango, municipio 33 (Petatán, 2015)
+    "2345 67813 1617",  # con espacios, como viene del OCR
+])
+def test_cui_valido(cui):
+    assert validar_cui(cui)
+
+
+@pytest.mark.parametrize("cui", [
+    "3456781250809",  # Totonicapán solo tiene 8 municipios
+    "1234567891422",  # Quiché solo tiene 21
+    "2345678131618",  # Alta Verapaz solo tiene 17
+    "1234567890515",  # Escuintla solo tiene 14
+    "2345678131334",  # Huehuetenango solo tiene 33
+    "1234567891400",  # municipio 00
+    "1234567892321",  # departamento 23 no existe
+    "1234567801421",  # dígito verificador incorrecto
+])
+def test_cui_invalido(cui):
+    assert not validar_cui(cui)
@@ -0,0 +1,30 @@
+# tests/test_formato_legal.py
+"""parsear_fecha: mismos formatos que aceptaba strptime con "%d/%m/%Y" y "%Y-%m-%d"."""
+
+import datetime
+
+import pytest
+
+from app.utils.formato_legal import parsear_fecha
+
+
+@pytest.mark.parametrize("texto, esperada", [
+    ("15/03/2024", datetime.date(2024, 3, 15)),
+    ("5/1/2007", datetime.date(2007, 1, 5)),
+    ("2024-03-15", datetime.date(2024, 3, 15)),
+    ("2024-3-5", datetime.date(2024, 3, 5)),
+])
+def test_fecha_valida(texto, esperada):
+    assert parsear_fecha(texto) == esperada
+
+
+@pytest.mark.parametrize("texto", [
+    "15/03/24",  # el OCR perdió dígitos del año
+    "24-03-15",
+    "5/1/7",
+    "31/02/2024",
+    "Por tiempo indefinido",
+    "",
+])
+def test_fecha_invalida(texto):
+    assert parsear_fecha(texto) is None
@@ -0,0 +1,36 @@
+# tests/test_layout_ocr.py
+"""Ubicación de etiquetas y celdas en el TSV de Tesseract."""
+
+import pytest
+
+from app.services.layout_ocr import buscar_etiquetas, ubicar_celdas
+from app.services.calidad_ocr import palabras_tsv
+
+
+def _tsv(*lineas):
+    """TSV de Tesseract (sin encabezado): una línea por fila, palabras de 100 px separadas 10 px."""
+    filas = []
+    for numero, palabras in enumerate(lineas, start=1):
+        for indice, texto in enumerate(palabras.split()):
+            filas.append("\t".join(map(str, (
+                5, 1, 1, numero, indice + 1, indice + 1, indice * 110, numero * 50, 100, 30, 95, texto
+            ))))
+    return "\n".join(filas)
+
+
+def test_empresa_con_sociedad_en_el_nombre():
+    tsv = _tsv("EMPRESA: INVERSIONES LA SOCIEDAD ANONIMA", "EDAD: 57")
+    celdas = ubicar_celdas(tsv, ancho_imagen=2000)
+    assert celdas["empresa_contratante"]["texto"] == "INVERSIONES LA SOCIEDAD ANONIMA"
+    assert celdas["edad"]["texto"] == "57"
+    assert celdas["edad"]["caja"][1] == 100  # fila de EDAD, no la de la empresa
+
+
+@pytest.mark.parametrize("texto", ["EMPRESARIAL", "SUBDIRECCIÓN", "DISPOSICIÓN", "SOCIEDAD"])
+def test_etiqueta_dentro_de_otra_palabra(texto):
+    assert buscar_etiquetas(palabras_tsv(_tsv(texto))) == []
+
+
+def test_valor_pegado_a_la_etiqueta():
+    etiquetas = buscar_etiquetas(palabras_tsv(_tsv("EDAD57")))
+    assert [(e["campo"], e["resto"]) for e in etiquetas] == [("edad", "57")]